@@ -190,6 +190,7 @@ import os
 import logging
 
 import hubblestack.module_runner.runner_utils as runner_utils
+import hubblestack.utils.grep
 from hubblestack.exceptions import HubbleCheckValidationError, CommandExecutionError
 
 log = logging.getLogger(__name__)
@@ -288,6 +289,40 @@ def execute(block_id, block_dict, extra_args=None):
     return runner_utils.prepare_positive_result_for_module(block_id, result)
 
 
+def prepare_batch(block_list, extra_args=None):
+    """
+    Run the greps of all the given checks that search the same file in a
+    single pass over that file; execute() then picks up the results.
+
+    :param block_list:
+        list of (block_id, block_dict) of the checks about to be executed
+    :param extra_args:
+        Extra argument dictionary, (If any)
+    """
+    hubblestack.utils.grep.clear_primed()
+    if not __opts__.get('grep_in_process', True):
+        return
+    by_path = {}
+    for block_id, block_dict in block_list:
+        filepath = runner_utils.get_param_for_module(block_id, block_dict, 'path')
+        pattern = runner_utils.get_param_for_module(block_id, block_dict, 'pattern')
+        if not filepath or not pattern:
+            continue
+        filepath = os.path.expanduser(filepath)
+        if not os.path.isfile(filepath):
+            continue
+        flags = runner_utils.get_param_for_module(block_id, block_dict, 'flags')
+        if flags is None:
+            flags = []
+        if isinstance(flags, str):
+            flags = [flags]
+        by_path.setdefault(filepath, []).append(_grep_argv(filepath, pattern, *flags))
+    for filepath, argvs in by_path.items():
+        if len(argvs) > 1:
+            log.debug('Batching %d greps on %s', len(argvs), filepath)
+            hubblestack.utils.grep.prime(filepath, argvs)
+
+
 def get_filtered_params_to_log(block_id, block_dict, extra_args=None):
     """
     For getting params to log, in non-verbose logging
@@ -313,6 +348,25 @@ def get_filtered_params_to_log(block_id, block_dict, extra_args=None):
             'pattern': pattern}
 
 
+def get_inputs(block_id, block_dict, extra_args=None):
+    """
+    The inputs the result of the check depends on, for the differential
+    audit mode (see hubblestack.module_runner.result_store)
+
+    :param block_id:
+        id of the block
+    :param block_dict:
+        parameter for this module
+    :param extra_args:
+        Extra argument dictionary, (If any)
+        Example: {'caller': 'Audit'}
+    """
+    filepath = runner_utils.get_param_for_module(block_id, block_dict, 'path')
+    if not filepath:
+        return None
+    return [('file', filepath)]
+
+
 def _grep(path,
           string,
           pattern,
@@ -346,15 +400,13 @@ def _grep(path,
     if path:
         path = os.path.expanduser(path)
 
-    if args:
-        options = [' '.join(args)]
-    else:
-        options = []
-
     # prepare the command
-    cmd = ['grep'] + options + [pattern]
-    if path:
-        cmd += [path]
+    cmd = ['grep'] + _grep_argv(path, pattern, *args)
+
+    if __opts__.get('grep_in_process', True):
+        ret = hubblestack.utils.grep.run(cmd[1:], stdin=string)
+        if ret is not None:
+            return ret
 
     try:
         ret = __mods__['cmd.run_all'](cmd, python_shell=False, ignore_retcode=True, stdin=string)
@@ -362,3 +414,18 @@ def _grep(path,
         raise CommandExecutionError(exc.strerror)
 
     return ret
+
+
+def _grep_argv(path, pattern, *args):
+    """
+    The arguments (after ``grep``) of the grep command for the given path,
+    pattern and flags
+    """
+    if args:
+        options = [' '.join(args)]
+    else:
+        options = []
+    argv = options + [pattern]
+    if path:
+        argv += [path]
+    return argv
@@ -135,6 +135,8 @@ Functions supported:
     Params:
         path (Mandatory)
         permission (Mandatory)
+        workers (Default 1) - number of threads walking the top level subdirectories
+        max_violations (Default None) - stop after reporting this many files
 - check_duplicate_gnames
     Return False if any duplicate group names exist in /etc/group file, else return True
 - check_duplicate_unames
@@ -247,6 +249,11 @@ ensure_ntp_configured:
 """
 import os
 import logging
+try:
+    import grp
+    import pwd
+except ImportError:
+    pass
 
 import re
 
@@ -256,6 +263,12 @@ from collections import Counter
 import hubblestack.module_runner.comparator
 from hubblestack.module_runner.runner import Caller
 import hubblestack.module_runner.runner_utils as runner_utils
+import hubblestack.utils.accounts as accounts
+import hubblestack.utils.args
+import hubblestack.utils.grep
+import hubblestack.utils.netfilter
+import hubblestack.utils.sysctl
+import hubblestack.utils.treewalk as treewalk
 from hubblestack.exceptions import HubbleCheckValidationError
 import hubblestack.audit.grep as grep_module
 
@@ -381,8 +394,7 @@ def _check_all_ports_firewall_rules(block_id, block_dict, extra_args):
     end_open_ports = (_execute_shell_command('netstat -ln | grep "Active UNIX domain sockets (only servers)" -n  | cut -d ":" -f1', python_shell=True)).strip()
     open_ports = (_execute_shell_command('netstat -ln | awk \'FNR > ' + start_open_ports + ' && FNR < ' + end_open_ports + ' && $6 == "LISTEN" && $4 !~ /127.0.0.1/ {print $4}\' | sed -e "s/.*://"', python_shell=True)).strip()
     open_ports = open_ports.split('\n') if open_ports != "" else []
-    firewall_ports = (_execute_shell_command('iptables -L INPUT -v -n | awk \'FNR > 2 && $11 != "" && $11 ~ /^dpt:/ {print $11}\' | sed -e "s/.*://"', python_shell=True)).strip()
-    firewall_ports = firewall_ports.split('\n') if firewall_ports != "" else []
+    firewall_ports = _firewall_ports()
     no_firewall_ports = []
 
     for open_port in open_ports:
@@ -391,11 +403,23 @@ def _check_all_ports_firewall_rules(block_id, block_dict, extra_args):
 
     return True if len(no_firewall_ports) == 0 else str(no_firewall_ports)
 
+def _firewall_ports():
+    """
+    The destination ports of the rules of the INPUT chain (filter table, IPv4)
+    """
+    if 'iptables.inventory' in __mods__:
+        rules = __mods__['iptables.inventory']().select(family='ipv4', table='filter', chain='INPUT',
+                                                        backend=hubblestack.utils.netfilter.IPTABLES)
+        return [port for rule in rules for port in rule.dports if ':' not in port]
+    firewall_ports = (_execute_shell_command('iptables -L INPUT -v -n | awk \'FNR > 2 && $11 != "" && $11 ~ /^dpt:/ {print $11}\' | sed -e "s/.*://"', python_shell=True)).strip()
+    return firewall_ports.split('\n') if firewall_ports != "" else []
+
 def _check_password_fields_not_empty(block_id, block_dict, extra_args):
     """
     Ensure password fields are not empty
     """
-    result = _execute_shell_command('cat /etc/shadow | awk -F: \'($2 == "" ) { print $1 " does not have a password "}\'', python_shell=True)
+    result = '\n'.join(entry[0] + ' does not have a password ' for entry in _accounts(accounts.shadow)
+                       if accounts.field(entry, 1) == '').rstrip()
     return True if result == '' else result
 
 def _system_account_non_login(block_id, block_dict, extra_args=None):
@@ -411,18 +435,16 @@ def _system_account_non_login(block_id, block_dict, extra_args=None):
         if user.strip() != "":
             users_list.append(user.strip())
     result = []
-    cmd = __mods__["cmd.run_all"]('egrep -v "^\+" /etc/passwd ')
-    for line in cmd['stdout'].split('\n'):
-        tokens = line.split(':')
+    for tokens in _passwd_entries():
         if tokens[0] not in users_list and int(tokens[2]) < int(max_system_uid) and tokens[6] not in ( non_login_shell , "/bin/false" ):
-           result.append(line)
+           result.append(':'.join(tokens))
     return True if result == [] else str(result)
 
 def _default_group_for_root(block_id, block_dict, extra_args):
     """
     Ensure default group for the root account is GID 0
     """
-    result = _execute_shell_command('grep "^root:" /etc/passwd | cut -f4 -d:', python_shell=True)
+    result = '\n'.join(accounts.field(entry, 3) for entry in _accounts(accounts.passwd) if entry[0] == 'root')
     result = result.strip()
     return True if result == '0' else False
 
@@ -431,7 +453,8 @@ def _root_is_only_uid_0_account(block_id, block_dict, extra_args):
     """
     Ensure root is the only UID 0 account
     """
-    result = _execute_shell_command('cat /etc/passwd | awk -F: \'($3 == 0) { print $1 }\'', python_shell=True)
+    result = '\n'.join(entry[0] for entry in _accounts(accounts.passwd)
+                       if accounts.field(entry, 2).strip().isdigit() and int(accounts.field(entry, 2)) == 0)
     return True if result.strip() == 'root' else result
 
 def _check_time_synchronization(block_id, block_dict, extra_args):
@@ -494,8 +517,7 @@ def _check_duplicate_uids(block_id, block_dict, extra_args):
     """
     Return False if any duplicate user id exist in /etc/group file, else return True
     """
-    uids = _execute_shell_command("cat /etc/passwd | cut -f3 -d\":\"", python_shell=True).strip()
-    uids = uids.split('\n') if uids != "" else []
+    uids = [accounts.field(entry, 2) for entry in _accounts(accounts.passwd)]
     duplicate_uids = [k for k, v in Counter(uids).items() if v > 1]
     if duplicate_uids is None or duplicate_uids == []:
         return True
@@ -505,8 +527,7 @@ def _check_duplicate_gids(block_id, block_dict, extra_args):
     """
     Return False if any duplicate group id exist in /etc/group file, else return True
     """
-    gids = _execute_shell_command("cat /etc/group | cut -f3 -d\":\"", python_shell=True).strip()
-    gids = gids.split('\n') if gids != "" else []
+    gids = [accounts.field(entry, 2) for entry in _accounts(accounts.group)]
     duplicate_gids = [k for k, v in Counter(gids).items() if v > 1]
     if duplicate_gids is None or duplicate_gids == []:
         return True
@@ -516,8 +537,7 @@ def _check_duplicate_unames(block_id, block_dict, extra_args):
     """
     Return False if any duplicate user names exist in /etc/group file, else return True
     """
-    unames = _execute_shell_command("cat /etc/passwd | cut -f1 -d\":\"", python_shell=True).strip()
-    unames = unames.split('\n') if unames != "" else []
+    unames = [accounts.field(entry, 0) for entry in _accounts(accounts.passwd)]
     duplicate_unames = [k for k, v in Counter(unames).items() if v > 1]
     if duplicate_unames is None or duplicate_unames == []:
         return True
@@ -527,8 +547,7 @@ def _check_duplicate_gnames(block_id, block_dict, extra_args):
     """
     Return False if any duplicate group names exist in /etc/group file, else return True
     """
-    gnames = _execute_shell_command("cat /etc/group | cut -f1 -d\":\"", python_shell=True).strip()
-    gnames = gnames.split('\n') if gnames != "" else []
+    gnames = [accounts.field(entry, 0) for entry in _accounts(accounts.group)]
     duplicate_gnames = [k for k, v in Counter(gnames).items() if v > 1]
     if duplicate_gnames is None or duplicate_gnames == []:
         return True
@@ -544,13 +563,13 @@ def _check_directory_files_permission(block_id, block_dict, extra_args=None):
     blacklisted_characters = '[^a-zA-Z0-9-_/]'
     if "-exec" in path or re.findall(blacklisted_characters, path):
       raise CommandExecutionError("Profile parameter '{0}' not a safe pattern".format(path))
-    files_list = _execute_shell_command("find {0} -type f".format(path)).strip()
-    files_list = files_list.split('\n') if files_list != "" else []
-    bad_permission_files = []
-    for file_in_directory in files_list:
-        per = _compare_file_stats(block_id, file_in_directory, permission, True)
-        if per is not True:
-            bad_permission_files += [file_in_directory + ": Bad Permission - " + per + ":"]
+    workers = runner_utils.get_param_for_module(block_id, block_dict, 'workers', 1)
+    max_violations = runner_utils.get_param_for_module(block_id, block_dict, 'max_violations')
+    mask = treewalk.permission_mask(permission)
+    bad_files = treewalk.sweep(path, lambda _, st: treewalk.file_mode(st) if st.st_mode & mask else None,
+                               workers=workers, limit=max_violations)
+    bad_permission_files = [file_in_directory + ": Bad Permission - " + per + ":"
+                            for file_in_directory, per in bad_files]
     return True if bad_permission_files == [] else str(bad_permission_files)
 
 def _compare_file_stats(block_id, path, permission, allow_more_strict=False):
@@ -625,13 +644,9 @@ def _check_all_users_home_directory(block_id, block_dict, extra_args=None):
     """
     max_system_uid = runner_utils.get_param_for_module(block_id, block_dict, 'max_system_uid')
     max_system_uid = int(max_system_uid)
-    users_uids_dirs = _execute_shell_command("cat /etc/passwd | awk -F: '{ print $1 \" \" $3 \" \" $6 \" \" $7}'", python_shell=True).strip()
-    users_uids_dirs = users_uids_dirs.split('\n') if users_uids_dirs else []
     error = []
-    for user_data in users_uids_dirs:
-        user_uid_dir = user_data.strip().split(" ")
-        if len(user_uid_dir) < 4:
-                user_uid_dir = user_uid_dir + [''] * (4 - len(user_uid_dir))
+    for entry in _accounts(accounts.passwd):
+        user_uid_dir = [accounts.field(entry, idx) for idx in (0, 2, 5, 6)]
         if user_uid_dir[1].isdigit():
             if not _is_valid_home_directory(user_uid_dir[2], True) and int(user_uid_dir[1]) >= max_system_uid and user_uid_dir[0] != "nfsnobody" \
                     and 'nologin' not in user_uid_dir[3] and 'false' not in user_uid_dir[3]:
@@ -653,9 +668,7 @@ def _check_users_home_directory_permissions(block_id, block_dict, extra_args=Non
             users_list.append(user.strip())
 
     users_dirs = []
-    cmd = __mods__["cmd.run_all"]('egrep -v "^\+" /etc/passwd ')
-    for line in cmd['stdout'].split('\n'):
-        tokens = line.split(':')
+    for tokens in _passwd_entries():
         if tokens[0] not in users_list and 'nologin' not in tokens[6] and 'false' not in tokens[6]:
             users_dirs.append(tokens[0] + " " + tokens[5])
     error = []
@@ -687,20 +700,16 @@ def _check_users_own_their_home(block_id, block_dict, extra_args=None):
     max_system_uid = runner_utils.get_param_for_module(block_id, block_dict, 'max_system_uid')
     max_system_uid = int(max_system_uid)
 
-    users_uids_dirs = _execute_shell_command("cat /etc/passwd | awk -F: '{ print $1 \" \" $3 \" \" $6 \" \" $7}'", python_shell=True).strip()
-    users_uids_dirs = users_uids_dirs.split('\n') if users_uids_dirs != "" else []
     error = []
-    for user_data in users_uids_dirs:
-        user_uid_dir = user_data.strip().split(" ")
-        if len(user_uid_dir) < 4:
-            user_uid_dir = user_uid_dir + [''] * (4 - len(user_uid_dir))
+    for entry in _accounts(accounts.passwd):
+        user_uid_dir = [accounts.field(entry, idx) for idx in (0, 2, 5, 6)]
         if user_uid_dir[1].isdigit():
             if not _is_valid_home_directory(user_uid_dir[2]):
                 if int(user_uid_dir[1]) >= max_system_uid and 'nologin' not in user_uid_dir[3] and 'false' not in user_uid_dir[3]:
                     error += ["Either home directory " + user_uid_dir[2] + " of user " + user_uid_dir[0] + " is invalid or does not exist."]
             elif int(user_uid_dir[1]) >= max_system_uid and user_uid_dir[0] != "nfsnobody" and 'nologin' not in user_uid_dir[3] \
                     and 'false' not in user_uid_dir[3]:
-                owner = __mods__['cmd.run']("stat -L -c \"%U\" \"" + user_uid_dir[2] + "\"")
+                owner = _owner(user_uid_dir[2])
                 if owner != user_uid_dir[0]:
                     error += ["The home directory " + user_uid_dir[2] + " of user " + user_uid_dir[0] + " is owned by " + owner]
         else:
@@ -713,8 +722,9 @@ def _check_users_dot_files(block_id, block_dict, extra_args):
     Ensure users' dot files are not group or world writable
     """
 
-    users_dirs = _execute_shell_command("cat /etc/passwd | egrep -v '(root|halt|sync|shutdown)' | awk -F: '($7 != \"/sbin/nologin\") {print $1\" \"$6}'", python_shell=True).strip()
-    users_dirs = users_dirs.split('\n') if users_dirs != "" else []
+    users_dirs = [entry[0] + " " + accounts.field(entry, 5) for entry in _accounts(accounts.passwd)
+                  if not re.search('(root|halt|sync|shutdown)', ':'.join(entry))
+                  and accounts.field(entry, 6) != "/sbin/nologin"]
     error = []
     for user_dir in users_dirs:
         user_dir = user_dir.split()
@@ -740,8 +750,7 @@ def _check_users_forward_files(block_id, block_dict, extra_args):
     Ensure no users have .forward files
     """
 
-    users_dirs = _execute_shell_command("cat /etc/passwd | awk -F: '{ print $1\" \"$6 }'", python_shell=True).strip()
-    users_dirs = users_dirs.split('\n') if users_dirs != "" else []
+    users_dirs = [entry[0] + " " + accounts.field(entry, 5) for entry in _accounts(accounts.passwd)]
     error = []
     for user_dir in users_dirs:
         user_dir = user_dir.split()
@@ -759,8 +768,7 @@ def _check_users_netrc_files(block_id, block_dict, extra_args):
     Ensure no users have .netrc files
     """
 
-    users_dirs = _execute_shell_command("cat /etc/passwd | awk -F: '{ print $1\" \"$6 }'", python_shell=True).strip()
-    users_dirs = users_dirs.split('\n') if users_dirs != "" else []
+    users_dirs = [entry[0] + " " + accounts.field(entry, 5) for entry in _accounts(accounts.passwd)]
     error = []
     for user_dir in users_dirs:
         user_dir = user_dir.split()
@@ -778,13 +786,11 @@ def _check_groups_validity(block_id, block_dict, extra_args):
     Ensure all groups in /etc/passwd exist in /etc/group
     """
 
-    group_ids_in_passwd = _execute_shell_command("cut -s -d: -f4 /etc/passwd 2>/dev/null", python_shell=True).strip()
-    group_ids_in_passwd = group_ids_in_passwd.split('\n') if group_ids_in_passwd != "" else []
-    group_ids_in_passwd = list(set(group_ids_in_passwd))
+    group_ids_in_passwd = list(set(accounts.field(entry, 3) for entry in _accounts(accounts.passwd)
+                                   if len(entry) > 1))
     invalid_groups = []
     for group_id in group_ids_in_passwd:
-        group_presence_validity = _execute_shell_command("getent group " + group_id + " 2>/dev/null 1>/dev/null; echo $?", python_shell=True).strip()
-        if str(group_presence_validity) != "0":
+        if not _group_exists(group_id):
             invalid_groups += ["Invalid groupid: " + group_id + " in /etc/passwd file"]
 
     return True if invalid_groups == [] else str(invalid_groups)
@@ -794,34 +800,34 @@ def _ensure_reverse_path_filtering(block_id, block_dict, extra_args):
     Ensure Reverse Path Filtering is enabled
     """
     error_list = []
-    command = "sysctl net.ipv4.conf.all.rp_filter 2> /dev/null"
-    output = _execute_shell_command(command, python_shell=True)
-    if output.strip() == '':
-        error_list.append("net.ipv4.conf.all.rp_filter not found")
-    search_results = re.findall("rp_filter = (\d+)", output)
-    result = int(search_results[0])
-    if result < 1:
-        error_list.append("net.ipv4.conf.all.rp_filter  value set to " + str(result))
-    command = "sysctl net.ipv4.conf.default.rp_filter 2> /dev/null"
-    output = _execute_shell_command(command, python_shell=True)
-    if output.strip() == '':
-        error_list.append("net.ipv4.conf.default.rp_filter not found")
-    search_results = re.findall("rp_filter = (\d+)", output)
-    result = int(search_results[0])
-    if result < 1:
-        error_list.append("net.ipv4.conf.default.rp_filter  value set to " + str(result))
+    for name in ('net.ipv4.conf.all.rp_filter', 'net.ipv4.conf.default.rp_filter'):
+        value = _sysctl_value(name)
+        if not value:
+            error_list.append(name + " not found")
+        elif int(value) < 1:
+            error_list.append(name + "  value set to " + value)
     if len(error_list) > 0:
         return str(error_list)
     else:
         return True
 
+
+def _sysctl_value(name):
+    """
+    The value of a kernel parameter, read from /proc/sys when available
+    """
+    if hubblestack.utils.sysctl.available():
+        return hubblestack.utils.sysctl.read(name)
+    return _execute_shell_command("sysctl -n {0} 2> /dev/null".format(name), python_shell=True).strip()
+
 def _check_users_rhosts_files(block_id, block_dict, extra_args):
     """
     Ensure no users have .rhosts files
     """
 
-    users_dirs = _execute_shell_command("cat /etc/passwd | egrep -v '(root|halt|sync|shutdown)' | awk -F: '($7 != \"/sbin/nologin\") {print $1\" \"$6}'", python_shell=True).strip()
-    users_dirs = users_dirs.split('\n') if users_dirs != "" else []
+    users_dirs = [entry[0] + " " + accounts.field(entry, 5) for entry in _accounts(accounts.passwd)
+                  if not re.search('(root|halt|sync|shutdown)', ':'.join(entry))
+                  and accounts.field(entry, 6) != "/sbin/nologin"]
     error = []
     for user_dir in users_dirs:
         user_dir = user_dir.split()
@@ -924,6 +930,14 @@ def _grep(path,
         )
     )
 
+    if __opts__.get('grep_in_process', True):
+        try:
+            ret = hubblestack.utils.grep.run(hubblestack.utils.args.shlex_split(cmd)[1:])
+        except ValueError:
+            ret = None
+        if ret is not None:
+            return ret
+
     try:
         log.info(cmd)
         ret = __salt__['cmd.run_all'](cmd, python_shell=False, ignore_retcode=True)
@@ -1032,15 +1046,15 @@ def _ensure_max_password_expiration(block_id, block_dict, extra_args=None):
         return "PASS_MAX_DAYS must be less than or equal to " + str(allow_max_days)
 
     #fetch all users with passwords
-    grep_args.append('-E')
-    all_users = _grep('/etc/shadow', '^[^:]+:[^\!*]', *grep_args).get('stdout')
+    all_users = '\n'.join(':'.join(entry) for entry in _accounts(accounts.shadow)
+                          if entry[0] and accounts.field(entry, 1)[:1] not in ('!', '*'))
 
     except_for_users_list=[]
     for user in except_for_users.split(","):
         if user.strip() != "":
             except_for_users_list.append(user.strip())
     result = []
-    for line in all_users.split('\n'):
+    for line in all_users.split('\n') if all_users else []:
         user = line.split(':')[0]
         #As per CIS doc, 5th field is the password max expiry days
         user_passwd_expiry = line.split(':')[4]
@@ -1132,6 +1146,55 @@ def _test_failure_reason(block_id, block_dict, extra_args):
     """
     return runner_utils.get_param_for_module(block_id, block_dict, 'reason')
 
+def _accounts(database):
+    """
+    The entries of an account database (hubblestack.utils.accounts), none if
+    it can't be read
+    """
+    try:
+        return database()
+    except (OSError, ValueError) as exc:
+        log.warning('Unable to read the account database: {0}'.format(exc))
+        return ()
+
+def _passwd_entries():
+    """
+    The /etc/passwd entries, without the NIS '+' entries
+    """
+    return [entry for entry in _accounts(accounts.passwd) if not entry[0].startswith('+')]
+
+def _owner(path):
+    """
+    Name of the owner of path (following symlinks), like stat -c %U
+    """
+    try:
+        uid = os.stat(path).st_uid
+    except OSError:
+        return ''
+    name = accounts.uid_to_name(uid)
+    if name is None:
+        try:
+            name = pwd.getpwuid(uid).pw_name
+        except KeyError:
+            name = 'UNKNOWN'
+    return name
+
+def _group_exists(group):
+    """
+    True if the group (gid or name) exists, like getent group
+    """
+    if accounts.gid_to_name(group) is not None \
+            or any(entry[0] == group for entry in _accounts(accounts.group)):
+        return True
+    try:
+        if group.isdigit():
+            grp.getgrgid(int(group))
+        else:
+            grp.getgrnam(group)
+        return True
+    except (KeyError, ValueError):
+        return False
+
 def _execute_shell_command(cmd, python_shell=False):
     """
     This function will execute passed command in /bin/shell
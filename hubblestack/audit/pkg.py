@@ -182,10 +182,14 @@ import logging
 import fnmatch
 
 import hubblestack.module_runner.runner_utils as runner_utils
+import hubblestack.utils.pkg.inventory
 from hubblestack.exceptions import HubbleCheckValidationError
 
 log = logging.getLogger(__name__)
 
+# the package list listed by prepare_batch(), with its generation
+_INSTALLED = {}
+
 
 def validate_params(block_id, block_dict, extra_args=None):
     """
@@ -239,7 +243,7 @@ def execute(block_id, block_dict, extra_args=None):
     if not name:
         name = runner_utils.get_param_for_module(block_id, block_dict, 'name')
 
-    installed_pkgs_dict = __mods__['pkg.list_pkgs']()
+    installed_pkgs_dict = _installed_pkgs()
     filtered_pkgs_list = fnmatch.filter(installed_pkgs_dict, name)
     result_dict = {}
     for package in filtered_pkgs_list:
@@ -248,6 +252,34 @@ def execute(block_id, block_dict, extra_args=None):
     return runner_utils.prepare_positive_result_for_module(block_id, result_dict)
 
 
+def prepare_batch(block_list, extra_args=None):
+    """
+    List the installed packages once for all the given checks (and the
+    following runs, until the package databases change)
+
+    :param block_list:
+        list of (block_id, block_dict) of the checks about to be executed
+    :param extra_args:
+        Extra argument dictionary, (If any)
+    """
+    generation = hubblestack.utils.pkg.inventory.generation()
+    if generation is not None and _INSTALLED.get('generation') == generation:
+        return
+    _INSTALLED.clear()
+    if generation is not None:
+        _INSTALLED.update({'generation': generation, 'packages': __mods__['pkg.list_pkgs']()})
+
+
+def _installed_pkgs():
+    """
+    The installed packages, as listed by prepare_batch() if the package
+    databases didn't change since
+    """
+    if _INSTALLED and _INSTALLED['generation'] == hubblestack.utils.pkg.inventory.generation():
+        return _INSTALLED['packages']
+    return __mods__['pkg.list_pkgs']()
+
+
 def get_filtered_params_to_log(block_id, block_dict, extra_args=None):
     """
     For getting params to log, in non-verbose logging
@@ -267,4 +299,20 @@ def get_filtered_params_to_log(block_id, block_dict, extra_args=None):
     if not name:
         name = runner_utils.get_param_for_module(block_id, block_dict, 'name')
 
-    return {'name': name}
\ No newline at end of file
+    return {'name': name}
+
+
+def get_inputs(block_id, block_dict, extra_args=None):
+    """
+    The inputs the result of the check depends on, for the differential
+    audit mode (see hubblestack.module_runner.result_store)
+
+    :param block_id:
+        id of the block
+    :param block_dict:
+        parameter for this module
+    :param extra_args:
+        Extra argument dictionary, (If any)
+        Example: {'caller': 'Audit'}
+    """
+    return [('pkgs',)]
@@ -222,12 +222,15 @@ main:
     "subkey": 'id'
 """
 
+import copy
+import functools
 import os
 import logging
 import json as _json
 import yaml as _yaml
 import re
 
+import hubblestack.utils.filecache
 from hubblestack.utils.encoding import encode_base64
 import hubblestack.module_runner.runner_utils as runner_utils
 from hubblestack.exceptions import HubbleCheckValidationError
@@ -336,15 +339,17 @@ def _handle_file_helper(file_format, block_id, path, subkey=None, sep=None, chai
         log.error('Path %s not found.', path)
         return runner_utils.prepare_negative_result_for_module(block_id, 'file_not_found')
 
+    if file_format == 'json':
+        parser = _json.load
+    elif file_format == 'yaml':
+        parser = _yaml.safe_load
+    else:
+        return runner_utils.prepare_negative_result_for_module(block_id, 'unknown_format')
     ret = None
     try:
-        with open(path, 'r') as file_handle:
-            if file_format == 'json':
-                ret = _json.load(file_handle)
-            elif file_format == 'yaml':
-                ret = _yaml.safe_load(file_handle)
-            else:
-                return runner_utils.prepare_negative_result_for_module(block_id, 'unknown_format')
+        # the parsed file is shared with other checks, only a copy of the
+        # selected value is returned
+        ret = hubblestack.utils.filecache.parsed(path, file_format, parser)
     except Exception:
         log.error('Error reading file %s.', path, exc_info=True)
         return runner_utils.prepare_negative_result_for_module(block_id, 'exception while reading file')
@@ -368,7 +373,7 @@ def _handle_file_helper(file_format, block_id, path, subkey=None, sep=None, chai
             log.error('Error traversing dict.', exc_info=True)
             return runner_utils.prepare_negative_result_for_module(block_id, 'unknown_error')
 
-    return runner_utils.prepare_positive_result_for_module(block_id, ret)
+    return runner_utils.prepare_positive_result_for_module(block_id, copy.deepcopy(ret))
 
 
 def _handle_config_file(block_id, block_dict, extra_args=None):
@@ -497,24 +502,28 @@ def _lines_as_list(path, pattern, ignore_pattern):
     Helper function for config. Process lines as list of strings.
     """
     try:
-        # All lines as list of strings
-        if not pattern and not ignore_pattern:
-            with open(path, 'r') as input_file:
-                ret = input_file.readlines()
-                ret = [s.strip() for s in ret]
-                return ret
-        # Some lines as a list of strings
-        ret = []
-        with open(path, 'r') as input_file:
-            for line in input_file:
-                line = line.strip()
-                if not _check_pattern(line, pattern, ignore_pattern):
-                    continue
-                ret.append(line)
+        ret = hubblestack.utils.filecache.parsed(
+            path, 'config_list',
+            functools.partial(_parse_lines_as_list, pattern=pattern, ignore_pattern=ignore_pattern),
+            (pattern, ignore_pattern))
     except Exception:
         log.error('Error while processing readfile.config for file %s.', path, exc_info=True)
         return None
 
+    return list(ret)
+
+
+def _parse_lines_as_list(input_file, pattern, ignore_pattern):
+    # All lines as list of strings
+    if not pattern and not ignore_pattern:
+        return [s.strip() for s in input_file.readlines()]
+    # Some lines as a list of strings
+    ret = []
+    for line in input_file:
+        line = line.strip()
+        if not _check_pattern(line, pattern, ignore_pattern):
+            continue
+        ret.append(line)
     return ret
 
 
@@ -522,34 +531,42 @@ def _lines_as_dict(path, pattern, ignore_pattern, dictsep, valsep, subsep):
     """
     Helper function for congig. Process lines as dict.
     """
-    ret = {}
-    found_keys = set()
-    processed_keys = set()
-
     try:
-        with open(path, 'r') as input_file:
-            for line in input_file:
-                line = line.strip()
-                if not _check_pattern(line, pattern, ignore_pattern):
-                    continue
-                key, val = _process_line(line, dictsep, valsep, subsep)
-                if key in found_keys and key not in processed_keys:
-                    # Duplicate keys, make it a list of values underneath
-                    # and add to list of values
-                    ret[key] = [ret[key]]
-                    ret[key].append(val)
-                    processed_keys.add(key)
-                elif key in found_keys and key in processed_keys:
-                    # Duplicate keys, add to list of values
-                    ret[key].append(val)
-                else:
-                    # First found, add to dict as normal
-                    ret[key] = val
-                    found_keys.add(key)
+        ret = hubblestack.utils.filecache.parsed(
+            path, 'config_dict',
+            functools.partial(_parse_lines_as_dict, pattern=pattern, ignore_pattern=ignore_pattern,
+                              dictsep=dictsep, valsep=valsep, subsep=subsep),
+            (pattern, ignore_pattern, dictsep, valsep, subsep))
     except Exception:
         log.error('Error while processing readfile.config for file %s.', path, exc_info=True)
         return None
 
+    return copy.deepcopy(ret)
+
+
+def _parse_lines_as_dict(input_file, pattern, ignore_pattern, dictsep, valsep, subsep):
+    ret = {}
+    found_keys = set()
+    processed_keys = set()
+
+    for line in input_file:
+        line = line.strip()
+        if not _check_pattern(line, pattern, ignore_pattern):
+            continue
+        key, val = _process_line(line, dictsep, valsep, subsep)
+        if key in found_keys and key not in processed_keys:
+            # Duplicate keys, make it a list of values underneath
+            # and add to list of values
+            ret[key] = [ret[key]]
+            ret[key].append(val)
+            processed_keys.add(key)
+        elif key in found_keys and key in processed_keys:
+            # Duplicate keys, add to list of values
+            ret[key].append(val)
+        else:
+            # First found, add to dict as normal
+            ret[key] = val
+            found_keys.add(key)
     return ret
 
 
@@ -639,8 +656,7 @@ def _readfile_string(block_id, path, encode_b64=False, chained_param=None):
     if not os.path.isfile(path):
         log.error('Path %s not found.', path)
         return runner_utils.prepare_negative_result_for_module(block_id, 'file_not_found')
-    with open(path, 'r') as input_file:
-        ret = input_file.read()
+    ret = hubblestack.utils.filecache.parsed(path, 'string', _read)
     status = bool(ret)
     if encode_b64:
         status, ret = encode_base64(ret, format_chained=False)
@@ -648,6 +664,10 @@ def _readfile_string(block_id, path, encode_b64=False, chained_param=None):
     return status, ret
 
 
+def _read(input_file):
+    return input_file.read()
+
+
 def get_filtered_params_to_log(block_id, block_dict, extra_args=None):
     """
     For getting params to log, in non-verbose logging
@@ -666,3 +686,20 @@ def get_filtered_params_to_log(block_id, block_dict, extra_args=None):
     # fetch required param
     filepath = runner_utils.get_param_for_module(block_id, block_dict, 'path')
     return {'path': filepath}
+
+
+def get_inputs(block_id, block_dict, extra_args=None):
+    """
+    The inputs the result of the check depends on, for the differential
+    audit mode (see hubblestack.module_runner.result_store)
+
+    :param block_id:
+        id of the block
+    :param block_dict:
+        parameter for this module
+    :param extra_args:
+        Extra argument dictionary, (If any)
+        Example: {'caller': 'Audit'}
+    """
+    filepath = runner_utils.get_param_for_module(block_id, block_dict, 'path')
+    return [('file', filepath)]
@@ -246,6 +246,17 @@ def execute(block_id, block_dict, extra_args=None):
 
     result = []
     matched_services = fnmatch.filter(__mods__['service.get_all'](), name)
+    if 'service.states' in __mods__:
+        # one batched query (systemd) instead of two per service
+        states = __mods__['service.states'](matched_services)
+        for matched_service in matched_services:
+            result.append({
+                "name": matched_service,
+                "running": states[matched_service]['running'],
+                "enabled": states[matched_service]['enabled']
+            })
+        return runner_utils.prepare_positive_result_for_module(block_id, result)
+
     for matched_service in matched_services:
         service_status = __mods__['service.status'](matched_service)
         is_enabled = __mods__['service.enabled'](matched_service)
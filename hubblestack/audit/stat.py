@@ -280,3 +280,21 @@ def get_filtered_params_to_log(block_id, block_dict, extra_args=None):
     if not filepath:
         filepath = runner_utils.get_param_for_module(block_id, block_dict, 'path')
     return {'path': filepath}
+
+
+def get_inputs(block_id, block_dict, extra_args=None):
+    """
+    The inputs the result of the check depends on, for the differential
+    audit mode (see hubblestack.module_runner.result_store)
+
+    :param block_id:
+        id of the block
+    :param block_dict:
+        parameter for this module
+    :param extra_args:
+        Extra argument dictionary, (If any)
+        Example: {'caller': 'Audit'}
+    """
+    filepath = runner_utils.get_param_for_module(block_id, block_dict, 'path')
+    # file.stats also resolves the owner and group names
+    return [('file', filepath), ('file', '/etc/passwd'), ('file', '/etc/group')]
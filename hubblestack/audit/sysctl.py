@@ -115,6 +115,8 @@ Module Arguments
 ----------------
 - name
     name of kernel parameter
+    On Linux, it can be a shell-style pattern (Example: net.ipv4.conf.*.accept_redirects)
+    matching many parameters
 
 Module Output
 -------------
@@ -124,6 +126,11 @@ Module Output
 
 Output: (True, {'vm.zone_reclaim_mode': '8'})
 
+For a pattern, all the matching parameters:
+Output: (True, {'net.ipv4.conf.all.accept_redirects': '0', 'net.ipv4.conf.default.accept_redirects': '0'})
+
+On Linux, values are read from /proc/sys, all the parameters of a profile at once.
+
 Note: Module returns a tuple
     First value being the status of module
     Second value is the actual output from module
@@ -172,6 +179,7 @@ main:
 import logging
 
 import hubblestack.module_runner.runner_utils as runner_utils
+import hubblestack.utils.sysctl
 from hubblestack.exceptions import HubbleCheckValidationError
 
 log = logging.getLogger(__name__)
@@ -229,7 +237,16 @@ def execute(block_id, block_dict, extra_args=None):
     if not name:
         name = runner_utils.get_param_for_module(block_id, block_dict, 'name')
 
-    sysctl_res = __mods__['sysctl.get'](name)
+    if 'sysctl.values' in __mods__:
+        # read from /proc/sys, primed for the whole batch by prepare_batch()
+        sysctl_res = __mods__['sysctl.values']([name])[name]
+        if isinstance(sysctl_res, dict):
+            if not sysctl_res:
+                return runner_utils.prepare_negative_result_for_module(
+                    block_id, "Could not find attributes matching %s in the kernel" %(name))
+            return runner_utils.prepare_positive_result_for_module(block_id, sysctl_res)
+    else:
+        sysctl_res = __mods__['sysctl.get'](name)
     result = {name: sysctl_res}
     if not sysctl_res or "No such file or directory" in sysctl_res:
         return runner_utils.prepare_negative_result_for_module(block_id, "Could not find attribute %s in the kernel" %(name))
@@ -240,6 +257,26 @@ def execute(block_id, block_dict, extra_args=None):
     return runner_utils.prepare_positive_result_for_module(block_id, result)
 
 
+def prepare_batch(block_list, extra_args=None):
+    """
+    Read the kernel parameters of all the given checks at once, execute()
+    then picks up the values.
+
+    :param block_list:
+        list of (block_id, block_dict) of the checks about to be executed
+    :param extra_args:
+        Extra argument dictionary, (If any)
+    """
+    if 'sysctl.values' not in __mods__:
+        return
+    names = set()
+    for block_id, block_dict in block_list:
+        name = runner_utils.get_param_for_module(block_id, block_dict, 'name')
+        if name:
+            names.add(name)
+    __mods__['sysctl.values'](sorted(names), refresh=True)
+
+
 def get_filtered_params_to_log(block_id, block_dict, extra_args=None):
     """
     For getting params to log, in non-verbose logging
@@ -259,3 +296,22 @@ def get_filtered_params_to_log(block_id, block_dict, extra_args=None):
     if not name:
         name = runner_utils.get_param_for_module(block_id, block_dict, 'name')
     return {'name': name}
+
+
+def get_inputs(block_id, block_dict, extra_args=None):
+    """
+    The inputs the result of the check depends on, for the differential
+    audit mode (see hubblestack.module_runner.result_store)
+
+    :param block_id:
+        id of the block
+    :param block_dict:
+        parameter for this module
+    :param extra_args:
+        Extra argument dictionary, (If any)
+        Example: {'caller': 'Audit'}
+    """
+    name = runner_utils.get_param_for_module(block_id, block_dict, 'name')
+    if hubblestack.utils.sysctl.is_glob(name):
+        return None
+    return [('sysctl', name)]
@@ -106,11 +106,20 @@ check_id:
                     status: false
 """
 
+import collections
 import logging
+import threading
+
 import hubblestack.module_runner.comparator
 
 log = logging.getLogger(__name__)
 
+# expected values of match_any/match_all split by _split_expected(), by
+# identity of the comparator args of a check
+PLANS_MAX_ENTRIES = 1024
+_PLANS = collections.OrderedDict()
+_PLANS_LOCK = threading.Lock()
+
 
 def size(audit_id, result_to_compare, args):
     """
@@ -192,6 +201,7 @@ def match_any(audit_id, result_to_compare, args):
     """
     log.debug('Running list::match_any for check: {0}'.format(audit_id))
 
+    values, others = _plan(args, 'match_any')
     for r_compare in result_to_compare:
         if is_integer(r_compare):
             ret_status, ret_val = hubblestack.module_runner.comparator.run(
@@ -209,8 +219,11 @@ def match_any(audit_id, result_to_compare, args):
             if ret_status:
                 return True, "Check Passed"
         else:
+            # primitive datatype comparison
+            if _contains(values, r_compare):
+                return True, "Check Passed"
             # direct compare
-            for to_compare in args['match_any']:
+            for to_compare in others:
                 # check if it has specified any custom comparator
                 if isinstance(to_compare, dict):
                     dict_key = list(to_compare.keys())[0]
@@ -243,6 +256,9 @@ def match_all(audit_id, result_to_compare, args):
     """
     log.debug('Running list::match_all for check: {0}'.format(audit_id))
 
+    if not any(isinstance(r_compare, dict) for r_compare in result_to_compare):
+        return _match_all_values(audit_id, result_to_compare, args)
+
     for to_compare in args['match_all']:
         found_match = False
         for r_compare in result_to_compare:
@@ -274,6 +290,93 @@ def match_all(audit_id, result_to_compare, args):
     return True, "Check Passed"
 
 
+def _match_all_values(audit_id, result_to_compare, args):
+    """
+    list::match_all for a result without dicts: the primitive expected values
+    are looked up in a set of the result's values instead of comparing every
+    pair
+    """
+    values, others = _plan(args, 'match_all')
+    result_values = set()
+    unhashable = []
+    for r_compare in result_to_compare:
+        try:
+            result_values.add(r_compare)
+        except TypeError:
+            unhashable.append(r_compare)
+
+    for to_compare in values:
+        if to_compare not in result_values and to_compare not in unhashable:
+            return False, "Check failed, got={0}".format(result_to_compare)
+
+    for to_compare in others:
+        found_match = False
+        for r_compare in result_to_compare:
+            ret_status = False
+            if isinstance(to_compare, dict):
+                dict_key = list(to_compare.keys())[0]
+                if 'type' in to_compare[dict_key]:
+                    # Lets hand-over this new specific comparison to comparator orchestrator
+                    ret_status, ret_val = hubblestack.module_runner.comparator.run(
+                        audit_id,
+                        to_compare[dict_key],
+                        r_compare)
+            else:
+                ret_status = r_compare == to_compare
+
+            if ret_status:
+                found_match = True
+                break
+        if not found_match:
+            return False, "Check failed, got={0}".format(result_to_compare)
+    return True, "Check Passed"
+
+
+def _plan(args, name):
+    """
+    The (cached) _split_expected() of ``args[name]``
+    """
+    key = (id(args), name)
+    with _PLANS_LOCK:
+        plan = _PLANS.get(key)
+        if plan is not None and plan[0] is args:
+            _PLANS.move_to_end(key)
+            return plan[1]
+    ret = _split_expected(args[name])
+    with _PLANS_LOCK:
+        # keeping a reference to args keeps its id from being reused
+        _PLANS[key] = (args, ret)
+        while len(_PLANS) > PLANS_MAX_ENTRIES:
+            _PLANS.popitem(last=False)
+    return ret
+
+
+def _split_expected(expected):
+    """
+    Split expected values into a set of the hashable primitive ones, which
+    can be matched by membership, and a list of the others (dicts naming
+    another comparator, unhashable values) that are compared one by one
+    """
+    values = set()
+    others = []
+    for to_compare in expected:
+        if isinstance(to_compare, dict):
+            others.append(to_compare)
+            continue
+        try:
+            values.add(to_compare)
+        except TypeError:
+            others.append(to_compare)
+    return values, others
+
+
+def _contains(values, value):
+    try:
+        return value in values
+    except TypeError:
+        return False
+
+
 def match_any_if_keyvalue_matches(audit_id, result_to_compare, args):
     """
     We want to compare things if we found our interested key
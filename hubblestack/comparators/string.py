@@ -26,6 +26,7 @@ String comparator exposes various commands:
         is_regex: true # Optional, default False
         is_multiline: false # Optional. Works only when is_regex=True
 """
+import functools
 import logging
 import re
 
@@ -78,8 +79,11 @@ def _compare(result_to_compare, expected_string, args):
     is_regex = args.get('is_regex', False)
     if is_regex:
         is_multiline = args.get('is_multiline', True)
-        if is_multiline:
-            return re.search(expected_string, result_to_compare, re.MULTILINE)
-        return re.search(expected_string, result_to_compare)
+        return _compile(expected_string, re.MULTILINE if is_multiline else 0).search(result_to_compare)
     else:
         return result_to_compare == expected_string
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile(pattern, flags):
+    return re.compile(pattern, flags)
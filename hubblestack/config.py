@@ -218,6 +218,49 @@ VALID_OPTS = {
     # other non-salt hubble-specific things
     "fileserver_update_frequency": int,
     "grains_refresh_frequency": int,
+    # Number of (non-core) grain functions run concurrently
+    "grains_workers": int,
+    # Seconds before a single grain function is abandoned (0 to wait forever)
+    "grains_timeout": int,
+    # Seconds a grain function's result is reused, by glob on the function
+    # key (e.g. hubble_core.os_data); unmatched grains use grains_refresh_frequency
+    "grains_refresh_ttl": dict,
+    # Grains that (can) affect __virtual__; the module and returner loaders are
+    # only rebuilt on a grains refresh when one of these changed
+    "grains_reload_keys": list,
+    # Reuse module directory scans between loaders and runs while the
+    # directories don't change (cached in <cachedir>/loader/file_mapping.p)
+    "loader_file_mapping_cache": bool,
+    # Run the grep checks of the audit/fdg/nova grep modules in-process (the
+    # external grep is still used for anything the engine doesn't support)
+    "grep_in_process": bool,
+    # Spawn commands through a small helper process forked at startup
+    # (hubblestack.utils.spawn_broker) instead of from the daemon itself
+    "cmd_broker": bool,
+    # Command lines (globs) of read-only commands whose output cmd.run & co
+    # reuse for cmd_memoize_ttl seconds, e.g. ['rpm -qa*', 'systemctl list-unit-files*']
+    "cmd_memoize": list,
+    "cmd_memoize_ttl": int,
+    # Keep audit/fdg profiles parsed and validated (keyed by content hash) in
+    # memory and in <cachedir>/profiles instead of parsing the YAML every run
+    "profile_cache": bool,
+    # Answer audit checks whose inputs (as declared by their module) didn't
+    # change from their last result, with a full run every
+    # audit_differential_full_run seconds
+    "audit_differential": bool,
+    "audit_differential_full_run": int,
+    # Threads running the elements of an fdg xpipe (1: one after the other)
+    # and the seconds after which an element is abandoned (0: no limit)
+    "fdg_xpipe_workers": int,
+    "fdg_xpipe_timeout": int,
+    # Reverse lookups of the fqdns grain: threads running them, seconds after
+    # which one lookup and all of them are abandoned (0: no limit), and the
+    # seconds names (or the lack of them) are reused across grains refreshes
+    "fqdns_workers": int,
+    "fqdns_timeout": int,
+    "fqdns_deadline": int,
+    "fqdns_ttl": int,
+    "fqdns_negative_ttl": int,
     "scheduler_sleep_frequency": float,
     "default_include": str,
     "logfile_maxbytes": int,
@@ -234,6 +277,8 @@ VALID_OPTS = {
     "file_roots": dict,
     # The type of hashing algorithm to use when doing file comparisons
     "hash_type": str,
+    # Remember server/local file hashes in the fileclient between fileserver updates
+    "fileclient_hash_cache": bool,
     # Order of preference for optimized .pyc files (PY3 only)
     "optimization_order": list,
     # Refuse to load these modules
@@ -521,6 +566,10 @@ VALID_OPTS = {
     "gitfs_ref_types": list,
     "gitfs_refspecs": list,
     "gitfs_disable_saltenv_mapping": bool,
+    # Number of gitfs remotes fetched concurrently
+    "gitfs_fetch_workers": int,
+    # Seconds before a single gitfs remote fetch is abandoned (0 to wait forever)
+    "gitfs_fetch_timeout": int,
     "hgfs_remotes": list,
     "hgfs_mountpoint": str,
     "hgfs_root": str,
@@ -906,6 +955,37 @@ DEFAULT_OPTS = {
     "file_client": "local",
     "fileserver_update_frequency": 43200, # 12 hours
     "grains_refresh_frequency": 3600, # 1 hour
+    "grains_workers": 8,
+    "grains_timeout": 60,
+    "grains_refresh_ttl": {
+        '*.os_data': 86400,
+        '*.get_machine_id': 86400,
+        '*.python*': 86400,
+        '*.saltpath': 86400,
+        'hubbleversion.*': 86400,
+        'hubble_process.*': 86400,
+    },
+    "grains_reload_keys": [
+        'os', 'os_family', 'osfullname', 'osrelease', 'osrelease_info',
+        'osmajorrelease', 'osfinger', 'osarch', 'cpuarch', 'kernel',
+        'kernelrelease', 'init', 'virtual', 'virtual_subtype', 'lsb_distrib_id',
+        'hubble_uuid', 'system_uuid', 'ip_gw',
+    ],
+    "loader_file_mapping_cache": True,
+    "grep_in_process": True,
+    "cmd_broker": True,
+    "cmd_memoize": [],
+    "cmd_memoize_ttl": 60,
+    "profile_cache": True,
+    "audit_differential": False,
+    "audit_differential_full_run": 86400,
+    "fdg_xpipe_workers": 1,
+    "fdg_xpipe_timeout": 0,
+    "fqdns_workers": 8,
+    "fqdns_timeout": 5,
+    "fqdns_deadline": 10,
+    "fqdns_ttl": 3600,
+    "fqdns_negative_ttl": 300,
     "scheduler_sleep_frequency": 0.5, # 500ms
     "default_include": 'hubble.d/*.conf',
     "logfile_maxbytes": 100000000, # 100MB kindof
@@ -972,8 +1052,11 @@ DEFAULT_OPTS = {
     "gitfs_ref_types": ["branch", "tag", "sha"],
     "gitfs_refspecs": _DFLT_REFSPECS,
     "gitfs_disable_saltenv_mapping": False,
+    "gitfs_fetch_workers": 4,
+    "gitfs_fetch_timeout": 300,
     "unique_jid": False,
     "hash_type": "sha256",
+    "fileclient_hash_cache": True,
     "optimization_order": [0, 1, 2],
     "disable_modules": [],
     "disable_returners": [],
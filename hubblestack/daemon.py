@@ -4,7 +4,12 @@ Main entry point for the hubble daemon
 """
 
 # import lockfile
+import time
+# measured as the "import" phase of hubble --startup-profile
+_IMPORT_START = time.time()
+
 import argparse
+import collections
 import copy
 import json
 import logging
@@ -17,7 +22,6 @@ import random
 import signal
 import socket
 import sys
-import time
 import uuid
 from datetime import datetime
 
@@ -29,6 +33,8 @@ import hubblestack.utils.platform
 import hubblestack.utils.jid
 import hubblestack.utils.gitfs
 import hubblestack.utils.path
+import hubblestack.utils.pkg.inventory
+import hubblestack.utils.spawn_broker
 from croniter import croniter
 
 import hubblestack.loader
@@ -56,13 +62,15 @@ if not hubblestack.utils.platform.is_windows():
 __opts__ = {}
 # This should work fine until we go to multiprocessing
 SESSION_UUID = str(uuid.uuid4())
+# seconds spent in each startup phase, see --startup-profile
+STARTUP_PROFILE = collections.OrderedDict([('import', time.time() - _IMPORT_START)])
 
 def run():
     """
     Set up program, daemonize if needed
     """
     try:
-        load_config()
+        load_config(start_broker=True)
     except Exception as exc:
         print('An Error occurred while loading the config: %s', exc)
         raise
@@ -142,6 +150,7 @@ def main():
     retry_count = __opts__.get('fileserver_retry_count_on_startup', None)
     retry_time = __opts__.get('fileserver_retry_rate_on_startup', 30)
     count = 0
+    start = time.time()
     while True:
         try:
             file_client = hubblestack.fileclient.get_file_client(__opts__)
@@ -158,6 +167,11 @@ def main():
             else:
                 log.exception('Exception thrown trying to setup fileclient. Exiting.')
                 sys.exit(1)
+    _record_startup('fileserver', start)
+    if __opts__.get('startup_profile'):
+        print(_startup_profile_report())
+        clean_up_process(None, None)
+        sys.exit(0)
     # Check for single function run
     if __opts__['function']:
         run_function()
@@ -177,6 +191,11 @@ def main():
             create_pidfile()
         if time.time() - last_grains_refresh >= __opts__['grains_refresh_frequency']:
             last_grains_refresh = _emit_and_refresh_grains()
+        elif hubblestack.loader.grains_expired(max_ttl=__opts__['grains_refresh_frequency']):
+            # grains with a grains_refresh_ttl shorter than the refresh
+            # frequency; everything else is reused from the last refresh
+            log.debug('Refreshing expired grains')
+            refresh_grains()
         try:
             log.debug('Executing schedule')
             sf_count = schedule()
@@ -445,13 +464,30 @@ def run_function():
             print(ret)
 
 
-def load_config(args=None):
+def _start_spawn_broker():
+    """
+    Fork the command spawn broker. This has to happen while the daemon is
+    still single-threaded (a fork while other threads hold locks, like the
+    logging ones, can leave the child deadlocked) and small: before the
+    grains refresh (on its thread pool) and the loaders.
+    """
+    if __opts__.get('cmd_broker') and not __opts__['function'] \
+            and not __opts__.get('startup_profile') and not hubblestack.utils.platform.is_windows():
+        hubblestack.utils.spawn_broker.BROKER.start()
+
+
+def load_config(args=None, start_broker=False):
     """
     Load the config from configfile and load into imported salt modules
+
+    start_broker
+        Fork the command spawn broker once the daemon is set up (and before
+        the first grains refresh), see ``cmd_broker``
     """
 
     global __opts__
 
+    start = time.time()
     # Parse arguments
     parsed_args = parse_args(args=args)
 
@@ -494,7 +530,8 @@ def load_config(args=None):
             check_pidfile(kill_other=True, scan_proc=scan_proc)
         hubblestack.utils.daemonize()
         create_pidfile()
-    elif not __opts__['function'] and not __opts__['version'] and not __opts__['buildinfo']:
+    elif not __opts__['function'] and not __opts__['version'] and not __opts__['buildinfo'] \
+            and not __opts__.get('startup_profile'):
         # check the pidfile and possibly refuse to run (assuming this isn't a single function call)
         if not __opts__.get('ignore_running', False):
             check_pidfile(kill_other=False, scan_proc=scan_proc)
@@ -505,12 +542,17 @@ def load_config(args=None):
     _setup_dirs()
     _disable_boto_modules()
     _setup_logging(parsed_args)
+    if start_broker:
+        _start_spawn_broker()
     _setup_cached_uuid()
+    _record_startup('config', start)
     refresh_grains(initial=True)
+    start = time.time()
     if __mods__['config.get']('splunklogging', False):
         hubblestack.log.setup_splunk_logger()
         hubblestack.log.emit_to_splunk(__grains__, 'INFO', 'hubblestack.grains_report')
         __mods__['conf_publisher.publish']()
+    _record_startup('splunk logging', start)
 
     return __opts__ # this is also a global, but the return is handy in tests/unittests
 
@@ -687,6 +729,10 @@ def _setup_dirs():
 def refresh_grains(initial=False):
     """
     Refresh the grains, pillar, utils, modules, and returners
+
+    Grain functions whose results haven't expired (see grains_refresh_ttl)
+    are not re-run, and the utils, modules and returners are only reloaded
+    when one of the grains_reload_keys grains changed.
     """
     global __opts__
     global __grains__
@@ -712,9 +758,12 @@ def refresh_grains(initial=False):
         __opts__.pop('grains')
     if 'pillar' in __opts__:
         __opts__.pop('pillar')
-    __grains__ = hubblestack.loader.grains(__opts__)
-    __grains__.update(persist)
-    __grains__['session_uuid'] = SESSION_UUID
+    start = time.time()
+    new_grains = hubblestack.loader.grains(__opts__)
+    if initial:
+        _record_startup('grains', start)
+    new_grains.update(persist)
+    new_grains['session_uuid'] = SESSION_UUID
 
     # This was a weird one. In older versions of hubble the version and
     # buildinfo were not persisted automatically which means that if you
@@ -722,10 +771,15 @@ def refresh_grains(initial=False):
     # cause that old daemon to report grains as if it were the new version.
     # Now if this hubble_marker_3 grain is present you know you can trust the
     # hubble_version and buildinfo.
-    __grains__['hubble_marker_3'] = True
+    new_grains['hubble_marker_3'] = True
 
-    old_grains.update(__grains__)
-    __grains__ = old_grains
+    reload_loaders = initial or _grains_need_reload(old_grains, new_grains)
+    if reload_loaders:
+        old_grains.update(new_grains)
+        __grains__ = old_grains
+    else:
+        # the loaded modules hold a reference to __grains__; update it in place
+        __grains__.update(new_grains)
 
     # Check for default gateway and fall back if necessary
     if __grains__.get('ip_gw', None) is False and 'fallback_fileserver_backend' in __opts__:
@@ -734,12 +788,19 @@ def refresh_grains(initial=False):
 
     __opts__['hubble_uuid'] = __grains__.get('hubble_uuid', None)
     __opts__['system_uuid'] = __grains__.get('system_uuid', None)
-    __pillar__ = {}
     __opts__['grains'] = __grains__
-    __opts__['pillar'] = __pillar__
-    __utils__ = hubblestack.loader.utils(__opts__)
-    __mods__ = hubblestack.loader.modules(__opts__, utils=__utils__, context=__context__)
-    __returners__ = hubblestack.loader.returners(__opts__, __mods__)
+    if reload_loaders:
+        start = time.time()
+        __pillar__ = {}
+        __opts__['pillar'] = __pillar__
+        __utils__ = hubblestack.loader.utils(__opts__)
+        __mods__ = hubblestack.loader.modules(__opts__, utils=__utils__, context=__context__)
+        __returners__ = hubblestack.loader.returners(__opts__, __mods__)
+        if initial:
+            _record_startup('loaders', start)
+    else:
+        __opts__['pillar'] = __pillar__
+        log.debug('No grains affecting module loading changed, keeping the loaded modules')
 
     # the only things that turn up in here (and that get preserved)
     # are pulsar.queue, pulsar.notifier and cp.fileclient_###########
@@ -785,6 +846,40 @@ def refresh_grains(initial=False):
         hubblestack.log.emit_to_splunk(__grains__, 'INFO', 'hubblestack.grains_report')
 
 
+def _record_startup(phase, start):
+    """ Add the time since start to the given phase of STARTUP_PROFILE """
+    STARTUP_PROFILE[phase] = STARTUP_PROFILE.get(phase, 0) + time.time() - start
+
+
+def _startup_profile_report():
+    """
+    Format the time spent in each startup phase (hubble --startup-profile)
+    """
+    total = sum(STARTUP_PROFILE.values())
+    lines = ['hubble startup profile:']
+    for phase, secs in STARTUP_PROFILE.items():
+        lines.append('  {0:<16} {1:8.3f}s {2:6.1%}'.format(phase, secs, secs / total if total else 0))
+    lines.append('  {0:<16} {1:8.3f}s'.format('total', total))
+    stats = hubblestack.loader.FILE_MAPPING_STATS
+    lines.append('  loaders created: {0}, module dir scans: {1}, file mapping cache hits: {2}, '
+                 'file mapping time: {3:.3f}s'.format(stats['loaders'], stats['scans'],
+                                                      stats['hits'], stats['time']))
+    return '\n'.join(lines)
+
+
+def _grains_need_reload(old_grains, new_grains):
+    """
+    Check whether any of the grains that can change which modules load
+    (grains_reload_keys) differ between the old and the new grains. Grains
+    missing from new_grains keep their old value, as in refresh_grains.
+    """
+    for grain in __opts__.get('grains_reload_keys', []):
+        if grain in new_grains and old_grains.get(grain) != new_grains[grain]:
+            log.info('Grain %s changed, reloading modules', grain)
+            return True
+    return False
+
+
 def emit_to_syslog(grains_to_emit):
     """
     Emit grains and their values to syslog
@@ -816,8 +911,10 @@ def clear_selective_context():
     global __context__
 
     # Fixing bug: Package list is not refreshed
-    # clear the package list so that pkg module can fetch it as fresh in next cycle
-    __context__.pop('pkg.list_pkgs', None)
+    # clear the package list so that pkg module can fetch it as fresh in next cycle,
+    # once the package databases changed (always, when they can't be checked)
+    if hubblestack.utils.pkg.inventory.refresh_context(__context__) is None:
+        __context__.pop('pkg.list_pkgs', None)
 
 def parse_args(args=None):
     """
@@ -850,6 +947,9 @@ def parse_args(args=None):
         help='Optional argument to print the output of single run function in json format')
     parser.add_argument('--ignore_running', action='store_true',
                         help='Ignore any running hubble processes. This disables the pidfile.')
+    parser.add_argument('--startup-profile', action='store_true',
+                        help='Start up (config, grains, loaders, fileserver), print how long '
+                             'each phase took and exit')
     return vars(parser.parse_args(args=args))
 
 
@@ -9,6 +9,7 @@ This fdg module allows for grepping against files and strings
 import logging
 import os.path
 
+import hubblestack.utils.grep
 from hubblestack.exceptions import CommandExecutionError
 
 log = logging.getLogger(__name__)
@@ -130,6 +131,11 @@ def _grep(pattern, path=None, string=None, args=None):
     if path:
         cmd += [path]
 
+    if __opts__.get('grep_in_process', True):
+        ret = hubblestack.utils.grep.run(cmd[1:], stdin=string)
+        if ret is not None:
+            return ret['stdout']
+
     try:
         ret = __mods__['cmd.run_stdout'](cmd, python_shell=False, ignore_retcode=True, stdin=string)
     except (IOError, OSError) as exc:
@@ -7,6 +7,8 @@ options for format and filtering.
 """
 
 
+import copy
+import functools
 import json as _json
 import logging
 import os
@@ -14,6 +16,7 @@ import re
 
 import yaml as _yaml
 
+import hubblestack.utils.filecache
 from hubblestack.utils.encoding import encode_base64
 
 log = logging.getLogger(__name__)
@@ -54,8 +57,7 @@ def json(path, subkey=None, sep=None, chained=None, chained_status=None):
 
     ret = None
     try:
-        with open(path, 'r') as jfile:
-            ret = _json.load(jfile)
+        ret = hubblestack.utils.filecache.parsed(path, 'json', _json.load)
     except Exception:
         log.error('Error reading file %s.', path, exc_info=True)
 
@@ -75,7 +77,7 @@ def json(path, subkey=None, sep=None, chained=None, chained_status=None):
             log.error('Error traversing dict.', exc_info=True)
             return False, None
 
-    return True, ret
+    return True, copy.deepcopy(ret)
 
 
 def yaml(path, subkey=None, sep=None, chained=None, chained_status=None):
@@ -113,8 +115,7 @@ def yaml(path, subkey=None, sep=None, chained=None, chained_status=None):
 
     ret = None
     try:
-        with open(path, 'r') as yaml_file:
-            ret = _yaml.safe_load(yaml_file)
+        ret = hubblestack.utils.filecache.parsed(path, 'yaml', _yaml.safe_load)
     except Exception:
         log.error('Error reading file %s.', path, exc_info=True)
 
@@ -134,7 +135,7 @@ def yaml(path, subkey=None, sep=None, chained=None, chained_status=None):
             log.error('Error traversing dict.', exc_info=True)
             return False, None
 
-    return True, ret
+    return True, copy.deepcopy(ret)
 
 
 def config(path,
@@ -251,24 +252,28 @@ def _lines_as_list(path, pattern, ignore_pattern):
     Helper function for config. Process lines as list of strings.
     """
     try:
-        # All lines as list of strings
-        if not pattern and not ignore_pattern:
-            with open(path, 'r') as input_file:
-                ret = input_file.readlines()
-                ret = [s.strip() for s in ret]
-                return ret
-        # Some lines as a list of strings
-        ret = []
-        with open(path, 'r') as input_file:
-            for line in input_file:
-                line = line.strip()
-                if not _check_pattern(line, pattern, ignore_pattern):
-                    continue
-                ret.append(line)
+        ret = hubblestack.utils.filecache.parsed(
+            path, 'config_list',
+            functools.partial(_parse_lines_as_list, pattern=pattern, ignore_pattern=ignore_pattern),
+            (pattern, ignore_pattern))
     except Exception:
         log.error('Error while processing readfile.config for file %s.', path, exc_info=True)
         return None
 
+    return list(ret)
+
+
+def _parse_lines_as_list(input_file, pattern, ignore_pattern):
+    # All lines as list of strings
+    if not pattern and not ignore_pattern:
+        return [s.strip() for s in input_file.readlines()]
+    # Some lines as a list of strings
+    ret = []
+    for line in input_file:
+        line = line.strip()
+        if not _check_pattern(line, pattern, ignore_pattern):
+            continue
+        ret.append(line)
     return ret
 
 
@@ -276,34 +281,42 @@ def _lines_as_dict(path, pattern, ignore_pattern, dictsep, valsep, subsep):
     """
     Helper function for congig. Process lines as dict.
     """
-    ret = {}
-    found_keys = set()
-    processed_keys = set()
-
     try:
-        with open(path, 'r') as input_file:
-            for line in input_file:
-                line = line.strip()
-                if not _check_pattern(line, pattern, ignore_pattern):
-                    continue
-                key, val = _process_line(line, dictsep, valsep, subsep)
-                if key in found_keys and key not in processed_keys:
-                    # Duplicate keys, make it a list of values underneath
-                    # and add to list of values
-                    ret[key] = [ret[key]]
-                    ret[key].append(val)
-                    processed_keys.add(key)
-                elif key in found_keys and key in processed_keys:
-                    # Duplicate keys, add to list of values
-                    ret[key].append(val)
-                else:
-                    # First found, add to dict as normal
-                    ret[key] = val
-                    found_keys.add(key)
+        ret = hubblestack.utils.filecache.parsed(
+            path, 'config_dict',
+            functools.partial(_parse_lines_as_dict, pattern=pattern, ignore_pattern=ignore_pattern,
+                              dictsep=dictsep, valsep=valsep, subsep=subsep),
+            (pattern, ignore_pattern, dictsep, valsep, subsep))
     except Exception:
         log.error('Error while processing readfile.config for file %s.', path, exc_info=True)
         return None
 
+    return copy.deepcopy(ret)
+
+
+def _parse_lines_as_dict(input_file, pattern, ignore_pattern, dictsep, valsep, subsep):
+    ret = {}
+    found_keys = set()
+    processed_keys = set()
+
+    for line in input_file:
+        line = line.strip()
+        if not _check_pattern(line, pattern, ignore_pattern):
+            continue
+        key, val = _process_line(line, dictsep, valsep, subsep)
+        if key in found_keys and key not in processed_keys:
+            # Duplicate keys, make it a list of values underneath
+            # and add to list of values
+            ret[key] = [ret[key]]
+            ret[key].append(val)
+            processed_keys.add(key)
+        elif key in found_keys and key in processed_keys:
+            # Duplicate keys, add to list of values
+            ret[key].append(val)
+        else:
+            # First found, add to dict as normal
+            ret[key] = val
+            found_keys.add(key)
     return ret
 
 
@@ -390,8 +403,7 @@ def readfile_string(path, encode_b64=False, chained=None, chained_status=None):
         log.error('Path %s not found.', path)
         return False, None
     try:
-        with open(path, 'r') as input_file:
-            ret = input_file.read()
+        ret = hubblestack.utils.filecache.parsed(path, 'string', _read)
     except Exception:
         log.error('Error reading file %s', path, exc_info=True)
         return False, None
@@ -400,3 +412,7 @@ def readfile_string(path, encode_b64=False, chained=None, chained_status=None):
         status, ret = encode_base64(ret, format_chained=False)
 
     return status, ret
+
+
+def _read(input_file):
+    return input_file.read()
@@ -81,6 +81,8 @@ class Client(object):
         self.opts = opts
         self.utils = hubblestack.loader.utils(self.opts)
         self.serial = hubblestack.payload.Serial(self.opts)
+        # (saltenv, path, dest, cachedir) -> (generation, hash, local path, stat key)
+        self._hash_cache = {}
 
     # Add __setstate__ and __getstate__ so that the object may be
     # deep copied. It normally can't be deep copied because its
@@ -744,6 +746,52 @@ class RemoteClient(Client):
         if channel is not None:
             channel.close()
 
+    def _hash_cache_enabled(self):
+        '''
+        The hash cache is only valid when the fileserver is local to this
+        process; that's the only case where we see fileserver updates happen
+        (through the fileserver update generation counter).
+        '''
+        if not self.opts.get('fileclient_hash_cache', True):
+            return False
+        return getattr(self.channel, 'fs', None) is not None
+
+    @staticmethod
+    def _local_stat_key(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _hash_cache_get(self, key):
+        '''
+        Return the cached local path for key if neither the fileserver has
+        been updated nor the local copy modified since the entry was made.
+        '''
+        entry = self._hash_cache.get(key)
+        if entry is None:
+            return None
+        generation, _, local_path, stat_key = entry
+        if generation != hubblestack.fileserver.update_generation() \
+                or self._local_stat_key(local_path) != stat_key:
+            self._hash_cache.pop(key, None)
+            return None
+        return local_path
+
+    def _hash_cache_set(self, key, hash_server, local_path):
+        stat_key = self._local_stat_key(local_path)
+        if not hash_server or stat_key is None:
+            return
+        self._hash_cache[key] = (hubblestack.fileserver.update_generation(),
+                                 hash_server, local_path, stat_key)
+
+    def clear_hash_cache(self):
+        '''
+        Forget all remembered server/local file hashes
+        '''
+        self._hash_cache.clear()
+
     def get_file(self,
                  path,
                  dest='',
@@ -756,11 +804,27 @@ class RemoteClient(Client):
         path must be a salt server location, aka, salt://path/to/file, if
         dest is omitted, then the downloaded file will be placed in the minion
         cache
+
+        When the fileserver is local, the result of a successful hash
+        comparison is remembered until the next fileserver update or until the
+        local copy changes, so repeated requests for unchanged files skip
+        hashing both the server and the local copy.
         '''
         path, senv = hubblestack.utils.url.split_env(path)
         if senv:
             saltenv = senv
 
+        cache_key = None
+        if self._hash_cache_enabled():
+            cache_key = (saltenv, path, dest, cachedir)
+            cached = self._hash_cache_get(cache_key)
+            if cached:
+                log.debug(
+                    'In saltenv \'%s\', using unchanged cached copy \'%s\' of '
+                    '\'%s\'', saltenv, cached, path
+                )
+                return cached
+
         if not hubblestack.utils.platform.is_windows():
             hash_server, stat_server = self.hash_and_stat_file(path, saltenv)
             try:
@@ -821,6 +885,8 @@ class RemoteClient(Client):
                 mode_local = None
 
             if hash_local == hash_server:
+                if cache_key is not None:
+                    self._hash_cache_set(cache_key, hash_server, dest2check)
                 return dest2check
 
         log.debug(
@@ -81,6 +81,7 @@ import logging
 import fnmatch
 import copy
 import hubblestack.utils
+import hubblestack.utils.netfilter
 import hubblestack.utils.platform
 import hubblestack.utils.path
 
@@ -164,8 +165,11 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
                 # replacing all the elements of the rule with the actual rule (for verbose mode)
                 tag_data['rule'] = rule
 
-                # checking the existence of the rule
-                salt_ret = __mods__['iptables.check'](table=table, chain=chain, rule=rule, family=family)
+                # checking the existence of the rule, in the rules listed once per run first
+                if _rule_listed(table, chain, rule, family):
+                    salt_ret = True
+                else:
+                    salt_ret = __mods__['iptables.check'](table=table, chain=chain, rule=rule, family=family)
 
                 if salt_ret not in (True, False):
                     log.error(salt_ret)
@@ -183,6 +187,22 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
     return ret
 
 
+def _rule_listed(table, chain, rule, family):
+    """
+    True if the rule is listed, as is, in the iptables-save output of the
+    family. A rule that isn't may still be in effect in the form iptables-save
+    normalizes it to (iptables.check tells).
+    """
+    if 'iptables.inventory' not in __mods__:
+        return False
+    args = hubblestack.utils.netfilter.split_args(rule)
+    for listed in __mods__['iptables.inventory']().select(family=family, table=table, chain=chain,
+                                                         backend=hubblestack.utils.netfilter.IPTABLES):
+        if hubblestack.utils.netfilter.split_args(listed.raw)[2:] == args:
+            return True
+    return False
+
+
 def _merge_yaml(ret, data, profile=None):
     """
     Merge two yaml dicts together at the pkg:blacklist and pkg:whitelist level
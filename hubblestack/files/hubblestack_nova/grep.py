@@ -58,6 +58,8 @@ import fnmatch
 import os
 import copy
 import hubblestack.utils
+import hubblestack.utils.args
+import hubblestack.utils.grep
 import hubblestack.utils.platform
 import re
 
@@ -110,6 +112,7 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
         log.debug(__tags__)
 
     ret = {'Success': [], 'Failure': [], 'Controlled': []}
+    _prepare_batch(__tags__, tags)
     for tag in __tags__:
         if fnmatch.fnmatch(tag, tags):
             for tag_data in __tags__[tag]:
@@ -200,6 +203,36 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
     return ret
 
 
+def _prepare_batch(__tags__, tags):
+    """
+    Run the greps of all the selected tags that search the same file in a
+    single pass over that file; _grep() then picks up the results.
+    """
+    hubblestack.utils.grep.clear_primed()
+    if not __opts__.get('grep_in_process', True):
+        return
+    by_path = {}
+    for tag in __tags__:
+        if not fnmatch.fnmatch(tag, tags):
+            continue
+        for tag_data in __tags__[tag]:
+            if 'control' in tag_data or 'pattern' not in tag_data:
+                continue
+            grep_args = tag_data.get('grep_args', [])
+            if isinstance(grep_args, str):
+                grep_args = [grep_args]
+            path = os.path.expanduser(tag_data['name'])
+            cmd = _grep_cmd(path, tag_data['pattern'], *grep_args)
+            try:
+                argv = hubblestack.utils.args.shlex_split(cmd)[1:]
+            except ValueError:
+                continue
+            by_path.setdefault(path, []).append(argv)
+    for path, argvs in by_path.items():
+        if len(argvs) > 1 and os.path.isfile(path):
+            hubblestack.utils.grep.prime(path, argvs)
+
+
 def _merge_yaml(ret, data, profile=None):
     """
     Merge two yaml dicts together at the grep:blacklist and grep:whitelist level
@@ -313,11 +346,33 @@ def _grep(path,
     """
     path = os.path.expanduser(path)
 
+    cmd = _grep_cmd(path, pattern, *args)
+
+    if __opts__.get('grep_in_process', True):
+        try:
+            ret = hubblestack.utils.grep.run(hubblestack.utils.args.shlex_split(cmd)[1:])
+        except ValueError:
+            ret = None
+        if ret is not None:
+            return ret
+
+    try:
+        ret = __mods__['cmd.run_all'](cmd, python_shell=False, ignore_retcode=True)
+    except (IOError, OSError) as exc:
+        raise CommandExecutionError(exc.strerror)
+
+    return ret
+
+
+def _grep_cmd(path, pattern, *args):
+    """
+    The grep command line run by _grep()
+    """
     if args:
         options = ' '.join(args)
     else:
         options = ''
-    cmd = (
+    return (
         r'''grep  {options} {pattern} {path}'''
         .format(
             options=options,
@@ -325,10 +380,3 @@ def _grep(path,
             path=path,
         )
     )
-
-    try:
-        ret = __mods__['cmd.run_all'](cmd, python_shell=False, ignore_retcode=True)
-    except (IOError, OSError) as exc:
-        raise CommandExecutionError(exc.strerror)
-
-    return ret
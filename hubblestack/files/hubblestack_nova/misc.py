@@ -45,6 +45,9 @@ import fnmatch
 import os
 import re
 import hubblestack.utils
+import hubblestack.utils.netfilter
+import hubblestack.utils.sysctl
+import hubblestack.utils.treewalk
 from hubblestack.exceptions import CommandExecutionError
 from collections import Counter
 
@@ -257,8 +260,7 @@ def check_all_ports_firewall_rules(reason=''):
     end_open_ports = (_execute_shell_command('netstat -ln | grep "Active UNIX domain sockets (only servers)" -n  | cut -d ":" -f1', python_shell=True)).strip()
     open_ports = (_execute_shell_command('netstat -ln | awk \'FNR > ' + start_open_ports + ' && FNR < ' + end_open_ports + ' && $6 == "LISTEN" && $4 !~ /127.0.0.1/ {print $4}\' | sed -e "s/.*://"', python_shell=True)).strip()
     open_ports = open_ports.split('\n') if open_ports != "" else []
-    firewall_ports = (_execute_shell_command('iptables -L INPUT -v -n | awk \'FNR > 2 && $11 != "" && $11 ~ /^dpt:/ {print $11}\' | sed -e "s/.*://"', python_shell=True)).strip()
-    firewall_ports = firewall_ports.split('\n') if firewall_ports != "" else []
+    firewall_ports = _firewall_ports()
     no_firewall_ports = []
 
     for open_port in open_ports:
@@ -268,6 +270,18 @@ def check_all_ports_firewall_rules(reason=''):
     return True if len(no_firewall_ports) == 0 else str(no_firewall_ports)
 
 
+def _firewall_ports():
+    """
+    The destination ports of the rules of the INPUT chain (filter table, IPv4)
+    """
+    if 'iptables.inventory' in __mods__:
+        rules = __mods__['iptables.inventory']().select(family='ipv4', table='filter', chain='INPUT',
+                                                        backend=hubblestack.utils.netfilter.IPTABLES)
+        return [port for rule in rules for port in rule.dports if ':' not in port]
+    firewall_ports = (_execute_shell_command('iptables -L INPUT -v -n | awk \'FNR > 2 && $11 != "" && $11 ~ /^dpt:/ {print $11}\' | sed -e "s/.*://"', python_shell=True)).strip()
+    return firewall_ports.split('\n') if firewall_ports != "" else []
+
+
 def check_password_fields_not_empty(reason=''):
     """
     Ensure password fields are not empty
@@ -490,20 +504,19 @@ def check_duplicate_gnames(reason=''):
     return str(duplicate_gnames)
 
 
-def check_directory_files_permission(path, permission):
+def check_directory_files_permission(path, permission, workers=1, max_violations=None):
     """
     Check all files permission inside a directory
     """
     blacklisted_characters = '[^a-zA-Z0-9-_/]'
     if "-exec" in path or re.findall(blacklisted_characters, path):
       raise CommandExecutionError("Profile parameter '{0}' not a safe pattern".format(path))
-    files_list = _execute_shell_command("find {0} -type f".format(path)).strip()
-    files_list = files_list.split('\n') if files_list != "" else []
-    bad_permission_files = []
-    for file_in_directory in files_list:
-        per = restrict_permissions(file_in_directory, permission)
-        if per is not True:
-            bad_permission_files += [file_in_directory + ": Bad Permission - " + per + ":"]
+    mask = hubblestack.utils.treewalk.permission_mask(permission)
+    bad_files = hubblestack.utils.treewalk.sweep(
+        path, lambda _, st: hubblestack.utils.treewalk.file_mode(st)[-3:] if st.st_mode & mask else None,
+        workers=workers, limit=max_violations)
+    bad_permission_files = [file_in_directory + ": Bad Permission - " + per + ":"
+                            for file_in_directory, per in bad_files]
     return True if bad_permission_files == [] else str(bad_permission_files)
 
 
@@ -759,28 +772,27 @@ def ensure_reverse_path_filtering(reason=''):
     Ensure Reverse Path Filtering is enabled
     """
     error_list = []
-    command = "sysctl net.ipv4.conf.all.rp_filter 2> /dev/null"
-    output = _execute_shell_command(command, python_shell=True)
-    if output.strip() == '':
-        error_list.append("net.ipv4.conf.all.rp_filter not found")
-    search_results = re.findall(r"rp_filter = (\d+)", output)
-    result = int(search_results[0])
-    if result < 1:
-        error_list.append("net.ipv4.conf.all.rp_filter  value set to " + str(result))
-    command = "sysctl net.ipv4.conf.default.rp_filter 2> /dev/null"
-    output = _execute_shell_command(command, python_shell=True)
-    if output.strip() == '':
-        error_list.append("net.ipv4.conf.default.rp_filter not found")
-    search_results = re.findall(r"rp_filter = (\d+)", output)
-    result = int(search_results[0])
-    if result < 1:
-        error_list.append("net.ipv4.conf.default.rp_filter  value set to " + str(result))
+    for name in ('net.ipv4.conf.all.rp_filter', 'net.ipv4.conf.default.rp_filter'):
+        value = _sysctl_value(name)
+        if not value:
+            error_list.append(name + " not found")
+        elif int(value) < 1:
+            error_list.append(name + "  value set to " + value)
     if len(error_list) > 0:
         return str(error_list)
     else:
         return True
 
 
+def _sysctl_value(name):
+    """
+    The value of a kernel parameter, read from /proc/sys when available
+    """
+    if hubblestack.utils.sysctl.available():
+        return hubblestack.utils.sysctl.read(name)
+    return _execute_shell_command("sysctl -n {0} 2> /dev/null".format(name), python_shell=True).strip()
+
+
 def check_users_rhosts_files(reason=''):
     """
     Ensure no users have .rhosts files
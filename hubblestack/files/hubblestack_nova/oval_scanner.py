@@ -37,17 +37,30 @@ references based on OVAL test reference data of the definition, and then makes
 a comparison to the local packages installed on the system to identify potential
 vulnerabilities.
 
+The downloaded source file is kept in the cachedir (``<cachedir>/oval``) and is
+only downloaded again when the server has a newer one (ETag/Last-Modified). The
+source is parsed once per version of the file into a compact index (package
+name to fixed versions and definitions), also kept in the cachedir, so scans
+look up the installed packages in the index instead of parsing the XML again.
+
 This scanner currently only supports the Linux platform.
 """
 
 
 
 import xml.etree.ElementTree as ET
+import hashlib
 import json
+import os
 import requests
 import logging
 import hubblestack.utils.platform
 
+# bump when the format of the index changes
+INDEX_VERSION = 1
+# seconds to wait for the OVAL source server
+SOURCE_TIMEOUT = 300
+
 
 def __virtual__():
     return not hubblestack.utils.platform.is_windows()
@@ -69,16 +82,14 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
                 return ret
             local_pkgs = __mods__['pkg.list_pkgs']()
             # Scanner options
-            opt_baseurl = data['oval_scanner']['opt_baseurl']
-            opt_remote_sourcefile = data['oval_scanner']['opt_remote_sourcefile']
-            opt_local_sourcefile = data['oval_scanner']['opt_local_sourcefile']
-            opt_output_file = data['oval_scanner']['opt_output_file']
+            opt_baseurl = data['oval_scanner'].get('opt_baseurl')
+            opt_remote_sourcefile = data['oval_scanner'].get('opt_remote_sourcefile')
+            opt_local_sourcefile = data['oval_scanner'].get('opt_local_sourcefile')
+            opt_output_file = data['oval_scanner'].get('opt_output_file')
             # Build report
-            source_content = get_source_content(distro_name, distro_release, distro_codename, opt_baseurl, opt_remote_sourcefile, opt_local_sourcefile)
-            oval_definition = build_oval(source_content)
-            oval_and_maps = map_oval_ids(oval_definition)
-            vulns = create_vulns(oval_and_maps)
-            report = get_impact_report(vulns, local_pkgs, distro_name)
+            source_path = get_source_path(distro_name, distro_release, distro_codename, opt_baseurl, opt_remote_sourcefile, opt_local_sourcefile)
+            index = load_index(source_path)
+            report = get_index_report(index, local_pkgs, distro_name)
             # Write report to file if specified
             if opt_output_file:
                 write_report_to_file(opt_output_file, report)
@@ -88,8 +99,10 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
     return ret
 
 
-def parse_impact_report(report, local_pkgs, hubble_format, impacted_pkgs=[]):
+def parse_impact_report(report, local_pkgs, hubble_format, impacted_pkgs=None):
     """Parse into Hubble friendly format"""
+    if impacted_pkgs is None:
+        impacted_pkgs = []
     for key, value in report.items():
         pkg_desc = 'Vulnerable Package(s): '
         for pkg in value['installed']:
@@ -122,8 +135,10 @@ def get_impact_report(vulns, local_pkgs, distro_name):
 
 
 # Build an impact report
-def build_impact(vulns, local_pkgs, distro_name, result={}):
+def build_impact(vulns, local_pkgs, distro_name, result=None):
     """Build impacts based on pkg comparisons"""
+    if result is None:
+        result = {}
     logging.debug('build_impact')
     for data in vulns.values():
         for pkg in data['pkg']:
@@ -145,12 +160,14 @@ def build_impact(vulns, local_pkgs, distro_name, result={}):
                       advisory = cve
                 impact = get_impact(local_pkgs[name], name, ver, title, cve, advisory, severity)
                 if impact:
-                    result = build_impact_report(impact)
+                    result = build_impact_report(impact, result)
     return result
 
 
-def build_impact_report(impact, report={}):
+def build_impact_report(impact, report=None):
     """Build a report based on impacts"""
+    if report is None:
+        report = {}
     logging.debug('build_impact_report')
     for adv, detail in impact.items():
         if adv not in report:
@@ -182,8 +199,10 @@ def get_impact(local_ver, name, ver, title, cve, advisory, severity):
 
 
 # Create vulnerability dictionary
-def create_vulns(oval_and_maps, vulns={}):
+def create_vulns(oval_and_maps, vulns=None):
     """Create vuln dict that maps definitions directly to objects and states"""
+    if vulns is None:
+        vulns = {}
     logging.debug('create_vulns')
     id_maps = oval_and_maps[0]
     oval = oval_and_maps[1]
@@ -214,8 +233,10 @@ def create_vulns(oval_and_maps, vulns={}):
 
 
 # Map oval definitions to oval objects and states
-def map_oval_ids(oval, id_maps={}):
+def map_oval_ids(oval, id_maps=None):
     """For every test, grab only tests with both state and obj references"""
+    if id_maps is None:
+        id_maps = {}
     logging.debug('map_oval_ids')
     for definition, data in oval['definitions'].items():
         id_maps[definition] = {'objects': []}
@@ -237,8 +258,10 @@ def map_oval_ids(oval, id_maps={}):
 
 
 # Build oval from source
-def build_oval(source_content, oval={}):
+def build_oval(source_content, oval=None):
     """Build oval dict from ElementTree content"""
+    if oval is None:
+        oval = {}
     logging.debug('build_oval')
     namespace = {
         'oval': 'http://oval.mitre.org/XMLSchema/oval-definitions-5',
@@ -255,8 +278,10 @@ def build_oval(source_content, oval={}):
     return oval
 
 
-def build_generator(root, namespace, gen={}):
+def build_generator(root, namespace, gen=None):
     """Build generator dict from oval source"""
+    if gen is None:
+        gen = {}
     logging.debug('build_generator')
     generator = root.find('oval:generator', namespace)
     if is_et(generator):
@@ -275,8 +300,10 @@ def build_generator(root, namespace, gen={}):
     return gen
 
 
-def build_definitions(root, namespace, defs={}):
+def build_definitions(root, namespace, defs=None):
     """Build element definitions from source into oval dict"""
+    if defs is None:
+        defs = {}
     logging.debug('build_definitions')
     definitions = root.find('oval:definitions', namespace)
     if is_et(definitions):
@@ -313,8 +340,10 @@ def build_definitions(root, namespace, defs={}):
     return defs
 
 
-def build_tests(root, namespace, tsts={}):
+def build_tests(root, namespace, tsts=None):
     """Build element tests from source into oval dict"""
+    if tsts is None:
+        tsts = {}
     logging.debug('build_tests')
     tests = root.find('oval:tests', namespace)
     if is_et(tests):
@@ -333,8 +362,10 @@ def build_tests(root, namespace, tsts={}):
     return tsts
 
 
-def build_objects(root, namespace, objs={}):
+def build_objects(root, namespace, objs=None):
     """Build element objects from source into oval dict"""
+    if objs is None:
+        objs = {}
     logging.debug('build_objects')
     objects = root.find('oval:objects', namespace)
     if is_et(objects):
@@ -352,8 +383,10 @@ def build_objects(root, namespace, objs={}):
     return objs
 
 
-def build_states(root, namespace, stes={}):
+def build_states(root, namespace, stes=None):
     """Build element states from source into oval dict"""
+    if stes is None:
+        stes = {}
     logging.debug('build_states')
     states = root.find('oval:states', namespace)
     if is_et(states):
@@ -369,8 +402,10 @@ def build_states(root, namespace, stes={}):
     return stes
 
 
-def build_vars(root, namespace, vrs={}):
+def build_vars(root, namespace, vrs=None):
     """Build element vars from source into oval dict (aka Ubuntu pkg names)"""
+    if vrs is None:
+        vrs = {}
     logging.debug('build_vars')
     vars = root.find('oval:variables', namespace)
     if is_et(vars):
@@ -426,3 +461,226 @@ def get_definition_source(base_url, source_file, distro_name, distro_release, di
         base = base_url or 'https://www.debian.org/security/oval/'
     url = base + source
     return url
+
+
+# Cached source and index
+def get_source_path(distro_name, distro_release, distro_codename, base_url, source_file, local_file=None):
+    """Get the path of the (cached copy of the) source"""
+    logging.debug('get_source_path')
+    if local_file:
+        logging.info('Found local file: {0}'.format(local_file))
+        return local_file
+    url = get_definition_source(base_url, source_file, distro_name, distro_release, distro_codename)
+    return fetch_source(url, get_cache_dir())
+
+
+def get_cache_dir():
+    """Directory of the downloaded sources and of the indexes"""
+    cache_dir = os.path.join(__opts__.get('cachedir', '/var/cache/hubble'), 'oval')
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    return cache_dir
+
+
+def fetch_source(url, cache_dir):
+    """
+    Download the source into cache_dir, unless the copy there is still the
+    current one (conditional request on its ETag/Last-Modified)
+    """
+    logging.debug('fetch_source')
+    path = os.path.join(cache_dir, url.rstrip('/').rsplit('/', 1)[-1] or 'oval.xml')
+    meta = _read_json(path + '.meta') if os.path.isfile(path) else None
+    headers = {}
+    if meta and meta.get('url') == url:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+    try:
+        logging.info('Reading remote file: {0}, this could take some time...'.format(url))
+        response = requests.get(url, headers=headers, stream=True, timeout=SOURCE_TIMEOUT)
+        if response.status_code == 304:
+            logging.info('Cached copy of {0} is up to date'.format(url))
+            return path
+        response.raise_for_status()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as outfile:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                outfile.write(chunk)
+        os.rename(tmp_path, path)
+        _write_json(path + '.meta', {'url': url,
+                                     'etag': response.headers.get('ETag'),
+                                     'last_modified': response.headers.get('Last-Modified')})
+    except (requests.exceptions.RequestException, IOError) as exc:
+        if meta is None:
+            raise
+        logging.warning('Unable to refresh {0} ({1}), using the cached copy'.format(url, exc))
+    return path
+
+
+def load_index(source_path):
+    """
+    Load the index of source_path from the cache, building (and caching) it
+    if the source changed since it was last indexed
+    """
+    logging.debug('load_index')
+    stat = os.stat(source_path)
+    stamp = [os.path.abspath(source_path), stat.st_size, stat.st_mtime_ns, INDEX_VERSION]
+    index_path = os.path.join(get_cache_dir(), 'index-{0}.json'.format(
+        hashlib.sha256(stamp[0].encode('utf-8')).hexdigest()[:16]))
+    index = _read_json(index_path)
+    if index and index.get('stamp') == stamp:
+        return index
+    index = build_index(source_path)
+    index['stamp'] = stamp
+    _write_json(index_path, index)
+    return index
+
+
+def build_index(source):
+    """
+    Build the compact index of an OVAL source (path or file object) with a
+    streaming parse that only keeps what the package comparisons need:
+
+    .. code-block:: python
+
+        {'definitions': [{'id': ..., 'title': ..., 'cve': [...], ...}, ...],
+         'packages': {name: [[fixed version, definition index], ...]}}
+    """
+    logging.debug('build_index')
+    oval_ns = '{http://oval.mitre.org/XMLSchema/oval-definitions-5}'
+    linux_ns = '{http://oval.mitre.org/XMLSchema/oval-definitions-5#linux}'
+    namespace = {
+        'oval': oval_ns[1:-1],
+        'linux': linux_ns[1:-1],
+    }
+    sections = {oval_ns + 'definitions', oval_ns + 'tests', oval_ns + 'objects',
+                oval_ns + 'states', oval_ns + 'variables'}
+    definitions, tests, objects, states, variables = [], {}, {}, {}, {}
+    depth = 0
+    section = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            if depth == 2:
+                section = elem.tag if elem.tag in sections else None
+            continue
+        depth -= 1
+        if depth != 2 or section is None:
+            if depth == 1:
+                # done with a section (or the generator)
+                elem.clear()
+            continue
+        if section == oval_ns + 'definitions':
+            definitions.append(_index_definition(elem, namespace))
+        elif section == oval_ns + 'tests':
+            test_object = elem.find('linux:object', namespace)
+            test_state = elem.find('linux:state', namespace)
+            if test_object is not None and 'object_ref' in test_object.attrib \
+                    and test_state is not None and 'state_ref' in test_state.attrib:
+                tests[elem.attrib['id']] = (test_object.attrib['object_ref'],
+                                            test_state.attrib['state_ref'])
+        elif section == oval_ns + 'objects':
+            object_name = elem.find('linux:name', namespace)
+            if object_name is not None:
+                if object_name.text:
+                    objects[elem.attrib['id']] = object_name.text
+                elif object_name.attrib.get('var_ref'):
+                    objects[elem.attrib['id']] = object_name.attrib['var_ref']
+        elif section == oval_ns + 'states':
+            evr = elem.find('linux:evr', namespace)
+            if evr is not None:
+                states[elem.attrib['id']] = evr.text
+        elif section == oval_ns + 'variables':
+            variables[elem.attrib['id']] = [value.text for names in elem for value in names.iter()]
+        elem.clear()
+
+    packages = {}
+    for def_idx, definition in enumerate(definitions):
+        for test_ref in definition.pop('tests'):
+            if test_ref not in tests:
+                continue
+            object_id, state_id = tests[test_ref]
+            if object_id not in objects or states.get(state_id) is None:
+                continue
+            name = objects[object_id]
+            for pkg in variables.get(name, [name]):
+                packages.setdefault(pkg, []).append([states[state_id], def_idx])
+    return {'definitions': definitions, 'packages': packages}
+
+
+def _index_definition(definition, namespace):
+    """The index entry of an OVAL definition element"""
+    metadata = definition.find('oval:metadata', namespace)
+    definition_data = {'id': definition.attrib['id'], 'cve': [], 'tests': []}
+    title = metadata.find('oval:title', namespace) if metadata is not None else None
+    definition_data['title'] = title.text if title is not None else definition.attrib['id']
+    if metadata is not None:
+        for reference in metadata.findall('oval:reference', namespace):
+            ref_id = reference.attrib['ref_id']
+            ref_url = reference.attrib.get('ref_url')
+            source = reference.attrib['source']
+            if source in ('RHSA', 'RHBA', 'RHEA'):
+                definition_data['rhsa'] = {ref_id: ref_url}
+            elif source == 'CVE':
+                definition_data['cve'].append({ref_id: ref_url})
+        advisory = metadata.find('oval:advisory', namespace)
+        if advisory is not None:
+            severity = advisory.find('oval:severity', namespace)
+            if severity is not None:
+                definition_data['severity'] = severity.text
+            definition_data['advisories'] = [ref.text for ref in advisory.findall('oval:ref', namespace)]
+    for criterion in definition.iter():
+        if 'test_ref' in criterion.attrib:
+            definition_data['tests'].append(criterion.attrib['test_ref'])
+    return definition_data
+
+
+def get_index_report(index, local_pkgs, distro_name):
+    """
+    Build the impact report (as get_impact_report does) by looking up the
+    installed packages in the index
+    """
+    logging.debug('get_index_report')
+    impacts = []
+    for name, local_ver in local_pkgs.items():
+        for pos, (ver, def_idx) in enumerate(index['packages'].get(name, ())):
+            if __mods__['pkg.version_cmp'](ver, local_ver) > 0:
+                impacts.append((def_idx, pos, name, ver, local_ver))
+    # in the order of the definitions, like build_impact()
+    impacts.sort(key=lambda impact: impact[:2])
+    report = {}
+    for def_idx, _, name, ver, local_ver in impacts:
+        data = index['definitions'][def_idx]
+        if distro_name in ('centos', 'redhat'):
+            advisory = data.get('rhsa', data['cve'])
+        else:
+            advisory = data.get('advisories', data['cve'])
+        impact = {data['title']: {
+            'updated_pkg': {'name': name, 'version': ver},
+            'installed': {'name': name, 'version': local_ver},
+            'severity': data.get('severity', 'N/A'),
+            'advisory': advisory,
+            'cve': data['cve']
+        }}
+        report = build_impact_report(impact, report)
+    logging.debug(json.dumps(report, indent=4, sort_keys=True))
+    return report
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r') as infile:
+            return json.load(infile)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w') as outfile:
+            json.dump(data, outfile)
+        os.rename(tmp_path, path)
+    except (IOError, OSError) as exc:
+        logging.warning('Unable to write {0}: {1}'.format(path, exc))
@@ -103,6 +103,7 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
         log.debug(__tags__)
 
     ret = {'Success': [], 'Failure': [], 'Controlled': []}
+    states = _service_states(__tags__, tags)
     for tag in __tags__:
         if fnmatch.fnmatch(tag, tags):
             for tag_data in __tags__[tag]:
@@ -114,7 +115,7 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
 
                 # Blacklisted packages (must not be installed)
                 if audittype == 'blacklist':
-                    if __mods__['service.available'](name) and __mods__['service.status'](name):
+                    if _running(name, states):
                         tag_data['failure_reason'] = "Found blacklisted service '{0}' " \
                                                      "running on the system" \
                                                      .format(name)
@@ -124,7 +125,7 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
 
                 # Whitelisted packages (must be installed)
                 elif audittype == 'whitelist':
-                    if __mods__['service.available'](name) and __mods__['service.status'](name):
+                    if _running(name, states):
                         ret['Success'].append(tag_data)
                     else:
                         tag_data['failure_reason'] = "Could not find requisite service" \
@@ -135,6 +136,31 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
     return ret
 
 
+def _service_states(__tags__, tags):
+    """
+    Query the state of all the services named by the matching tags at once,
+    if the service module supports it (systemd)
+    """
+    if 'service.states' not in __mods__:
+        return {}
+    names = set()
+    for tag in __tags__:
+        if fnmatch.fnmatch(tag, tags):
+            for tag_data in __tags__[tag]:
+                if 'control' not in tag_data and not any(char in tag_data['name'] for char in '*?['):
+                    names.add(tag_data['name'])
+    return __mods__['service.states'](sorted(names))
+
+
+def _running(name, states):
+    """
+    True if the service is available and running
+    """
+    if name in states:
+        return states[name]['available'] and states[name]['running']
+    return __mods__['service.available'](name) and __mods__['service.status'](name)
+
+
 def _merge_yaml(ret, data, profile=None):
     """
     Merge two yaml dicts together at the service:blacklist and service:whitelist level
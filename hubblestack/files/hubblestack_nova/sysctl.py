@@ -33,6 +33,7 @@ import fnmatch
 import copy
 import hubblestack.utils
 import hubblestack.utils.platform
+import hubblestack.utils.sysctl
 
 from distutils.version import LooseVersion
 
@@ -79,6 +80,7 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
         log.debug(__tags__)
 
     ret = {'Success': [], 'Failure': [], 'Controlled': []}
+    values = _sysctl_values(__tags__, tags)
 
     for tag in __tags__:
         if fnmatch.fnmatch(tag, tags):
@@ -90,7 +92,7 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
                 name = tag_data['name']
                 match_output = tag_data['match_output']
 
-                salt_ret = __mods__['sysctl.get'](name)
+                salt_ret = values[name] if name in values else __mods__['sysctl.get'](name)
                 if not salt_ret:
                     passed = False
                     tag_data['failure_reason'] = "Could not find attribute '{0}' in" \
@@ -113,6 +115,22 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
     return ret
 
 
+def _sysctl_values(__tags__, tags):
+    """
+    Read all the kernel parameters named by the matching tags at once, if the
+    sysctl module supports it (linux, from /proc/sys)
+    """
+    if 'sysctl.values' not in __mods__:
+        return {}
+    names = set()
+    for tag in __tags__:
+        if fnmatch.fnmatch(tag, tags):
+            for tag_data in __tags__[tag]:
+                if 'control' not in tag_data and not hubblestack.utils.sysctl.is_glob(tag_data['name']):
+                    names.add(tag_data['name'])
+    return __mods__['sysctl.values'](sorted(names), refresh=True)
+
+
 def _merge_yaml(ret, data, profile=None):
     """
     Merge two yaml dicts together
@@ -80,6 +80,7 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
         log.debug(__tags__)
 
     ret = {'Success': [], 'Failure': [], 'Controlled': []}
+    states = _service_states(__tags__, tags)
     for tag in __tags__:
         if fnmatch.fnmatch(tag, tags):
             for tag_data in __tags__[tag]:
@@ -89,7 +90,10 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
                 name = tag_data['name']
                 audittype = tag_data['type']
 
-                enabled = __mods__['service.enabled'](name)
+                if name in states:
+                    enabled = states[name]['enabled']
+                else:
+                    enabled = __mods__['service.enabled'](name)
                 # Blacklisted service (must not be running or not found)
                 if audittype == 'blacklist':
                     if not enabled:
@@ -112,6 +116,22 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
     return ret
 
 
+def _service_states(__tags__, tags):
+    """
+    Query the state of all the services named by the matching tags at once,
+    if the service module supports it (systemd)
+    """
+    if 'service.states' not in __mods__:
+        return {}
+    names = set()
+    for tag in __tags__:
+        if fnmatch.fnmatch(tag, tags):
+            for tag_data in __tags__[tag]:
+                if 'control' not in tag_data and not any(char in tag_data['name'] for char in '*?['):
+                    names.add(tag_data['name'])
+    return __mods__['service.states'](sorted(names))
+
+
 def _merge_yaml(ret, data, profile=None):
     """
     Merge two yaml dicts together at the systemctl:blacklist and systemctl:whitelist level
@@ -15,10 +15,25 @@ vulners_api_key: REDACTED
 
 It does not matter what `<random data>` is, as long as the top key of the file is named `vulners_scanner`.
 This allows the module to run under a certain profile, as all of the other Nova modules do.
+
+Optional keys:
+
+vulners_cache_ttl: 86400
+vulners_api_url: https://vulners.com
+
+The package inventory and the results of the last scan are kept in the
+cachedir (``<cachedir>/vulners/state.json``); each scan only queries the API
+for the packages that were added or changed since, or whose results are older
+than ``vulners_cache_ttl`` seconds (default one day), and carries the previous
+results forward for the others. With ``vulners_api_url`` the audit API at that
+URL is queried directly instead of through the vulners library.
 """
 
 
+import json
 import logging
+import os
+import time
 
 import sys
 import requests
@@ -27,6 +42,11 @@ import vulners
 
 log = logging.getLogger(__name__)
 
+# seconds before the results for a package are queried again
+CACHE_TTL = 86400
+# format of the state file, bump when it changes
+STATE_VERSION = 1
+
 
 def __virtual__():
     return not sys.platform.startswith('win')
@@ -45,9 +65,7 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
         if 'vulners_scanner' in data:
 
             local_packages = _get_local_packages()
-            vulners_data = _vulners_query(local_packages, os=os_name, version=os_version, api_key=data['vulners_api_key'])
-            if 'result' in vulners_data and vulners_data['result'] == 'ERROR':
-                log.error(vulners_data['data']['error'])
+            vulners_data = _incremental_query(local_packages, os_name, os_version, data)
 
             vulners_data = _process_vulners(vulners_data)
             total_packages = len(local_packages)
@@ -60,6 +78,72 @@ def audit(data_list, tags, labels, debug=False, **kwargs):
     return ret
 
 
+def _incremental_query(local_packages, os_name, os_version, data):
+    """
+    Query the API for the packages that changed since the last scan (or whose
+    results expired) and merge the answer with the previous results.
+
+    :return: The API data for all of ``local_packages``: a dictionary with
+             the vulnerable packages under ``packages``
+    """
+    ttl = data.get('vulners_cache_ttl', CACHE_TTL)
+    state_file = os.path.join(__opts__.get('cachedir', '/var/cache/hubble'), 'vulners', 'state.json')
+    state = _load_state(state_file, os_name, os_version)
+    now = time.time()
+    local_packages = local_packages or []
+
+    # packages no longer installed (or changed versions) are dropped
+    known = dict((pkg, state['packages'][pkg]) for pkg in local_packages if pkg in state['packages'])
+    delta = [pkg for pkg in local_packages if pkg not in known or known[pkg]['checked'] + ttl < now]
+    log.debug('vulners: %d of %d packages to query', len(delta), len(local_packages))
+
+    if delta or not local_packages:
+        vulners_data = _vulners_query(delta or local_packages, os=os_name, version=os_version,
+                                      api_key=data.get('vulners_api_key'), url=data.get('vulners_api_url'))
+        if 'result' in vulners_data and vulners_data['result'] == 'ERROR':
+            log.error(vulners_data['data']['error'])
+        else:
+            found = vulners_data.get('packages') or {}
+            for pkg in delta:
+                known[pkg] = {'checked': now, 'vulnerabilities': found.get(pkg, {})}
+
+    state['packages'] = known
+    _save_state(state_file, state)
+    return {'packages': dict((pkg, known[pkg]['vulnerabilities'])
+                             for pkg in local_packages
+                             if pkg in known and known[pkg]['vulnerabilities'])}
+
+
+def _load_state(state_file, os_name, os_version):
+    """
+    The package inventory and results of the last scan, if they are for the
+    same OS
+    """
+    state = None
+    try:
+        with open(state_file, 'r') as infile:
+            state = json.load(infile)
+    except (IOError, OSError, ValueError):
+        pass
+    if not isinstance(state, dict) or state.get('version') != STATE_VERSION \
+            or state.get('os') != str(os_name) or state.get('os_version') != str(os_version):
+        state = {'version': STATE_VERSION, 'os': str(os_name), 'os_version': str(os_version),
+                 'packages': {}}
+    return state
+
+
+def _save_state(state_file, state):
+    tmp_file = state_file + '.tmp'
+    try:
+        if not os.path.isdir(os.path.dirname(state_file)):
+            os.makedirs(os.path.dirname(state_file))
+        with open(tmp_file, 'w') as outfile:
+            json.dump(state, outfile)
+        os.rename(tmp_file, state_file)
+    except (IOError, OSError) as exc:
+        log.warning('Unable to save the vulners scan state to %s: %s', state_file, exc)
+
+
 def _get_local_packages():
     """
     Get the packages installed on the system.
@@ -90,14 +174,15 @@ def _get_local_packages():
              for pkg in local_packages ]
 
 
-def _vulners_query(packages=None, os=None, version=None, api_key=None):
+def _vulners_query(packages=None, os=None, version=None, api_key=None, url=None):
     """
     Query the Vulners.com Linux Vulnerability Audit API for the provided packages.
 
     :param packages: The list on packages to check
     :param os: The name of the operating system
     :param version: The version of the operating system
-    :param url: The URL of the auditing API; the default value is the Vulners.com audit API
+    :param url: The base URL of the auditing API, queried directly; by default the
+                vulners library queries the Vulners.com audit API
                 Check the following link for more details:
                     https://blog.vulners.com/linux-vulnerability-audit-in-vulners/
     :return: A dictionary containing the JSON data returned by the HTTP request.
@@ -122,6 +207,18 @@ def _vulners_query(packages=None, os=None, version=None, api_key=None):
         error['data']['error'] = 'Missing the operating system version.'
         return error
 
+    if url:
+        try:
+            response = requests.post(url.rstrip('/') + '/api/v3/audit/audit/',
+                                     json={'os': str(os), 'version': str(version),
+                                           'package': packages, 'apiKey': api_key},
+                                     timeout=300)
+            response.raise_for_status()
+            return response.json().get('data', {})
+        except (requests.exceptions.RequestException, ValueError) as exc:
+            error['data']['error'] = 'Vulners audit API request failed: {0}'.format(exc)
+            return error
+
     vulners_api = vulners.Vulners(api_key=api_key)
     return vulners_api.audit(str(os), str(version), packages)
 
@@ -21,6 +21,24 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
+# Bumped every time any Fileserver instance updates or clears its backends.
+# Consumers (e.g. the fileclient hash cache) compare against this to decide
+# whether previously computed server-side results are still valid.
+_UPDATE_GENERATION = 0
+
+
+def update_generation():
+    """
+    Return the current fileserver update generation counter
+    """
+    return _UPDATE_GENERATION
+
+
+def _bump_update_generation():
+    global _UPDATE_GENERATION
+    _UPDATE_GENERATION += 1
+    return _UPDATE_GENERATION
+
 
 def is_file_ignored(opts, fname):
     """
@@ -421,6 +439,7 @@ class Fileserver(object):
                         'The {0} fileserver cache was successfully cleared'
                         .format(fsb)
                     )
+        _bump_update_generation()
         return cleared, errors
 
     def lock(self, back=None, remote=None):
@@ -487,6 +506,7 @@ class Fileserver(object):
             if fstr in self.servers:
                 log.debug('Updating %s fileserver cache', fsb)
                 self.servers[fstr]()
+        _bump_update_generation()
 
     def update_intervals(self, back=None):
         '''
@@ -55,6 +55,7 @@ PER_REMOTE_OVERRIDES = (
     'saltenv_whitelist', 'saltenv_blacklist',
     'env_whitelist', 'env_blacklist', 'refspecs',
     'disable_saltenv_mapping', 'ref_types', 'update_interval',
+    'fetch_timeout',
 )
 PER_REMOTE_ONLY = ('all_saltenvs', 'name', 'saltenv')
 
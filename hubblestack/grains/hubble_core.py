@@ -64,6 +64,7 @@ import hubblestack.utils.network
 import hubblestack.utils.path
 import hubblestack.utils.pkg.rpm
 import hubblestack.utils.platform
+import hubblestack.utils.rdns
 import hubblestack.utils.stringutils
 
 if hubblestack.utils.platform.is_windows():
@@ -2209,31 +2210,23 @@ def fqdns():
     '''
     Return all known FQDNs for the system by enumerating all interfaces and
     then trying to reverse resolve them (excluding 'lo' interface).
+
+    The addresses are resolved concurrently, within the ``fqdns_timeout`` and
+    ``fqdns_deadline`` limits, and their names reused across refreshes (see
+    :py:func:`hubblestack.utils.rdns.resolve`).
     '''
     # Provides:
     # fqdns
 
     grains = {}
-    fqdns = set()
 
     addresses = hubblestack.utils.network.ip_addrs(include_loopback=False,
-                                            interface_data=_INTERFACES)
+                                            interface_data=_get_interfaces())
     addresses.extend(hubblestack.utils.network.ip_addrs6(include_loopback=False,
-                                                  interface_data=_INTERFACES))
-    err_message = 'An exception occurred resolving address \'%s\': %s'
-    for ip in addresses:
-        try:
-            fqdns.add(socket.getfqdn(socket.gethostbyaddr(ip)[0]))
-        except socket.herror as err:
-            if err.errno == 0:
-                # No FQDN for this IP address, so we don't need to know this all the time.
-                log.debug("Unable to resolve address %s: %s", ip, err)
-            else:
-                log.error(err_message, ip, err)
-        except (socket.error, socket.gaierror, socket.timeout) as err:
-            log.error(err_message, ip, err)
+                                                  interface_data=_get_interfaces()))
+    resolved = hubblestack.utils.rdns.resolve(addresses, **hubblestack.utils.rdns.resolve_args(__opts__))
 
-    grains['fqdns'] = sorted(list(fqdns))
+    grains['fqdns'] = sorted(set(name for names in resolved.values() for name in names))
     return grains
 
 
@@ -8,6 +8,9 @@ plugin interfaces used by Salt.
 import os
 import re
 import sys
+import copy
+import fnmatch
+import hashlib
 import time
 import yaml
 import logging
@@ -21,16 +24,21 @@ import types
 from zipimport import zipimporter
 
 import hubblestack.config
+import hubblestack.payload
+import hubblestack.status
 import hubblestack.syspaths
 import hubblestack.utils.args
+import hubblestack.utils.atomicfile
 import hubblestack.utils.context
 import hubblestack.utils.data
 import hubblestack.utils.dictupdate
 import hubblestack.utils.files
 import hubblestack.utils.lazy
 import hubblestack.utils.odict
+import hubblestack.utils.parallel
 import hubblestack.utils.platform
 import hubblestack.utils.versions
+from hubblestack.version import __version__
 
 from hubblestack.exceptions import LoaderError
 from hubblestack.template import check_render_pipe_str
@@ -49,6 +57,20 @@ except ImportError:
     from collections import MutableMapping
 
 log = logging.getLogger(__name__)
+# per-grain timings are added as resources when the grains are loaded
+HSS = hubblestack.status.HubbleStatus(__name__)
+
+# grain function results kept between refreshes, see _grain_ttl()
+# {'<grain function key>': (expires, ttl, ret)}
+_GRAINS_CACHE = {}
+
+# module directory scans kept between loaders (and, persisted in the
+# cachedir, between runs), see LazyLoader._refresh_file_mapping
+FILE_MAPPING_CACHE_MAX_ENTRIES = 64
+_FILE_MAPPING_CACHE = {'path': None, 'entries': None}
+_FILE_MAPPING_LOCK = threading.Lock()
+# counters for hubble --startup-profile
+FILE_MAPPING_STATS = {'loaders': 0, 'scans': 0, 'hits': 0, 'time': 0.0}
 
 HUBBLE_BASE_PATH = os.path.abspath(hubblestack.syspaths.INSTALL_DIR)
 LOADED_BASE_NAME = 'hubble.loaded'
@@ -258,6 +280,78 @@ def grain_funcs(opts, proxy=None):
     )
 
 
+def _grain_ttl(opts, key):
+    '''
+    How long (in seconds) the result of grain function ``key`` may be reused.
+
+    The first glob in ``grains_refresh_ttl`` matching the function key (e.g.
+    ``hubble_core.os_data``) wins; other grains are reused until the next
+    regular refresh (``grains_refresh_frequency``). 0 means always re-run.
+    '''
+    for pattern, ttl in (opts.get('grains_refresh_ttl') or {}).items():
+        if fnmatch.fnmatch(key, pattern):
+            return ttl or 0
+    return opts.get('grains_refresh_frequency') or 0
+
+
+def _cached_grain(key, now):
+    '''
+    Return a copy of the cached result of grain function ``key`` if it has
+    not expired, else None
+    '''
+    try:
+        expires, _, ret = _GRAINS_CACHE[key]
+    except KeyError:
+        return None
+    if now >= expires:
+        del _GRAINS_CACHE[key]
+        return None
+    return copy.deepcopy(ret)
+
+
+def _cache_grain(opts, key, ret, now):
+    ttl = _grain_ttl(opts, key)
+    if ttl > 0 and isinstance(ret, dict):
+        _GRAINS_CACHE[key] = (now + ttl, ttl, copy.deepcopy(ret))
+
+
+def grains_expired(now=None, max_ttl=None):
+    '''
+    True if any cached grain function result has expired, meaning a call to
+    grains() would re-run at least one grain function. With ``max_ttl`` only
+    results with a shorter TTL than that are considered.
+    '''
+    if now is None:
+        now = time.time()
+    return any(now >= expires for expires, ttl, _ in _GRAINS_CACHE.values()
+               if max_ttl is None or ttl < max_ttl)
+
+
+def clear_grains_cache():
+    '''
+    Forget all cached grain function results
+    '''
+    _GRAINS_CACHE.clear()
+
+
+def _timed_grain(key, func, kwargs):
+    '''
+    Wrap a grain function so its run time is tracked in HubbleStatus under
+    "grains:<key>"
+    '''
+    hs_key = 'grains:{0}'.format(key)
+    HSS.add_resource(hs_key)
+
+    def _call(**more):
+        log.trace('Loading %s grain', key)
+        stat_handle = HSS.mark(hs_key)
+        try:
+            return func(**dict(kwargs, **more))
+        finally:
+            stat_handle.fin()
+    return _call
+
+
 def grains(opts, force_refresh=False, proxy=None):
     '''
     Return the functions for the dynamic grains and the values for the static
@@ -315,12 +409,26 @@ def grains(opts, force_refresh=False, proxy=None):
     funcs = grain_funcs(opts, proxy=None)
     if force_refresh:  # if we refresh, lets reload grain modules
         funcs.clear()
+        clear_grains_cache()
+    # grain functions whose results haven't expired are not re-run
+    now = time.time()
+    cached = {}
+    for key in funcs:
+        ret = _cached_grain(key, now)
+        if ret is not None:
+            cached[key] = ret
+    if cached:
+        log.debug('Reusing %d of %d grain function results', len(cached), len(funcs))
     # Run core grains
     for key in funcs:
         if not key.startswith('core.'):
             continue
-        log.trace('Loading %s grain', key)
-        ret = funcs[key]()
+        if key in cached:
+            ret = cached[key]
+        else:
+            log.trace('Loading %s grain', key)
+            ret = funcs[key]()
+            _cache_grain(opts, key, ret, now)
         if not isinstance(ret, dict):
             continue
         if grains_deep_merge:
@@ -328,10 +436,21 @@ def grains(opts, force_refresh=False, proxy=None):
         else:
             grains_data.update(ret)
 
-    # Run the rest of the grains
+    # Run the rest of the grains. Grain functions that don't take the
+    # grains collected so far are independent of each other and run
+    # concurrently (grains_workers at a time, each limited to grains_timeout
+    # seconds); the results are merged in the same order as before, and
+    # functions that do take grains are called in their place during the
+    # merge so they see exactly what they would have seen serially.
+    timeout = opts.get('grains_timeout')
+    calls = []
+    tasks = []
     for key in funcs:
         if key.startswith('core.') or key == '_errors':
             continue
+        if key in cached:
+            calls.append((key, cached[key], None))
+            continue
         try:
             # Grains are loaded too early to take advantage of the injected
             # __proxy__ variable.  Pass an instance of that LazyLoader
@@ -339,14 +458,7 @@ def grains(opts, force_refresh=False, proxy=None):
             # one parameter.  Then the grains can have access to the
             # proxymodule for retrieving information from the connected
             # device.
-            log.trace('Loading %s grain', key)
             parameters = hubblestack.utils.args.get_function_argspec(funcs[key]).args
-            kwargs = {}
-            if 'proxy' in parameters:
-                kwargs['proxy'] = proxy
-            if 'grains' in parameters:
-                kwargs['grains'] = grains_data
-            ret = funcs[key](**kwargs)
         except Exception:
             log.critical(
                 'Failed to load grains defined in grain file %s in '
@@ -354,6 +466,41 @@ def grains(opts, force_refresh=False, proxy=None):
                 exc_info=True
             )
             continue
+        kwargs = {}
+        if 'proxy' in parameters:
+            kwargs['proxy'] = proxy
+        call = _timed_grain(key, funcs[key], kwargs)
+        if 'grains' in parameters:
+            calls.append((key, call, None))
+        else:
+            calls.append((key, call, len(tasks)))
+            tasks.append((key, call, timeout))
+
+    results = hubblestack.utils.parallel.run_tasks(
+        tasks, workers=opts.get('grains_workers', 1), name='grains')
+
+    for key, call, task_idx in calls:
+        if isinstance(call, dict):
+            ret = call
+        else:
+            if task_idx is None:
+                res = hubblestack.utils.parallel.run_tasks(
+                    [(key, functools.partial(call, grains=grains_data))], workers=1)[0]
+            else:
+                res = results[task_idx]
+            if res.timed_out:
+                log.error('Grain function %s timed out after %ss, skipping it', key, timeout)
+                continue
+            if res.exc is not None:
+                log.critical(
+                    'Failed to load grains defined in grain file %s in '
+                    'function %s, error:\n', key, funcs[key],
+                    exc_info=(type(res.exc), res.exc, res.exc.__traceback__)
+                )
+                continue
+            log.trace('Loaded %s grain in %.3fs', key, res.duration)
+            ret = res.value
+            _cache_grain(opts, key, ret, now)
         if not isinstance(ret, dict):
             continue
         if grains_deep_merge:
@@ -437,6 +584,79 @@ def _mod_type(module_path):
     return 'ext'
 
 
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _file_mapping_cache_entries(opts):
+    '''
+    Return the (lazily loaded) file mapping cache for opts['cachedir'], or
+    None if the cache is disabled. Must be called holding _FILE_MAPPING_LOCK.
+    '''
+    if not opts.get('loader_file_mapping_cache', True) or not opts.get('cachedir'):
+        return None
+    path = os.path.join(opts['cachedir'], 'loader', 'file_mapping.p')
+    if _FILE_MAPPING_CACHE['path'] != path:
+        entries = hubblestack.utils.odict.OrderedDict()
+        try:
+            with hubblestack.utils.files.fopen(path, 'rb') as fp_:
+                data = hubblestack.payload.Serial(opts).load(fp_)
+            if isinstance(data, dict):
+                entries.update(hubblestack.utils.data.decode(data))
+        except (IOError, OSError):
+            pass
+        except Exception:
+            log.warning('Ignoring unreadable loader file mapping cache %s', path, exc_info=True)
+        _FILE_MAPPING_CACHE.update(path=path, entries=entries)
+    return _FILE_MAPPING_CACHE['entries']
+
+
+def _file_mapping_cache_get(opts, key):
+    '''
+    Return the cached file mapping (a list of [name, path, ext, opt_index])
+    for key if none of the directories it was built from changed since
+    '''
+    with _FILE_MAPPING_LOCK:
+        entries = _file_mapping_cache_entries(opts)
+        if not entries or key not in entries:
+            return None
+        stamp, mapping = entries[key]
+    if all(_mtime(path) == mtime for path, mtime in stamp):
+        return mapping
+    return None
+
+
+def _file_mapping_cache_set(opts, key, stamp, mapping):
+    '''
+    Cache (and persist) the file mapping built from the directories in stamp
+    '''
+    now_ns = time.time_ns()
+    # a directory changed within the last couple of seconds could change
+    # again without its mtime moving (coarse timestamps); don't cache that
+    if any(mtime is not None and now_ns - mtime < 2 * 10 ** 9 for _, mtime in stamp):
+        return
+    with _FILE_MAPPING_LOCK:
+        entries = _file_mapping_cache_entries(opts)
+        if entries is None:
+            return
+        entries.pop(key, None)
+        entries[key] = [stamp, mapping]
+        while len(entries) > FILE_MAPPING_CACHE_MAX_ENTRIES:
+            entries.popitem(last=False)
+        path = _FILE_MAPPING_CACHE['path']
+        try:
+            dirname = os.path.dirname(path)
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            with hubblestack.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+                fp_.write(hubblestack.payload.Serial(opts).dumps(dict(entries)))
+        except (IOError, OSError) as exc:
+            log.warning('Unable to write loader file mapping cache %s: %s', path, exc)
+
+
 class LazyLoader(hubblestack.utils.lazy.LazyDict):
     '''
     A pseduo-dictionary which has a set of keys which are the
@@ -629,6 +849,43 @@ class LazyLoader(hubblestack.utils.lazy.LazyDict):
         # allow for module dirs
         self.suffix_map[''] = ('', '', MODULE_KIND_PKG_DIRECTORY)
 
+        start = time.time()
+        FILE_MAPPING_STATS['loaders'] += 1
+        # The mapping only depends on the names in the module directories (and
+        # the loader settings below), so a previous scan can be reused as long
+        # as none of the directories' mtimes moved.
+        cache_key = hashlib.sha1(repr((
+            __version__, list(self.module_dirs), sorted(self.suffix_map),
+            self.suffix_order, sorted(self.disabled),
+            self.opts.get('optimization_order'))).encode()).hexdigest()
+        mapping = _file_mapping_cache_get(self.opts, cache_key)
+        if mapping is not None:
+            FILE_MAPPING_STATS['hits'] += 1
+            self.file_mapping = hubblestack.utils.odict.OrderedDict(
+                (name, (fpath, ext, opt_index)) for name, fpath, ext, opt_index in mapping)
+        else:
+            FILE_MAPPING_STATS['scans'] += 1
+            stamp = []
+            for mod_dir in self.module_dirs:
+                stamp.append([mod_dir, _mtime(mod_dir)])
+                stamp.append([os.path.join(mod_dir, '__pycache__'),
+                              _mtime(os.path.join(mod_dir, '__pycache__'))])
+            self._scan_file_mapping()
+            # packages are mapped by whether they contain an __init__
+            stamp.extend([fpath, _mtime(fpath)] for fpath, ext, _ in self.file_mapping.values()
+                         if ext == '')
+            _file_mapping_cache_set(self.opts, cache_key, stamp, [
+                [name, fpath, ext, opt_index]
+                for name, (fpath, ext, opt_index) in self.file_mapping.items()])
+        for smod in self.static_modules:
+            f_noext = smod.split('.')[-1]
+            self.file_mapping[f_noext] = (smod, '.o', 0)
+        FILE_MAPPING_STATS['time'] += time.time() - start
+
+    def _scan_file_mapping(self):
+        '''
+        list the module directories and build the file mapping from scratch
+        '''
         # create mapping of filename (without suffix) to (path, suffix)
         # The files are added in order of priority, so order *must* be retained.
         self.file_mapping = hubblestack.utils.odict.OrderedDict()
@@ -750,9 +1007,6 @@ class LazyLoader(hubblestack.utils.lazy.LazyDict):
 
                 except OSError:
                     continue
-        for smod in self.static_modules:
-            f_noext = smod.split('.')[-1]
-            self.file_mapping[f_noext] = (smod, '.o', 0)
 
     def clear(self):
         '''
@@ -1,16 +1,20 @@
 import os
 import logging
 import fnmatch
+import collections
 
 import hubblestack.module_runner.runner
 from hubblestack.module_runner.runner import Caller
 
 import hubblestack.module_runner.comparator
+import hubblestack.module_runner.result_store as result_store
+import hubblestack.status
 
 from hubblestack.exceptions import HubbleCheckVersionIncompatibleError
 from hubblestack.exceptions import HubbleCheckValidationError
 
 log = logging.getLogger(__name__)
+HSS = hubblestack.status.HubbleStatus(__name__, 'differential_reused', 'differential_executed')
 CHECK_STATUS = {
     'Success': 'Success',
     'Failure': 'Failure',
@@ -37,8 +41,8 @@ class AuditRunner(hubblestack.module_runner.runner.Runner):
         result_list = []
         boolean_expr_check_list = []
         audit_profile = os.path.splitext(os.path.basename(audit_file))[0]
+        matched = []
         for audit_id, audit_data in audit_data_dict.items():
-            log.debug('Executing check-id: %s in audit profile: %s', audit_id, audit_profile)
             audit_impl = self._get_matched_implementation(audit_id, audit_data, tags, labels)
             if not audit_impl:
                 # no matched impl found
@@ -48,7 +52,27 @@ class AuditRunner(hubblestack.module_runner.runner.Runner):
 
             if not self._validate_audit_data(audit_id, audit_impl):
                 continue
-
+            matched.append((audit_id, audit_data, audit_impl))
+
+        store = self._open_result_store(audit_file, args)
+        keys = {}
+        reused = {}
+        if store is not None:
+            for audit_id, audit_data, audit_impl in matched:
+                keys[audit_id] = self._differential_key(audit_id, audit_data, audit_impl, verbose)
+                stored = store.get(audit_id, keys[audit_id]) if keys[audit_id] else None
+                if stored is not None:
+                    reused[audit_id] = stored
+
+        self._prepare_batches([check for check in matched if check[0] not in reused])
+
+        for audit_id, audit_data, audit_impl in matched:
+            if audit_id in reused:
+                log.debug('Reusing the result of check-id: %s in audit profile: %s', audit_id, audit_profile)
+                result_list.append(reused[audit_id])
+                HSS.mark('differential_reused')
+                continue
+            log.debug('Executing check-id: %s in audit profile: %s', audit_id, audit_profile)
             try:
                 # version check
                 if not self._is_hubble_version_compatible(audit_id, audit_impl):
@@ -67,6 +91,9 @@ class AuditRunner(hubblestack.module_runner.runner.Runner):
                     # handover to module
                     audit_result = self._execute_audit(audit_id, audit_impl, audit_data, verbose, audit_profile)
                     result_list.append(audit_result)
+                    if store is not None:
+                        store.put(audit_id, keys.get(audit_id), audit_result)
+                        HSS.mark('differential_executed')
             except (HubbleCheckValidationError, HubbleCheckVersionIncompatibleError) as herror:
                 # add into error/skipped section
                 result_list.append({
@@ -87,9 +114,67 @@ class AuditRunner(hubblestack.module_runner.runner.Runner):
             boolean_expr_check_list, verbose, audit_profile, result_list)
         result_list = result_list + boolean_expr_result_list
 
+        if store is not None:
+            store.save()
+            log.info('Differential audit of %s: %d checks reused, %d executed%s', audit_profile,
+                     store.reused, store.executed, ' (full run)' if store.full_run else '')
+
         # return list of results for a file
         return result_list
 
+    def _open_result_store(self, audit_file, args):
+        """
+        The stored results of the profile, if the differential mode is on
+        (``differential`` argument of audit.run, or the audit_differential
+        option)
+        """
+        differential = args.get('differential')
+        if differential is None:
+            differential = __opts__.get('audit_differential', False)
+        if not differential or not __opts__.get('cachedir'):
+            return None
+        return result_store.ResultStore(__opts__['cachedir'], audit_file,
+                                        __opts__.get('audit_differential_full_run', 86400))
+
+    def _differential_key(self, audit_id, audit_data, audit_impl, verbose):
+        """
+        The key of the stored result of a check: a digest of the check and
+        of the current fingerprint of the inputs its module declared. None
+        if the check must always be executed (boolean expressions, modules
+        not declaring their inputs).
+        """
+        if self._is_boolean_expression(audit_impl) or not isinstance(audit_impl.get('items'), list):
+            return None
+        fingerprints = []
+        for audit_check in audit_impl['items']:
+            inputs = self._get_module_inputs(audit_impl['module'], audit_id, audit_check)
+            if inputs is None:
+                return None
+            fingerprint = result_store.fingerprint(inputs, __mods__)
+            if fingerprint is None:
+                return None
+            fingerprints.append(fingerprint)
+        return result_store.check_key(audit_id, audit_data, audit_impl, bool(verbose),
+                                      __grains__.get('hubble_version'), fingerprints)
+
+    def _prepare_batches(self, matched):
+        """
+        Hand the checks of each module to that module's prepare_batch(), so
+        that modules can share work between checks of the same profile
+        """
+        batches = collections.OrderedDict()
+        for audit_id, _, audit_impl in matched:
+            if self._is_boolean_expression(audit_impl) or audit_impl.get('return_no_exec', False):
+                continue
+            items = audit_impl.get('items')
+            if not isinstance(items, list):
+                continue
+            batch = batches.setdefault(audit_impl['module'], [])
+            batch.extend((audit_id, audit_check) for audit_check in items if isinstance(audit_check, dict))
+        for module_name, block_list in batches.items():
+            if block_list:
+                self._prepare_batch(module_name, block_list)
+
     # overridden method
     def _validate_yaml_dictionary(self, yaml_dict):
         return True
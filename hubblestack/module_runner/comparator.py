@@ -10,6 +10,9 @@ from hubblestack.exceptions import HubbleCheckFailedError
 
 log = logging.getLogger(__name__)
 
+__comparator__ = {}
+_FUNCS = {'loader': None, 'funcs': {}}
+
 
 def run(audit_id, args, module_result, module_status=True):
     """
@@ -32,10 +35,8 @@ def run(audit_id, args, module_result, module_status=True):
         log.error(error_msg)
         return False, error_msg
 
-    global __comparator__
-
-    comparator_command_method_name = _find_comparator_command(args)
-    if not comparator_command_method_name:
+    comparator_func = _find_comparator_func(args)
+    if not comparator_func:
         # raise error when no matched command found
         raise HubbleCheckFailedError('Unknown comparator or command for: {0}'.format(args['type']))
 
@@ -43,11 +44,32 @@ def run(audit_id, args, module_result, module_status=True):
         result_val = module_result
     else:
         result_val = module_result['result'] if 'result' in module_result else module_result
-    comparator_result = __comparator__[comparator_command_method_name](audit_id, result_val, args)
+    comparator_result = comparator_func(audit_id, result_val, args)
 
     return comparator_result
 
 
+def _find_comparator_func(args):
+    """
+    Find matched comparator's function. Comparators invoke each other for
+    every element of the lists and dicts they compare, so the lookup is
+    memoized per comparator type and set of keys (until the comparators are
+    reloaded)
+    """
+    if _FUNCS['loader'] is not __comparator__:
+        _FUNCS['loader'] = __comparator__
+        _FUNCS['funcs'] = {}
+    key = (args['type'], tuple(args))
+    try:
+        return _FUNCS['funcs'][key]
+    except KeyError:
+        pass
+    method_name = _find_comparator_command(args)
+    func = __comparator__[method_name] if method_name else None
+    _FUNCS['funcs'][key] = func
+    return func
+
+
 def _find_comparator_command(args):
     """
     Find matched comparator's command
@@ -3,12 +3,16 @@ from hubblestack.module_runner.runner import Caller
 import hubblestack.module_runner.comparator
 
 import logging
+import threading
 
 from hubblestack.exceptions import CommandExecutionError
 import hubblestack.loader
+import hubblestack.utils.parallel
 
 log = logging.getLogger(__name__)
 RETURNER_ID_BLOCK = None
+# set in the threads running the elements of a concurrent xpipe
+_XPIPE_WORKER = threading.local()
 
 
 class FdgRunner(Runner):
@@ -68,10 +72,10 @@ class FdgRunner(Runner):
 
         if 'xpipe_on_true' in block and status:
             log.debug('Piping via chaining keyword xpipe_on_true.')
-            return self._xpipe(ret, status, block_data, block['xpipe_on_true'], returner)
+            return self._xpipe(ret, status, block_data, block['xpipe_on_true'], returner, block)
         elif 'xpipe_on_false' in block and not status:
             log.debug('Piping via chaining keyword xpipe_on_false.')
-            return self._xpipe(ret, status, block_data, block['xpipe_on_false'], returner)
+            return self._xpipe(ret, status, block_data, block['xpipe_on_false'], returner, block)
         elif 'pipe_on_true' in block and status:
             log.debug('Piping via chaining keyword pipe_on_true.')
             return self._pipe(ret, status, block_data, block['pipe_on_true'], returner)
@@ -80,7 +84,7 @@ class FdgRunner(Runner):
             return self._pipe(ret, status, block_data, block['pipe_on_false'], returner)
         elif 'xpipe' in block:
             log.debug('Piping via chaining keyword xpipe.')
-            return self._xpipe(ret, status, block_data, block['xpipe'], returner)
+            return self._xpipe(ret, status, block_data, block['xpipe'], returner, block)
         elif 'pipe' in block:
             log.debug('Piping via chaining keyword pipe.')
             return self._pipe(ret, status, block_data, block['pipe'], returner)
@@ -90,16 +94,47 @@ class FdgRunner(Runner):
                 self._return((ret, status), returner)
             return ret, status
 
-    def _xpipe(self, chained, chained_status, block_data, block_id, returner=None):
+    def _xpipe(self, chained, chained_status, block_data, block_id, returner=None, parent=None):
         """
         Iterate over the given value and for each iteration, call the given fdg
         block by id with the iteration value as the passthrough.
 
-        The results will be returned as a list.
+        The results will be returned as a list, in the order of the values.
+
+        With more than one worker (``xpipe_workers`` in the piping block, or
+        the fdg_xpipe_workers option), the values are run concurrently on up
+        to that many threads; an xpipe nested in one of them runs its values
+        one after the other. An element running longer than ``xpipe_timeout``
+        (or fdg_xpipe_timeout) seconds is abandoned and its result is
+        ``({'error': 'timed_out'}, False)``.
         """
-        ret = []
-        for value in chained:
-            ret.append(self._fdg_execute(block_id, block_data, value, chained_status))
+        parent = parent or {}
+        workers = parent.get('xpipe_workers', __opts__.get('fdg_xpipe_workers', 1))
+        timeout = parent.get('xpipe_timeout', __opts__.get('fdg_xpipe_timeout', 0))
+        try:
+            workers = int(workers or 1)
+        except (TypeError, ValueError):
+            workers = 1
+        values = list(chained)
+        if getattr(_XPIPE_WORKER, 'active', False) or not timeout and (workers <= 1 or len(values) <= 1):
+            ret = [self._fdg_execute(block_id, block_data, value, chained_status) for value in values]
+        else:
+            def _element(value):
+                _XPIPE_WORKER.active = True
+                return self._fdg_execute(block_id, block_data, value, chained_status)
+
+            results = hubblestack.utils.parallel.run_tasks(
+                [(idx, lambda value=value: _element(value)) for idx, value in enumerate(values)],
+                workers=workers, timeout=timeout, name='hubble-xpipe')
+            ret = []
+            for res in results:
+                if res.timed_out:
+                    log.error('fdg block %s timed out after %ss for %s', block_id, timeout, values[res.key])
+                    ret.append(({'error': 'timed_out'}, False))
+                elif res.exc is not None:
+                    raise res.exc
+                else:
+                    ret.append(res.value)
         if returner:
             self._return(ret, returner)
         return ret
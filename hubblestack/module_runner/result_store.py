@@ -0,0 +1,158 @@
+# -*- encoding: utf-8 -*-
+"""
+Stored results of audit checks, for the differential audit mode.
+
+Audit modules can declare the inputs a check depends on with a
+``get_inputs(block_id, block_dict, extra_args=None)`` function returning a
+list of inputs (or None if they can't be known in advance):
+
+- ``('file', path)``: the stat of the file (content, mode, owner...)
+- ``('pkgs',)``: the installed packages (the package database files)
+- ``('sysctl', name)``: the value of a kernel parameter
+
+With the differential mode on, the runner fingerprints the inputs of each
+check and answers it from the result of its last run while neither the
+check nor its inputs changed. A full run of every check is forced every
+``audit_differential_full_run`` seconds to bound the staleness of results
+depending on something the inputs don't cover.
+
+The results are kept per profile in ``<cachedir>/audit_results``.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+
+import hubblestack.utils.atomicfile
+import hubblestack.utils.pkg.inventory
+import hubblestack.utils.sysctl
+
+log = logging.getLogger(__name__)
+
+# bump when the stored structure or the fingerprints change
+STORE_VERSION = 2
+
+
+def _stat(path):
+    try:
+        st = os.stat(os.path.expanduser(path))
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_ctime_ns, st.st_size, st.st_ino, st.st_mode, st.st_uid, st.st_gid]
+
+
+def _file_input(mods, path):
+    return _stat(path)
+
+
+def _pkgs_input(mods):
+    stamp = hubblestack.utils.pkg.inventory.stamp()
+    if not stamp:
+        raise ValueError('no known package database')
+    return stamp
+
+
+def _sysctl_input(mods, name):
+    if not hubblestack.utils.sysctl.available():
+        raise ValueError('/proc/sys is not available')
+    return hubblestack.utils.sysctl.read(name)
+
+
+INPUTS = {
+    'file': _file_input,
+    'pkgs': _pkgs_input,
+    'sysctl': _sysctl_input,
+}
+
+
+def fingerprint(inputs, mods):
+    """
+    Return the current fingerprint (a list) of the given inputs, or None if
+    one of them is unknown or can't be fingerprinted here
+    """
+    ret = []
+    for item in inputs:
+        kind, args = item[0], list(item[1:])
+        if kind not in INPUTS:
+            log.debug('Unknown audit input %s', kind)
+            return None
+        try:
+            ret.append([kind, args, INPUTS[kind](mods, *args)])
+        except Exception as exc:
+            log.debug('Unable to fingerprint audit input %s: %s', item, exc)
+            return None
+    return ret
+
+
+def check_key(*parts):
+    """
+    A digest of the json representation of parts (the check, its inputs...)
+    """
+    data = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class ResultStore(object):
+    """
+    The results of the last run of the checks of a profile
+    """
+
+    def __init__(self, cachedir, profile, full_run_interval):
+        self.path = os.path.join(cachedir, 'audit_results',
+                                 hashlib.sha256(profile.encode('utf-8')).hexdigest() + '.json')
+        self.reused = 0
+        self.executed = 0
+        self._results = {}
+        self._full_run = 0
+        data = None
+        try:
+            with open(self.path, 'r') as file_handle:
+                data = json.load(file_handle)
+        except (IOError, OSError):
+            pass
+        except ValueError:
+            log.warning('Ignoring unreadable audit results %s', self.path)
+        if isinstance(data, dict) and data.get('version') == STORE_VERSION:
+            self._results = data.get('results', {})
+            self._full_run = data.get('full_run', 0)
+        now = time.time()
+        self.full_run = not full_run_interval or now - self._full_run >= full_run_interval \
+            or self._full_run > now
+        if self.full_run:
+            self._full_run = now
+            self._results = {}
+
+    def get(self, check_id, key):
+        """
+        The stored result of check_id, if it was stored with this key
+        """
+        entry = self._results.get(check_id)
+        if entry and entry.get('key') == key:
+            self.reused += 1
+            return entry['result']
+        return None
+
+    def put(self, check_id, key, result):
+        """
+        Store the result of a check that was executed
+        """
+        self.executed += 1
+        if key is None:
+            self._results.pop(check_id, None)
+        else:
+            self._results[check_id] = {'key': key, 'result': result}
+
+    def save(self):
+        """
+        Persist the results
+        """
+        try:
+            dirname = os.path.dirname(self.path)
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname, 0o700)
+            with hubblestack.utils.atomicfile.atomic_open(self.path, 'w') as file_handle:
+                json.dump({'version': STORE_VERSION, 'full_run': self._full_run,
+                           'results': self._results}, file_handle, default=str)
+        except (IOError, OSError, TypeError, ValueError) as exc:
+            log.warning('Unable to write audit results %s: %s', self.path, exc)
@@ -2,15 +2,26 @@
 """
 A base class for Audit/FDG module runner.
 
+Profiles are loaded through a compiled-profile cache: the parsed and
+validated profile is kept, keyed by the sha256 of the file content, as a
+pickle in memory and in ``<cachedir>/profiles`` (``profile_cache`` option),
+so a profile only goes through the YAML parser (libyaml's when available)
+when its content changes.
 """
+import collections
+import hashlib
 import os
 import logging
+import pickle
+import threading
 import yaml
 from abc import ABC, abstractmethod
 from packaging import version
 import hubblestack.module_runner.comparator
 
 import hubblestack.loader
+import hubblestack.status
+import hubblestack.utils.atomicfile
 from hubblestack.exceptions import CommandExecutionError
 from hubblestack.exceptions import HubbleCheckValidationError
 
@@ -18,6 +29,18 @@ log = logging.getLogger(__name__)
 __hmods__ = {}
 __comparator__ = {}
 
+HSS = hubblestack.status.HubbleStatus(__name__, 'profile_cache_hit', 'profile_cache_miss')
+
+# bump when the cached structure changes
+PROFILE_CACHE_VERSION = 1
+PROFILE_CACHE_MAX_ENTRIES = 512
+_PROFILE_CACHE = collections.OrderedDict()
+_PROFILE_CACHE_LOCK = threading.Lock()
+# (hubble_version, version condition) -> compatible
+_VERSION_CHECKS = {}
+
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 
 class Caller:
     """
@@ -63,9 +86,8 @@ class Runner(ABC):
             raise CommandExecutionError('There was a problem caching the file: {0}'
                                         .format(file))
 
-        # load yaml and validate
-        yaml_data_dict = self._load_yaml(cached_file, file)
-        self._validate_yaml_dictionary(yaml_data_dict)
+        # load (and validate) yaml, or reuse it if the content didn't change
+        yaml_data_dict = self._load_profile(cached_file, file)
 
         return self._execute(yaml_data_dict, file, args)
 
@@ -117,7 +139,7 @@ class Runner(ABC):
             acceptable_block_args = {
                 'return', 'module', 'args', 'comparator',
                 'xpipe_on_true', 'xpipe_on_false', 'xpipe', 'pipe',
-                'pipe_on_true', 'pipe_on_false',
+                'pipe_on_true', 'pipe_on_false', 'xpipe_workers', 'xpipe_timeout',
             }
             for key in module_args:
                 if key not in acceptable_block_args:
@@ -139,6 +161,37 @@ class Runner(ABC):
                                                                    'extra_args': extra_args,
                                                                    'caller': self._caller})
 
+    def _prepare_batch(self, module_name, block_list, extra_args=None):
+        """
+        Helper method to let a module prepare for a batch of checks, if the
+        module has a prepare_batch() method. Failures are only logged, the
+        checks are then executed one by one as usual.
+        """
+        prepare_method = '{0}.prepare_batch'.format(module_name)
+        if prepare_method not in __hmods__:
+            return
+        try:
+            __hmods__[prepare_method](block_list, {'extra_args': extra_args,
+                                                   'caller': self._caller})
+        except Exception:
+            log.exception('Error preparing batch of %d checks for module %s',
+                          len(block_list), module_name)
+
+    def _get_module_inputs(self, module_name, profile_id, module_args):
+        """
+        Helper method to get the inputs a block depends on from the module's
+        get_inputs() method, for the differential audit mode. Returns None
+        if the module doesn't declare them (or failed to).
+        """
+        inputs_method = '{0}.get_inputs'.format(module_name)
+        if inputs_method not in __hmods__:
+            return None
+        try:
+            return __hmods__[inputs_method](profile_id, module_args, {'caller': self._caller})
+        except Exception:
+            log.exception('Error getting the inputs of %s', profile_id)
+            return None
+
     def _get_filtered_params_to_log(self, module_name, profile_id, module_args, extra_args=None, chaining_args=None):
         """
         Helper method to execute a Module's get_filtered_params_to_log() method.
@@ -156,7 +209,7 @@ class Runner(ABC):
             return __mods__['cp.cache_file'](file)
         return file
 
-    def _load_yaml(self, filepath, filename):
+    def _load_yaml(self, filepath, filename, data=None):
         """
         Load and validate yaml file
         File must be a valid yaml file, and content loaded must form a python-dictionary
@@ -164,6 +217,7 @@ class Runner(ABC):
         Arguments:
             filepath {str} -- Actual filepath of profile file
             filename {str} -- Filename for logging purpose
+            data {bytes} -- Content of the file, if already read
 
         Returns:
             [dict] -- Dictionary representation for yaml
@@ -175,8 +229,10 @@ class Runner(ABC):
 
         yaml_data = None
         try:
-            with open(filepath, 'r') as file_handle:
-                yaml_data = yaml.safe_load(file_handle)
+            if data is None:
+                with open(filepath, 'rb') as file_handle:
+                    data = file_handle.read()
+            yaml_data = yaml.load(data, Loader=_YAML_LOADER)
         except Exception as exc:
             raise CommandExecutionError('Could not load yaml file: {0}, Exception: {1}'.format(filepath, exc))
 
@@ -185,6 +241,37 @@ class Runner(ABC):
 
         return yaml_data
 
+    def _load_profile(self, filepath, filename):
+        """
+        Return the validated dictionary of a profile file, from the compiled
+        profile cache if a file with the same content was loaded before.
+        Every call returns a new copy.
+        """
+        if not filepath or not os.path.isfile(filepath):
+            raise CommandExecutionError('Could not find file: {0}'.format(filepath))
+        try:
+            with open(filepath, 'rb') as file_handle:
+                data = file_handle.read()
+        except (IOError, OSError) as exc:
+            raise CommandExecutionError('Could not load yaml file: {0}, Exception: {1}'.format(filepath, exc))
+
+        key = '{0}-{1}-{2}'.format(self._caller.lower(), PROFILE_CACHE_VERSION,
+                                   hashlib.sha256(data).hexdigest())
+        compiled = _profile_cache_get(key)
+        if compiled is not None:
+            try:
+                yaml_data = pickle.loads(compiled)
+                HSS.mark('profile_cache_hit')
+                return yaml_data
+            except Exception:
+                log.warning('Ignoring unreadable compiled profile for %s', filename, exc_info=True)
+
+        HSS.mark('profile_cache_miss')
+        yaml_data = self._load_yaml(filepath, filename, data)
+        self._validate_yaml_dictionary(yaml_data)
+        _profile_cache_set(key, pickle.dumps(yaml_data, protocol=pickle.HIGHEST_PROTOCOL))
+        return yaml_data
+
     def _is_hubble_version_compatible(self, profile_id, yaml_dictionary_data):
         """
         Function to check if current hubble version matches with provided values
@@ -212,11 +299,22 @@ class Runner(ABC):
             >1
         """
         log.debug("Current hubble version: %s" % __grains__['hubble_version'])
-        current_version = version.parse(__grains__['hubble_version'])
         version_str = yaml_dictionary_data.get('hubble_version', '').strip()
         if not version_str:
             log.debug("No hubble version provided for check id: %s Thus returning true for this check" % (profile_id))
             return True
+        # the same conditions are repeated across the checks of a profile
+        check_key = (__grains__['hubble_version'], version_str)
+        if check_key not in _VERSION_CHECKS:
+            _VERSION_CHECKS[check_key] = self._check_hubble_version(profile_id, version_str)
+        return _VERSION_CHECKS[check_key]
+
+    def _check_hubble_version(self, profile_id, version_str):
+        """
+        Evaluate a hubble_version condition against the current version of
+        hubble (see _is_hubble_version_compatible)
+        """
+        current_version = version.parse(__grains__['hubble_version'])
         if '*' in version_str:
             log.error("Invalid syntax in version condition. No regex is supported. check_id: %s hubble_version: %s" % (
             profile_id, version_str))
@@ -263,3 +361,92 @@ class Runner(ABC):
                 # Found a true condition. No need to evaluate further for OR conditions
                 return True
         return False
+
+
+def _profile_cache_dir():
+    if not __opts__.get('profile_cache', True) or not __opts__.get('cachedir'):
+        return None
+    return os.path.join(__opts__['cachedir'], 'profiles')
+
+
+def _profile_cache_get(key):
+    """
+    Return the compiled (pickled) profile cached under key, or None
+    """
+    with _PROFILE_CACHE_LOCK:
+        compiled = _PROFILE_CACHE.pop(key, None)
+        if compiled is not None:
+            _PROFILE_CACHE[key] = compiled
+            return compiled
+    cache_dir = _profile_cache_dir()
+    if cache_dir is None:
+        return None
+    path = os.path.join(cache_dir, key + '.p')
+    try:
+        with open(path, 'rb') as file_handle:
+            compiled = file_handle.read()
+    except (IOError, OSError):
+        return None
+    try:
+        # the mtime orders the entries for _profile_cache_prune
+        os.utime(path)
+    except OSError:
+        pass
+    _profile_cache_remember(key, compiled)
+    return compiled
+
+
+def _profile_cache_remember(key, compiled):
+    with _PROFILE_CACHE_LOCK:
+        _PROFILE_CACHE[key] = compiled
+        while len(_PROFILE_CACHE) > PROFILE_CACHE_MAX_ENTRIES:
+            _PROFILE_CACHE.popitem(last=False)
+
+
+def _profile_cache_set(key, compiled):
+    """
+    Cache (and persist) a compiled profile
+    """
+    _profile_cache_remember(key, compiled)
+    cache_dir = _profile_cache_dir()
+    if cache_dir is None:
+        return
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, 0o700)
+        with hubblestack.utils.atomicfile.atomic_open(os.path.join(cache_dir, key + '.p'), 'wb') as file_handle:
+            file_handle.write(compiled)
+    except (IOError, OSError) as exc:
+        log.warning('Unable to write compiled profile cache %s: %s', cache_dir, exc)
+        return
+    _profile_cache_prune(cache_dir)
+
+
+def _profile_cache_prune(cache_dir, max_entries=None):
+    """
+    Remove the least recently used compiled profiles from cache_dir (those of
+    profiles that were edited or removed) beyond PROFILE_CACHE_MAX_ENTRIES
+    """
+    if max_entries is None:
+        max_entries = PROFILE_CACHE_MAX_ENTRIES
+    entries = []
+    try:
+        for name in os.listdir(cache_dir):
+            if not name.endswith('.p'):
+                continue
+            path = os.path.join(cache_dir, name)
+            try:
+                entries.append((os.stat(path).st_mtime, path))
+            except OSError:
+                continue
+    except OSError as exc:
+        log.warning('Unable to list compiled profile cache %s: %s', cache_dir, exc)
+        return
+    if len(entries) <= max_entries:
+        return
+    entries.sort()
+    for _, path in entries[:len(entries) - max_entries]:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
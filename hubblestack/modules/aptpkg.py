@@ -20,6 +20,7 @@ import time
 
 import hubblestack.utils.data
 import hubblestack.utils.pkg
+import hubblestack.utils.pkg.inventory
 import hubblestack.utils.systemd
 import hubblestack.utils.environment
 from hubblestack.exceptions import (
@@ -117,6 +118,8 @@ def list_pkgs(versions_as_list=False,
     removed = hubblestack.utils.data.is_true(removed)
     purge_desired = hubblestack.utils.data.is_true(purge_desired)
 
+    # list the packages again once the package databases changed
+    hubblestack.utils.pkg.inventory.refresh_context(__context__)
     if 'pkg.list_pkgs' in __context__:
         if removed:
             ret = copy.deepcopy(__context__['pkg.list_pkgs']['removed'])
@@ -115,7 +115,8 @@ def run(audit_files=None,
         tags='*',
         labels=None,
         verbose=None,
-        show_compliance=None):
+        show_compliance=None,
+        differential=None):
     """
     :param audit_files:
         Profile to execute. Can have one or more files
@@ -130,6 +131,10 @@ def run(audit_files=None,
         and descriptions.
     :param show_compliance:
         Whether to show compliance with results or not
+    :param differential:
+        Answer the checks whose inputs didn't change since the last run from
+        the stored results instead of executing them again. Defaults to the
+        audit_differential option (False).
     :return:
         Returns dictionary with Success, Skipped, and Failure keys and the
         results of the checks
@@ -139,7 +144,8 @@ def run(audit_files=None,
             return top(verbose=verbose,
                        tags=tags,
                        show_compliance=show_compliance,
-                       labels=labels)
+                       labels=labels,
+                       differential=differential)
 
         audit_runner = runner_factory.get_audit_runner()
 
@@ -175,7 +181,8 @@ def run(audit_files=None,
             ret = audit_runner.execute(audit_file, {
                 'tags': tags,
                 'labels': labels,
-                'verbose': verbose
+                'verbose': verbose,
+                'differential': differential
             })
             combined_dict[audit_file] = ret
 
@@ -263,7 +270,8 @@ def top(topfile='top.audit',
         tags='*',
         verbose=None,
         show_compliance=None,
-        labels=None):
+        labels=None,
+        differential=None):
     """
     Top function that is called from hubble config file
     :param topfile:
@@ -275,6 +283,8 @@ def top(topfile='top.audit',
     :param labels:
         Tests with matching labels are executed. If multiple labels are passed,
         then tests which have all those labels are executed.
+    :param differential:
+        Reuse the results of unchanged checks (see run)
     :return:
     """
     if verbose is None:
@@ -300,7 +310,8 @@ def top(topfile='top.audit',
                   tags=tag,
                   verbose=verbose,
                   show_compliance=False,
-                  labels=labels)
+                  labels=labels,
+                  differential=differential)
 
         # Merge in the results
         for key, val in ret.items():
@@ -20,6 +20,7 @@ import fnmatch
 import base64
 import re
 import tempfile
+import threading
 
 import hubblestack.utils.args
 import hubblestack.utils.data
@@ -28,6 +29,7 @@ import hubblestack.utils.path
 import hubblestack.utils.platform
 import hubblestack.utils.stringutils
 import hubblestack.utils.timed_subprocess
+import hubblestack.status
 import hubblestack.grains.extra
 import hubblestack.utils.user
 import hubblestack.grains.extra
@@ -58,6 +60,12 @@ log = logging.getLogger(__name__)
 
 DEFAULT_SHELL = hubblestack.grains.extra.shell()['shell']
 
+HSS = hubblestack.status.HubbleStatus(__name__, 'memo_hit', 'memo_miss')
+
+# finished commands (TimedProc) by _memo_key(), see the cmd_memoize option
+_MEMO = {}
+_MEMO_LOCK = threading.Lock()
+
 
 # Overwriting the cmd python module makes debugging modules with pdb a bit
 # harder so lets do it this way instead.
@@ -297,6 +305,55 @@ def _is_valid_shell(shell):
     else:
         return False
 
+def _memo_key(cmd, new_kwargs, *extra):
+    '''
+    Return the key under which the result of the command is memoized, or None
+    if it isn't one of the read-only commands listed in the ``cmd_memoize``
+    option (globs matched against the command line)
+    '''
+    try:
+        patterns = __opts__.get('cmd_memoize')
+    except NameError:
+        return None
+    if not patterns or new_kwargs['bg'] or not new_kwargs['with_communicate'] \
+            or new_kwargs['stdout'] != subprocess.PIPE or new_kwargs['stderr'] != subprocess.PIPE:
+        return None
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    cmd_line = cmd if isinstance(cmd, str) else ' '.join(str(arg) for arg in cmd)
+    if not any(fnmatch.fnmatch(cmd_line, pattern) for pattern in patterns):
+        return None
+    return (cmd if isinstance(cmd, str) else tuple(str(arg) for arg in cmd),
+            new_kwargs['shell'], new_kwargs['cwd'], new_kwargs['stdin'],
+            tuple(sorted((str(key), str(val)) for key, val in new_kwargs['env'].items())),
+            extra)
+
+
+def _memoized(key):
+    '''
+    Return the memoized TimedProc for ``key``, if it hasn't expired
+    '''
+    with _MEMO_LOCK:
+        entry = _MEMO.get(key)
+        if entry is not None and entry[0] > time.time():
+            HSS.mark('memo_hit')
+            return entry[1]
+    HSS.mark('memo_miss')
+    return None
+
+
+def _memoize(key, proc):
+    '''
+    Remember the finished TimedProc ``proc`` for ``cmd_memoize_ttl`` seconds
+    '''
+    ttl = __opts__.get('cmd_memoize_ttl', 60)
+    now = time.time()
+    with _MEMO_LOCK:
+        for old_key in [old_key for old_key, entry in _MEMO.items() if entry[0] <= now]:
+            del _MEMO[old_key]
+        _MEMO[key] = (now + ttl, proc)
+
+
 def _check_loglevel(level='info'):
     '''
     Retrieve the level code for use in logging.Logger.log().
@@ -759,39 +816,46 @@ def _run(cmd,
                 'success_retcodes must be a list of integers'
             )
 
-    # This is where the magic happens
-    try:
-        proc = hubblestack.utils.timed_subprocess.TimedProc(cmd, **new_kwargs)
-    except (OSError, IOError) as exc:
-        msg = (
-            'Unable to run command \'{0}\' with the context \'{1}\', '
-            'reason: '.format(
-                cmd if output_loglevel is not None else 'REDACTED',
-                new_kwargs
-            )
-        )
+    memo_key = _memo_key(cmd, new_kwargs, runas, group, umask)
+    proc = _memoized(memo_key) if memo_key is not None else None
+    if proc is not None:
+        log.debug('Using the memoized result of command %s', cmd)
+    else:
+        # This is where the magic happens
         try:
-            if exc.filename is None:
-                msg += 'command not found'
-            else:
-                msg += '{0}: {1}'.format(exc, exc.filename)
-        except AttributeError:
-            # Both IOError and OSError have the filename attribute, so this
-            # is a precaution in case the exception classes in the previous
-            # try/except are changed.
-            msg += 'unknown'
-        raise CommandExecutionError(msg)
+            proc = hubblestack.utils.timed_subprocess.TimedProc(cmd, **new_kwargs)
+        except (OSError, IOError) as exc:
+            msg = (
+                'Unable to run command \'{0}\' with the context \'{1}\', '
+                'reason: '.format(
+                    cmd if output_loglevel is not None else 'REDACTED',
+                    new_kwargs
+                )
+            )
+            try:
+                if exc.filename is None:
+                    msg += 'command not found'
+                else:
+                    msg += '{0}: {1}'.format(exc, exc.filename)
+            except AttributeError:
+                # Both IOError and OSError have the filename attribute, so this
+                # is a precaution in case the exception classes in the previous
+                # try/except are changed.
+                msg += 'unknown'
+            raise CommandExecutionError(msg)
 
-    try:
-        proc.run()
-    except TimedProcTimeoutError as exc:
-        ret['stdout'] = str(exc)
-        ret['stderr'] = ''
-        ret['retcode'] = None
-        ret['pid'] = proc.process.pid
-        # ok return code for timeouts?
-        ret['retcode'] = 1
-        return ret
+        try:
+            proc.run()
+        except TimedProcTimeoutError as exc:
+            ret['stdout'] = str(exc)
+            ret['stderr'] = ''
+            ret['retcode'] = None
+            ret['pid'] = proc.process.pid
+            # ok return code for timeouts?
+            ret['retcode'] = 1
+            return ret
+        if memo_key is not None:
+            _memoize(memo_key, proc)
 
     if output_loglevel != 'quiet' and output_encoding is not None:
         log.debug('Decoding output from command %s using %s encoding',
@@ -15,6 +15,7 @@ import time
 from collections import namedtuple
 
 # Import hubble libs
+import hubblestack.utils.accounts
 import hubblestack.utils.files
 import hubblestack.utils.hashutils
 import hubblestack.utils.path
@@ -965,8 +966,10 @@ def stats(path, hash_type=None, follow_symlinks=True):
     ret["inode"] = pstat.st_ino
     ret["uid"] = pstat.st_uid
     ret["gid"] = pstat.st_gid
-    ret["group"] = gid_to_group(pstat.st_gid)
-    ret["user"] = uid_to_user(pstat.st_uid)
+    # the account databases are parsed once, instead of a getpwuid() and
+    # getgrgid() (each reading the files again) per file
+    ret["group"] = hubblestack.utils.accounts.gid_to_name(pstat.st_gid) or gid_to_group(pstat.st_gid)
+    ret["user"] = hubblestack.utils.accounts.uid_to_name(pstat.st_uid) or uid_to_user(pstat.st_uid)
     ret["atime"] = pstat.st_atime
     ret["mtime"] = pstat.st_mtime
     ret["ctime"] = pstat.st_ctime
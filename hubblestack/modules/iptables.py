@@ -24,7 +24,14 @@ master config. The configuration is read using :py:func:`config.get
         - "-A POSTROUTING"
         - "-A CATTLE_POSTROUTING"
         - "-A FORWARD"
+
+The rules in effect can be listed, for all tables and both families at once,
+with :py:func:`iptables.inventory <hubblestack.modules.iptables.inventory>`;
+the snapshot it takes (which includes the nftables ruleset when ``nft`` is
+installed) is kept for ``INVENTORY_TTL`` seconds and is also what
+``get_rules`` and ``get_policy`` parse.
 """
+import copy
 import logging
 
 # Import python libs
@@ -32,16 +39,21 @@ import os
 import re
 import string
 import sys
+import time
 import uuid
 
 # Import hubble libs
 import hubblestack.utils.args
 import hubblestack.utils.files
+import hubblestack.utils.netfilter
 import hubblestack.utils.path
 from hubblestack.exceptions import HubbleException
 
 log = logging.getLogger(__name__)
 
+# how long the inventory snapshot is reused, about one run
+INVENTORY_TTL = 60
+
 # These are keywords passed to state module functions which are to be used
 # by hubble in this state module and not on the actual state module function
 STATE_REQUISITE_KEYWORDS = frozenset(
@@ -679,6 +691,67 @@ def get_rules(family="ipv4"):
     return _parse_conf(in_mem=True, family=family)
 
 
+def _snapshot(refresh=False):
+    """
+    Take (or reuse) the snapshot of the rules in effect: the output of
+    iptables-save and ip6tables-save, and of ``nft -j list ruleset``
+    """
+    cached = __context__.get("iptables.snapshot")
+    now = time.time()
+    if cached and not refresh and cached["expires"] > now:
+        return cached
+    saves = {}
+    for family in ("ipv4", "ipv6"):
+        cmd = _iptables_cmd(family)
+        if not cmd:
+            continue
+        out = __mods__["cmd.run_all"](
+            ["{0}-save".format(cmd)], python_shell=False, output_loglevel="quiet", ignore_retcode=True
+        )
+        if out["retcode"] == 0:
+            saves[family] = out["stdout"]
+    nft = None
+    nft_cmd = hubblestack.utils.path.which("nft")
+    if nft_cmd:
+        out = __mods__["cmd.run_all"](
+            [nft_cmd, "-j", "list", "ruleset"], python_shell=False, output_loglevel="quiet", ignore_retcode=True
+        )
+        if out["retcode"] == 0:
+            nft = out["stdout"]
+    snapshot = {
+        "expires": now + INVENTORY_TTL,
+        "saves": saves,
+        "ruleset": hubblestack.utils.netfilter.snapshot(saves, nft),
+        "parsed": {},
+    }
+    __context__["iptables.snapshot"] = snapshot
+    return snapshot
+
+
+def _clear_snapshot():
+    """
+    Forget the snapshot of the rules, after changing them
+    """
+    __context__.pop("iptables.snapshot", None)
+
+
+def inventory(refresh=False):
+    """
+    Return the rules in effect, all tables of both families and the nftables
+    ruleset, as a :py:class:`Ruleset <hubblestack.utils.netfilter.Ruleset>`
+    of normalized rules that can be queried with ``select()`` and
+    ``policy()``. One snapshot is taken and reused for INVENTORY_TTL seconds
+    unless ``refresh`` is True.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' iptables.inventory
+    """
+    return _snapshot(refresh)["ruleset"]
+
+
 def get_saved_policy(table="filter", chain=None, conf_file=None, family="ipv4"):
     """
     Return the current policy for the specified table/chain
@@ -752,6 +825,7 @@ def set_policy(table="filter", chain=None, policy=None, family="ipv4"):
     cmd = "{0} {1} -t {2} -P {3} {4}".format(
         _iptables_cmd(family), wait, table, chain, policy
     )
+    _clear_snapshot()
     out = __mods__["cmd.run"](cmd)
     return out
 
@@ -896,6 +970,7 @@ def new_chain(table="filter", chain=None, family="ipv4"):
 
     wait = "--wait" if _has_option("--wait", family) else ""
     cmd = "{0} {1} -t {2} -N {3}".format(_iptables_cmd(family), wait, table, chain)
+    _clear_snapshot()
     out = __mods__["cmd.run"](cmd)
 
     if not out:
@@ -924,6 +999,7 @@ def delete_chain(table="filter", chain=None, family="ipv4"):
 
     wait = "--wait" if _has_option("--wait", family) else ""
     cmd = "{0} {1} -t {2} -X {3}".format(_iptables_cmd(family), wait, table, chain)
+    _clear_snapshot()
     out = __mods__["cmd.run"](cmd)
 
     if not out:
@@ -964,6 +1040,7 @@ def append(table="filter", chain=None, rule=None, family="ipv4"):
     cmd = "{0} {1} -t {2} -A {3} {4}".format(
         _iptables_cmd(family), wait, table, chain, rule
     )
+    _clear_snapshot()
     out = __mods__["cmd.run"](cmd)
     return not out
 
@@ -1015,6 +1092,7 @@ def insert(table="filter", chain=None, position=None, rule=None, family="ipv4"):
     cmd = "{0} {1} -t {2} -I {3} {4} {5}".format(
         _iptables_cmd(family), wait, table, chain, position, rule
     )
+    _clear_snapshot()
     out = __mods__["cmd.run"](cmd)
     return out
 
@@ -1054,6 +1132,7 @@ def delete(table, chain=None, position=None, rule=None, family="ipv4"):
     cmd = "{0} {1} -t {2} -D {3} {4}".format(
         _iptables_cmd(family), wait, table, chain, rule
     )
+    _clear_snapshot()
     out = __mods__["cmd.run"](cmd)
     return out
 
@@ -1075,6 +1154,7 @@ def flush(table="filter", chain="", family="ipv4"):
 
     wait = "--wait" if _has_option("--wait", family) else ""
     cmd = "{0} {1} -t {2} -F {3}".format(_iptables_cmd(family), wait, table, chain)
+    _clear_snapshot()
     out = __mods__["cmd.run"](cmd)
     return out
 
@@ -1092,8 +1172,13 @@ def _parse_conf(conf_file=None, in_mem=False, family="ipv4"):
         with hubblestack.utils.files.fopen(conf_file, "r") as ifile:
             rules = ifile.read()
     elif in_mem:
-        cmd = "{0}-save".format(_iptables_cmd(family))
-        rules = __mods__["cmd.run"](cmd)
+        snapshot = _snapshot()
+        if family not in snapshot["saves"]:
+            cmd = "{0}-save".format(_iptables_cmd(family))
+            snapshot["saves"][family] = __mods__["cmd.run"](cmd)
+        rules = snapshot["saves"][family]
+        if family in snapshot["parsed"]:
+            return copy.deepcopy(snapshot["parsed"][family])
     else:
         raise HubbleException("A file was not found to parse")
 
@@ -1149,6 +1234,8 @@ def _parse_conf(conf_file=None, in_mem=False, family="ipv4"):
                 comment = parsed_args["comment"][0].strip('"')
                 ret[table][chain[0]]["rules_comment"][comment] = ret_args
             ret[table][chain[0]]["rules"].append(ret_args)
+    if in_mem and not conf_file:
+        snapshot["parsed"][family] = copy.deepcopy(ret)
     return ret
 
 
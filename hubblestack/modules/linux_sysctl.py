@@ -7,18 +7,23 @@ Module for viewing and modifying sysctl parameters
 import logging
 import os
 import re
+import time
 
 import hubblestack.utils.systemd
 from hubblestack.exceptions import CommandExecutionError
 import hubblestack.utils.data
 import hubblestack.utils.files
 import hubblestack.utils.stringutils
+import hubblestack.utils.sysctl
 
 log = logging.getLogger(__name__)
 
 # Define the module's virtual name
 __virtualname__ = "sysctl"
 
+# how long values() reuses what it read, about one run
+VALUES_TTL = 60
+
 # TODO: Add unpersist() to remove either a sysctl or sysctl/value combo from
 # the config
 
@@ -107,6 +112,39 @@ def get(name):
     return out
 
 
+def values(names, refresh=False):
+    """
+    Return the values of many sysctl parameters at once: a dict mapping each
+    name to its value (None if there is no such parameter) and each pattern
+    (``net.ipv4.conf.*.rp_filter``) to a dict of the parameters it matches.
+
+    The values are read from /proc/sys rather than with a ``sysctl`` per
+    parameter (which is only used when /proc/sys isn't mounted), and reused
+    for VALUES_TTL seconds unless ``refresh`` is True.
+    CLI Example:
+    .. code-block:: bash
+        salt '*' sysctl.values '["net.ipv4.ip_forward", "net.ipv4.conf.*.rp_filter"]'
+    """
+    cache = __context__.setdefault("sysctl.values", {})
+    now = time.time()
+    if refresh:
+        cache.clear()
+    todo = [name for name in names if name not in cache or cache[name][0] < now]
+    if todo:
+        if hubblestack.utils.sysctl.available():
+            snapshot = hubblestack.utils.sysctl.snapshot(todo)
+        else:
+            snapshot = {}
+            for name in todo:
+                value = None if hubblestack.utils.sysctl.is_glob(name) else get(name)
+                if not value or "No such file or directory" in value or value.lower().startswith("error"):
+                    value = None
+                snapshot[name] = value
+        for name in todo:
+            cache[name] = (now + VALUES_TTL, snapshot[name])
+    return dict((name, cache[name][1]) for name in names)
+
+
 def assign(name, value):
     """
     Assign a single sysctl parameter for this minion
@@ -48,48 +48,48 @@ def _list_mounts():
     return ret
 
 
-def _active_mountinfo(ret):
-    _list = _list_mounts()
-    filename = "/proc/self/mountinfo"
-    if not os.access(filename, os.R_OK):
+def _mount_table():
+    """
+    The parsed /proc/self/mountinfo, cached until the mount table changes
+    """
+    try:
+        return hubblestack.utils.mount.mounts()
+    except (IOError, OSError):
         msg = "File not readable {0}"
-        raise CommandExecutionError(msg.format(filename))
+        raise CommandExecutionError(msg.format(hubblestack.utils.mount.MOUNTINFO))
+
+
+def _active_mountinfo(ret):
+    table = _mount_table()
 
     if "disk.blkid" not in __context__:
         __context__["disk.blkid"] = __mods__["disk.blkid"]()
     blkid_info = __context__["disk.blkid"]
 
-    with hubblestack.utils.files.fopen(filename) as ifile:
-        for line in ifile:
-            comps = hubblestack.utils.stringutils.to_unicode(line).split()
-            device = comps[2].split(":")
-            # each line can have any number of
-            # optional parameters, we use the
-            # location of the separator field to
-            # determine the location of the elements
-            # after it.
-            _sep = comps.index("-")
-            device_name = comps[_sep + 2]
-            device_uuid = None
-            device_label = None
-            if device_name:
-                device_uuid = blkid_info.get(device_name, {}).get("UUID")
-                device_uuid = device_uuid and device_uuid.lower()
-                device_label = blkid_info.get(device_name, {}).get("LABEL")
-            ret[comps[4]] = {
-                "mountid": comps[0],
-                "parentid": comps[1],
-                "major": device[0],
-                "minor": device[1],
-                "root": comps[3],
-                "opts": _resolve_user_group_names(comps[5].split(",")),
-                "fstype": comps[_sep + 1],
-                "device": device_name.replace("\\040", "\\ "),
-                "alt_device": _list.get(comps[4], None),
-                "superopts": _resolve_user_group_names(comps[_sep + 3].split(",")),
-                "device_uuid": device_uuid,
-                "device_label": device_label,
-            }
+    for entry in table:
+        device_name = entry["device"]
+        device_uuid = None
+        device_label = None
+        if device_name:
+            device_uuid = blkid_info.get(device_name, {}).get("UUID")
+            device_uuid = device_uuid and device_uuid.lower()
+            device_label = blkid_info.get(device_name, {}).get("LABEL")
+        ret[entry["mountpoint"]] = {
+            "mountid": entry["mountid"],
+            "parentid": entry["parentid"],
+            "major": entry["major"],
+            "minor": entry["minor"],
+            "root": entry["root"],
+            "opts": _resolve_user_group_names(list(entry["opts"])),
+            "propagation": list(entry["propagation"]),
+            "fstype": entry["fstype"],
+            "device": device_name,
+            # the source mount(8) shows, it reads mountinfo as well
+            "alt_device": device_name,
+            "superopts": _resolve_user_group_names(list(entry["superopts"])),
+            "device_uuid": device_uuid,
+            "device_label": device_label,
+        }
     return ret
 
 
@@ -97,6 +97,29 @@ def _active_mounts(ret):
     """
     List active mounts on Linux systems
     """
+    try:
+        table = _mount_table()
+    except CommandExecutionError:
+        return _active_proc_mounts(ret)
+
+    for entry in table:
+        # the options of /proc/self/mounts: the per-mount ones and
+        # the super block ones after its leading rw/ro
+        opts = list(entry["opts"])
+        opts.extend(opt for opt in entry["superopts"][1:] if opt not in opts)
+        ret[entry["mountpoint"]] = {
+            "device": entry["device"],
+            "alt_device": entry["device"],
+            "fstype": entry["fstype"],
+            "opts": _resolve_user_group_names(opts),
+        }
+    return ret
+
+
+def _active_proc_mounts(ret):
+    """
+    List active mounts on Linux systems without mountinfo
+    """
     _list = _list_mounts()
     filename = "/proc/self/mounts"
     if not os.access(filename, os.R_OK):
@@ -254,6 +277,9 @@ def active(extended=False):
     """
     List the active mounts.
 
+    On Linux, the mount table is parsed from /proc/self/mountinfo once and
+    parsed again only after it changed, so repeated calls are cheap.
+
     CLI Example:
 
     .. code-block:: bash
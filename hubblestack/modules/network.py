@@ -10,13 +10,12 @@ import logging
 import os
 import re
 import socket
-import time
-from multiprocessing.pool import ThreadPool
 from inspect import getfullargspec
 
 # Import hubble libs
 import hubblestack.utils.decorators.path
 import hubblestack.utils.network
+import hubblestack.utils.rdns
 import hubblestack.utils.validate.net
 from hubblestack.utils._compat import ipaddress
 from hubblestack.exceptions import CommandExecutionError
@@ -846,6 +845,8 @@ def netstat():
         salt '*' network.netstat
     """
     if __grains__["kernel"] == "Linux":
+        if os.access("/proc/net/tcp", os.R_OK):
+            return hubblestack.utils.network.proc_netstat()
         if not __utils__["path.which"]("netstat"):
             return _ss_linux()
         return _netstat_linux()
@@ -873,7 +874,7 @@ def active_tcp():
         salt '*' network.active_tcp
     """
     if __grains__["kernel"] == "Linux":
-        return __utils__["network.active_tcp"]()
+        return hubblestack.utils.network.active_tcp()
     elif __grains__["kernel"] == "SunOS":
         # lets use netstat to mimic linux as close as possible
         ret = {}
@@ -2049,30 +2050,14 @@ def fqdns():
     """
     Return all known FQDNs for the system by enumerating all interfaces and
     then trying to reverse resolve them (excluding 'lo' interface).
+
+    The addresses are resolved concurrently, within the ``fqdns_timeout`` and
+    ``fqdns_deadline`` limits, and their names reused for ``fqdns_ttl``
+    seconds (``fqdns_negative_ttl`` for the addresses without a name).
     """
     # Provides:
     # fqdns
 
-    # Possible value for h_errno defined in netdb.h
-    HOST_NOT_FOUND = 1
-    NO_DATA = 4
-
-    fqdns = set()
-
-    def _lookup_fqdn(ip):
-        try:
-            return [socket.getfqdn(socket.gethostbyaddr(ip)[0])]
-        except socket.herror as err:
-            if err.errno in (0, HOST_NOT_FOUND, NO_DATA):
-                # No FQDN for this IP address, so we don't need to know this all the time.
-                log.debug("Unable to resolve address %s: %s", ip, err)
-            else:
-                log.error(err_message, err)
-        except (socket.error, socket.gaierror, socket.timeout) as err:
-            log.error(err_message, err)
-
-    start = time.time()
-
     addresses = hubblestack.utils.network.ip_addrs(
         include_loopback=False, interface_data=hubblestack.utils.network.interfaces()
     )
@@ -2081,26 +2066,6 @@ def fqdns():
             include_loopback=False, interface_data=hubblestack.utils.network.interfaces()
         )
     )
-    err_message = "Exception during resolving address: %s"
-
-    # Create a ThreadPool to process the underlying calls to 'socket.gethostbyaddr' in parallel.
-    # This avoid blocking the execution when the "fqdn" is not defined for certains IP addresses, which was causing
-    # that "socket.timeout" was reached multiple times secuencially, blocking execution for several seconds.
-
-    results = []
-    try:
-        pool = ThreadPool(8)
-        results = pool.map(_lookup_fqdn, addresses)
-        pool.close()
-        pool.join()
-    except Exception as exc:  # pylint: disable=broad-except
-        log.error("Exception while creating a ThreadPool for resolving FQDNs: %s", exc)
-
-    for item in results:
-        if item:
-            fqdns.update(item)
-
-    elapsed = time.time() - start
-    log.debug("Elapsed time getting FQDNs: %d seconds", elapsed)
+    resolved = hubblestack.utils.rdns.resolve(addresses, **hubblestack.utils.rdns.resolve_args(__opts__))
 
-    return {"fqdns": sorted(list(fqdns))}
+    return {"fqdns": sorted(set(name for names in resolved.values() for name in names))}
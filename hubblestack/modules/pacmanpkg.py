@@ -20,6 +20,7 @@ import os.path
 import hubblestack.utils.data
 import hubblestack.utils.itertools
 import hubblestack.utils.pkg
+import hubblestack.utils.pkg.inventory
 from hubblestack.exceptions import CommandExecutionError
 
 log = logging.getLogger(__name__)
@@ -48,6 +49,8 @@ def list_pkgs(versions_as_list=False, **kwargs):
             for x in ('removed', 'purge_desired')]):
         return {}
 
+    # list the packages again once the package databases changed
+    hubblestack.utils.pkg.inventory.refresh_context(__context__)
     if 'pkg.list_pkgs' in __context__:
         if versions_as_list:
             return __context__['pkg.list_pkgs']
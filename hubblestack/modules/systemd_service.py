@@ -18,6 +18,7 @@ import os
 import fnmatch
 import re
 import shlex
+import time
 
 # Import Salt libs
 import hubblestack.utils.files
@@ -38,6 +39,12 @@ LOCAL_CONFIG_PATH = '/etc/systemd/system'
 INITSCRIPT_PATH = '/etc/init.d'
 VALID_UNIT_TYPES = ('service', 'socket', 'device', 'mount', 'automount',
                     'swap', 'target', 'path', 'timer')
+# unit file states for which "systemctl is-enabled" succeeds
+ENABLED_STATES = ('enabled', 'enabled-runtime', 'static', 'alias', 'indirect', 'transient')
+# how long (in seconds) states() reuses the state of a unit, about one run
+STATES_TTL = 60
+# units per "systemctl show" invocation
+STATES_BATCH = 200
 
 # Define the module's virtual name
 __virtualname__ = 'service'
@@ -164,6 +171,89 @@ def get_all():
     ret.update(set(_get_sysv_services(systemd_services=ret)))
     return sorted(ret)
 
+def states(names=None, refresh=False):
+    '''
+    Return the state of many services at once: a dict mapping each service
+    name to a dict with ``available``, ``running`` and ``enabled`` (the same
+    as ``service.available``, ``service.status`` and ``service.enabled``)
+
+    The units are queried with one ``systemctl show`` per STATES_BATCH of
+    them, rather than two or three ``systemctl`` invocations per service, and
+    the result is reused for STATES_TTL seconds unless ``refresh`` is True.
+
+    names
+        List of service names (no globs), defaults to all the services
+        (``service.get_all``)
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' service.states
+    '''
+    if names is None:
+        names = get_all()
+    cache = __context__.setdefault('systemd.states', {})
+    now = time.time()
+    if refresh:
+        cache.clear()
+    todo = [name for name in names if name not in cache or cache[name][0] < now]
+    for idx in range(0, len(todo), STATES_BATCH):
+        shown = _show_units(todo[idx:idx + STATES_BATCH])
+        if any(unit.get('NeedDaemonReload') == 'yes' for unit in shown.values()):
+            systemctl_reload()
+            __context__['systemd.states'] = cache
+            shown = _show_units(todo[idx:idx + STATES_BATCH])
+        for name in todo[idx:idx + STATES_BATCH]:
+            cache[name] = (now + STATES_TTL, _unit_state(name, shown.get(name)))
+    return dict((name, cache[name][1]) for name in names)
+
+def _show_units(names):
+    '''
+    Return the properties of the named units we need for states(), from a
+    single "systemctl show", or an empty dict if its output can't be used
+    '''
+    out = __mods__['cmd.run_all'](
+        _systemctl_cmd(['show', '--property=Id,LoadState,ActiveState,UnitFileState,NeedDaemonReload', '--'])
+        + [_canonical_unit_name(name) for name in names],
+        python_shell=False,
+        ignore_retcode=True,
+        output_loglevel='quiet'
+    )
+    if out['retcode'] != 0:
+        return {}
+    # one block of properties per unit, in the order they were given
+    blocks = [block for block in re.split(r'\n\s*\n', out['stdout'].strip()) if block.strip()]
+    if len(blocks) != len(names):
+        return {}
+    ret = {}
+    for name, block in zip(names, blocks):
+        props = dict(line.split('=', 1) for line in block.splitlines() if '=' in line)
+        if 'Id' not in props:
+            return {}
+        ret[name] = props
+    return ret
+
+def _unit_state(name, props):
+    '''
+    The states() entry for a service, falling back to the per-service
+    functions for whatever "systemctl show" can't tell
+    '''
+    if props is None:
+        running = status(name)
+        return {'available': available(name), 'running': running, 'enabled': enabled(name)}
+    file_state = props.get('UnitFileState', '')
+    if file_state in ENABLED_STATES:
+        is_enabled = True
+    elif file_state and file_state not in ('generated', 'bad') and '@' not in name:
+        is_enabled = False
+    else:
+        # sysvinit scripts and template instances, see enabled()
+        is_enabled = enabled(name)
+    return {'available': props.get('LoadState') != 'not-found',
+            'running': props.get('ActiveState') in ('active', 'reloading'),
+            'enabled': is_enabled}
+
 def _get_systemd_services():
     '''
     Use os.listdir() to get all the unit files
@@ -362,7 +452,7 @@ def _clear_context():
     # raise a RuntimeError.
     for key in list(__context__):
         try:
-            if key.startswith('systemd._systemctl_status.'):
+            if key.startswith('systemd._systemctl_status.') or key == 'systemd.states':
                 __context__.pop(key)
         except AttributeError:
             continue
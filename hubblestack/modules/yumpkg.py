@@ -26,6 +26,7 @@ except ImportError:
 import hubblestack.utils.args
 import hubblestack.utils.data
 import hubblestack.utils.pkg
+import hubblestack.utils.pkg.inventory
 import hubblestack.utils.pkg.rpm
 import hubblestack.utils.systemd
 import hubblestack.utils.environment
@@ -93,6 +94,8 @@ def list_pkgs(versions_as_list=False, **kwargs):
 
     contextkey = 'pkg.list_pkgs'
 
+    # list the packages again once the package databases changed
+    hubblestack.utils.pkg.inventory.refresh_context(__context__)
     if contextkey not in __context__:
         ret = {}
         cmd = ['rpm', '-qa', '--queryformat',
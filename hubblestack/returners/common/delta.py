@@ -0,0 +1,188 @@
+# -*- encoding: utf-8 -*-
+"""
+Delta reporting for the compliance returners.
+
+With ``delta: true`` in a returner's config, only what changed since the
+previous run is sent instead of the complete result set of every run: new
+checks, checks changing status (new failures, fixed checks) or result, and
+checks no longer reported. Every ``delta_full_snapshot`` seconds (default
+one day) everything is sent again, and each run sends a digest event with a
+hash of the complete result set so the indexer side can detect drift.
+
+The previous result set is kept in ``<cachedir>/returner_delta``, per
+returner, destination and scheduled function (with its arguments, i.e. the
+profiles run).
+
+.. code-block:: yaml
+
+    hubblestack:
+      returner:
+        splunk:
+          - token: XXXXXXXX-XXXX-XXXX-XXXX-XXXXXXXXXXXX
+            indexer: splunk-indexer.domain.tld
+            index: hubble
+            delta: true
+            delta_full_snapshot: 86400
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+
+import hubblestack.utils.atomicfile
+
+log = logging.getLogger(__name__)
+
+# bump when the stored state changes
+STATE_VERSION = 1
+DEFAULT_FULL_SNAPSHOT = 86400
+
+ADDED = 'added'
+NEW_FAILURE = 'new_failure'
+FIXED = 'fixed'
+CHANGED = 'changed'
+REMOVED = 'removed'
+SNAPSHOT = 'snapshot'
+
+
+def _digest(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def state_key(returner, opts, ret):
+    """
+    The key of the state of a returner sending the results of a job (ret)
+    to a destination (opts)
+    """
+    return _digest([returner, opts.get('indexer'), opts.get('index'), opts.get('sourcetype'),
+                    ret.get('fun'), ret.get('fun_args')])
+
+
+def compliance_rows(data):
+    """
+    The (check_id, status, check) rows of the Failure and Success checks of
+    an audit or nova result. A tag reported more than once gets a ``#n``
+    suffix from its second occurrence on.
+    """
+    rows = []
+    seen = {}
+    for status in ('Failure', 'Success'):
+        for check in data.get(status, []):
+            check_id = list(check.keys())[0]
+            count = seen.get(check_id, 0)
+            seen[check_id] = count + 1
+            rows.append((check_id if not count else '{0}#{1}'.format(check_id, count), status, check))
+    return rows
+
+
+class ResultDelta(object):
+    """
+    The results sent by the previous run of a returner
+    """
+
+    def __init__(self, cachedir, key, full_snapshot=DEFAULT_FULL_SNAPSHOT):
+        self.path = os.path.join(cachedir, 'returner_delta', key + '.json') if cachedir else None
+        self.digest = None
+        self._results = {}
+        self._snapshot = 0
+        data = None
+        if self.path:
+            try:
+                with open(self.path, 'r') as file_handle:
+                    data = json.load(file_handle)
+            except (IOError, OSError):
+                pass
+            except ValueError:
+                log.warning('Ignoring unreadable returner state %s', self.path)
+        if isinstance(data, dict) and data.get('version') == STATE_VERSION:
+            self._results = data.get('results', {})
+            self._snapshot = data.get('snapshot', 0)
+        now = time.time()
+        self.full = not full_snapshot or now - self._snapshot >= full_snapshot or self._snapshot > now
+        if self.full:
+            self._snapshot = now
+
+    def changes(self, rows):
+        """
+        Return the rows to send, as (check_id, status, check, change) tuples,
+        and remember rows as the new result set. Checks that are no longer
+        reported are returned with their previous status, check None and
+        change REMOVED.
+        """
+        results = {}
+        ret = []
+        for check_id, status, check in rows:
+            digest = _digest([status, check])
+            results[check_id] = [status, digest]
+            previous = self._results.get(check_id)
+            if self.full:
+                change = SNAPSHOT
+            elif previous is None:
+                change = ADDED
+            elif previous[0] != status:
+                change = NEW_FAILURE if status == 'Failure' else FIXED
+            elif previous[1] != digest:
+                change = CHANGED
+            else:
+                continue
+            ret.append((check_id, status, check, change))
+        for check_id, previous in self._results.items():
+            if check_id not in results:
+                ret.append((check_id, previous[0], None, REMOVED))
+        self._results = results
+        self.digest = _digest(sorted(results.items()))
+        return ret
+
+    @property
+    def count(self):
+        """
+        Number of checks in the current result set
+        """
+        return len(self._results)
+
+    def save(self):
+        """
+        Persist the current result set (call it once the changes were sent)
+        """
+        if not self.path:
+            return
+        try:
+            dirname = os.path.dirname(self.path)
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname, 0o700)
+            with hubblestack.utils.atomicfile.atomic_open(self.path, 'w') as file_handle:
+                json.dump({'version': STATE_VERSION, 'snapshot': self._snapshot,
+                           'results': self._results}, file_handle)
+        except (IOError, OSError) as exc:
+            log.warning('Unable to write returner state %s: %s', self.path, exc)
+
+
+def publish_delta(args, data, tracker, cloud_details, opts, generate_event, publish_event):
+    """
+    Publish the checks of an audit or nova result (data) that changed since
+    the previous run (all of them for a full snapshot), then a digest event of
+    the complete result set. generate_event and publish_event are the event
+    helpers of the returner (its _generate_event and _publish_event).
+    """
+    changes = tracker.changes(compliance_rows(data))
+    for check_id, check_result, check, change in changes:
+        if check is None:
+            # no longer reported, with its last status
+            check = {check_id: ''}
+        else:
+            check_id = list(check.keys())[0]
+        args['check_result'] = check_result
+        args['check_id'] = check_id
+        event = generate_event(data=check, args=args, cloud_details=cloud_details,
+                               custom_fields=opts['custom_fields'], check_type=check_result)
+        event['delta_change'] = change
+        publish_event(fqdn=args['fqdn'], opts=opts, event=event, hec=args['hec'])
+
+    args['digest'] = {'delta_digest': tracker.digest,
+                      'delta_checks': tracker.count,
+                      'delta_changes': len(changes),
+                      'delta_full_snapshot': tracker.full}
+    event = generate_event(args=args, cloud_details=cloud_details,
+                           custom_fields=opts['custom_fields'], check_type='digest')
+    publish_event(fqdn=args['fqdn'], opts=opts, event=event, hec=args['hec'])
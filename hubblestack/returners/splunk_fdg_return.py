@@ -41,12 +41,17 @@ gateway is not defined.
             custom_fields:
               - site
               - product_group
+
+With ``delta: true``, only the results that changed since the previous run
+are sent (with a ``delta_change`` field), and all of them every
+``delta_full_snapshot`` seconds. See hubblestack.returners.common.delta.
 """
 import socket
 import re
 import json
 import logging
 from hubblestack.hec import http_event_collector, get_splunk_options, make_hec_args
+import hubblestack.returners.common.delta as delta
 
 
 _MAX_CONTENT_BYTES = 100000
@@ -76,6 +81,8 @@ def returner(ret):
     try:
         opts_list = get_splunk_options(sourcetype='hubble_fdg',
                                        add_query_to_sourcetype=True,
+                                       delta=False,
+                                       delta_full_snapshot=delta.DEFAULT_FULL_SNAPSHOT,
                                        _nick={'sourcetype_fdg': 'sourcetype'})
 
         for opts in opts_list:
@@ -92,24 +99,63 @@ def returner(ret):
             args, kwargs = make_hec_args(opts)
             hec = http_event_collector(*args, **kwargs)
 
+            tracker = None
+            if opts['delta']:
+                tracker = delta.ResultDelta(__opts__.get('cachedir'),
+                                            delta.state_key('splunk_fdg_return', opts, ret),
+                                            opts['delta_full_snapshot'])
+                changed = dict((row_id, change) for row_id, _, _, change
+                               in tracker.changes(_fdg_rows(data)))
+
             for fdg_info, fdg_results in data.items():
 
                 if not isinstance(fdg_results, list):
                     fdg_results = [fdg_results]
-                for fdg_result in fdg_results:
+                for idx, fdg_result in enumerate(fdg_results):
+                    change = None
+                    if tracker is not None:
+                        # unchanged results (and removed ones) aren't sent
+                        change = changed.get(_fdg_row_id(fdg_info, idx))
+                        if change in (None, delta.REMOVED):
+                            continue
                     payload = _generate_payload(args=host_args, opts=opts,
                                                 index_extracted_fields=index_extracted_fields,
                                                 fdg_args={'fdg_info': fdg_info,
                                                           'fdg_result': fdg_result},
                                                 cloud_details=cloud_details)
+                    if change is not None:
+                        payload['event']['delta_change'] = change
                     hec.batchEvent(payload)
 
             hec.flushBatch()
+            if tracker is not None:
+                tracker.save()
     except Exception:
         log.exception('Error ocurred in splunk_fdg_return')
     return
 
 
+def _fdg_row_id(fdg_info, idx):
+    """
+    Identifier of a result for the delta mode
+    """
+    return json.dumps([fdg_info, idx], default=str)
+
+
+def _fdg_rows(data):
+    """
+    The (id, status, result) rows of the results for the delta mode
+    """
+    rows = []
+    for fdg_info, fdg_results in data.items():
+        if not isinstance(fdg_results, list):
+            fdg_results = [fdg_results]
+        for idx, fdg_result in enumerate(fdg_results):
+            status = 'Success' if fdg_result[1] else 'Failure'
+            rows.append((_fdg_row_id(fdg_info, idx), status, fdg_result))
+    return rows
+
+
 def _generate_event(fdg_args, args, starting_chained, cloud_details, custom_fields):
     """
     Helper function that builds and returns the event dict
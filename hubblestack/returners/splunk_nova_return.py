@@ -37,6 +37,11 @@ gateway is not defined.
             custom_fields:
               - site
               - product_group
+
+With ``delta: true``, only the checks that changed since the previous run
+are sent (with a ``delta_change`` field), plus a digest event of the
+complete result set and a full snapshot every ``delta_full_snapshot``
+seconds. See hubblestack.returners.common.delta.
 """
 import socket
 
@@ -45,6 +50,7 @@ import json
 import logging
 
 from hubblestack.hec import http_event_collector, get_splunk_options, make_hec_args
+import hubblestack.returners.common.delta as delta
 
 log = logging.getLogger(__name__)
 
@@ -64,6 +70,8 @@ def returner(ret):
 
     try:
         opts_list = get_splunk_options(sourcetype='hubble_audit',
+                                       delta=False,
+                                       delta_full_snapshot=delta.DEFAULT_FULL_SNAPSHOT,
                                        _nick={'sourcetype_nova': 'sourcetype'})
 
         for opts in opts_list:
@@ -74,13 +82,23 @@ def returner(ret):
             hec = http_event_collector(*args, **kwargs)
             host_args['hec'] = hec
 
-            # Failure checks
-            _publish_data(args=host_args, checks=data.get('Failure', []), check_result='Failure',
-                          cloud_details=cloud_details, opts=opts)
-
-            # Success checks
-            _publish_data(args=host_args, checks=data.get('Success', []), check_result='Success',
-                          cloud_details=cloud_details, opts=opts)
+            tracker = None
+            if opts['delta']:
+                # Changed checks and a digest of the result set
+                tracker = delta.ResultDelta(__opts__.get('cachedir'),
+                                            delta.state_key('splunk_nova_return', opts, ret),
+                                            opts['delta_full_snapshot'])
+                delta.publish_delta(args=host_args, data=data, tracker=tracker,
+                                    cloud_details=cloud_details, opts=opts,
+                                    generate_event=_generate_event, publish_event=_publish_event)
+            else:
+                # Failure checks
+                _publish_data(args=host_args, checks=data.get('Failure', []), check_result='Failure',
+                              cloud_details=cloud_details, opts=opts)
+
+                # Success checks
+                _publish_data(args=host_args, checks=data.get('Success', []), check_result='Success',
+                              cloud_details=cloud_details, opts=opts)
 
             # Compliance checks
             if data.get('Compliance', None):
@@ -90,6 +108,8 @@ def returner(ret):
                 _publish_event(fqdn=host_args['fqdn'], event=event, opts=opts, hec=hec)
 
             hec.flushBatch()
+            if tracker is not None:
+                tracker.save()
     except Exception:
         log.exception('Error ocurred in splunk_nova_return')
     return
@@ -160,6 +180,8 @@ def _generate_event(args, cloud_details, custom_fields, check_type=None, data=No
     event = {'job_id': args['job_id']}
     if check_type == 'compliance':
         event['compliance_percentage'] = args['Compliance']
+    elif check_type == 'digest':
+        event.update(args['digest'])
     else:
         event.update({'check_result': args['check_result']})
         event.update({'check_id': args['check_id']})
@@ -232,3 +254,4 @@ def _publish_data(args, checks, check_result, cloud_details, opts):
         event = _generate_event(data=data, args=args, cloud_details=cloud_details,
                                 custom_fields=opts['custom_fields'], check_type=check_result)
         _publish_event(fqdn=args['fqdn'], opts=opts, event=event, hec=args['hec'])
+
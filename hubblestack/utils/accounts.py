@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+'''
+Parsed snapshots of the local account databases: ``/etc/passwd``,
+``/etc/group`` and ``/etc/shadow``.
+
+Many checks of an audit run read the same databases (duplicate uids, home
+directories, dot files, empty passwords...) and ``file.stats`` resolves the
+owner and group of every file it looks at. The databases are parsed once per
+version of each file (through hubblestack.utils.filecache, so a changed file
+is parsed again) and shared by all of them.
+
+Entries are tuples of the ``:`` separated fields of each (non-blank) line,
+in file order, exactly as in the file: nothing is merged from NSS (LDAP,
+NIS...). Callers resolving ids to names fall back to ``pwd``/``grp`` for ids
+that aren't in the files.
+
+.. code-block:: python
+
+    import hubblestack.utils.accounts
+
+    for entry in hubblestack.utils.accounts.passwd():
+        name, uid, home = entry[0], entry[2], hubblestack.utils.accounts.field(entry, 5)
+'''
+
+import logging
+
+import hubblestack.utils.filecache as filecache
+
+log = logging.getLogger(__name__)
+
+PASSWD = '/etc/passwd'
+GROUP = '/etc/group'
+SHADOW = '/etc/shadow'
+
+
+def _parse(file_handle):
+    return tuple(tuple(line.split(':')) for line in file_handle.read().splitlines() if line.strip())
+
+
+def _parse_names(file_handle):
+    # id -> name of the first entry with that id, like getpwuid()/getgrgid()
+    names = {}
+    for entry in _parse(file_handle):
+        if len(entry) > 2:
+            names.setdefault(entry[2], entry[0])
+    return names
+
+
+def _entries(path):
+    return filecache.parsed(path, 'accounts', _parse, errors='replace')
+
+
+def passwd():
+    '''
+    The entries of /etc/passwd. Raises OSError if it can't be read.
+    '''
+    return _entries(PASSWD)
+
+
+def group():
+    '''
+    The entries of /etc/group. Raises OSError if it can't be read.
+    '''
+    return _entries(GROUP)
+
+
+def shadow():
+    '''
+    The entries of /etc/shadow. Raises OSError if it can't be read (it is
+    only readable by root).
+    '''
+    return _entries(SHADOW)
+
+
+def field(entry, idx):
+    '''
+    Field ``idx`` of an entry, or an empty string if the line is short
+    '''
+    return entry[idx] if len(entry) > idx else ''
+
+
+def _name(path, ident):
+    try:
+        return filecache.parsed(path, 'accounts_names', _parse_names, errors='replace').get(str(ident))
+    except (OSError, ValueError) as exc:
+        log.debug('Unable to read %s: %s', path, exc)
+        return None
+
+
+def uid_to_name(uid):
+    '''
+    The name of the first user in /etc/passwd with that uid, or None
+    '''
+    return _name(PASSWD, uid)
+
+
+def gid_to_name(gid):
+    '''
+    The name of the first group in /etc/group with that gid, or None
+    '''
+    return _name(GROUP, gid)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+'''
+A bounded cache of parsed file contents, shared by the readfile audit and
+fdg modules.
+
+Profiles often have dozens of checks reading subkeys out of the same json or
+yaml file (``/etc/docker/daemon.json``) or the same lines of a config file
+(``sshd_config``); without a cache every check re-opens and re-parses it.
+``parsed()`` parses a file once per version of the file: entries are keyed
+by the file's identity and stat (device, inode, size, mtime) together with
+the parse mode and its parameters, so an edited or replaced file is simply
+parsed again. Entries are evicted least recently used first, once the total
+size of the files they came from exceeds ``MAX_BYTES``.
+
+Cached values are shared between callers and must not be modified; copy
+(the part of) a value before handing it to anything that might change it.
+
+.. code-block:: python
+
+    import hubblestack.utils.filecache
+
+    data = hubblestack.utils.filecache.parsed('/etc/docker/daemon.json', 'json', json.load)
+'''
+
+import collections
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# total size (of the files parsed) of the cached entries
+MAX_BYTES = 32 * 1024 * 1024
+# files modified more recently than this (in seconds) aren't cached: a change
+# within the same mtime tick that keeps the size would go unnoticed
+MIN_AGE = 2
+
+STATS = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+_CACHE = collections.OrderedDict()
+_SIZE = [0]
+_LOCK = threading.Lock()
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns), stat
+
+
+def parsed(path, mode, parser, params=(), errors=None):
+    '''
+    Return ``parser(file_handle)`` for the file at ``path`` (opened for
+    reading as text), from the cache if the file hasn't changed since it was
+    last parsed the same way.
+
+    mode
+        Name of the parse mode, e.g. ``json``. Callers using the same mode
+        (and params) must use equivalent parsers.
+
+    params
+        Hashable parameters of the parse mode (separators, patterns...) that
+        also determine the result.
+
+    errors
+        How ``open()`` handles decoding errors (e.g. ``replace``)
+
+    Errors (from ``open()`` or the parser) are raised and nothing is cached.
+    '''
+    path = os.path.abspath(path)
+    stamp, stat = _stat_key(path)
+    key = (path, mode, params)
+    with _LOCK:
+        entry = _CACHE.get(key)
+        if entry is not None and entry[0] == stamp:
+            _CACHE.move_to_end(key)
+            STATS['hits'] += 1
+            return entry[2]
+    STATS['misses'] += 1
+
+    with open(path, 'r', errors=errors) as file_handle:
+        value = parser(file_handle)
+
+    size = max(stat.st_size, 1)
+    if size > MAX_BYTES or time.time() - stat.st_mtime < MIN_AGE:
+        return value
+    try:
+        if _stat_key(path)[0] != stamp:
+            # changed while we were reading it
+            return value
+    except OSError:
+        return value
+    with _LOCK:
+        old = _CACHE.pop(key, None)
+        if old is not None:
+            _SIZE[0] -= old[1]
+        _CACHE[key] = (stamp, size, value)
+        _SIZE[0] += size
+        while _SIZE[0] > MAX_BYTES and len(_CACHE) > 1:
+            _, (_, old_size, _) = _CACHE.popitem(last=False)
+            _SIZE[0] -= old_size
+            STATS['evictions'] += 1
+    return value
+
+
+def clear():
+    '''
+    Empty the cache
+    '''
+    with _LOCK:
+        _CACHE.clear()
+        _SIZE[0] = 0
@@ -22,12 +22,15 @@ import tornado.ioloop
 import weakref
 from datetime import datetime
 
+import hubblestack.payload
+import hubblestack.utils.atomicfile
 import hubblestack.utils.configparser
 import hubblestack.utils.data
 import hubblestack.utils.files
 import hubblestack.utils.gzip_util
 import hubblestack.utils.hashutils
 import hubblestack.utils.itertools
+import hubblestack.utils.parallel
 import hubblestack.utils.path
 import hubblestack.utils.platform
 import hubblestack.utils.stringutils
@@ -35,6 +38,7 @@ import hubblestack.utils.url
 import hubblestack.utils.user
 import hubblestack.utils.versions
 import hubblestack.fileserver
+import hubblestack.status
 from hubblestack.config import DEFAULT_OPTS
 from hubblestack.utils.odict import OrderedDict
 from hubblestack.utils.process import os_is_running as pid_exists
@@ -48,6 +52,9 @@ from hubblestack.utils.versions import LooseVersion as _LooseVersion
 
 VALID_REF_TYPES = DEFAULT_OPTS['gitfs_ref_types']
 
+# per-remote fetch timings are added as resources when the remotes are fetched
+HSS = hubblestack.status.HubbleStatus(__name__)
+
 # Optional per-remote params that can only be used on a per-remote basis, and
 # thus do not have defaults in salt/config.py.
 PER_REMOTE_ONLY = ('name',)
@@ -56,6 +63,9 @@ GLOBAL_ONLY = ()
 
 SYMLINK_RECURSE_DEPTH = 100
 
+# Upper bound on memoized tree listings/lookups kept (and persisted) per remote
+TREE_INDEX_MAX_ENTRIES = 20000
+
 # Auth support (auth params can be global or per-remote, too)
 AUTH_PROVIDERS = ('pygit2',)
 AUTH_PARAMS = ('user', 'password', 'pubkey', 'privkey', 'passphrase',
@@ -161,6 +171,7 @@ def enforce_types(key, val):
         'refspecs': 'stringlist',
         'ref_types': 'stringlist',
         'update_interval': int,
+        'fetch_timeout': int,
     }
 
     def _find_global(key):
@@ -207,6 +218,98 @@ def failhard(role):
     raise FileserverConfigError('Failed to load {0}'.format(role))
 
 
+def _oid_hex(obj):
+    '''
+    Return the hex object id of a pygit2 object or tree entry. Older pygit2
+    releases spell this .hex/.oid, newer ones only provide .id
+    '''
+    try:
+        return obj.hex
+    except AttributeError:
+        return str(obj.id)
+
+
+def _entry_oid(entry):
+    try:
+        return entry.id
+    except AttributeError:
+        return entry.oid
+
+
+class TreeIndex(object):
+    '''
+    Memoized results keyed by git object ids. Commits and trees are immutable,
+    so anything computed from a tree id (a recursive listing, the blob a path
+    resolves to) stays valid forever; only the ref -> tree resolution has to be
+    repeated. Entries are kept in LRU order, bounded by max_entries, and
+    persisted to path so they survive restarts.
+    '''
+
+    def __init__(self, path, opts, max_entries=TREE_INDEX_MAX_ENTRIES):
+        self.path = path
+        self.opts = opts
+        self.max_entries = max_entries
+        self.entries = None
+        self.dirty = False
+        self.hits = self.misses = 0
+
+    def _load(self):
+        self.entries = OrderedDict()
+        try:
+            with hubblestack.utils.files.fopen(self.path, 'rb') as fp_:
+                data = hubblestack.payload.Serial(self.opts).load(fp_)
+            if isinstance(data, dict):
+                self.entries.update(hubblestack.utils.data.decode(data))
+        except (IOError, OSError):
+            pass
+        except Exception:
+            log.warning('Ignoring unreadable git tree index %s', self.path, exc_info=True)
+
+    def get(self, key, default=None):
+        '''
+        Return the memoized value for key, or default
+        '''
+        if self.entries is None:
+            self._load()
+        try:
+            value = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        '''
+        Memoize value under key
+        '''
+        if self.entries is None:
+            self._load()
+        self.entries.pop(key, None)
+        self.entries[key] = value
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.dirty = True
+        return value
+
+    def save(self):
+        '''
+        Write the index to disk if it changed since it was loaded
+        '''
+        if not self.dirty or self.entries is None:
+            return
+        try:
+            dirname = os.path.dirname(self.path)
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            with hubblestack.utils.atomicfile.atomic_open(self.path, 'wb') as fp_:
+                fp_.write(hubblestack.payload.Serial(self.opts).dumps(dict(self.entries)))
+            self.dirty = False
+        except (IOError, OSError) as exc:
+            log.warning('Unable to write git tree index %s: %s', self.path, exc)
+
+
 class GitProvider(object):
     '''
     Base class for gitfs/git_pillar provider classes. Should never be used
@@ -438,6 +541,13 @@ class GitProvider(object):
         if not os.path.isdir(self.cachedir):
             os.makedirs(self.cachedir)
 
+        self.tree_index = TreeIndex(
+            hubblestack.utils.path.join(cache_root, 'tree_index',
+                                        '{0}.p'.format(self.cachedir_basename)),
+            self.opts)
+        # tgt_env -> ((tree id, root, mountpoint), listing), see _env_listing
+        self._env_listing_memo = {}
+
         try:
             self.new = self.init_remote()
         except Exception as exc:
@@ -1651,57 +1761,93 @@ class Pygit2(GitProvider):
 
         return new
 
-    def dir_list(self, tgt_env):
+    def _tree_listing(self, tree):
         '''
-        Get a list of directories for the target environment using pygit2
+        Return a dict with the files, symlinks and directories in a pygit2
+        Tree, relative to the tree. Trees are immutable, so the result is
+        memoized in the tree index by tree id.
         '''
-        def _traverse(tree, blobs, prefix):
+        key = 'tree:' + _oid_hex(tree)
+        listing = self.tree_index.get(key)
+        if listing is not None:
+            return listing
+
+        def _traverse(tree, listing, prefix):
             '''
             Traverse through a pygit2 Tree object recursively, accumulating all
-            the empty directories within it in the "blobs" list
+            the file paths, symlink info and directories in "listing"
             '''
             for entry in iter(tree):
-                if entry.oid not in self.repo:
+                oid = _entry_oid(entry)
+                if oid not in self.repo:
                     # Entry is a submodule, skip it
                     continue
-                blob = self.repo[entry.oid]
-                if not isinstance(blob, pygit2.Tree):
-                    continue
-                blobs.append(
-                    hubblestack.utils.path.join(prefix, entry.name, use_posixpath=True)
-                )
-                if len(blob):
-                    _traverse(
-                        blob, blobs, hubblestack.utils.path.join(
-                            prefix, entry.name, use_posixpath=True)
-                    )
+                obj = self.repo[oid]
+                repo_path = hubblestack.utils.path.join(
+                    prefix, entry.name, use_posixpath=True)
+                if isinstance(obj, pygit2.Blob):
+                    listing['files'].append(repo_path)
+                    if stat.S_ISLNK(entry.filemode):
+                        listing['symlinks'][repo_path] = \
+                            hubblestack.utils.stringutils.to_unicode(obj.data)
+                elif isinstance(obj, pygit2.Tree):
+                    listing['dirs'].append(repo_path)
+                    if len(obj):
+                        _traverse(obj, listing, repo_path)
 
-        ret = set()
+        listing = {'files': [], 'symlinks': {}, 'dirs': []}
+        if len(tree):
+            _traverse(tree, listing, '')
+        return self.tree_index.set(key, listing)
+
+    def _env_listing(self, tgt_env):
+        '''
+        Return the files, symlinks and dirs for the target environment with
+        the root stripped and the mountpoint applied, or None if the env (or
+        its root) cannot be found. Memoized per (tree id, root, mountpoint),
+        so repeated listings of an unchanged ref are a dictionary lookup.
+        The memo is only recomputed when the env's ref moves.
+        '''
         tree = self.get_tree(tgt_env)
         if not tree:
-            return ret
-        if self.root(tgt_env):
+            return None
+        root = self.root(tgt_env)
+        mountpoint = self.mountpoint(tgt_env)
+        memo_key = (_oid_hex(tree), root, mountpoint)
+        cached_key, cached = self._env_listing_memo.get(tgt_env, (None, None))
+        if cached_key == memo_key:
+            return cached
+        if root:
             try:
-                oid = tree[self.root(tgt_env)].oid
-                tree = self.repo[oid]
+                # This might need to be changed to account for a root that
+                # spans more than one directory
+                tree = self.repo[_entry_oid(tree[root])]
             except KeyError:
-                return ret
+                return None
             if not isinstance(tree, pygit2.Tree):
-                return ret
-            relpath = lambda path: os.path.relpath(path, self.root(tgt_env))
-        else:
-            relpath = lambda path: path
-        blobs = []
-        if len(tree):
-            _traverse(tree, blobs, self.root(tgt_env))
+                return None
+        listing = self._tree_listing(tree)
         add_mountpoint = lambda path: hubblestack.utils.path.join(
-            self.mountpoint(tgt_env), path, use_posixpath=True)
-        for blob in blobs:
-            ret.add(add_mountpoint(relpath(blob)))
-        if self.mountpoint(tgt_env):
-            ret.add(self.mountpoint(tgt_env))
+            mountpoint, path, use_posixpath=True)
+        dirs = set(add_mountpoint(x) for x in listing['dirs'])
+        if mountpoint:
+            dirs.add(mountpoint)
+        ret = (frozenset(add_mountpoint(x) for x in listing['files']),
+               dict((add_mountpoint(x), y) for x, y in listing['symlinks'].items()),
+               frozenset(dirs))
+        # Only the listing for the tree the env currently points to is kept
+        self._env_listing_memo[tgt_env] = (memo_key, ret)
         return ret
 
+    def dir_list(self, tgt_env):
+        '''
+        Get a list of directories for the target environment using pygit2
+        '''
+        listing = self._env_listing(tgt_env)
+        if listing is None:
+            return set()
+        return listing[2]
+
     def envs(self):
         '''
         Check the refs and return a list of the ones which can be used as salt
@@ -1779,58 +1925,11 @@ class Pygit2(GitProvider):
         '''
         Get file list for the target environment using pygit2
         '''
-        def _traverse(tree, blobs, prefix):
-            '''
-            Traverse through a pygit2 Tree object recursively, accumulating all
-            the file paths and symlink info in the "blobs" dict
-            '''
-            for entry in iter(tree):
-                if entry.oid not in self.repo:
-                    # Entry is a submodule, skip it
-                    continue
-                obj = self.repo[entry.oid]
-                if isinstance(obj, pygit2.Blob):
-                    repo_path = hubblestack.utils.path.join(
-                        prefix, entry.name, use_posixpath=True)
-                    blobs.setdefault('files', []).append(repo_path)
-                    if stat.S_ISLNK(tree[entry.name].filemode):
-                        link_tgt = self.repo[tree[entry.name].oid].data
-                        blobs.setdefault('symlinks', {})[repo_path] = link_tgt
-                elif isinstance(obj, pygit2.Tree):
-                    _traverse(
-                        obj, blobs, hubblestack.utils.path.join(
-                            prefix, entry.name, use_posixpath=True)
-                    )
-
-        files = set()
-        symlinks = {}
-        tree = self.get_tree(tgt_env)
-        if not tree:
+        listing = self._env_listing(tgt_env)
+        if listing is None:
             # Not found, return empty objects
-            return files, symlinks
-        if self.root(tgt_env):
-            try:
-                # This might need to be changed to account for a root that
-                # spans more than one directory
-                oid = tree[self.root(tgt_env)].oid
-                tree = self.repo[oid]
-            except KeyError:
-                return files, symlinks
-            if not isinstance(tree, pygit2.Tree):
-                return files, symlinks
-            relpath = lambda path: os.path.relpath(path, self.root(tgt_env))
-        else:
-            relpath = lambda path: path
-        blobs = {}
-        if len(tree):
-            _traverse(tree, blobs, self.root(tgt_env))
-        add_mountpoint = lambda path: hubblestack.utils.path.join(
-            self.mountpoint(tgt_env), path, use_posixpath=True)
-        for repo_path in blobs.get('files', []):
-            files.add(add_mountpoint(relpath(repo_path)))
-        for repo_path, link_tgt in blobs.get('symlinks', {}).items():
-            symlinks[add_mountpoint(relpath(repo_path))] = link_tgt
-        return files, symlinks
+            return set(), {}
+        return listing[0], dict(listing[1])
 
     def find_file(self, path, tgt_env):
         '''
@@ -1840,14 +1939,26 @@ class Pygit2(GitProvider):
         if not tree:
             # Branch/tag/SHA not found in repo
             return None, None, None
-        blob = None
+        key = 'find:{0}:{1}'.format(_oid_hex(tree), path)
+        found = self.tree_index.get(key)
+        if found is None:
+            found = self.tree_index.set(key, self._resolve_path(tree, path))
+        if not found:
+            return None, None, None
+        blob_hexsha, mode = found
+        return self.repo[blob_hexsha], blob_hexsha, mode
+
+    def _resolve_path(self, tree, path):
+        '''
+        Follow path (and any symlinks along the way) in tree and return
+        [blob hex id, file mode], or [] if it does not resolve to a file
+        '''
         mode = None
         depth = 0
         while True:
             depth += 1
             if depth > SYMLINK_RECURSE_DEPTH:
-                blob = None
-                break
+                return []
             try:
                 entry = tree[path]
                 mode = entry.filemode
@@ -1856,21 +1967,18 @@ class Pygit2(GitProvider):
                     # path's object ID will be the target of the symlink. Follow
                     # the symlink and set path to the location indicated
                     # in the blob data.
-                    link_tgt = self.repo[entry.oid].data
+                    link_tgt = hubblestack.utils.stringutils.to_unicode(
+                        self.repo[_entry_oid(entry)].data)
                     path = hubblestack.utils.path.join(
                         os.path.dirname(path), link_tgt, use_posixpath=True)
                 else:
-                    blob = self.repo[entry.oid]
-                    if isinstance(blob, pygit2.Tree):
+                    blob = self.repo[_entry_oid(entry)]
+                    if not isinstance(blob, pygit2.Blob):
                         # Path is a directory, not a file.
-                        blob = None
-                    break
+                        return []
+                    return [_oid_hex(blob), mode]
             except KeyError:
-                blob = None
-                break
-        if isinstance(blob, pygit2.Blob):
-            return blob, blob.hex, mode
-        return None, None, None
+                return []
 
     def get_tree_from_branch(self, ref):
         '''
@@ -2122,6 +2230,10 @@ class GitBase(object):
         self.hash_cachedir = hubblestack.utils.path.join(self.cache_root, 'hash')
         self.file_list_cachedir = hubblestack.utils.path.join(
             self.opts['cachedir'], 'file_lists', self.role)
+        # cache path -> id of the blob last written there
+        self.blob_index = TreeIndex(
+            hubblestack.utils.path.join(self.cache_root, 'tree_index', 'blobs.p'),
+            self.opts)
         if init_remotes:
             self.init_remotes(
                 remotes if remotes is not None else [],
@@ -2336,6 +2448,10 @@ class GitBase(object):
         '''
         Fetch all remotes and return a boolean to let the calling function know
         whether or not any remotes were updated in the process of fetching
+
+        Up to ``<role>_fetch_workers`` remotes are fetched at the same time and
+        each fetch is given ``<role>_fetch_timeout`` seconds (or the per-remote
+        ``fetch_timeout``) before it is abandoned.
         '''
         if remotes is None:
             remotes = []
@@ -2346,27 +2462,70 @@ class GitBase(object):
             )
             remotes = []
 
-        changed = False
+        selected = []
         for repo in self.remotes:
             name = getattr(repo, 'name', None)
             if not remotes or (repo.id, name) in remotes:
-                try:
-                    if repo.fetch():
-                        # We can't just use the return value from repo.fetch()
-                        # because the data could still have changed if old
-                        # remotes were cleared above. Additionally, we're
-                        # running this in a loop and later remotes without
-                        # changes would override this value and make it
-                        # incorrect.
-                        changed = True
-                except Exception as exc:
-                    log.error(
-                        'Exception caught while fetching %s remote \'%s\': %s',
-                        self.role, repo.id, exc,
-                        exc_info=True
-                    )
+                selected.append(repo)
+
+        default_timeout = self.opts.get('{0}_fetch_timeout'.format(self.role))
+        tasks = []
+        for repo in selected:
+            timeout = getattr(repo, 'fetch_timeout', default_timeout)
+            tasks.append((repo, self._timed_fetch(repo), timeout))
+
+        # Remotes are fetched concurrently; each one still takes its own
+        # update lock inside repo.fetch(). A remote that exceeds its timeout
+        # is abandoned here, but keeps its lock until the underlying fetch
+        # returns, so the next update skips it rather than racing it.
+        results = hubblestack.utils.parallel.run_tasks(
+            tasks,
+            workers=self.opts.get('{0}_fetch_workers'.format(self.role), 1),
+            name='{0}-fetch'.format(self.role))
+
+        changed = False
+        for res in results:
+            repo = res.key
+            if res.timed_out:
+                log.error(
+                    'Timed out fetching %s remote \'%s\' after %ss; it will '
+                    'be retried on the next update',
+                    self.role, repo.id, getattr(repo, 'fetch_timeout', default_timeout)
+                )
+            elif res.exc is not None:
+                log.error(
+                    'Exception caught while fetching %s remote \'%s\': %s',
+                    self.role, repo.id, res.exc,
+                    exc_info=(type(res.exc), res.exc, res.exc.__traceback__)
+                )
+            elif res.value:
+                # We can't just use the return value from repo.fetch()
+                # because the data could still have changed if old
+                # remotes were cleared above. Additionally, later remotes
+                # without changes would override this value and make it
+                # incorrect.
+                changed = True
+            if res.duration is not None:
+                log.debug('Fetching %s remote \'%s\' took %.2fs',
+                          self.role, repo.id, res.duration)
         return changed
 
+    def _timed_fetch(self, repo):
+        '''
+        Return a callable that fetches repo and records the fetch timing in
+        HubbleStatus under "<role>_fetch:<remote id>"
+        '''
+        hs_key = '{0}_fetch:{1}'.format(self.role, repo.id)
+        HSS.add_resource(hs_key)
+
+        def _fetch():
+            stat_handle = HSS.mark(hs_key)
+            try:
+                return repo.fetch()
+            finally:
+                stat_handle.fin()
+        return _fetch
+
     def lock(self, remote=None):
         '''
         Place an update.lk
@@ -2433,6 +2592,16 @@ class GitBase(object):
             # Hash file won't exist if no files have yet been served up
             pass
 
+        self.save_indexes()
+
+    def save_indexes(self):
+        '''
+        Persist the memoized tree listings/lookups and the blob cache index
+        '''
+        for repo in self.remotes:
+            repo.tree_index.save()
+        self.blob_index.save()
+
     def update_intervals(self):
         '''
         Returns a dictionary mapping remote IDs to their intervals, designed to
@@ -2789,11 +2958,18 @@ class GitFS(GitBase):
                     fnd['stat'] = [mode]
                 return fnd
 
+            if self.blob_index.get(dest) == blob_hexsha and os.path.isfile(dest):
+                # This exact blob was already written to dest
+                fnd['rel'] = path
+                fnd['path'] = dest
+                return _add_file_stat(fnd, blob_mode)
+
             hubblestack.fileserver.wait_lock(lk_fn, dest)
             try:
                 with hubblestack.utils.files.fopen(blobshadest, 'r') as fp_:
                     sha = hubblestack.utils.stringutils.to_unicode(fp_.read())
                     if sha == blob_hexsha:
+                        self.blob_index.set(dest, blob_hexsha)
                         fnd['rel'] = path
                         fnd['path'] = dest
                         return _add_file_stat(fnd, blob_mode)
@@ -2817,6 +2993,8 @@ class GitFS(GitBase):
                 os.remove(lk_fn)
             except OSError:
                 pass
+            # persisted with the other indexes by save_indexes()
+            self.blob_index.set(dest, blob_hexsha)
             fnd['rel'] = path
             fnd['path'] = dest
             return _add_file_stat(fnd, blob_mode)
@@ -2933,6 +3111,7 @@ class GitFS(GitBase):
                     ret['dirs'].update(repo.dir_list(load['saltenv']))
             ret['files'] = sorted(ret['files'])
             ret['dirs'] = sorted(ret['dirs'])
+            self.save_indexes()
 
             if save_cache:
                 hubblestack.fileserver.write_file_list_cache(
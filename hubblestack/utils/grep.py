@@ -0,0 +1,575 @@
+# -*- coding: utf-8 -*-
+'''
+An in-process replacement for the ``grep`` command used by the grep audit,
+fdg and nova modules.
+
+Profiles run dozens of greps against the same few files (sshd_config,
+login.defs, fstab, ...); spawning a ``grep`` for each of them dominates the
+run time of those checks. ``run()`` takes the same argument vector the
+modules would have given to ``grep`` and returns what ``cmd.run_all`` would
+have returned for it (retcode, rstripped stdout, stderr).
+
+Only what can be reproduced exactly is handled here: GNU grep in the C
+locale (which is how ``cmd.run_all`` runs it) with the flags profiles use:
+``-E -F -G -i -v -w -x -c -q -s -n -h -H -A -B -C -e`` (and their long
+forms), against a single file or stdin. For anything else (other flags,
+several files, binary files, regular expression constructs whose meaning
+differs between grep and python) ``run()`` returns None and the caller
+should run ``grep`` as before.
+
+Several greps against the same file can be answered in one pass over the
+file with ``prime()``; their results are then handed out by ``run()`` for as
+long as the file doesn't change, until ``clear_primed()``.
+
+.. code-block:: python
+
+    import hubblestack.utils.grep
+
+    ret = hubblestack.utils.grep.run(['-E', '^PASS_MAX_DAYS', '/etc/login.defs'])
+    if ret is None:
+        ret = __mods__['cmd.run_all'](['grep', '-E', '^PASS_MAX_DAYS', '/etc/login.defs'], ...)
+'''
+
+import collections
+import logging
+import os
+import re
+import threading
+
+import hubblestack.utils.stringutils
+
+log = logging.getLogger(__name__)
+
+# files larger than this are left to grep
+MAX_FILE_SIZE = 16 * 1024 * 1024
+# number of file contents kept between greps
+FILE_CACHE_ENTRIES = 32
+
+_FILE_CACHE = collections.OrderedDict()
+_PRIMED = {}
+_LOCK = threading.Lock()
+
+_SHORT_FLAGS = {
+    'E': ('syntax', 'E'), 'F': ('syntax', 'F'), 'G': ('syntax', 'G'),
+    'i': ('icase', True), 'y': ('icase', True), 'v': ('invert', True),
+    'w': ('word', True), 'x': ('line', True), 'c': ('count', True),
+    'q': ('quiet', True), 's': ('silent', True), 'n': ('number', True),
+    'h': ('filename', False), 'H': ('filename', True),
+}
+_LONG_FLAGS = {
+    'extended-regexp': 'E', 'fixed-strings': 'F', 'basic-regexp': 'G',
+    'ignore-case': 'i', 'invert-match': 'v', 'word-regexp': 'w',
+    'line-regexp': 'x', 'count': 'c', 'quiet': 'q', 'silent': 'q',
+    'no-messages': 's', 'line-number': 'n', 'no-filename': 'h',
+    'with-filename': 'H',
+}
+_SHORT_VALUES = {'A': 'after', 'B': 'before', 'C': 'context', 'e': 'regexp'}
+_LONG_VALUES = {'after-context': 'after', 'before-context': 'before',
+                'context': 'context', 'regexp': 'regexp'}
+
+# POSIX character classes in the C locale
+_CLASSES = {
+    b'alpha': b'a-zA-Z', b'digit': b'0-9', b'alnum': b'a-zA-Z0-9',
+    b'upper': b'A-Z', b'lower': b'a-z', b'xdigit': b'0-9A-Fa-f',
+    b'space': b' \\t\\n\\r\\f\\v', b'blank': b' \\t',
+    b'punct': re.escape(b'!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~'),
+    b'print': b'\\x20-\\x7e', b'graph': b'\\x21-\\x7e', b'cntrl': b'\\x00-\\x1f\\x7f',
+}
+
+
+class Unsupported(Exception):
+    '''
+    The grep invocation can't be reproduced exactly in-process
+    '''
+
+
+class GrepArgs(object):
+    '''
+    A parsed grep command line
+    '''
+
+    def __init__(self):
+        self.syntax = 'G'
+        self.icase = self.invert = self.word = self.line = False
+        self.count = self.quiet = self.silent = self.number = False
+        self.filename = None
+        self.after = self.before = self.context = None
+        self.regexp = []
+        self.operands = []
+
+    @property
+    def patterns(self):
+        ''' the patterns to match, one per line of each -e / the pattern operand '''
+        patterns = self.regexp if self.regexp else self.operands[:1]
+        ret = []
+        for pattern in patterns:
+            ret.extend(pattern.split('\n'))
+        return ret
+
+    @property
+    def files(self):
+        ''' the files operands '''
+        return self.operands if self.regexp else self.operands[1:]
+
+    def context_lines(self):
+        ''' (before, after) lines of context '''
+        before = self.before if self.before is not None else self.context or 0
+        after = self.after if self.after is not None else self.context or 0
+        return before, after
+
+
+def _context_value(value):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise Unsupported('invalid context length {0!r}'.format(value))
+    if value < 0:
+        raise Unsupported('invalid context length {0!r}'.format(value))
+    return value
+
+
+def parse_args(argv):
+    '''
+    Parse a grep argument vector (without the leading ``grep``) the way GNU
+    grep's getopt would, raising Unsupported for anything not handled here.
+    '''
+    args = GrepArgs()
+    argv = list(argv)
+    idx = 0
+    while idx < len(argv):
+        arg = argv[idx]
+        idx += 1
+        if not isinstance(arg, str):
+            raise Unsupported('non-string argument {0!r}'.format(arg))
+        if arg == '--':
+            args.operands.extend(argv[idx:])
+            break
+        if arg.startswith('--'):
+            name, eq, value = arg[2:].partition('=')
+            if name in _LONG_FLAGS and not eq:
+                attr, val = _SHORT_FLAGS[_LONG_FLAGS[name]]
+                setattr(args, attr, val)
+            elif name in _LONG_VALUES:
+                if not eq:
+                    if idx >= len(argv):
+                        raise Unsupported('option --{0} requires an argument'.format(name))
+                    value = argv[idx]
+                    idx += 1
+                _set_value(args, _LONG_VALUES[name], value)
+            else:
+                raise Unsupported('unsupported option {0}'.format(arg))
+            continue
+        if not arg.startswith('-') or arg == '-':
+            args.operands.append(arg)
+            continue
+        pos = 1
+        while pos < len(arg):
+            char = arg[pos]
+            pos += 1
+            if char in _SHORT_FLAGS:
+                attr, val = _SHORT_FLAGS[char]
+                setattr(args, attr, val)
+            elif char in _SHORT_VALUES:
+                value = arg[pos:]
+                if not value:
+                    if idx >= len(argv):
+                        raise Unsupported('option -{0} requires an argument'.format(char))
+                    value = argv[idx]
+                    idx += 1
+                _set_value(args, _SHORT_VALUES[char], value)
+                break
+            elif char.isdigit():
+                # -NUM is --context=NUM
+                digits = char
+                while pos < len(arg) and arg[pos].isdigit():
+                    digits += arg[pos]
+                    pos += 1
+                args.context = int(digits)
+            else:
+                raise Unsupported('unsupported option -{0}'.format(char))
+    if not args.regexp and not args.operands:
+        raise Unsupported('no pattern given')
+    return args
+
+
+def _set_value(args, attr, value):
+    if attr == 'regexp':
+        args.regexp.append(value)
+    else:
+        setattr(args, attr, _context_value(value))
+
+
+def _escape_bracket_char(char):
+    if char in b'\\]^-[':
+        return b'\\' + char
+    return char
+
+
+def _translate_bracket(pattern, idx):
+    '''
+    Translate the POSIX bracket expression starting after the ``[`` at idx,
+    returning the python equivalent and the index after the closing ``]``
+    '''
+    out = [b'[']
+    if pattern[idx:idx + 1] == b'^':
+        out.append(b'^')
+        idx += 1
+    first = True
+    close = pattern.find(b']', idx + 1)
+    if pattern[idx:idx + 1] == b':' and close > idx + 1 and pattern[close - 1:close] == b':':
+        # grep refuses [:space:] (meaning [[:space:]])
+        raise Unsupported('character class outside of a bracket expression')
+    while True:
+        if idx >= len(pattern):
+            raise Unsupported('unmatched [')
+        char = pattern[idx:idx + 1]
+        if char == b']' and not first:
+            idx += 1
+            break
+        first = False
+        if char == b'[' and pattern[idx + 1:idx + 2] in (b':', b'.', b'='):
+            kind = pattern[idx + 1:idx + 2]
+            end = pattern.find(kind + b']', idx + 2)
+            if end < 0:
+                raise Unsupported('unterminated character class')
+            name = pattern[idx + 2:end]
+            if kind != b':' or name not in _CLASSES:
+                raise Unsupported('unsupported character class {0!r}'.format(name))
+            out.append(_CLASSES[name])
+            idx = end + 2
+        elif pattern[idx + 1:idx + 2] == b'-' and pattern[idx + 2:idx + 3] not in (b']', b'', b'['):
+            low, high = char, pattern[idx + 2:idx + 3]
+            if ord(low) > ord(high):
+                raise Unsupported('invalid range end')
+            out.append(_escape_bracket_char(low) + b'-' + _escape_bracket_char(high))
+            idx += 3
+        else:
+            out.append(_escape_bracket_char(char))
+            idx += 1
+    out.append(b']')
+    return b''.join(out), idx
+
+
+def _interval(pattern, idx, extended):
+    '''
+    Return the python interval for the grep interval whose contents start at
+    idx, and the index after it
+    '''
+    close = b'}' if extended else b'\\}'
+    match = re.match(br'(\d*)(,?)(\d*)' + re.escape(close), pattern[idx:])
+    if not match or not (match.group(1) or match.group(3)):
+        raise Unsupported('invalid interval')
+    low, comma, high = match.groups()
+    if low and high and int(low) > int(high):
+        raise Unsupported('invalid interval')
+    return b'{' + low + comma + high + b'}', idx + match.end()
+
+
+def translate(pattern, syntax='G'):
+    '''
+    Translate a grep pattern (bytes) in basic (G), extended (E) or fixed
+    string (F) syntax to an equivalent python (bytes) regular expression.
+    Raises Unsupported for constructs that can't be translated faithfully.
+    '''
+    if syntax == 'F':
+        return re.escape(pattern)
+    extended = syntax == 'E'
+    out = []
+    idx = 0
+    # what came before: 'start' (of the expression or a group/alternative),
+    # 'anchor' (a leading ^), 'assert' (other zero-width matches), 'quant'
+    # (a repetition) or 'atom'
+    prev = 'start'
+    while idx < len(pattern):
+        char = pattern[idx:idx + 1]
+        idx += 1
+        quant = None
+        if char == b'\\':
+            if idx >= len(pattern):
+                raise Unsupported('trailing backslash')
+            char = pattern[idx:idx + 1]
+            idx += 1
+            if not extended and char in b'+?{':
+                quant = char
+            elif not extended and char in b'(|':
+                out.append(char)
+                prev = 'start'
+            elif not extended and char == b')':
+                out.append(char)
+                prev = 'atom'
+            elif char in b'bB<>':
+                out.append({b'<': b'\\b(?=\\w)', b'>': b'\\b(?<=\\w)'}.get(char, b'\\' + char))
+                prev = 'assert'
+            elif char in b'wWsS':
+                out.append(b'\\' + char)
+                prev = 'atom'
+            elif char.isdigit() and char != b'0':
+                # grouped so following digits aren't read as part of it
+                out.append(b'(?:\\' + char + b')')
+                prev = 'atom'
+            elif char.isalnum() or ord(char) > 127:
+                raise Unsupported('unsupported escape \\{0}'.format(char.decode('latin-1')))
+            else:
+                out.append(re.escape(char))
+                prev = 'atom'
+        elif char == b'[':
+            translated, idx = _translate_bracket(pattern, idx)
+            out.append(translated)
+            prev = 'atom'
+        elif char == b'*' or (extended and char in b'+?{'):
+            quant = char
+        elif char == b'^' and (extended or prev == 'start'):
+            out.append(b'^')
+            prev = 'anchor'
+        elif char == b'$' and (extended or idx == len(pattern)
+                               or pattern[idx:idx + 2] in (b'\\)', b'\\|')):
+            out.append(b'$')
+            prev = 'assert'
+        elif char == b'.':
+            out.append(b'.')
+            prev = 'atom'
+        elif extended and char in b'(|':
+            if pattern[idx:idx + 1] == b'?':
+                raise Unsupported('(? in pattern')
+            out.append(char)
+            prev = 'start'
+        elif extended and char == b')':
+            out.append(char)
+            prev = 'atom'
+        else:
+            out.append(re.escape(char))
+            prev = 'atom'
+
+        if quant is None:
+            continue
+        if prev in ('start', 'anchor') and quant == b'*' and not extended:
+            # a leading * is literal in a basic regular expression
+            out.append(b'\\*')
+            prev = 'atom'
+            continue
+        if prev != 'atom':
+            raise Unsupported('repetition of {0}'.format(prev))
+        if quant == b'{':
+            quant, idx = _interval(pattern, idx, extended)
+        out.append(quant)
+        prev = 'quant'
+    return b''.join(out)
+
+
+def compile_args(args):
+    '''
+    Return a function telling whether a line (bytes, without the newline)
+    matches any of the patterns of the parsed grep args
+    '''
+    if args.invert and '' in args.patterns:
+        # grep short-cuts this case (e.g. -vc '' prints nothing at all)
+        raise Unsupported('inverted empty pattern')
+    flags = re.IGNORECASE if args.icase else 0
+    regexes = []
+    for pattern in args.patterns:
+        try:
+            expr = translate(pattern.encode('utf-8'), args.syntax)
+            re.compile(expr)
+            if args.line:
+                expr = b'(?:' + expr + b')'
+                regexes.append(re.compile(expr, flags).fullmatch)
+                continue
+            if args.word:
+                expr = b'(?<!\\w)(?:' + expr + b')(?!\\w)'
+            regexes.append(re.compile(expr, flags).search)
+        except re.error as exc:
+            raise Unsupported('pattern {0!r}: {1}'.format(pattern, exc))
+    if len(regexes) == 1:
+        match = regexes[0]
+        return lambda line: match(line) is not None
+    return lambda line: any(match(line) is not None for match in regexes)
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _read_lines(path):
+    '''
+    Return (stat key, lines) for path, reusing the lines read earlier if
+    the file didn't change since
+    '''
+    key = _stat_key(path)
+    if key[2] > MAX_FILE_SIZE:
+        raise Unsupported('{0} is too large'.format(path))
+    with _LOCK:
+        cached = _FILE_CACHE.get(path)
+        if cached and cached[0] == key:
+            _FILE_CACHE.move_to_end(path)
+            return cached
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    lines = _split_lines(data)
+    with _LOCK:
+        _FILE_CACHE[path] = (key, lines)
+        while len(_FILE_CACHE) > FILE_CACHE_ENTRIES:
+            _FILE_CACHE.popitem(last=False)
+    return key, lines
+
+
+def _split_lines(data):
+    if b'\0' in data:
+        # grep would report "Binary file ... matches"
+        raise Unsupported('binary data')
+    lines = data.split(b'\n')
+    if lines and lines[-1] == b'':
+        lines.pop()
+    return lines
+
+
+def _format(args, lines, selected, path):
+    '''
+    Build the cmd.run_all style result of grep args over lines, where
+    selected is the list of indexes of the selected lines
+    '''
+    ret = {'pid': None, 'retcode': 0 if selected else 1, 'stdout': '', 'stderr': ''}
+    if args.quiet:
+        return ret
+    prefix = path + ':' if args.filename and path else ''
+    if args.count:
+        ret['stdout'] = '{0}{1}'.format(prefix, len(selected))
+        return ret
+    out = []
+    before, after = args.context_lines()
+    selected_set = set(selected)
+    last = None
+    for line_no in selected:
+        for idx in range(max(line_no - before, 0 if last is None else last + 1),
+                         min(line_no + after, len(lines) - 1) + 1):
+            if last is not None and idx > last + 1 and (before or after):
+                out.append(b'--')
+            sep = b':' if idx in selected_set else b'-'
+            head = b''
+            if args.filename and path:
+                head += path.encode('utf-8') + sep
+            if args.number:
+                head += str(idx + 1).encode() + sep
+            out.append(head + lines[idx])
+            last = idx
+    stdout = b'\n'.join(out)
+    try:
+        ret['stdout'] = hubblestack.utils.stringutils.to_unicode(stdout).rstrip()
+    except UnicodeDecodeError:
+        ret['stdout'] = hubblestack.utils.stringutils.to_unicode(stdout, errors='replace').rstrip()
+    return ret
+
+
+def _file_error(args, path, exc):
+    return {'pid': None, 'retcode': 2, 'stdout': '',
+            'stderr': '' if args.silent else 'grep: {0}: {1}'.format(path, exc.strerror)}
+
+
+def _prepare(argv):
+    args = parse_args(argv)
+    files = args.files
+    if len(files) > 1 or files == ['-']:
+        raise Unsupported('more than one file')
+    path = files[0] if files else None
+    if path is None and args.filename:
+        raise Unsupported('file name of standard input')
+    if path is not None and os.path.isdir(path):
+        raise Unsupported('{0} is a directory'.format(path))
+    return args, path, compile_args(args)
+
+
+def run(argv, stdin=None):
+    '''
+    Run ``grep <argv>`` in-process. ``stdin`` is the text grep reads when no
+    file is given.
+
+    Returns a dict like ``cmd.run_all`` would (retcode, stdout, stderr), or
+    None if the invocation isn't supported in-process and grep should be
+    run instead.
+    '''
+    try:
+        args, path, match = _prepare(argv)
+        if path is None:
+            if stdin is None:
+                raise Unsupported('no file and no input')
+            if isinstance(stdin, str):
+                stdin = stdin.encode('utf-8')
+            lines = _split_lines(stdin)
+        else:
+            primed = _primed(argv, path)
+            if primed is not None:
+                return primed
+            try:
+                _, lines = _read_lines(path)
+            except (IOError, OSError) as exc:
+                return _file_error(args, path, exc)
+        selected = [idx for idx, line in enumerate(lines) if match(line) != args.invert]
+        return _format(args, lines, selected, path)
+    except Unsupported as exc:
+        log.debug('Running grep %s: %s', argv, exc)
+        return None
+
+
+def prime(path, argvs):
+    '''
+    Run all of the greps ``argvs`` (argument vectors whose only file is
+    ``path``) in a single pass over the file, and keep their results for
+    run() until the file changes or clear_primed() is called. Greps that
+    aren't supported in-process are skipped.
+
+    Returns the number of greps primed.
+    '''
+    checks = []
+    for argv in argvs:
+        try:
+            args, arg_path, match = _prepare(argv)
+        except Unsupported as exc:
+            log.debug('Not batching grep %s: %s', argv, exc)
+            continue
+        if arg_path != path:
+            continue
+        checks.append((tuple(argv), args, match, []))
+    if not checks:
+        return 0
+    try:
+        key, lines = _read_lines(path)
+    except Unsupported as exc:
+        log.debug('Not batching greps on %s: %s', path, exc)
+        return 0
+    except (IOError, OSError) as exc:
+        with _LOCK:
+            for argv, args, _, _ in checks:
+                _PRIMED[argv] = (None, _file_error(args, path, exc))
+        return len(checks)
+
+    for idx, line in enumerate(lines):
+        for _, args, match, selected in checks:
+            if match(line) != args.invert:
+                selected.append(idx)
+    with _LOCK:
+        for argv, args, _, selected in checks:
+            _PRIMED[argv] = (key, _format(args, lines, selected, path))
+    return len(checks)
+
+
+def _primed(argv, path):
+    with _LOCK:
+        primed = _PRIMED.get(tuple(argv))
+    if primed is None:
+        return None
+    key, ret = primed
+    try:
+        current = _stat_key(path)
+    except (IOError, OSError):
+        current = None
+    if key != current:
+        return None
+    return dict(ret)
+
+
+def clear_primed():
+    '''
+    Forget the results of prime()
+    '''
+    with _LOCK:
+        _PRIMED.clear()
@@ -6,6 +6,9 @@ Common functions for managing mounts
 # Import python libs
 import logging
 import os
+import re
+import select
+import threading
 
 # Import Hubble libs
 import hubblestack.utils.files
@@ -56,3 +59,125 @@ def write_cache(cache, opts):
     except (IOError, OSError):
         log.error("Failed to cache mounts", exc_info=True)
         return False
+
+
+MOUNTINFO = "/proc/self/mountinfo"
+
+_ESCAPE = re.compile(r"\\([0-7]{3})")
+
+
+def unescape(field):
+    """
+    Undo the octal escapes (space, tab, newline, backslash) of a mountinfo field
+    """
+    return _ESCAPE.sub(lambda match: chr(int(match.group(1), 8)), field)
+
+
+def parse_mountinfo(data):
+    """
+    Parse the content of /proc/<pid>/mountinfo into a list of dicts, one per
+    mount in the order of the file: mountid, parentid, major, minor, root,
+    mountpoint, opts (the per-mount options), propagation (the optional
+    fields: shared:N, master:N, propagate_from:N, unbindable), fstype,
+    device and superopts (the super block options). Malformed lines are
+    skipped.
+    """
+    ret = []
+    for line in data.splitlines():
+        comps = line.split()
+        try:
+            # any number of optional fields come before the separator
+            sep = comps.index("-", 6)
+            major, minor = comps[2].split(":")
+            ret.append({
+                "mountid": comps[0],
+                "parentid": comps[1],
+                "major": major,
+                "minor": minor,
+                "root": unescape(comps[3]),
+                "mountpoint": unescape(comps[4]),
+                "opts": comps[5].split(","),
+                "propagation": comps[6:sep],
+                "fstype": comps[sep + 1],
+                "device": unescape(comps[sep + 2]),
+                "superopts": comps[sep + 3].split(",") if len(comps) > sep + 3 else [],
+            })
+        except (IndexError, ValueError):
+            log.debug("Skipping malformed mountinfo line: %s", line)
+    return ret
+
+
+class MountTable(object):
+    """
+    The parsed mount table of this process, read from mountinfo again only
+    once the mount table changed: the kernel flags a change of the mount
+    namespace with POLLPRI (and POLLERR) on every open mountinfo file, so the
+    file is kept open and polled without blocking before the table is used.
+    Where it can't be polled, the file is read on every call.
+    """
+
+    def __init__(self, path=MOUNTINFO):
+        self.path = path
+        self.reads = 0
+        self._fd = None
+        self._poll = None
+        self._table = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Return the list of mounts (see parse_mountinfo), to be used read-only
+        """
+        with self._lock:
+            if self._table is None or self._changed():
+                self._table = parse_mountinfo(self._read())
+            return self._table
+
+    def _changed(self):
+        if self._poll is None:
+            return True
+        try:
+            # polling consumes the change event
+            return bool(self._poll.poll(0))
+        except (OSError, select.error):
+            return True
+
+    def _read(self):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDONLY)
+            try:
+                self._poll = select.poll()
+                self._poll.register(self._fd, select.POLLPRI | select.POLLERR)
+                # the event pending since the namespace was created
+                self._poll.poll(0)
+            except (AttributeError, OSError, select.error):
+                self._poll = None
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        chunks = []
+        while True:
+            chunk = os.read(self._fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        self.reads += 1
+        return hubblestack.utils.stringutils.to_unicode(b"".join(chunks))
+
+    def close(self):
+        """
+        Close the mountinfo file
+        """
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+            self._fd = self._poll = self._table = None
+
+
+_TABLE = MountTable()
+
+
+def mounts():
+    """
+    Return the mount table of this process (see MountTable), parsed from
+    /proc/self/mountinfo. Raises OSError if it can't be read.
+    """
+    return _TABLE.get()
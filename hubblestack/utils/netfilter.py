@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+'''
+An inventory of the firewall rules of a host, from ``iptables-save`` /
+``ip6tables-save`` output and from the JSON ruleset of ``nft -j list
+ruleset``.
+
+Firewall checks used to run ``iptables-save`` (or ``iptables -L``) for every
+table, family and check, and parse it with an argparse based parser. The
+parsers here handle the complete output of each tool in one pass over its
+lines (or JSON objects) and return a ``Ruleset`` of normalized ``Rule``
+objects that can be queried by family, table and chain:
+
+- ``family``: ipv4, ipv6, or the nftables family (inet, arp, bridge, netdev)
+- ``backend``: iptables or nftables
+- ``table``, ``chain`` and ``position`` (1-based, within the chain)
+- ``protocol``, ``source``, ``destination``, ``in_interface``,
+  ``out_interface``: strings (``!`` prefixed when negated) or None
+- ``sports``, ``dports``: lists of ports and ``first:last`` ranges
+- ``target``: the jump/goto target or the verdict (upper case), or None
+- ``comment``
+- ``options``: (iptables) the options of the rule, long names as keys and
+  lists of values
+- ``raw``: the rule as given (the iptables-save line or the nft rule)
+
+.. code-block:: python
+
+    import hubblestack.utils.netfilter
+
+    ruleset = hubblestack.utils.netfilter.parse_iptables_save(output, 'ipv4')
+    for rule in ruleset.select(table='filter', chain='INPUT'):
+        print(rule.protocol, rule.dports, rule.target)
+'''
+
+import json
+import logging
+import re
+
+log = logging.getLogger(__name__)
+
+IPTABLES = 'iptables'
+NFTABLES = 'nftables'
+
+# the tables iptables-nft creates in the ip and ip6 nftables families
+IPTABLES_NFT_TABLES = ('filter', 'nat', 'mangle', 'raw', 'security')
+
+_TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"|(\S+)')
+_ESCAPED = re.compile(r'\\(.)')
+
+_LONG_OPTIONS = {
+    '-p': '--protocol',
+    '-s': '--source',
+    '-d': '--destination',
+    '-i': '--in-interface',
+    '-o': '--out-interface',
+    '-j': '--jump',
+    '-g': '--goto',
+    '-m': '--match',
+    '-f': '--fragment',
+    '--src': '--source',
+    '--dst': '--destination',
+    '--sport': '--source-port',
+    '--dport': '--destination-port',
+    '--sports': '--source-ports',
+    '--dports': '--destination-ports',
+}
+
+_NFT_FAMILIES = {'ip': 'ipv4', 'ip6': 'ipv6'}
+_NFT_VERDICTS = ('accept', 'drop', 'reject', 'return', 'queue', 'continue', 'masquerade', 'snat', 'dnat',
+                 'redirect')
+
+
+class Rule(object):
+    '''
+    A normalized firewall rule
+    '''
+    __slots__ = ('family', 'backend', 'table', 'chain', 'position', 'protocol', 'source', 'destination',
+                 'in_interface', 'out_interface', 'sports', 'dports', 'target', 'comment', 'options', 'raw')
+
+    def __init__(self, family, backend, table, chain, position, raw):
+        self.family = family
+        self.backend = backend
+        self.table = table
+        self.chain = chain
+        self.position = position
+        self.raw = raw
+        self.protocol = self.source = self.destination = None
+        self.in_interface = self.out_interface = None
+        self.target = self.comment = None
+        self.sports = []
+        self.dports = []
+        self.options = {}
+
+    def as_dict(self):
+        '''
+        The rule as a dict
+        '''
+        return dict((attr, getattr(self, attr)) for attr in self.__slots__)
+
+    def __repr__(self):
+        return '<Rule {0} {1} {2} {3} #{4}>'.format(self.backend, self.family, self.table, self.chain,
+                                                    self.position)
+
+
+class Ruleset(object):
+    '''
+    The rules and chains of one or more snapshots
+    '''
+
+    def __init__(self):
+        self.rules = []
+        # (family, table, chain) -> {'policy': ..., 'packets': ..., 'bytes': ...}
+        self.chains = {}
+
+    def extend(self, other):
+        '''
+        Add the rules and chains of another Ruleset
+        '''
+        self.rules.extend(other.rules)
+        self.chains.update(other.chains)
+        return self
+
+    def select(self, family=None, table=None, chain=None, backend=None):
+        '''
+        Return the rules of the given family, table, chain and backend (all of
+        them when None), in order
+        '''
+        return [rule for rule in self.rules
+                if (family is None or rule.family == family) and (table is None or rule.table == table)
+                and (chain is None or rule.chain == chain) and (backend is None or rule.backend == backend)]
+
+    def policy(self, table, chain, family='ipv4'):
+        '''
+        The policy of a (built-in) chain, None if there is no such chain
+        '''
+        return self.chains.get((family, table, chain), {}).get('policy')
+
+
+def split_args(line):
+    '''
+    Split an iptables-save line into its arguments (double quoted arguments,
+    with backslash escapes, as iptables-save writes them)
+    '''
+    ret = []
+    for match in _TOKEN.finditer(line):
+        if match.group(2) is not None:
+            ret.append(match.group(2))
+        else:
+            ret.append(_ESCAPED.sub(r'\1', match.group(1)))
+    return ret
+
+
+def _ports(values):
+    ret = []
+    for value in values:
+        negated = value.startswith('!')
+        for port in value.lstrip('!').split(','):
+            if port:
+                ret.append(('!' if negated else '') + port)
+    return ret
+
+
+def _iptables_rule(rule, args):
+    options = rule.options
+    negated = False
+    idx = 0
+    while idx < len(args):
+        arg = args[idx]
+        idx += 1
+        if arg == '!':
+            negated = True
+            continue
+        if not arg.startswith('-'):
+            # a value following another one (e.g. --set-mark 1/0xff)
+            continue
+        option = _LONG_OPTIONS.get(arg, arg)
+        values = []
+        while idx < len(args) and args[idx] != '!' and not args[idx].startswith('-'):
+            values.append(args[idx])
+            idx += 1
+        # the old syntax puts the ! after the option
+        if idx + 1 < len(args) and args[idx] == '!' and not args[idx + 1].startswith('-'):
+            negated = True
+            values.append(args[idx + 1])
+            idx += 2
+        options.setdefault(option, []).append(('!' if negated else '') + ' '.join(values))
+        negated = False
+
+    def first(option):
+        return options[option][0] if option in options else None
+
+    rule.protocol = first('--protocol')
+    rule.source = first('--source')
+    rule.destination = first('--destination')
+    rule.in_interface = first('--in-interface')
+    rule.out_interface = first('--out-interface')
+    rule.target = first('--jump') or first('--goto')
+    rule.comment = first('--comment')
+    rule.sports = _ports(options.get('--source-port', []) + options.get('--source-ports', []))
+    rule.dports = _ports(options.get('--destination-port', []) + options.get('--destination-ports', []))
+    return rule
+
+
+def parse_iptables_save(text, family='ipv4'):
+    '''
+    Parse the output of iptables-save (or ip6tables-save, family ipv6), all
+    tables, into a Ruleset
+    '''
+    ruleset = Ruleset()
+    table = None
+    positions = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#') or line == 'COMMIT':
+            continue
+        if line.startswith('*'):
+            table = line[1:]
+        elif line.startswith(':'):
+            comps = line[1:].split()
+            if not comps:
+                continue
+            chain = {'policy': comps[1] if len(comps) > 1 and comps[1] != '-' else None,
+                     'packets': None, 'bytes': None}
+            if len(comps) > 2 and comps[2].startswith('['):
+                chain['packets'], _, chain['bytes'] = comps[2].strip('[]').partition(':')
+            ruleset.chains[(family, table, comps[0])] = chain
+        elif line.startswith('-A '):
+            args = split_args(line)
+            if len(args) < 2:
+                continue
+            key = (table, args[1])
+            positions[key] = positions.get(key, 0) + 1
+            rule = Rule(family, IPTABLES, table, args[1], positions[key], line)
+            ruleset.rules.append(_iptables_rule(rule, args[2:]))
+        else:
+            log.debug('Skipping unknown iptables-save line: %s', line)
+    return ruleset
+
+
+def _nft_value(value):
+    if isinstance(value, dict):
+        if 'set' in value:
+            return [item for element in value['set'] for item in _nft_value(element)]
+        if 'range' in value:
+            return ['{0}:{1}'.format(*value['range'])]
+        if 'prefix' in value:
+            return ['{0}/{1}'.format(value['prefix'].get('addr'), value['prefix'].get('len'))]
+        return [json.dumps(value, sort_keys=True)]
+    if isinstance(value, list):
+        return [item for element in value for item in _nft_value(element)]
+    return [str(value)]
+
+
+def _nft_match(rule, match):
+    left, right = match.get('left'), match.get('right')
+    if not isinstance(left, dict):
+        return
+    prefix = '!' if match.get('op') == '!=' else ''
+    values = [prefix + value for value in _nft_value(right)]
+    if 'payload' in left:
+        payload = left['payload']
+        field, protocol = payload.get('field'), payload.get('protocol')
+        if field in ('sport', 'dport'):
+            if protocol in ('tcp', 'udp', 'sctp', 'dccp', 'udplite') and rule.protocol is None:
+                rule.protocol = protocol
+            (rule.sports if field == 'sport' else rule.dports).extend(values)
+        elif field == 'saddr':
+            rule.source = ','.join(values)
+        elif field == 'daddr':
+            rule.destination = ','.join(values)
+    elif 'meta' in left:
+        key = left['meta'].get('key')
+        if key in ('l4proto', 'protocol') and len(values) == 1:
+            rule.protocol = values[0]
+        elif key in ('iifname', 'iif'):
+            rule.in_interface = ','.join(values)
+        elif key in ('oifname', 'oif'):
+            rule.out_interface = ','.join(values)
+
+
+def parse_nft_json(text):
+    '''
+    Parse the output of ``nft -j list ruleset`` into a Ruleset
+    '''
+    ruleset = Ruleset()
+    data = json.loads(text) if text.strip() else {}
+    positions = {}
+    for item in data.get('nftables', []):
+        if 'chain' in item:
+            chain = item['chain']
+            family = _NFT_FAMILIES.get(chain.get('family'), chain.get('family'))
+            ruleset.chains[(family, chain.get('table'), chain.get('name'))] = {
+                'policy': chain['policy'].upper() if chain.get('policy') else None,
+                'packets': None, 'bytes': None,
+                'hook': chain.get('hook'), 'type': chain.get('type')}
+        elif 'rule' in item:
+            raw = item['rule']
+            family = _NFT_FAMILIES.get(raw.get('family'), raw.get('family'))
+            key = (family, raw.get('table'), raw.get('chain'))
+            positions[key] = positions.get(key, 0) + 1
+            rule = Rule(family, NFTABLES, raw.get('table'), raw.get('chain'), positions[key], raw)
+            rule.comment = raw.get('comment')
+            for expr in raw.get('expr', []):
+                if not isinstance(expr, dict):
+                    continue
+                if 'match' in expr:
+                    _nft_match(rule, expr['match'])
+                elif 'jump' in expr or 'goto' in expr:
+                    rule.target = (expr.get('jump') or expr.get('goto')).get('target')
+                else:
+                    for verdict in _NFT_VERDICTS:
+                        if verdict in expr:
+                            rule.target = verdict.upper()
+                            break
+            ruleset.rules.append(rule)
+    return ruleset
+
+
+def snapshot(saves, nft=None):
+    '''
+    Return the Ruleset of the outputs of iptables-save by family (saves:
+    {'ipv4': ..., 'ipv6': ...}) and of ``nft -j list ruleset`` (nft). The
+    tables that iptables-nft manages show up in both; they are only taken
+    from the iptables-save output when there is one for their family.
+    '''
+    ruleset = Ruleset()
+    for family, text in sorted(saves.items()):
+        ruleset.extend(parse_iptables_save(text, family))
+    if nft:
+        try:
+            nft_ruleset = parse_nft_json(nft)
+        except ValueError as exc:
+            log.warning('Unable to parse the nftables ruleset: %s', exc)
+        else:
+            def _duplicate(family, table):
+                return family in saves and table in IPTABLES_NFT_TABLES
+            nft_ruleset.rules = [rule for rule in nft_ruleset.rules if not _duplicate(rule.family, rule.table)]
+            for key in list(nft_ruleset.chains):
+                if _duplicate(key[0], key[1]):
+                    del nft_ruleset.chains[key]
+            ruleset.extend(nft_ruleset)
+    return ruleset
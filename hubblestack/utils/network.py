@@ -10,6 +10,7 @@ import logging
 import subprocess
 import socket
 import platform
+import time
 
 from hubblestack.utils.versions import LooseVersion
 import hubblestack.utils.path
@@ -670,3 +671,189 @@ def generate_minion_id():
     except TypeError:
         ret = None
     return ret or 'localhost'
+
+
+# Socket inventory from /proc/net (Linux)
+
+TCP_STATES = {
+    '01': 'ESTABLISHED', '02': 'SYN_SENT', '03': 'SYN_RECV', '04': 'FIN_WAIT1',
+    '05': 'FIN_WAIT2', '06': 'TIME_WAIT', '07': 'CLOSE', '08': 'CLOSE_WAIT',
+    '09': 'LAST_ACK', '0A': 'LISTEN', '0B': 'CLOSING',
+}
+
+# socket inode -> 'pid/program' from the last scan of /proc/*/fd, reused for
+# SOCKET_OWNERS_CACHE_TIME seconds so that several checks in the same run
+# share one scan
+SOCKET_OWNERS_CACHE_TIME = 10
+_SOCKET_OWNERS = {'time': None, 'owners': {}}
+
+
+def hex2ip(hex_ip, invert=False):
+    '''
+    Convert a hex string to an ip, if a failure occurs the original hex is
+    returned. If 'invert=True' assume that ip from /proc/net/<proto>
+    '''
+    if len(hex_ip) == 32:  # ipv6
+        ip_addr = []
+        for i in range(0, 32, 8):
+            ip_part = hex_ip[i:i + 8]
+            ip_part = [ip_part[x:x + 2] for x in range(0, 8, 2)]
+            if invert:
+                ip_addr.append('{0[3]}{0[2]}:{0[1]}{0[0]}'.format(ip_part))
+            else:
+                ip_addr.append('{0[0]}{0[1]}:{0[2]}{0[3]}'.format(ip_part))
+        try:
+            address = ipaddress.IPv6Address(':'.join(ip_addr))
+            if address.ipv4_mapped:
+                return '::ffff:{0}'.format(address.ipv4_mapped)
+            return address.compressed
+        except ipaddress.AddressValueError as ex:
+            log.error('hex2ip - ipv6 address error: %s', ex)
+            return hex_ip
+
+    try:
+        hip = int(hex_ip, 16)
+    except ValueError:
+        return hex_ip
+    if invert:
+        return '{3}.{2}.{1}.{0}'.format(*[hip >> i & 0xff for i in (24, 16, 8, 0)])
+    return '{0}.{1}.{2}.{3}'.format(*[hip >> i & 0xff for i in (24, 16, 8, 0)])
+
+
+def _proc_net_sockets(proto):
+    '''
+    Yield the fields of each socket in /proc/net/<proto>, reading the file
+    line by line
+    '''
+    try:
+        with open('/proc/net/{0}'.format(proto), 'r') as proc_file:
+            next(proc_file, None)  # header
+            for line in proc_file:
+                comps = line.split()
+                if len(comps) >= 10:
+                    yield comps
+    except (IOError, OSError) as exc:
+        log.debug('Unable to read /proc/net/%s: %s', proto, exc)
+
+
+def _proc_net_address(hex_address):
+    hex_ip, hex_port = hex_address.split(':')
+    return hex2ip(hex_ip, invert=True), int(hex_port, 16)
+
+
+def _program_name(pid):
+    '''
+    The name of the program of ``pid`` as netstat shows it: the basename of
+    its first argument, else its command name
+    '''
+    try:
+        with open('/proc/{0}/cmdline'.format(pid), 'rb') as cmdline:
+            name = cmdline.read().split(b'\0')[0]
+        if name:
+            return os.path.basename(name.decode('utf-8', 'replace'))
+        with open('/proc/{0}/comm'.format(pid), 'rb') as comm:
+            return comm.read().strip().decode('utf-8', 'replace')
+    except (IOError, OSError):
+        return None
+
+
+def socket_owners(refresh=False):
+    '''
+    Return a dict of socket inode (str) -> 'pid/program' for the sockets open
+    in the processes we can see, from a single scan of /proc/*/fd. The result
+    is reused for SOCKET_OWNERS_CACHE_TIME seconds unless ``refresh``.
+    '''
+    now = time.time()
+    cached = _SOCKET_OWNERS['time']
+    if not refresh and cached is not None and 0 <= now - cached < SOCKET_OWNERS_CACHE_TIME:
+        return _SOCKET_OWNERS['owners']
+
+    owners = {}
+    try:
+        pids = [entry.name for entry in os.scandir('/proc') if entry.name.isdigit()]
+    except OSError:
+        pids = []
+    for pid in pids:
+        fd_dir = '/proc/{0}/fd'.format(pid)
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        name = None
+        for fd in fds:
+            try:
+                link = os.readlink(os.path.join(fd_dir, fd))
+            except OSError:
+                continue
+            if not link.startswith('socket:['):
+                continue
+            inode = link[8:-1]
+            if inode in owners:
+                continue
+            if name is None:
+                name = _program_name(pid) or ''
+            # netstat truncates 'pid/program' to 19 characters
+            owners[inode] = '{0}/{1}'.format(pid, name)[:19]
+    _SOCKET_OWNERS['time'] = now
+    _SOCKET_OWNERS['owners'] = owners
+    return owners
+
+
+def proc_netstat():
+    '''
+    Return the tcp and udp sockets (IPv4 and IPv6) listed in /proc/net in the
+    same form as network.netstat parses from ``netstat -tulpnea``: a list of
+    dicts with proto, recv-q, send-q, local-address, remote-address, state
+    (tcp only), user (uid), inode and program ('pid/name', or '-' if the
+    owner isn't visible).
+    '''
+    ret = []
+    owners = None
+    for proto in ('tcp', 'tcp6', 'udp', 'udp6'):
+        for comps in _proc_net_sockets(proto):
+            if owners is None:
+                owners = socket_owners()
+            local = _format_address(*_proc_net_address(comps[1]))
+            remote = _format_address(*_proc_net_address(comps[2]))
+            tx_queue, rx_queue = comps[4].split(':')
+            inode = comps[9]
+            sock = {
+                'proto': proto,
+                'recv-q': str(int(rx_queue, 16)),
+                'send-q': str(int(tx_queue, 16)),
+                'local-address': local,
+                'remote-address': remote,
+            }
+            if proto.startswith('tcp'):
+                sock['state'] = TCP_STATES.get(comps[3], 'UNKNOWN')
+            sock.update({
+                'user': comps[7],
+                'inode': inode,
+                'program': owners.get(inode, '-'),
+            })
+            ret.append(sock)
+    return ret
+
+
+def _format_address(address, port):
+    return '{0}:{1}'.format(address, port if port else '*')
+
+
+def active_tcp():
+    '''
+    Return a dict describing all active tcp connections as quickly as possible
+    '''
+    ret = {}
+    for proto in ('tcp', 'tcp6'):
+        for comps in _proc_net_sockets(proto):
+            if comps[3] != '01':  # ESTABLISHED
+                continue
+            local_addr, local_port = _proc_net_address(comps[1])
+            remote_addr, remote_port = _proc_net_address(comps[2])
+            ret[len(ret)] = {
+                'local_addr': local_addr,
+                'local_port': local_port,
+                'remote_addr': remote_addr,
+                'remote_port': remote_port,
+            }
+    return ret
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+'''
+Bounded, order-preserving concurrent execution of independent callables.
+
+Tasks run on daemon threads so that a task which never returns (a hung git
+fetch, an unresponsive metadata endpoint) can be abandoned once its timeout
+expires without blocking the caller or interpreter shutdown. An abandoned
+task's worker is replaced so the remaining tasks keep their full concurrency;
+the abandoned thread exits quietly when (if) its task eventually finishes.
+
+.. code-block:: python
+
+    import hubblestack.utils.parallel
+
+    results = hubblestack.utils.parallel.run_tasks(
+        [('a', fetch_a), ('b', fetch_b, 30)], workers=4, timeout=60)
+    for res in results:  # same order as the tasks
+        if res.ok:
+            use(res.value)
+'''
+
+import logging
+import queue
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class TaskResult(object):
+    '''
+    Outcome of a single task
+
+    * key: the key given with the task
+    * value: the return value of the task (None unless ok)
+    * exc: the exception raised by the task, if any
+    * timed_out: the task was abandoned (or never started) due to a timeout
+    * started: the time the task started running (None if it never ran)
+    * duration: run time in seconds (time until abandoned, if timed out)
+    '''
+
+    def __init__(self, key):
+        self.key = key
+        self.value = None
+        self.exc = None
+        self.timed_out = False
+        self.started = None
+        self.duration = None
+
+    @property
+    def ok(self):
+        ''' True if the task ran to completion without raising '''
+        return self.duration is not None and self.exc is None and not self.timed_out
+
+    def __repr__(self):
+        return '<TaskResult {0!r} ok={1} timed_out={2} duration={3}>'.format(
+            self.key, self.ok, self.timed_out, self.duration)
+
+
+def _normalize_task(task, timeout):
+    if callable(task):
+        return task, task, timeout
+    if len(task) == 2:
+        return task[0], task[1], timeout
+    return task[0], task[1], task[2]
+
+
+def run_tasks(tasks, workers=4, timeout=None, deadline=None, name='hubble-task'):
+    '''
+    Run tasks with at most ``workers`` running at once and return a list of
+    TaskResult in the same order as ``tasks``.
+
+    tasks
+        An iterable of callables, ``(key, func)`` or ``(key, func, timeout)``
+        tuples. The callables take no arguments.
+
+    workers
+        Maximum number of tasks running at the same time. With ``workers=1``
+        and no timeouts the tasks are simply run inline, one after the other.
+
+    timeout
+        Default per-task timeout in seconds, measured from when the task
+        starts running (not from when it was queued). None or 0 means no
+        timeout. A per-task timeout given in the task tuple takes precedence.
+
+    deadline
+        Overall limit in seconds for the whole batch. When reached, running
+        tasks are abandoned and unstarted tasks are never run; both are
+        reported as timed_out.
+    '''
+    tasks = [_normalize_task(task, timeout) for task in tasks]
+    results = [TaskResult(key) for key, _, _ in tasks]
+    if not tasks:
+        return results
+
+    try:
+        workers = max(1, min(int(workers or 1), len(tasks)))
+    except (TypeError, ValueError):
+        workers = 1
+
+    if workers == 1 and not deadline and not any(t_o for _, _, t_o in tasks):
+        for (_, func, _), res in zip(tasks, results):
+            res.started = time.time()
+            try:
+                res.value = func()
+            except Exception as exc:
+                res.exc = exc
+            res.duration = time.time() - res.started
+        return results
+
+    todo = queue.Queue()
+    for idx in range(len(tasks)):
+        todo.put(idx)
+    cond = threading.Condition()
+    finished = set()
+
+    def _work():
+        while True:
+            try:
+                idx = todo.get_nowait()
+            except queue.Empty:
+                return
+            res = results[idx]
+            with cond:
+                if idx in finished:
+                    continue
+                res.started = time.time()
+                cond.notify_all()
+            value = exc = None
+            try:
+                value = tasks[idx][1]()
+            except Exception as err:
+                exc = err
+            with cond:
+                if idx in finished:
+                    # abandoned while running and already replaced by
+                    # another worker
+                    log.debug('abandoned task %s finished after %.2fs',
+                              res.key, time.time() - res.started)
+                    return
+                res.value, res.exc = value, exc
+                res.duration = time.time() - res.started
+                finished.add(idx)
+                cond.notify_all()
+
+    def _spawn():
+        thread = threading.Thread(target=_work, name=name)
+        thread.daemon = True
+        thread.start()
+
+    def _abandon(idx, now):
+        res = results[idx]
+        res.timed_out = True
+        if res.started is not None:
+            res.duration = now - res.started
+        finished.add(idx)
+
+    end = time.time() + deadline if deadline else None
+    with cond:
+        for _ in range(workers):
+            _spawn()
+        while len(finished) < len(tasks):
+            now = time.time()
+            wait = None
+            for idx, res in enumerate(results):
+                if idx in finished or res.started is None:
+                    continue
+                t_o = tasks[idx][2]
+                if not t_o:
+                    continue
+                left = res.started + t_o - now
+                if left <= 0:
+                    log.error('task %s timed out after %ss', res.key, t_o)
+                    _abandon(idx, now)
+                    if not todo.empty():
+                        _spawn()
+                    continue
+                wait = left if wait is None else min(wait, left)
+            if end is not None:
+                left = end - now
+                if left <= 0:
+                    for idx in range(len(tasks)):
+                        if idx not in finished:
+                            _abandon(idx, now)
+                    log.error('deadline of %ss reached, abandoned unfinished tasks', deadline)
+                    break
+                wait = left if wait is None else min(wait, left)
+            if len(finished) < len(tasks):
+                cond.wait(wait)
+    return results
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+'''
+Change detection for the installed package list.
+
+``pkg.list_pkgs`` runs ``rpm -qa``/``dpkg-query`` and parses its output, then
+keeps the result in ``__context__['pkg.list_pkgs']``. The daemon used to drop
+that result on every refresh so that package changes were picked up; with the
+stamp of the package database files (mtime, ctime, size and inode, which
+every package manager transaction changes) it only does so once the database
+actually changed, and ``pkg.list_pkgs`` checks that stamp itself before
+using its list.
+
+``generation()`` is a counter bumped each time the stamp changes (None when
+no known database is found, changes can't be told then). Consumers that
+derive something from the package list can keep it for as long as the
+generation stays the same; ``refresh_context()`` does that for the list kept
+by ``pkg.list_pkgs`` in ``__context__``.
+
+.. code-block:: python
+
+    import hubblestack.utils.pkg.inventory
+
+    generation = hubblestack.utils.pkg.inventory.generation()
+    if generation is None or generation != cached_generation:
+        packages = __mods__['pkg.list_pkgs']()
+'''
+
+import logging
+import os
+import threading
+
+log = logging.getLogger(__name__)
+
+CONTEXT_KEY = 'pkg.list_pkgs'
+GENERATION_KEY = 'pkg.list_pkgs_generation'
+
+DATABASES = ('/var/lib/rpm/Packages', '/var/lib/rpm/rpmdb.sqlite',
+             '/var/lib/rpm/rpmdb.sqlite-wal', '/usr/lib/sysimage/rpm/rpmdb.sqlite',
+             '/usr/lib/sysimage/rpm/rpmdb.sqlite-wal', '/var/lib/dpkg/status',
+             '/lib/apk/db/installed', '/var/lib/pacman/local')
+
+_STATE = {'stamp': None, 'generation': 0}
+_LOCK = threading.Lock()
+
+
+def stamp(databases=DATABASES):
+    '''
+    Return the stamp of the package databases found on this system: a list of
+    [path, [mtime_ns, ctime_ns, size, inode]], or None if there is none
+    '''
+    ret = []
+    for path in databases:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        ret.append([path, [st.st_mtime_ns, st.st_ctime_ns, st.st_size, st.st_ino]])
+    return ret or None
+
+
+def generation(databases=DATABASES):
+    '''
+    Return the generation of the installed package list, bumped whenever the
+    package databases changed since the previous call, or None if there is
+    no known package database
+    '''
+    current = stamp(databases)
+    if current is None:
+        return None
+    with _LOCK:
+        if current != _STATE['stamp']:
+            _STATE['stamp'] = current
+            _STATE['generation'] += 1
+        return _STATE['generation']
+
+
+def refresh_context(context, databases=DATABASES):
+    '''
+    Drop the package list kept in context by ``pkg.list_pkgs`` if the package
+    databases changed since it was listed (the first call only records the
+    generation). Returns the generation; when it is None (no known package
+    database) the list is left alone.
+    '''
+    current = generation(databases)
+    if current is not None and context.get(GENERATION_KEY) != current:
+        if GENERATION_KEY in context and CONTEXT_KEY in context:
+            log.debug('The package databases changed, the package list will be listed again')
+            context.pop(CONTEXT_KEY)
+        context[GENERATION_KEY] = current
+    return current
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+'''
+Reverse DNS resolution of many addresses at once, bounded in time.
+
+The fqdns grain resolves the name of every address of the host; done one
+after the other, a slow or broken resolver blocks the grains refresh for its
+timeout times the number of addresses. ``resolve()`` runs the lookups on a
+bounded number of threads (hubblestack.utils.parallel), abandons a lookup
+after ``timeout`` seconds and the whole batch after ``deadline`` seconds, and
+keeps the outcome of each address for the next refreshes: names for ``ttl``
+seconds, and the lack of them (no name, an error, a lookup that didn't finish
+in time) for ``negative_ttl`` seconds. A lookup that is abandoned still
+records its outcome in the cache whenever it finishes.
+
+.. code-block:: python
+
+    import hubblestack.utils.rdns
+
+    names = hubblestack.utils.rdns.resolve(['10.1.2.3', 'fe80::1'], workers=8,
+                                           timeout=5, deadline=10)
+    # or with the fqdns_* options
+    names = hubblestack.utils.rdns.resolve(addresses, **hubblestack.utils.rdns.resolve_args(__opts__))
+    # {'10.1.2.3': ['host.example.com'], 'fe80::1': []}
+'''
+
+import logging
+import socket
+import threading
+import time
+
+import hubblestack.utils.parallel
+
+log = logging.getLogger(__name__)
+
+POSITIVE_TTL = 3600
+NEGATIVE_TTL = 300
+
+# h_errno values (netdb.h) telling that the address has no name
+_NO_NAME = (0, 1, 4)  # -, HOST_NOT_FOUND, NO_DATA
+
+# address -> (expires, [names])
+_CACHE = {}
+_LOCK = threading.Lock()
+
+
+def gethostbyaddr(address):
+    '''
+    Return the FQDNs of address, an empty list if it has none
+    '''
+    try:
+        name = socket.gethostbyaddr(address)[0]
+    except socket.herror as err:
+        if err.errno in _NO_NAME:
+            # No FQDN for this IP address, so we don't need to know this all the time.
+            log.debug('Unable to resolve address %s: %s', address, err)
+            return []
+        raise
+    return [socket.getfqdn(name)]
+
+
+def _store(address, names, ttl, replace=True):
+    with _LOCK:
+        entry = _CACHE.get(address)
+        if replace or not entry or entry[0] <= time.time():
+            _CACHE[address] = (time.time() + ttl, names)
+
+
+def clear():
+    '''
+    Forget the outcome of all the lookups
+    '''
+    with _LOCK:
+        _CACHE.clear()
+
+
+def resolve_args(opts):
+    '''
+    The resolve() arguments from the fqdns_* options (fqdns_workers,
+    fqdns_timeout, fqdns_deadline, fqdns_ttl, fqdns_negative_ttl)
+    '''
+    return {'workers': opts.get('fqdns_workers', 8),
+            'timeout': opts.get('fqdns_timeout', 5),
+            'deadline': opts.get('fqdns_deadline', 10),
+            'ttl': opts.get('fqdns_ttl', POSITIVE_TTL),
+            'negative_ttl': opts.get('fqdns_negative_ttl', NEGATIVE_TTL)}
+
+
+def resolve(addresses, workers=8, timeout=5, deadline=10, ttl=POSITIVE_TTL, negative_ttl=NEGATIVE_TTL,
+            resolver=gethostbyaddr):
+    '''
+    Return a dict mapping each address to the list of its FQDNs (empty if it
+    has none or it couldn't be resolved in time).
+
+    workers
+        Maximum number of lookups running at once
+
+    timeout
+        Seconds after which a lookup is abandoned (0: no limit)
+
+    deadline
+        Seconds after which all the lookups still running or not started are
+        abandoned (0: no limit)
+
+    ttl, negative_ttl
+        Seconds for which the names of an address, or the lack of them, are
+        reused
+
+    resolver
+        The function returning the names of an address
+    '''
+    ret = {}
+    todo = []
+    now = time.time()
+    with _LOCK:
+        for address in addresses:
+            entry = _CACHE.get(address)
+            if entry and entry[0] > now:
+                ret[address] = list(entry[1])
+            elif address not in todo:
+                todo.append(address)
+    if not todo:
+        return ret
+
+    def _task(address):
+        def _lookup():
+            names = resolver(address)
+            _store(address, names, ttl if names else negative_ttl)
+            return names
+        return address, _lookup
+
+    start = time.time()
+    results = hubblestack.utils.parallel.run_tasks([_task(address) for address in todo], workers=workers,
+                                                   timeout=timeout, deadline=deadline, name='hubble-rdns')
+    for res in results:
+        if res.ok:
+            ret[res.key] = list(res.value)
+            continue
+        if res.timed_out:
+            log.warning('Resolving address %s timed out', res.key)
+        else:
+            log.error('An exception occurred resolving address \'%s\': %s', res.key, res.exc)
+        # an abandoned lookup that finished in the meantime already recorded its outcome
+        _store(res.key, [], negative_ttl, replace=res.exc is not None)
+        ret[res.key] = []
+    log.debug('Resolved %d address(es) in %.2f seconds', len(todo), time.time() - start)
+    return ret
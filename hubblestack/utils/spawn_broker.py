@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+'''
+A helper process that spawns commands on behalf of the daemon.
+
+The daemon grows large (loaders, grains, profile and osquery data) and every
+``subprocess.Popen()`` from it has the kernel duplicate (and then tear down)
+the page tables of that whole address space. With the broker started, a
+small helper process is forked once, early, and TimedProc hands it the
+commands to start; it sends back the pid, then the output and return code.
+
+Only plain invocations go through the broker: waited for, with stdout and
+stderr captured and no runas/group/umask (which need a ``preexec_fn`` in the
+daemon). Everything else, and everything when the broker isn't running (not
+started, or it died, or we're a forked child of the daemon), is spawned
+directly as before.
+
+.. code-block:: python
+
+    import hubblestack.utils.spawn_broker
+
+    hubblestack.utils.spawn_broker.BROKER.start()
+'''
+
+import errno
+import itertools
+import logging
+import os
+import pickle
+import queue
+import signal
+import socket
+import struct
+import subprocess
+import threading
+
+log = logging.getLogger(__name__)
+
+_HEADER = struct.Struct('!I')
+_KWARGS = ('cwd', 'env', 'shell', 'executable', 'close_fds')
+
+
+def _send(sock, lock, message):
+    # the socket pair is only shared with our own forked helper
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    with lock:
+        sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv(sock):
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    data = _recv_exactly(sock, _HEADER.unpack(header)[0])
+    if data is None:
+        return None
+    return pickle.loads(data)
+
+
+def _kill_group(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        proc.kill()
+
+
+def _serve_request(sock, lock, request):
+    # each command gets its own process group, so that a timeout kills what
+    # it started too (the shell of a python_shell command and its children)
+    try:
+        proc = subprocess.Popen(request['args'],
+                                stdin=subprocess.PIPE if request['stdin'] is not None else None,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                start_new_session=True, **request['kwargs'])
+    except (OSError, ValueError, TypeError) as exc:
+        _send(sock, lock, {'id': request['id'], 'error': (type(exc).__name__,
+                                                          getattr(exc, 'errno', None),
+                                                          getattr(exc, 'strerror', None) or str(exc),
+                                                          getattr(exc, 'filename', None))})
+        return
+    _send(sock, lock, {'id': request['id'], 'pid': proc.pid})
+    try:
+        stdout, stderr = proc.communicate(input=request['stdin'], timeout=request['timeout'])
+    except subprocess.TimeoutExpired:
+        _kill_group(proc)
+        # reply right away: a process that left the group may still hold the
+        # pipes, they are drained (and the command reaped) afterwards
+        _send(sock, lock, {'id': request['id'], 'returncode': None,
+                           'stdout': b'', 'stderr': b'', 'timed_out': True})
+        proc.communicate()
+        return
+    _send(sock, lock, {'id': request['id'], 'returncode': proc.returncode,
+                       'stdout': stdout, 'stderr': stderr, 'timed_out': False})
+
+
+def _serve(sock):
+    '''
+    The helper process: run each request on its own thread until the daemon
+    closes its end of the socket
+    '''
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    lock = threading.Lock()
+    while True:
+        request = _recv(sock)
+        if request is None:
+            return
+        thread = threading.Thread(target=_serve_request, args=(sock, lock, request))
+        thread.daemon = True
+        thread.start()
+
+
+class BrokerError(Exception):
+    '''
+    The broker went away before the command finished
+    '''
+
+
+class BrokeredProcess(object):
+    '''
+    Stands in for the ``subprocess.Popen`` object of a command spawned by the
+    broker (pid and returncode)
+    '''
+
+    def __init__(self, command_id, replies):
+        self.id = command_id
+        self.pid = None
+        self.returncode = None
+        self.timed_out = False
+        self._replies = replies
+
+    def communicate(self):
+        '''
+        Wait for the command to finish and return its (stdout, stderr)
+        '''
+        reply = self._replies.get()
+        if reply is None:
+            raise BrokerError('command broker exited')
+        self.returncode = reply['returncode']
+        self.timed_out = reply['timed_out']
+        return reply['stdout'], reply['stderr']
+
+
+class Broker(object):
+    '''
+    The daemon's end of the spawn broker
+    '''
+
+    def __init__(self):
+        self.pid = None
+        self._owner = None
+        self._sock = None
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._closed = True
+        self._waiting = {}
+        self._ids = itertools.count()
+
+    @property
+    def running(self):
+        ''' True if commands of this process can go through the broker '''
+        return self._sock is not None and self._owner == os.getpid()
+
+    def start(self):
+        '''
+        Fork the helper process. Call this early, while the daemon is small.
+        '''
+        if self.running:
+            return
+        parent, child = socket.socketpair()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                parent.close()
+                _serve(child)
+            finally:
+                os._exit(0)
+        child.close()
+        self._sock, self._owner, self.pid = parent, os.getpid(), pid
+        self._closed = False
+        reader = threading.Thread(target=self._read, args=(parent,), name='spawn-broker')
+        reader.daemon = True
+        reader.start()
+        log.info('Started command spawn broker (pid %s)', pid)
+
+    def stop(self):
+        '''
+        Stop the helper process (commands are then spawned directly)
+        '''
+        sock, self._sock = self._sock, None
+        if sock is not None and self._owner == os.getpid():
+            try:
+                # wakes up the reader thread, and the helper sees EOF
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+            try:
+                os.waitpid(self.pid, 0)
+            except OSError:
+                pass
+
+    def _read(self, sock):
+        while True:
+            try:
+                reply = _recv(sock)
+            except (OSError, pickle.PickleError, EOFError):
+                reply = None
+            if reply is None:
+                break
+            replies = self._waiting.get(reply['id'])
+            if replies is not None:
+                replies.put(reply)
+        with self._state_lock:
+            if self._sock is sock:
+                log.error('Command spawn broker exited, spawning commands directly')
+                self._sock = None
+            self._closed = True
+            for replies in self._waiting.values():
+                replies.put(None)
+
+    @staticmethod
+    def can_spawn(args, kwargs):
+        '''
+        True if the Popen ``args`` and ``kwargs`` can be handed to the broker
+        '''
+        if any(key not in _KWARGS + ('stdin', 'stdout', 'stderr') for key in kwargs):
+            return False
+        if kwargs.get('stdout') != subprocess.PIPE or kwargs.get('stderr') != subprocess.PIPE:
+            return False
+        if kwargs.get('shell'):
+            if not isinstance(args, str):
+                return False
+        elif not isinstance(args, (list, tuple)) or not all(isinstance(arg, str) for arg in args):
+            return False
+        env = kwargs.get('env')
+        if env is not None and not all(isinstance(key, str) and isinstance(val, str)
+                                       for key, val in env.items()):
+            return False
+        return True
+
+    def spawn(self, args, kwargs, stdin=None, timeout=None):
+        '''
+        Start a command through the broker and return its BrokeredProcess,
+        or None if the broker isn't available. Raises what Popen() would if
+        the command can't be started.
+        '''
+        if not self.running:
+            return None
+        command_id = next(self._ids)
+        replies = queue.Queue()
+        with self._state_lock:
+            if self._closed:
+                return None
+            self._waiting[command_id] = replies
+        request = {'id': command_id, 'args': args, 'stdin': stdin, 'timeout': timeout or None,
+                   'kwargs': dict((key, kwargs[key]) for key in _KWARGS if key in kwargs)}
+        try:
+            _send(self._sock, self._lock, request)
+        except (OSError, AttributeError):
+            self._waiting.pop(command_id, None)
+            return None
+        reply = replies.get()
+        if reply is None:
+            self._waiting.pop(command_id, None)
+            return None
+        if 'error' in reply:
+            self._waiting.pop(command_id, None)
+            name, err, strerror, filename = reply['error']
+            if name == 'ValueError':
+                raise ValueError(strerror)
+            if name == 'TypeError':
+                raise TypeError(strerror)
+            raise OSError(err or errno.EIO, strerror, filename)
+        proc = BrokeredProcess(command_id, _Replies(self._waiting, command_id, replies))
+        proc.pid = reply['pid']
+        return proc
+
+
+class _Replies(object):
+    '''
+    The rest of the replies for a command, forgotten once the last one arrives
+    '''
+
+    def __init__(self, waiting, command_id, replies):
+        self._waiting = waiting
+        self._id = command_id
+        self._replies = replies
+
+    def get(self):
+        try:
+            return self._replies.get()
+        finally:
+            self._waiting.pop(self._id, None)
+
+
+BROKER = Broker()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+'''
+Read Linux kernel parameters straight from ``/proc/sys``.
+
+``sysctl -n <key>`` does nothing more than read ``/proc/sys/<key path>``;
+profiles check dozens of keys per run and spawning a ``sysctl`` for each of
+them is most of the cost of those checks. The functions here read the files
+directly, one or many at a time.
+
+Keys are translated the way ``sysctl`` does: in the dotted form
+(``net.ipv4.conf.eth0/1.rp_filter``) dots separate the path components and a
+``/`` stands for a dot inside a component (``net/ipv4/conf/eth0.1/rp_filter``);
+a key using ``/`` before any ``.`` is taken as a path as is.
+
+Values are returned as ``sysctl -n`` prints them (through ``cmd.run``): the
+content of the file without the trailing whitespace, fields separated by
+tabs.
+
+.. code-block:: python
+
+    import hubblestack.utils.sysctl
+
+    if hubblestack.utils.sysctl.available():
+        values = hubblestack.utils.sysctl.snapshot(['kernel.randomize_va_space',
+                                                   'net.ipv4.conf.*.accept_redirects'])
+'''
+
+import errno
+import fnmatch
+import logging
+import os
+import stat
+
+log = logging.getLogger(__name__)
+
+PROC_SYS = '/proc/sys'
+
+_GLOB_CHARS = '*?['
+
+
+def available(root=PROC_SYS):
+    '''
+    True if the kernel parameters can be read from root
+    '''
+    return os.path.isdir(os.path.join(root, 'kernel'))
+
+
+def is_glob(key):
+    '''
+    True if key is a pattern rather than the name of a single parameter
+    '''
+    return any(char in key for char in _GLOB_CHARS)
+
+
+def key_to_path(key, root=PROC_SYS):
+    '''
+    Return the path of the file of the kernel parameter key
+    '''
+    key = key.strip()
+    slash, dot = key.find('/'), key.find('.')
+    if slash == -1 or (dot != -1 and dot < slash):
+        # dotted form: swap the separators
+        key = key.translate(str.maketrans('./', '/.'))
+    return os.path.join(root, key.strip('/'))
+
+
+def path_to_key(path, root=PROC_SYS):
+    '''
+    Return the (dotted) key of the kernel parameter file path
+    '''
+    return os.path.relpath(path, root).translate(str.maketrans('/.', './'))
+
+
+def read(key, root=PROC_SYS):
+    '''
+    Return the value of the kernel parameter key, or None if there is no such
+    parameter (or it can't be read, like the write-only ones)
+    '''
+    path = key_to_path(key, root)
+    try:
+        with open(path, 'r') as file_handle:
+            return file_handle.read().rstrip()
+    except (IOError, OSError) as exc:
+        if exc.errno not in (errno.ENOENT, errno.ENOTDIR, errno.EISDIR):
+            log.debug('Unable to read kernel parameter %s: %s', key, exc)
+        return None
+
+
+def read_glob(pattern, root=PROC_SYS):
+    '''
+    Return a dict of the values of all the (readable) kernel parameters whose
+    dotted key matches the shell-style pattern, like ``sysctl -a`` does.
+    Only the tree below the literal prefix of the pattern is walked.
+    '''
+    parts = pattern.strip().split('.')
+    prefix = []
+    for part in parts[:-1]:
+        if is_glob(part):
+            break
+        prefix.append(part)
+    top = key_to_path('.'.join(prefix), root) if prefix else root
+    pattern = path_to_key(key_to_path(pattern, root), root)
+    ret = {}
+    for dirpath, dirnames, filenames in os.walk(top):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            key = path_to_key(path, root)
+            if not fnmatch.fnmatchcase(key, pattern):
+                continue
+            try:
+                if not os.stat(path).st_mode & stat.S_IRUSR:
+                    continue
+            except OSError:
+                continue
+            value = read(key, root)
+            if value is not None:
+                ret[key] = value
+    return ret
+
+
+def snapshot(keys, root=PROC_SYS):
+    '''
+    Read the given keys (names or patterns) at once. Returns a dict mapping
+    each name to its value (None if there is no such parameter) and each
+    pattern to the dict of the parameters it matches.
+    '''
+    ret = {}
+    for key in keys:
+        if key in ret:
+            continue
+        ret[key] = read_glob(key, root) if is_glob(key) else read(key, root)
+    return ret
@@ -7,8 +7,12 @@ import shlex
 import subprocess
 import threading
 import hubblestack.exceptions
+import hubblestack.status
 import hubblestack.utils.data
 import hubblestack.utils.stringutils
+from hubblestack.utils.spawn_broker import BROKER, BrokeredProcess, BrokerError
+
+HSS = hubblestack.status.HubbleStatus(__name__, 'spawn', 'brokered_spawn')
 
 class TimedProc(object):
     '''
@@ -43,6 +47,18 @@ class TimedProc(object):
         if kwargs.get('shell', False):
             args = hubblestack.utils.data.decode(args, to_str=True)
 
+        self.process = None
+        if self.wait and self.with_communicate and BROKER.can_spawn(args, kwargs):
+            self._stat = HSS.mark('brokered_spawn')
+            self.process = BROKER.spawn(args, kwargs, self.stdin, self.timeout)
+        if self.process is None:
+            self._stat = HSS.mark('spawn')
+            self._popen(args, kwargs)
+        self.command = args
+        if not self.wait:
+            self._stat.fin()
+
+    def _popen(self, args, kwargs):
         try:
             self.process = subprocess.Popen(args, **kwargs)
         except (AttributeError, TypeError):
@@ -71,13 +87,34 @@ class TimedProc(object):
                     kwargs['env'][str(key)] = kwargs['env'].pop(key)
             args = hubblestack.utils.data.decode(args)
             self.process = subprocess.Popen(args, **kwargs)
-        self.command = args
 
     def run(self):
         '''
         wait for subprocess to terminate and return subprocess' return code.
         If timeout is reached, throw TimedProcTimeoutError
         '''
+        try:
+            return self._run()
+        finally:
+            if self.wait:
+                self._stat.fin()
+
+    def _run(self):
+        if isinstance(self.process, BrokeredProcess):
+            try:
+                self.stdout, self.stderr = self.process.communicate()
+            except BrokerError:
+                raise hubblestack.exceptions.TimedProcTimeoutError(
+                    '{0} : Command broker exited'.format(self.command))
+            if self.process.timed_out:
+                raise hubblestack.exceptions.TimedProcTimeoutError(
+                    '{0} : Timed out after {1} seconds'.format(
+                        self.command,
+                        str(self.timeout),
+                    )
+                )
+            return self.process.returncode
+
         def receive():
             if self.with_communicate:
                 self.stdout, self.stderr = self.process.communicate(input=self.stdin)
@@ -90,12 +127,12 @@ class TimedProc(object):
             rt = threading.Thread(target=receive)
             rt.start()
             rt.join(self.timeout)
-            if rt.isAlive():
+            if rt.is_alive():
                 # Subprocess cleanup (best effort)
                 self.process.kill()
 
                 def terminate():
-                    if rt.isAlive():
+                    if rt.is_alive():
                         self.process.terminate()
                 threading.Timer(10, terminate).start()
                 raise hubblestack.exceptions.TimedProcTimeoutError(
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+'''
+Walk directory trees with ``os.scandir`` and collect the files failing a
+check.
+
+This replaces ``find <path> -type f`` followed by a ``file.stats`` call per
+file: the directory entries carry their type (and, on some platforms, their
+stat) so a tree of 100k files is swept without a subprocess, a stat call per
+entry to find out what it is, or owner and group lookups that the check
+doesn't need.
+
+Like ``find -type f``, only regular files are checked and symlinks (to files
+or directories) are neither checked nor followed. Unreadable directories are
+skipped.
+
+The top level subdirectories can be walked on several threads (``os.scandir``
+and ``stat`` release the GIL) and the sweep stops once ``limit`` failures
+were found; with both, which failures are reported depends on which subtrees
+are walked first.
+
+.. code-block:: python
+
+    import hubblestack.utils.treewalk
+
+    mask = hubblestack.utils.treewalk.permission_mask('644')
+    bad = hubblestack.utils.treewalk.sweep(
+        '/var/log', lambda path, st: st.st_mode & mask or None, workers=4, limit=100)
+'''
+
+import logging
+import os
+import stat
+import threading
+
+import hubblestack.utils.parallel
+
+log = logging.getLogger(__name__)
+
+
+def permission_mask(permission):
+    '''
+    The mode bits (out of 0o777) that are not allowed by ``permission``, an
+    octal string or int like ``'644'``. A file is within the permission
+    (equal or more restrictive) if ``st_mode & mask == 0``.
+    '''
+    return ~int(str(permission), 8) & 0o777
+
+
+def file_mode(stat_result):
+    '''
+    The permission bits of a stat result, formatted as ``file.stats`` does
+    (``'0644'``)
+    '''
+    return '{0:04o}'.format(stat.S_IMODE(stat_result.st_mode))
+
+
+class _Sweep(object):
+    '''
+    The failures found so far, shared by the threads walking the subtrees
+    '''
+
+    def __init__(self, check, limit):
+        self.check = check
+        self.limit = limit
+        self.count = 0
+        self.lock = threading.Lock()
+        self.done = False
+
+    def add(self, found, path, stat_result):
+        value = self.check(path, stat_result)
+        if value is None or value is False:
+            return
+        with self.lock:
+            if self.done:
+                return
+            found.append((path, value))
+            self.count += 1
+            if self.limit and self.count >= self.limit:
+                self.done = True
+
+    def walk(self, top, found):
+        dirs = [top]
+        while dirs and not self.done:
+            path = dirs.pop()
+            subdirs = []
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if self.done:
+                            break
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            try:
+                                stat_result = entry.stat(follow_symlinks=False)
+                            except OSError:
+                                continue
+                            self.add(found, entry.path, stat_result)
+            except OSError as exc:
+                log.debug('Unable to read directory %s: %s', path, exc)
+            # walk the subdirectories in the order they were listed
+            dirs.extend(reversed(subdirs))
+        return found
+
+
+def sweep(path, check, workers=1, limit=None):
+    '''
+    Return a list of ``(file_path, value)`` for the regular files under
+    ``path`` (or ``path`` itself, if it is a regular file) for which
+    ``check(file_path, stat_result)`` returns something other than None or
+    False.
+
+    workers
+        Number of threads walking the top level subdirectories of ``path``
+
+    limit
+        Stop once this many files failed the check (None or 0: no limit)
+    '''
+    state = _Sweep(check, limit)
+    found = []
+    try:
+        stat_result = os.lstat(path)
+    except OSError as exc:
+        log.debug('Unable to stat %s: %s', path, exc)
+        return found
+    if stat.S_ISREG(stat_result.st_mode):
+        state.add(found, path, stat_result)
+        return found
+    if not stat.S_ISDIR(stat_result.st_mode):
+        return found
+
+    try:
+        workers = int(workers or 1)
+    except (TypeError, ValueError):
+        workers = 1
+    if workers <= 1:
+        return state.walk(path, found)
+
+    # the files directly under path, then a task per subdirectory
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and not state.done:
+                    try:
+                        state.add(found, entry.path, entry.stat(follow_symlinks=False))
+                    except OSError:
+                        continue
+    except OSError as exc:
+        log.debug('Unable to read directory %s: %s', path, exc)
+        return found
+
+    tasks = [(subdir, lambda subdir=subdir: state.walk(subdir, [])) for subdir in subdirs]
+    for res in hubblestack.utils.parallel.run_tasks(tasks, workers=workers, name='hubble-treewalk'):
+        if res.ok:
+            found.extend(res.value)
+        else:
+            log.error('Error walking %s: %s', res.key, res.exc)
+    return found
@@ -95,3 +95,29 @@ class TestComparatorMatch(TestCase):
         with pytest.raises(HubbleCheckFailedError) as exception:
             status, result = comparator.run('test', args, module_result, module_status)
             pytest.fail('Should not have come here')
+
+
+class TestComparatorLookup(TestCase):
+    """
+    Unit tests for the memoized comparator lookup
+    """
+    def test_lookup_memoized(self):
+        lookups = []
+
+        class Comparators(dict):
+            def __contains__(self, key):
+                lookups.append(key)
+                return dict.__contains__(self, key)
+
+        comparator.__comparator__ = Comparators({"string.match": lambda a, b, c: (b == c['match'], '')})
+        args = {"type": "string", "match": "abc"}
+        for _ in range(5):
+            status, result = comparator.run('test', args, 'abc')
+            self.assertTrue(status)
+        self.assertEqual(lookups, ['string.match'])
+
+        # reloaded comparators are looked up again
+        comparator.__comparator__ = Comparators({"string.match": lambda a, b, c: (False, '')})
+        status, result = comparator.run('test', args, 'abc')
+        self.assertFalse(status)
+        self.assertEqual(len(lookups), 2)
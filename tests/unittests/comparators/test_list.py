@@ -487,3 +487,81 @@ class TestListFilterCompare(TestCase):
             comparator_mock.run.return_value = (False, "Pass")
             status, result = list_comparator.filter_compare("test-1", result_to_compare, args)
             self.assertFalse(status)
+
+
+class TestListPlans(TestCase):
+    """
+    Unit tests for the primitive value fast paths of list::match_any and list::match_all
+    """
+
+    def test_match_all_large_lists(self):
+        """
+        Primitive values are matched by set lookup, without the orchestrator
+        """
+        packages = ['package-{0}'.format(i) for i in range(20000)]
+        args = {
+            "type": "list",
+            "match_all": ['package-{0}'.format(i) for i in range(0, 20000, 10)]
+        }
+        with patch('hubblestack.module_runner.comparator') as comparator_mock:
+            status, result = list_comparator.match_all("test-1", packages, args)
+            self.assertTrue(status)
+            args['match_all'].append('not-installed')
+            status, result = list_comparator.match_all("test-1", packages, {"type": "list",
+                                                                             "match_all": args['match_all']})
+            self.assertFalse(status)
+            self.assertFalse(comparator_mock.run.called)
+
+    def test_match_any_large_lists(self):
+        """
+        Primitive values are matched by set lookup, custom comparators still run
+        """
+        services = ['service-{0}'.format(i) for i in range(20000)]
+        args = {
+            "type": "list",
+            "match_any": ['telnet', 'service-19999']
+        }
+        with patch('hubblestack.module_runner.comparator') as comparator_mock:
+            status, result = list_comparator.match_any("test-1", services, args)
+            self.assertTrue(status)
+            self.assertFalse(comparator_mock.run.called)
+
+            comparator_mock.run.side_effect = lambda audit_id, c_args, value: (value == 'service-5', '')
+            args = {
+                "type": "list",
+                "match_any": ['telnet', {"name": {"type": "string", "match": "service-5"}}]
+            }
+            status, result = list_comparator.match_any("test-1", services, args)
+            self.assertTrue(status)
+            self.assertEqual(comparator_mock.run.call_count, 6)
+
+    def test_mixed_values(self):
+        """
+        Unhashable values and custom comparators in match_all
+        """
+        result_to_compare = ['a', ['b', 'c'], 'd']
+        with patch('hubblestack.module_runner.comparator') as comparator_mock:
+            comparator_mock.run.side_effect = lambda audit_id, c_args, value: (value == 'd', '')
+            args = {
+                "type": "list",
+                "match_all": ['a', ['b', 'c'], {"name": {"type": "string", "match": "d"}}]
+            }
+            status, result = list_comparator.match_all("test-1", result_to_compare, args)
+            self.assertTrue(status)
+            args = {
+                "type": "list",
+                "match_all": ['a', ['b'], {"name": {"type": "string", "match": "d"}}]
+            }
+            status, result = list_comparator.match_all("test-1", result_to_compare, args)
+            self.assertFalse(status)
+
+    def test_plan_cached_per_args(self):
+        """
+        The expected values of a check are split once
+        """
+        args = {"type": "list", "match_any": ['a', 'b']}
+        plan = list_comparator._plan(args, 'match_any')
+        self.assertIs(list_comparator._plan(args, 'match_any'), plan)
+        self.assertEqual(plan, ({'a', 'b'}, []))
+        other = {"type": "list", "match_any": ['a', 'b']}
+        self.assertIsNot(list_comparator._plan(other, 'match_any'), plan)
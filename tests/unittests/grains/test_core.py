@@ -26,6 +26,7 @@ from tests.support.mock import (
 # from unittest import skipIf, TestCase, mock
 
 import hubblestack.utils.dns
+import hubblestack.utils.rdns
 import hubblestack.utils.files
 import hubblestack.utils.network
 import hubblestack.utils.platform
@@ -977,6 +978,7 @@ class CoreGrainsTestCase(TestCase, LoaderModuleMockMixin):
                                ('foo.bar.baz', [], ['fe80::a8b2:93ff:fe00:0']),
                                ('bluesniff.foo.bar', [], ['fe80::a8b2:93ff:dead:beef'])]
         ret = {'fqdns': ['bluesniff.foo.bar', 'foo.bar.baz', 'rinzler.evil-corp.com']}
+        hubblestack.utils.rdns.clear()
         with patch.object(socket, 'gethostbyaddr', side_effect=reverse_resolv_mock):
             fqdns = core.fqdns()
             self.assertIn('fqdns', fqdns)
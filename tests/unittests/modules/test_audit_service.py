@@ -117,3 +117,26 @@ class TestService(TestCase):
             {"name": "service1", "running": True, "enabled": True},
             {"name": "service2", "running": False, "enabled": True}
             ]})
+
+    def test_execute_states(self):
+        """
+        Use service.states when the service module has it
+        """
+        def _get_all():
+            return ["service1", "service2", "other"]
+        def _states(names):
+            self.assertEqual(names, ["service1", "service2"])
+            return {"service1": {"available": True, "running": True, "enabled": False},
+                    "service2": {"available": True, "running": False, "enabled": True}}
+        service.__mods__ = {
+            "service.get_all": _get_all,
+            "service.states": _states
+        }
+        block_dict={"args": {"name": "s*"}}
+        check_id = "test-1"
+
+        status, res = service.execute(check_id, block_dict, {})
+        self.assertEqual(res, {"result": [
+            {"name": "service1", "running": True, "enabled": False},
+            {"name": "service2", "running": False, "enabled": True}
+            ]})
@@ -7,6 +7,7 @@ import os
 import sys
 import tempfile
 import builtins
+import unittest.mock
 
 import hubblestack.utils.files
 import hubblestack.utils.platform
@@ -413,3 +414,39 @@ class CMDMODTestCase(TestCase, LoaderModuleMockMixin):
             ret = cmdmod.run_all('some command', output_encoding='latin1')
 
         self.assertEqual(ret['stdout'], stdout)
+
+
+class CMDMODMemoTestCase(TestCase):
+    '''
+    Unit tests for the cmd_memoize option
+    '''
+    def setUp(self):
+        cmdmod.__opts__ = {'cmd_memoize': ['rpm -qa*'], 'cmd_memoize_ttl': 60}
+        cmdmod._MEMO.clear()
+
+    def tearDown(self):
+        del cmdmod.__opts__
+        cmdmod._MEMO.clear()
+
+    def test_memoized(self):
+        proc = unittest.mock.MagicMock(return_value=MockTimedProc(stdout=b'bash-5.1'))
+        with unittest.mock.patch('hubblestack.utils.timed_subprocess.TimedProc', proc):
+            for _ in range(3):
+                self.assertEqual(cmdmod.run_stdout('rpm -qa bash'), 'bash-5.1')
+            self.assertEqual(proc.call_count, 1)
+            # a different command line (or environment) is a different entry
+            cmdmod.run_stdout('rpm -qa')
+            cmdmod.run_stdout('rpm -qa', env={'FOO': 'bar'})
+            self.assertEqual(proc.call_count, 3)
+            # not listed in cmd_memoize
+            cmdmod.run_stdout('ls /tmp')
+            cmdmod.run_stdout('ls /tmp')
+            self.assertEqual(proc.call_count, 5)
+
+    def test_expired(self):
+        cmdmod.__opts__['cmd_memoize_ttl'] = 0
+        proc = unittest.mock.MagicMock(return_value=MockTimedProc(stdout=b'bash-5.1'))
+        with unittest.mock.patch('hubblestack.utils.timed_subprocess.TimedProc', proc):
+            cmdmod.run_stdout('rpm -qa bash')
+            cmdmod.run_stdout('rpm -qa bash')
+        self.assertEqual(proc.call_count, 2)
@@ -115,6 +115,7 @@ class TestGrep(TestCase):
         __mods__['cmd.run_all'] = mock_grep
 
         grep.__mods__ = __mods__
+        grep.__opts__ = {'grep_in_process': False}
         expected_dict = {'stdout': text}
         result = grep._grep(path, None, pattern)
         self.assertDictEqual(expected_dict, result)
\ No newline at end of file
@@ -3,10 +3,14 @@
 """
     :codeauthor: Jayesh Kariya <jayeshk@saltstack.com>
 """
+import os
+import unittest
 import uuid
+from unittest import mock
 
 # Import Hubble Libs
 import hubblestack.modules.iptables as iptables
+import hubblestack.utils.path
 
 # Import Hubble Testing Libs
 from tests.support.mixins import LoaderModuleMockMixin
@@ -630,3 +634,80 @@ class IptablesTestCase(TestCase, LoaderModuleMockMixin):
                 self.assertTrue(
                     iptables.flush(table="filter", chain="INPUT", family="ipv4")
                 )
+
+
+class IptablesInventoryTestCase(unittest.TestCase):
+    """
+    Test cases for the rule inventory of hubblestack.modules.iptables
+    """
+
+    RESOURCES = os.path.join(os.path.dirname(__file__), "..", "resources", "netfilter")
+
+    def setUp(self):
+        iptables.__grains__ = {"os_family": "Debian"}
+        iptables.__mods__ = {}
+        iptables.__context__ = {}
+        self.outputs = {}
+        for cmd, name in (
+            ("/sbin/iptables-save", "iptables-save.txt"),
+            ("/sbin/ip6tables-save", "ip6tables-save.txt"),
+            ("/sbin/nft", "nft-ruleset.json"),
+        ):
+            with open(os.path.join(self.RESOURCES, name), "r") as infile:
+                self.outputs[cmd] = infile.read()
+        self.run_all = mock.MagicMock(
+            side_effect=lambda cmd, **kwargs: {"retcode": 0, "stdout": self.outputs[cmd[0]], "stderr": ""}
+        )
+        iptables.__mods__["cmd.run_all"] = self.run_all
+
+    def tearDown(self):
+        del iptables.__grains__
+        del iptables.__mods__
+        del iptables.__context__
+
+    def _which(self, name):
+        return "/sbin/{0}".format(name)
+
+    def test_inventory(self):
+        """
+        One snapshot of both families and the nftables ruleset is taken
+        and reused.
+        """
+        with mock.patch.object(hubblestack.utils.path, "which", self._which):
+            ruleset = iptables.inventory()
+            self.assertEqual(self.run_all.call_count, 3)
+            self.assertEqual(len(ruleset.select(family="ipv4", table="filter", chain="INPUT")), 6)
+            self.assertEqual(len(ruleset.select(family="ipv6")), 4)
+            self.assertEqual(len(ruleset.select(family="inet")), 4)
+            self.assertIs(iptables.inventory(), ruleset)
+            self.assertEqual(self.run_all.call_count, 3)
+            self.assertIsNot(iptables.inventory(refresh=True), ruleset)
+            self.assertEqual(self.run_all.call_count, 6)
+
+    def test_get_rules_from_snapshot(self):
+        """
+        get_rules and get_policy parse the snapshot, once per family.
+        """
+        with mock.patch.object(hubblestack.utils.path, "which", self._which):
+            rules = iptables.get_rules()
+            self.assertEqual(len(rules["filter"]["INPUT"]["rules"]), 6)
+            self.assertEqual(rules["filter"]["INPUT"]["policy"], "DROP")
+            rules["filter"]["INPUT"]["rules"].pop()
+            self.assertEqual(iptables.get_policy("filter", "FORWARD", family="ipv6"), "DROP")
+            with mock.patch.object(iptables, "_parser") as parser:
+                self.assertEqual(len(iptables.get_rules()["filter"]["INPUT"]["rules"]), 6)
+                self.assertEqual(iptables.get_policy("filter", "INPUT", family="ipv6"), "ACCEPT")
+                self.assertEqual(iptables.get_policy("filter", "OUTPUT"), "ACCEPT")
+            self.assertEqual(parser.call_count, 0)
+            self.assertEqual(self.run_all.call_count, 3)
+
+    def test_changes_clear_snapshot(self):
+        """
+        Changing the rules drops the snapshot.
+        """
+        with mock.patch.object(hubblestack.utils.path, "which", self._which), mock.patch.object(
+            iptables, "_has_option", mock.MagicMock(return_value=False)
+        ), mock.patch.dict(iptables.__mods__, {"cmd.run": mock.MagicMock(return_value="")}):
+            iptables.inventory()
+            iptables.flush(table="filter", chain="INPUT")
+            self.assertNotIn("iptables.snapshot", iptables.__context__)
@@ -3,11 +3,14 @@
 # Import Python libs
 import os
 import textwrap
+import unittest
+from unittest import mock
 
 import hubblestack.modules.mount as mount
 
 # Import Hubble Libs
 import hubblestack.utils.files
+import hubblestack.utils.mount
 import hubblestack.utils.path
 from hubblestack.exceptions import CommandExecutionError
 
@@ -684,3 +687,57 @@ class MountTestCase(TestCase, LoaderModuleMockMixin):
             mount.__grains__, {"kernel": ""}
         ):
             self.assertTrue(mount.is_mounted("name"))
+
+
+class MountinfoTestCase(unittest.TestCase):
+    """
+    Test cases for the mountinfo based hubblestack.modules.mount.active
+    """
+
+    def setUp(self):
+        mount.__grains__ = {}
+        mount.__mods__ = {}
+        mount.__context__ = {}
+
+    def tearDown(self):
+        del mount.__grains__
+        del mount.__mods__
+        del mount.__context__
+
+    def test_active_mountinfo(self):
+        """
+        List the active mounts from the mount table of mountinfo.
+        """
+        table = hubblestack.utils.mount.parse_mountinfo(
+            "22 1 253:0 / / rw,relatime shared:1 - ext4 /dev/sda1 rw,errors=remount-ro\n"
+            "42 22 0:36 / /tmp rw,nosuid,nodev - tmpfs tmpfs rw,size=1024k,uid=user1\n"
+        )
+        with mock.patch.dict(mount.__grains__, {"os": "Debian", "kernel": "Linux"}), mock.patch.object(
+            hubblestack.utils.mount, "mounts", mock.MagicMock(return_value=table)
+        ), mock.patch.dict(mount.__mods__, {"user.info": mock.MagicMock(return_value={"uid": "100"})}):
+            self.assertEqual(
+                mount.active(),
+                {
+                    "/": {
+                        "device": "/dev/sda1",
+                        "alt_device": "/dev/sda1",
+                        "fstype": "ext4",
+                        "opts": ["rw", "relatime", "errors=remount-ro"],
+                    },
+                    "/tmp": {
+                        "device": "tmpfs",
+                        "alt_device": "tmpfs",
+                        "fstype": "tmpfs",
+                        "opts": ["rw", "nosuid", "nodev", "size=1024k", "uid=100"],
+                    },
+                },
+            )
+            blkid = mock.MagicMock(return_value={"/dev/sda1": {"UUID": "ABC", "LABEL": "root"}})
+            with mock.patch.dict(mount.__mods__, {"disk.blkid": blkid}):
+                extended = mount.active(extended=True)
+            self.assertEqual(extended["/"]["propagation"], ["shared:1"])
+            self.assertEqual(extended["/"]["superopts"], ["rw", "errors=remount-ro"])
+            self.assertEqual(extended["/"]["device_uuid"], "abc")
+            self.assertEqual(extended["/tmp"]["superopts"], ["rw", "size=1024k", "uid=100"])
+            # the cached table is left alone
+            self.assertEqual(table[1]["superopts"], ["rw", "size=1024k", "uid=user1"])
@@ -1,4 +1,5 @@
 from unittest import TestCase
+from unittest.mock import patch
 import pytest
 
 from hubblestack.audit import pkg
@@ -156,4 +157,41 @@ class TestPkg(TestCase):
         expected_dict = {"result": test_dict}
         status, result_dict = pkg.execute(block_id, block_dict, {})
         self.assertTrue(status)
-        self.assertDictEqual(expected_dict, result_dict)
\ No newline at end of file
+        self.assertDictEqual(expected_dict, result_dict)
+
+class TestPkgBatch(TestCase):
+    """
+    Unit tests for the package list shared by the checks of a run
+    """
+
+    def setUp(self):
+        self.generation = 1
+        self.listed = 0
+        pkg.__mods__ = {'pkg.list_pkgs': self._list_pkgs}
+        self.patch = patch('hubblestack.utils.pkg.inventory.generation', lambda: self.generation)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        pkg._INSTALLED.clear()
+        del pkg.__mods__
+
+    def _list_pkgs(self):
+        self.listed += 1
+        return {'perl': '5.16.3', 'bash': '4.2.46'}
+
+    def testPrepareBatch(self):
+        block_dict = {'args': {'name': 'perl*'}}
+        for _ in range(2):
+            pkg.prepare_batch([('test-1', block_dict)])
+            status, res = pkg.execute('test-1', block_dict, {})
+            self.assertTrue(status)
+            self.assertEqual(res, {'result': {'perl': '5.16.3'}})
+        self.assertEqual(self.listed, 1)
+
+        # the package databases changed
+        self.generation = 2
+        pkg.execute('test-1', block_dict, {})
+        self.assertEqual(self.listed, 2)
+        pkg.prepare_batch([('test-1', block_dict)])
+        self.assertEqual(self.listed, 3)
@@ -92,4 +92,45 @@ class TestSysctl(TestCase):
 
         status, res = sysctl.execute(check_id, block_dict, {})
         self.assertFalse(status)
-        self.assertEqual(res, {"error": "An error occurred while reading the value of kernel attribute vm.zone_reclaim_mode"})
\ No newline at end of file
+        self.assertEqual(res, {"error": "An error occurred while reading the value of kernel attribute vm.zone_reclaim_mode"})
+
+class TestSysctlValues(TestCase):
+    """
+    Unit tests for sysctl module with the batched sysctl.values
+    """
+    def setUp(self):
+        self.calls = []
+        sysctl.__mods__ = {"sysctl.values": self._values}
+
+    def tearDown(self):
+        del sysctl.__mods__
+
+    def _values(self, names, refresh=False):
+        self.calls.append((names, refresh))
+        values = {"vm.zone_reclaim_mode": "0",
+                  "net.ipv4.conf.*.rp_filter": {"net.ipv4.conf.all.rp_filter": "1"},
+                  "vm.*_nope": {}}
+        return dict((name, values.get(name)) for name in names)
+
+    def test_prepare_batch(self):
+        block_list = [("test-1", {"args": {"name": "vm.zone_reclaim_mode"}}),
+                      ("test-2", {"args": {"name": "kernel.nope"}})]
+        sysctl.prepare_batch(block_list)
+        self.assertEqual(self.calls, [(["kernel.nope", "vm.zone_reclaim_mode"], True)])
+
+    def test_execute(self):
+        status, res = sysctl.execute("test-1", {"args": {"name": "vm.zone_reclaim_mode"}}, {})
+        self.assertTrue(status)
+        self.assertEqual(res, {"result": {"vm.zone_reclaim_mode": "0"}})
+
+        status, res = sysctl.execute("test-2", {"args": {"name": "kernel.nope"}}, {})
+        self.assertFalse(status)
+        self.assertEqual(res, {"error": "Could not find attribute kernel.nope in the kernel"})
+
+    def test_execute_pattern(self):
+        status, res = sysctl.execute("test-1", {"args": {"name": "net.ipv4.conf.*.rp_filter"}}, {})
+        self.assertTrue(status)
+        self.assertEqual(res, {"result": {"net.ipv4.conf.all.rp_filter": "1"}})
+
+        status, res = sysctl.execute("test-2", {"args": {"name": "vm.*_nope"}}, {})
+        self.assertFalse(status)
@@ -4,6 +4,7 @@
 '''
 
 import os
+import unittest.mock
 
 from tests.support.mixins import LoaderModuleMockMixin
 from tests.support.unit import TestCase, skipIf
@@ -137,3 +138,80 @@ class SystemdTestCase(TestCase, LoaderModuleMockMixin):
                 with patch.object(systemd, '_systemctl_status', mock):
                     self.assertTrue(systemd.available('sshd.service'))
                     self.assertFalse(systemd.available('bar.service'))
+
+
+_SYSTEMCTL_SHOW = '''\
+Id=sshd.service
+NeedDaemonReload=no
+LoadState=loaded
+ActiveState=active
+UnitFileState=enabled
+
+Id=foo.service
+NeedDaemonReload=no
+LoadState=not-found
+ActiveState=inactive
+UnitFileState=
+
+Id=cups.service
+NeedDaemonReload=no
+LoadState=loaded
+ActiveState=inactive
+UnitFileState=disabled
+'''
+
+
+class SystemdStatesTestCase(TestCase):
+    '''
+    Test case for hubblestack.modules.systemd.states
+    '''
+    def setUp(self):
+        self.run_all = unittest.mock.MagicMock(
+            return_value={'stdout': _SYSTEMCTL_SHOW, 'stderr': '', 'retcode': 0, 'pid': 12345})
+        systemd.__context__ = {}
+        systemd.__mods__ = {'cmd.run_all': self.run_all}
+
+    def tearDown(self):
+        del systemd.__context__
+        del systemd.__mods__
+
+    def test_states(self):
+        names = ['sshd', 'foo', 'cups']
+        with unittest.mock.patch.object(systemd, 'enabled') as enabled:
+            ret = systemd.states(names)
+            self.assertEqual(ret, {
+                'sshd': {'available': True, 'running': True, 'enabled': True},
+                # sysvinit/unknown: left to enabled()
+                'foo': {'available': False, 'running': False, 'enabled': enabled.return_value},
+                'cups': {'available': True, 'running': False, 'enabled': False}})
+            enabled.assert_called_once_with('foo')
+        cmd = self.run_all.call_args[0][0]
+        self.assertEqual(cmd[-3:], ['sshd.service', 'foo.service', 'cups.service'])
+        self.assertEqual(self.run_all.call_count, 1)
+
+        # reused until they expire or refresh=True
+        self.assertEqual(systemd.states(['cups'])['cups']['running'], False)
+        self.assertEqual(self.run_all.call_count, 1)
+        self.run_all.return_value = {'stdout': _SYSTEMCTL_SHOW.split('\n\n')[0],
+                                     'stderr': '', 'retcode': 0, 'pid': 12345}
+        systemd.states(['sshd'], refresh=True)
+        self.assertEqual(self.run_all.call_count, 2)
+
+    def test_states_transient(self):
+        # "systemctl is-enabled" succeeds for transient units (systemd-run)
+        self.run_all.return_value['stdout'] = (
+            'Id=run-r1234.service\nNeedDaemonReload=no\nLoadState=loaded\n'
+            'ActiveState=active\nUnitFileState=transient\n')
+        with unittest.mock.patch.object(systemd, 'enabled') as enabled:
+            ret = systemd.states(['run-r1234'])
+        self.assertEqual(ret, {'run-r1234': {'available': True, 'running': True, 'enabled': True}})
+        enabled.assert_not_called()
+
+    def test_states_unexpected_output(self):
+        # one block short: fall back to the per-service functions
+        self.run_all.return_value['stdout'] = _SYSTEMCTL_SHOW.rsplit('\n\n', 1)[0]
+        with unittest.mock.patch.object(systemd, 'status', return_value=True), \
+                unittest.mock.patch.object(systemd, 'available', return_value=True), \
+                unittest.mock.patch.object(systemd, 'enabled', return_value=False):
+            ret = systemd.states(['sshd', 'foo', 'cups'])
+        self.assertEqual(ret['foo'], {'available': True, 'running': True, 'enabled': False})
@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+import hubblestack.audit.stat
+import hubblestack.module_runner.audit_runner as audit_runner
+import hubblestack.module_runner.runner as runner
+from hubblestack.module_runner.audit_runner import AuditRunner
+
+
+def _profile(path):
+    return {
+        'check_1': {
+            'description': 'file mode', 'tag': 'CIS-1',
+            'implementations': [{'filter': {'grains': '*'}, 'module': 'stat',
+                                 'items': [{'args': {'path': path}, 'comparator': {'mode': 644}}]}]},
+        'check_2': {
+            'description': 'no inputs', 'tag': 'CIS-2',
+            'implementations': [{'filter': {'grains': '*'}, 'module': 'misc',
+                                 'items': [{'args': {'function': 'test_success'}, 'comparator': {}}]}]},
+    }
+
+
+class TestDifferentialAudit():
+
+    def setup_method(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.path = os.path.join(self.cachedir, 'sshd_config')
+        with open(self.path, 'w') as outfile:
+            outfile.write('Port 22\n')
+        self.opts = {'cachedir': self.cachedir, 'audit_differential': True}
+        mods = {'match.compound': lambda tgt: True}
+        for module in (runner, audit_runner):
+            module.__opts__ = self.opts
+            module.__mods__ = mods
+            module.__grains__ = {'hubble_version': '4.1.0'}
+        self.executed = []
+        self.hmods = {
+            'stat.get_inputs': hubblestack.audit.stat.get_inputs,
+            'stat.execute': self._execute,
+            'misc.execute': self._execute,
+        }
+        for name in ('stat', 'misc'):
+            self.hmods[name + '.validate_params'] = lambda *args: None
+            self.hmods[name + '.get_filtered_params_to_log'] = lambda *args: {}
+        self.patches = [mock.patch.object(runner, '__hmods__', self.hmods),
+                        mock.patch('hubblestack.module_runner.comparator.run', return_value=(True, ''))]
+        for patch in self.patches:
+            patch.start()
+
+    def teardown_method(self):
+        for patch in self.patches:
+            patch.stop()
+        for module in (runner, audit_runner):
+            del module.__opts__
+            del module.__mods__
+            del module.__grains__
+        shutil.rmtree(self.cachedir)
+
+    def _execute(self, block_id, block_dict, extra_args=None):
+        self.executed.append(block_id)
+        return True, {'result': block_id}
+
+    def _run(self, **args):
+        del self.executed[:]
+        results = AuditRunner()._execute(_profile(self.path), 'salt://profile.yaml', args)
+        return sorted((res['check_id'], res['check_result']) for res in results)
+
+    def test_unchanged_checks_reused(self):
+        expected = [('check_1', 'Success'), ('check_2', 'Success')]
+        assert self._run() == expected
+        assert sorted(self.executed) == ['check_1', 'check_2']
+
+        # only the check without declared inputs runs again
+        assert self._run() == expected
+        assert self.executed == ['check_2']
+
+        # an input changed
+        os.chmod(self.path, 0o600)
+        assert self._run() == expected
+        assert sorted(self.executed) == ['check_1', 'check_2']
+
+        # turned off for this run
+        assert self._run(differential=False) == expected
+        assert sorted(self.executed) == ['check_1', 'check_2']
+
+    def test_full_run(self):
+        self.opts['audit_differential_full_run'] = 60
+        self._run()
+        with mock.patch('time.time', return_value=time.time() + 120):
+            self._run()
+        assert sorted(self.executed) == ['check_1', 'check_2']
@@ -0,0 +1,55 @@
+import threading
+import time
+from unittest import mock
+
+import hubblestack.module_runner.fdg_runner as fdg_runner
+import hubblestack.module_runner.runner as runner
+from hubblestack.module_runner.fdg_runner import FdgRunner
+
+FDG = {
+    'main': {'module': 'fake', 'args': {}, 'xpipe': 'double'},
+    'double': {'module': 'fake', 'args': {'double': True}},
+}
+
+
+class TestFdgXpipe():
+
+    def setup_method(self):
+        fdg_runner.__opts__ = {}
+        self.threads = set()
+        self.lock = threading.Lock()
+        hmods = {'fake.validate_params': lambda *args: None, 'fake.execute': self._execute}
+        self.patch = mock.patch.object(runner, '__hmods__', hmods)
+        self.patch.start()
+
+    def teardown_method(self):
+        self.patch.stop()
+        del fdg_runner.__opts__
+
+    def _execute(self, block_id, block_dict, extra_args=None):
+        if not block_dict['args'].get('double'):
+            return True, {'result': list(range(1, 9))}
+        value = extra_args['chaining_args']['result']
+        with self.lock:
+            self.threads.add(threading.get_ident())
+        time.sleep(0.5 if value == 6 else 0.05)
+        return True, {'result': value * 2}
+
+    def test_serial_by_default(self):
+        ret = FdgRunner()._execute(FDG, 'salt://fdg/test.fdg', {})[1]
+        assert ret == [(value * 2, True) for value in range(1, 9)]
+        assert self.threads == {threading.get_ident()}
+
+    def test_concurrent_same_results(self):
+        fdg_runner.__opts__['fdg_xpipe_workers'] = 4
+        start = time.time()
+        ret = FdgRunner()._execute(FDG, 'salt://fdg/test.fdg', {})[1]
+        assert ret == [(value * 2, True) for value in range(1, 9)]
+        assert time.time() - start < 0.85
+        assert len(self.threads) > 1
+
+    def test_element_timeout(self):
+        fdg = dict(FDG, main=dict(FDG['main'], xpipe_workers=4, xpipe_timeout=0.25))
+        ret = FdgRunner()._execute(fdg, 'salt://fdg/test.fdg', {})[1]
+        assert ret[5] == ({'error': 'timed_out'}, False)
+        assert ret[:5] + ret[6:] == [(value * 2, True) for value in range(1, 9) if value != 6]
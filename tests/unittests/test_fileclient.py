@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import pytest
+
+import hubblestack.fileclient
+import hubblestack.fileserver
+
+@pytest.fixture
+def fsclient(__opts__, tmp_path):
+    root = tmp_path / 'root'
+    root.mkdir()
+    (root / 'profile.yaml').write_text('a: 1\n')
+    __opts__['file_client'] = 'local'
+    __opts__['fileserver_backend'] = ['roots']
+    __opts__['file_roots'] = {'base': [str(root)]}
+    __opts__['cachedir'] = str(tmp_path / 'cache')
+    __opts__.pop('__fs_update', None)
+    client = hubblestack.fileclient.get_file_client(__opts__)
+    yield client, root
+
+def _count_hashes(client, monkeypatch):
+    calls = []
+    orig = client.hash_and_stat_file
+    def counting(path, saltenv='base'):
+        calls.append(path)
+        return orig(path, saltenv)
+    monkeypatch.setattr(client, 'hash_and_stat_file', counting)
+    return calls
+
+def test_cache_file_skips_hashing_when_unchanged(fsclient, monkeypatch):
+    client, _ = fsclient
+    calls = _count_hashes(client, monkeypatch)
+
+    first = client.cache_file('salt://profile.yaml')
+    assert first and os.path.isfile(first)
+    # first call downloads, second hashes server and local copy
+    second = client.cache_file('salt://profile.yaml')
+    assert second == first
+    hashed = len(calls)
+    assert hashed == 3
+
+    for _ in range(5):
+        assert client.cache_file('salt://profile.yaml') == first
+    assert len(calls) == hashed
+
+def test_cache_invalidated_by_fileserver_update(fsclient, monkeypatch):
+    client, root = fsclient
+    calls = _count_hashes(client, monkeypatch)
+
+    cached = client.cache_file('salt://profile.yaml')
+    client.cache_file('salt://profile.yaml')
+    hashed = len(calls)
+
+    (root / 'profile.yaml').write_text('a: 2\n')
+    # not seen until the fileserver is updated
+    assert client.cache_file('salt://profile.yaml') == cached
+    assert len(calls) == hashed
+
+    generation = hubblestack.fileserver.update_generation()
+    client.channel.fs.update()
+    assert hubblestack.fileserver.update_generation() > generation
+
+    assert client.cache_file('salt://profile.yaml') == cached
+    assert len(calls) > hashed
+    with open(cached) as fh:
+        assert fh.read() == 'a: 2\n'
+
+def test_cache_invalidated_by_local_change(fsclient, monkeypatch):
+    client, _ = fsclient
+    calls = _count_hashes(client, monkeypatch)
+
+    cached = client.cache_file('salt://profile.yaml')
+    client.cache_file('salt://profile.yaml')
+    hashed = len(calls)
+
+    with open(cached, 'w') as fh:
+        fh.write('tampered: true\n')
+    assert client.cache_file('salt://profile.yaml') == cached
+    assert len(calls) > hashed
+    with open(cached) as fh:
+        assert fh.read() == 'a: 1\n'
+
+def test_cache_can_be_disabled(fsclient, monkeypatch):
+    client, _ = fsclient
+    client.opts['fileclient_hash_cache'] = False
+    calls = _count_hashes(client, monkeypatch)
+
+    client.cache_file('salt://profile.yaml')
+    client.cache_file('salt://profile.yaml')
+    hashed = len(calls)
+    client.cache_file('salt://profile.yaml')
+    assert len(calls) > hashed
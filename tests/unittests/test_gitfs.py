@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import subprocess
+import time
+import pytest
+
+import hubblestack.status
+import hubblestack.utils.gitfs
+from hubblestack.fileserver.gitfs import PER_REMOTE_OVERRIDES, PER_REMOTE_ONLY
+
+pytest.importorskip('pygit2')
+
+def _git(*args, **kw):
+    env = dict(os.environ, GIT_AUTHOR_NAME='t', GIT_AUTHOR_EMAIL='t@t',
+               GIT_COMMITTER_NAME='t', GIT_COMMITTER_EMAIL='t@t')
+    subprocess.check_call(('git',) + args, env=env, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.DEVNULL, **kw)
+
+def _commit(work, name, content):
+    with open(os.path.join(work, name), 'w') as fh:
+        fh.write(content)
+    _git('add', name, cwd=work)
+    _git('commit', '-q', '-m', name, cwd=work)
+    _git('push', '-q', 'origin', 'master', cwd=work)
+
+@pytest.fixture
+def bare_repos(tmp_path):
+    ret = []
+    for i in range(4):
+        bare = str(tmp_path / 'remote{}.git'.format(i))
+        work = str(tmp_path / 'work{}'.format(i))
+        _git('init', '-q', '--bare', '-b', 'master', bare)
+        _git('clone', '-q', bare, work)
+        _git('checkout', '-q', '-b', 'master', cwd=work)
+        _commit(work, 'top.nova', 'profile{}\n'.format(i))
+        ret.append((bare, work))
+    return ret
+
+@pytest.fixture
+def gitfs_opts(__opts__, tmp_path, bare_repos):
+    __opts__['cachedir'] = str(tmp_path / 'cache')
+    __opts__['fileserver_backend'] = ['gitfs']
+    __opts__['gitfs_remotes'] = ['file://' + bare for bare, _ in bare_repos]
+    __opts__['gitfs_fetch_workers'] = 4
+    __opts__['gitfs_fetch_timeout'] = 300
+    return __opts__
+
+def _gitfs(opts):
+    hubblestack.utils.gitfs.GitFS.instance_map.clear()
+    return hubblestack.utils.gitfs.GitFS(opts, opts['gitfs_remotes'],
+        per_remote_overrides=PER_REMOTE_OVERRIDES, per_remote_only=PER_REMOTE_ONLY)
+
+def _slow_fetch(repo, seconds):
+    orig = repo._fetch
+    def _fetch():
+        time.sleep(seconds)
+        return orig()
+    repo._fetch = _fetch
+
+def test_fetch_remotes_concurrently(gitfs_opts, bare_repos):
+    gitfs = _gitfs(gitfs_opts)
+    assert len(gitfs.remotes) == 4
+    for repo in gitfs.remotes:
+        _slow_fetch(repo, 0.5)
+
+    _commit(bare_repos[2][1], 'other.nova', 'changed\n')
+
+    start = time.time()
+    assert gitfs.fetch_remotes() is True
+    assert time.time() - start < 1.5
+
+    short = hubblestack.status.HubbleStatus.short()
+    for repo in gitfs.remotes:
+        key = 'hubblestack.utils.gitfs.gitfs_fetch:' + repo.id
+        assert short[key]['count'] >= 1
+        assert short[key]['dur'] >= 0.5
+
+    assert gitfs.fetch_remotes() is False
+
+def test_fetch_remotes_sequential(gitfs_opts):
+    gitfs_opts['gitfs_fetch_workers'] = 1
+    gitfs = _gitfs(gitfs_opts)
+    for repo in gitfs.remotes:
+        _slow_fetch(repo, 0.2)
+    start = time.time()
+    gitfs.fetch_remotes()
+    assert time.time() - start >= 0.8
+
+def test_fetch_timeout_keeps_lock(gitfs_opts):
+    gitfs_opts['gitfs_fetch_timeout'] = 1
+    gitfs = _gitfs(gitfs_opts)
+    slow = gitfs.remotes[0]
+    _slow_fetch(slow, 3)
+
+    start = time.time()
+    gitfs.fetch_remotes()
+    assert time.time() - start < 2.5
+
+    # the abandoned fetch is still running and still holds its update lock
+    lock_file = slow._get_lock_file('update')
+    assert os.path.isfile(lock_file)
+    for repo in gitfs.remotes[1:]:
+        assert not os.path.isfile(repo._get_lock_file('update'))
+
+    deadline = time.time() + 10
+    while os.path.isfile(lock_file) and time.time() < deadline:
+        time.sleep(0.1)
+    assert not os.path.isfile(lock_file)
+
+def test_fetch_selected_remotes(gitfs_opts):
+    gitfs = _gitfs(gitfs_opts)
+    fetched = []
+    for repo in gitfs.remotes:
+        repo.fetch = (lambda r: lambda: fetched.append(r.id))(repo)
+    wanted = gitfs.remotes[1]
+    gitfs.fetch_remotes(remotes=[(wanted.id, None)])
+    assert fetched == [wanted.id]
+
+def test_file_list_memoized_per_tree(gitfs_opts, bare_repos):
+    gitfs_opts['fileserver_list_cache_time'] = 0
+    gitfs = _gitfs(gitfs_opts)
+    repo = gitfs.remotes[0]
+
+    assert gitfs.file_list({'saltenv': 'base'}) == ['top.nova']
+    misses = repo.tree_index.misses
+    for _ in range(3):
+        assert gitfs.file_list({'saltenv': 'base'}) == ['top.nova']
+        assert gitfs.dir_list({'saltenv': 'base'}) == []
+    # env listings come straight from the per-env memo
+    assert repo.tree_index.misses == misses
+
+    # a fresh process picks the listing up from the persisted index
+    gitfs.save_indexes()
+    gitfs = _gitfs(gitfs_opts)
+    repo = gitfs.remotes[0]
+    assert gitfs.file_list({'saltenv': 'base'}) == ['top.nova']
+    assert repo.tree_index.hits >= 1
+    assert repo.tree_index.misses == 0
+
+    # moving the ref recomputes the listing
+    os.makedirs(os.path.join(bare_repos[0][1], 'sub'))
+    _commit(bare_repos[0][1], 'sub/new.nova', 'new\n')
+    gitfs.fetch_remotes()
+    assert gitfs.file_list({'saltenv': 'base'}) == ['sub/new.nova', 'top.nova']
+    assert gitfs.dir_list({'saltenv': 'base'}) == ['sub']
+
+def test_find_file_memoized(gitfs_opts, bare_repos):
+    gitfs = _gitfs(gitfs_opts)
+    saves = []
+    orig_save = gitfs.blob_index.save
+    gitfs.blob_index.save = lambda: saves.append(1) or orig_save()
+    fnd = gitfs.find_file('top.nova', 'base')
+    # the blob index is only written by save_indexes, not for every file
+    assert saves == []
+    assert gitfs.blob_index.dirty
+    with open(fnd['path']) as fh:
+        assert fh.read() in ['profile{}\n'.format(i) for i in range(4)]
+
+    writes = []
+    for repo in gitfs.remotes:
+        orig = repo.write_file
+        repo.write_file = (lambda o: lambda blob, dest: writes.append(dest) or o(blob, dest))(orig)
+    assert gitfs.find_file('top.nova', 'base')['path'] == fnd['path']
+    assert writes == []
+
+    found = [r.tree_index.get('find:' + hubblestack.utils.gitfs._oid_hex(r.get_tree('base')) + ':top.nova')
+             for r in gitfs.remotes]
+    assert any(found)
+    assert gitfs.blob_index.get(fnd['path']) in [x[0] for x in found if x]
+
+    assert gitfs.find_file('missing.nova', 'base')['path'] == ''
+
+    gitfs.save_indexes()
+    assert saves == [1]
+    assert not gitfs.blob_index.dirty
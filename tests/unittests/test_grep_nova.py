@@ -47,6 +47,7 @@ class TestGrep():
             return test_val
         __mods__['cmd.run_all'] = cmd_run_all
         hubblestack.files.hubblestack_nova.grep.__mods__ = __mods__
+        hubblestack.files.hubblestack_nova.grep.__opts__ = {'grep_in_process': False}
         hubblestack.files.hubblestack_nova.grep.__grains__ = {'osfinger': 'Ubuntu-16.04'}
         val = hubblestack.files.hubblestack_nova.grep.audit(data_list, __tags__, [], debug=False)
         assert len(val['Success']) != 0
@@ -63,6 +64,7 @@ class TestGrep():
             return test_val
         __mods__['cmd.run_all'] = cmd_run_all
         hubblestack.files.hubblestack_nova.grep.__mods__ = __mods__
+        hubblestack.files.hubblestack_nova.grep.__opts__ = {'grep_in_process': False}
         hubblestack.files.hubblestack_nova.grep.__grains__ = {'osfinger': 'Ubuntu-16.04'}
         try:
             val = hubblestack.files.hubblestack_nova.grep.audit(data_list, __tags__, [], debug=False)
@@ -82,6 +84,7 @@ class TestGrep():
             return test_val
         __mods__['cmd.run_all'] = cmd_run_all
         hubblestack.files.hubblestack_nova.grep.__mods__ = __mods__
+        hubblestack.files.hubblestack_nova.grep.__opts__ = {'grep_in_process': False}
         hubblestack.files.hubblestack_nova.grep.__grains__ = {'osfinger': 'Ubuntu-16.04'}
         val = hubblestack.files.hubblestack_nova.grep.audit(data_list, __tags__, [], debug=False)
         assert val == expected_val
@@ -116,6 +119,7 @@ class TestGrep():
             return test_val
         __mods__['cmd.run_all'] = cmd_run_all
         hubblestack.files.hubblestack_nova.grep.__mods__ = __mods__
+        hubblestack.files.hubblestack_nova.grep.__opts__ = {'grep_in_process': False}
         val = hubblestack.files.hubblestack_nova.grep._grep(path, pattern, arg)
         hubblestack.files.hubblestack_nova.grep.__mods__ = {}
         assert val['stdout'] == 'tmpfs /dev/shm tmpfs rw,nosuid,nodev 0 0'
@@ -12,6 +12,7 @@ import pytest
 import hubblestack.syspaths
 import hubblestack.config
 import hubblestack.daemon
+import hubblestack.utils.spawn_broker
 
 import logging
 log = logging.getLogger(__name__)
@@ -121,7 +122,15 @@ def added_opts():
     # environment that would populate the field in __opts__; so it's been
     # spuriously added to __opts__ during config build to cover vestigial edge
     # cases.
-    return {'skip_file_logger', '__role'}
+    return {'skip_file_logger', '__role', 'fileclient_hash_cache',
+        'gitfs_fetch_workers', 'gitfs_fetch_timeout',
+        'grains_workers', 'grains_timeout', 'grains_refresh_ttl',
+        'grains_reload_keys', 'loader_file_mapping_cache', 'startup_profile',
+        'grep_in_process', 'cmd_broker', 'cmd_memoize',
+        'cmd_memoize_ttl', 'profile_cache', 'audit_differential',
+        'audit_differential_full_run', 'fdg_xpipe_workers', 'fdg_xpipe_timeout',
+        'fqdns_workers', 'fqdns_timeout', 'fqdns_deadline', 'fqdns_ttl',
+        'fqdns_negative_ttl'}
 
 @pytest.fixture
 def salt_config_opts(intentionally_removed_opts):
@@ -274,3 +283,15 @@ def test_linux_for_real_kindof():
     assert opts['osquerylog_backupdir'] == '/var/log/hubble_osquery/backuplogs'
 
     _both_platforms(opts, for_real=True)
+
+@pytest.mark.skipif(sys.platform != 'linux', reason="")
+def test_spawn_broker_started_before_grains():
+    calls = []
+    with mock.patch.object(hubblestack.utils.spawn_broker.BROKER, 'start', lambda: calls.append('broker')), \
+            mock.patch.object(hubblestack.daemon, 'refresh_grains',
+                              lambda initial=False: calls.append('grains')):
+        hubblestack.daemon.load_config(['-c', 'tests/unittests/resources/empty.config', '--skip-file-logger'])
+        assert calls == ['grains']
+        hubblestack.daemon.load_config(['-c', 'tests/unittests/resources/empty.config', '--skip-file-logger'],
+                                       start_broker=True)
+    assert calls == ['grains', 'broker', 'grains']
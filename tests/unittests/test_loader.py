@@ -2,10 +2,12 @@
 # coding: utf-8
 
 import os
+import time
 import pytest
 
 import hubblestack.loader as L
 import hubblestack.daemon as D
+import hubblestack.status
 
 @pytest.fixture(scope='module')
 def module_dirs(config_file):
@@ -34,3 +36,132 @@ def test_can_find_hubblestack_module_file(module_dirs):
 
 def test_can_find_hubblestack_module(__mods__):
     assert 'pulsar.canary' in __mods__
+
+def _fake_grain_funcs(monkeypatch, funcs):
+    import collections
+    monkeypatch.setattr(L, 'grain_funcs', lambda opts, proxy=None: collections.OrderedDict(funcs))
+
+def _sleepy(seconds, **ret):
+    def _grain():
+        time.sleep(seconds)
+        return ret
+    return _grain
+
+def test_grains_run_concurrently_in_order(monkeypatch, tmp_path):
+    def _needs_grains(grains):
+        return {'seen': sorted(grains)}
+    _fake_grain_funcs(monkeypatch, [
+        ('core.os', lambda: {'os': 'Linux', 'who': 'core'}),
+        ('a.a', _sleepy(0.4, who='a', a=1)),
+        ('b.b', _sleepy(0.1, who='b', b=1)),
+        ('c.c', _needs_grains),
+        ('d.d', _sleepy(0.4, d=1)),
+    ])
+    opts = {'cachedir': str(tmp_path), 'grains_workers': 4, 'grains_timeout': 10}
+    start = time.time()
+    grains = L.grains(opts)
+    assert time.time() - start < 0.75
+    # later grain functions still win, whatever order they finished in
+    assert grains['who'] == 'b'
+    # grain functions taking grains see everything merged before them
+    assert grains['seen'] == ['a', 'b', 'os', 'who']
+    assert grains['d'] == 1
+
+    short = hubblestack.status.HubbleStatus.short()
+    assert short['hubblestack.loader.grains:a.a']['dur'] >= 0.4
+    assert short['hubblestack.loader.grains:c.c']['count'] >= 1
+
+def test_grains_timeout_and_errors(monkeypatch, tmp_path):
+    def _boom():
+        raise RuntimeError('boom')
+    _fake_grain_funcs(monkeypatch, [
+        ('slow.slow', _sleepy(3, slow=1)),
+        ('bad.bad', _boom),
+        ('ok.ok', _sleepy(0, ok=1)),
+    ])
+    opts = {'cachedir': str(tmp_path), 'grains_workers': 1, 'grains_timeout': 1}
+    start = time.time()
+    grains = L.grains(opts)
+    assert time.time() - start < 2
+    assert grains == {'ok': 1}
+
+def test_grains_reused_until_ttl(monkeypatch, tmp_path):
+    calls = []
+    def _counted(name, **ret):
+        def _grain():
+            calls.append(name)
+            return dict(ret)
+        return _grain
+    _fake_grain_funcs(monkeypatch, [
+        ('static.os', _counted('static', os='Linux', nested={'a': 1})),
+        ('volatile.ip', _counted('volatile', ip='10.0.0.1')),
+        ('default.thing', _counted('default', thing=1)),
+    ])
+    monkeypatch.setattr(L, '_GRAINS_CACHE', {})
+    opts = {'cachedir': str(tmp_path), 'grains_workers': 1,
+            'grains_refresh_frequency': 100,
+            'grains_refresh_ttl': {'static.*': 1000, 'volatile.*': 10}}
+    now = [1000.0]
+    monkeypatch.setattr(L.time, 'time', lambda: now[0])
+
+    grains = L.grains(opts)
+    assert sorted(calls) == ['default', 'static', 'volatile']
+    # cached results are copies, changing the grains doesn't change the cache
+    grains['nested']['a'] = 2
+
+    del calls[:]
+    now[0] += 5
+    assert not L.grains_expired()
+    grains = L.grains(opts)
+    assert calls == []
+    assert grains['nested'] == {'a': 1}
+
+    now[0] += 10
+    assert L.grains_expired(max_ttl=100)
+    L.grains(opts)
+    assert calls == ['volatile']
+
+    del calls[:]
+    now[0] += 100
+    L.grains(opts)
+    assert sorted(calls) == ['default', 'volatile']
+
+def test_grains_need_reload(monkeypatch):
+    monkeypatch.setitem(D.__opts__, 'grains_reload_keys', ['os', 'kernel'])
+    old = {'os': 'Linux', 'kernel': 'Linux', 'ip': '10.0.0.1'}
+    assert not D._grains_need_reload(old, dict(old, ip='10.0.0.2'))
+    # missing grains keep their old values
+    assert not D._grains_need_reload(old, {'ip': '10.0.0.2'})
+    assert D._grains_need_reload(old, dict(old, os='Windows'))
+
+def test_file_mapping_cache(monkeypatch, tmp_path):
+    mod_dir = tmp_path / 'modules'
+    mod_dir.mkdir()
+    (mod_dir / 'one.py').write_text('def f():\n    return 1\n')
+    old = time.time() - 60
+    os.utime(str(mod_dir), (old, old))
+    monkeypatch.setattr(L, '_FILE_MAPPING_CACHE', {'path': None, 'entries': None})
+    opts = {'cachedir': str(tmp_path / 'cache'), 'optimization_order': [0, 1, 2]}
+
+    def _loader():
+        return L.LazyLoader([str(mod_dir)], opts, tag='module')
+
+    scans = L.FILE_MAPPING_STATS['scans']
+    loader = _loader()
+    assert list(loader.file_mapping) == ['one']
+    assert L.FILE_MAPPING_STATS['scans'] == scans + 1
+    assert os.path.isfile(os.path.join(opts['cachedir'], 'loader', 'file_mapping.p'))
+
+    def _no_scan():
+        raise AssertionError('module directory scanned')
+    monkeypatch.setattr(L.LazyLoader, '_scan_file_mapping', lambda self: _no_scan())
+    assert _loader().file_mapping == loader.file_mapping
+    # a new process loads the persisted mapping
+    monkeypatch.setattr(L, '_FILE_MAPPING_CACHE', {'path': None, 'entries': None})
+    assert _loader().file_mapping == loader.file_mapping
+    monkeypatch.undo()
+
+    # adding a module moves the directory mtime and invalidates the cache
+    monkeypatch.setattr(L, '_FILE_MAPPING_CACHE', {'path': None, 'entries': None})
+    (mod_dir / 'two.py').write_text('def f():\n    return 2\n')
+    assert list(_loader().file_mapping) == ['one', 'two']
@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+from distutils.version import LooseVersion
+from unittest import mock
+
+import hubblestack.files.hubblestack_nova.oval_scanner as oval_scanner
+
+OVAL = b'''<?xml version="1.0" encoding="utf-8"?>
+<oval_definitions xmlns="http://oval.mitre.org/XMLSchema/oval-definitions-5"
+    xmlns:oval="http://oval.mitre.org/XMLSchema/oval-common-5"
+    xmlns:red-def="http://oval.mitre.org/XMLSchema/oval-definitions-5#linux">
+  <generator>
+    <oval:product_name>Red Hat OVAL Patch Definition Merger</oval:product_name>
+  </generator>
+  <definitions>
+    <definition class="patch" id="oval:com.redhat.rhsa:def:20200001" version="1">
+      <metadata>
+        <title>RHSA-2020:0001: openssl security update (Important)</title>
+        <reference ref_id="RHSA-2020:0001" ref_url="https://access.redhat.com/errata/RHSA-2020:0001" source="RHSA"/>
+        <reference ref_id="CVE-2020-0001" ref_url="https://access.redhat.com/security/cve/CVE-2020-0001" source="CVE"/>
+        <advisory from="secalert@redhat.com">
+          <severity>Important</severity>
+        </advisory>
+      </metadata>
+      <criteria operator="AND">
+        <criterion comment="openssl is earlier than 1.0.2" test_ref="oval:com.redhat.rhsa:tst:20200001001"/>
+        <criteria operator="OR">
+          <criterion comment="openssl-libs is earlier than 1.0.2" test_ref="oval:com.redhat.rhsa:tst:20200001002"/>
+          <criterion comment="no state" test_ref="oval:com.redhat.rhsa:tst:20200001003"/>
+        </criteria>
+      </criteria>
+    </definition>
+    <definition class="patch" id="oval:com.redhat.rhsa:def:20200002" version="1">
+      <metadata>
+        <title>RHSA-2020:0002: bash security update (Low)</title>
+        <reference ref_id="RHSA-2020:0002" ref_url="https://access.redhat.com/errata/RHSA-2020:0002" source="RHSA"/>
+      </metadata>
+      <criteria>
+        <criterion comment="bash is earlier than 4.2" test_ref="oval:com.redhat.rhsa:tst:20200002001"/>
+      </criteria>
+    </definition>
+  </definitions>
+  <tests>
+    <red-def:rpminfo_test check="at least one" comment="openssl is earlier than 1.0.2" id="oval:com.redhat.rhsa:tst:20200001001" version="1">
+      <red-def:object object_ref="oval:com.redhat.rhsa:obj:20200001001"/>
+      <red-def:state state_ref="oval:com.redhat.rhsa:ste:20200001001"/>
+    </red-def:rpminfo_test>
+    <red-def:rpminfo_test check="at least one" comment="openssl-libs is earlier than 1.0.2" id="oval:com.redhat.rhsa:tst:20200001002" version="1">
+      <red-def:object object_ref="oval:com.redhat.rhsa:obj:20200001002"/>
+      <red-def:state state_ref="oval:com.redhat.rhsa:ste:20200001001"/>
+    </red-def:rpminfo_test>
+    <red-def:rpminfo_test check="at least one" comment="no state" id="oval:com.redhat.rhsa:tst:20200001003" version="1">
+      <red-def:object object_ref="oval:com.redhat.rhsa:obj:20200001002"/>
+    </red-def:rpminfo_test>
+    <red-def:rpminfo_test check="at least one" comment="bash is earlier than 4.2" id="oval:com.redhat.rhsa:tst:20200002001" version="1">
+      <red-def:object object_ref="oval:com.redhat.rhsa:obj:20200002001"/>
+      <red-def:state state_ref="oval:com.redhat.rhsa:ste:20200002001"/>
+    </red-def:rpminfo_test>
+  </tests>
+  <objects>
+    <red-def:rpminfo_object id="oval:com.redhat.rhsa:obj:20200001001" version="1">
+      <red-def:name>openssl</red-def:name>
+    </red-def:rpminfo_object>
+    <red-def:rpminfo_object id="oval:com.redhat.rhsa:obj:20200001002" version="1">
+      <red-def:name var_ref="oval:com.redhat.rhsa:var:1"/>
+    </red-def:rpminfo_object>
+    <red-def:rpminfo_object id="oval:com.redhat.rhsa:obj:20200002001" version="1">
+      <red-def:name>bash</red-def:name>
+    </red-def:rpminfo_object>
+  </objects>
+  <states>
+    <red-def:rpminfo_state id="oval:com.redhat.rhsa:ste:20200001001" version="1">
+      <red-def:evr datatype="evr_string" operation="less than">1.0.2</red-def:evr>
+    </red-def:rpminfo_state>
+    <red-def:rpminfo_state id="oval:com.redhat.rhsa:ste:20200002001" version="1">
+      <red-def:evr datatype="evr_string" operation="less than">4.2</red-def:evr>
+    </red-def:rpminfo_state>
+  </states>
+  <variables>
+    <constant_variable datatype="string" id="oval:com.redhat.rhsa:var:1" version="1">
+      <value>openssl-libs</value>
+      <value>openssl-devel</value>
+    </constant_variable>
+  </variables>
+</oval_definitions>
+'''
+
+
+def _version_cmp(ver1, ver2):
+    ver1, ver2 = LooseVersion(ver1), LooseVersion(ver2)
+    return (ver1 > ver2) - (ver1 < ver2)
+
+
+class TestOvalScanner():
+
+    def setup_method(self):
+        self.cachedir = tempfile.mkdtemp()
+        oval_scanner.__opts__ = {'cachedir': self.cachedir}
+        oval_scanner.__mods__ = {'pkg.version_cmp': _version_cmp}
+        self.source = os.path.join(self.cachedir, 'rhel.xml')
+        with open(self.source, 'wb') as outfile:
+            outfile.write(OVAL)
+
+    def teardown_method(self):
+        shutil.rmtree(self.cachedir)
+
+    def test_index_report_matches_full_parse(self):
+        local_pkgs = {'openssl': '1.0.1', 'openssl-devel': '1.0.2', 'openssl-libs': '1.0.0',
+                      'bash': '4.1', 'zsh': '5.0'}
+        vulns = oval_scanner.create_vulns(oval_scanner.map_oval_ids(oval_scanner.build_oval(OVAL)))
+        expected = oval_scanner.get_impact_report(vulns, local_pkgs, 'redhat')
+        assert sorted(expected) == ['RHSA-2020:0001: openssl security update (Important)',
+                                    'RHSA-2020:0002: bash security update (Low)']
+        index = oval_scanner.load_index(self.source)
+        assert sorted(index['packages']) == ['bash', 'openssl', 'openssl-devel', 'openssl-libs']
+        assert oval_scanner.get_index_report(index, local_pkgs, 'redhat') == expected
+
+    def test_index_cached(self):
+        index = oval_scanner.load_index(self.source)
+        with mock.patch.object(oval_scanner, 'build_index', wraps=oval_scanner.build_index) as build_index:
+            assert oval_scanner.load_index(self.source) == index
+            assert not build_index.called
+            # a new version of the source is indexed again
+            with open(self.source, 'ab') as outfile:
+                outfile.write(b'\n')
+            oval_scanner.load_index(self.source)
+            assert build_index.called
+
+    def test_fetch_source_conditional(self):
+        url = 'https://www.redhat.com/security/data/oval/rhel.xml'
+        response = mock.Mock(status_code=200, headers={'ETag': '"abc"'})
+        response.iter_content.return_value = [OVAL]
+        with mock.patch('requests.get', return_value=response) as get:
+            path = oval_scanner.fetch_source(url, self.cachedir)
+            assert get.call_args[1]['headers'] == {}
+            with open(path, 'rb') as infile:
+                assert infile.read() == OVAL
+
+            get.return_value = mock.Mock(status_code=304)
+            assert oval_scanner.fetch_source(url, self.cachedir) == path
+            assert get.call_args[1]['headers'] == {'If-None-Match': '"abc"'}
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import pytest
+
+import hubblestack.module_runner.runner as runner
+from hubblestack.exceptions import CommandExecutionError
+from hubblestack.module_runner.audit_runner import AuditRunner
+from hubblestack.module_runner.fdg_runner import FdgRunner
+
+PROFILE = b'''
+check_1:
+  description: a check
+  tag: CIS-1
+  implementations:
+    - filter:
+        grains: 'G@osfamily:Debian'
+      hubble_version: '>=4.0.0 AND <5.0.0'
+      module: stat
+      items:
+        - args:
+            path: /etc/passwd
+          comparator:
+            mode: 644
+'''
+
+
+class TestProfileCache():
+
+    def setup_method(self):
+        self.cachedir = tempfile.mkdtemp()
+        runner.__opts__ = {'cachedir': self.cachedir}
+        runner.__grains__ = {'hubble_version': '4.1.0'}
+        runner._PROFILE_CACHE.clear()
+        self.profile = os.path.join(self.cachedir, 'profile.yaml')
+        with open(self.profile, 'wb') as outfile:
+            outfile.write(PROFILE)
+
+    def teardown_method(self):
+        runner._PROFILE_CACHE.clear()
+        del runner.__opts__
+        del runner.__grains__
+        shutil.rmtree(self.cachedir)
+
+    def test_parsed_once_per_content(self):
+        audit = AuditRunner()
+        with mock.patch.object(AuditRunner, '_load_yaml', wraps=audit._load_yaml) as load_yaml:
+            data = audit._load_profile(self.profile, 'profile.yaml')
+            assert data['check_1']['implementations'][0]['items'][0]['comparator'] == {'mode': 644}
+            # copies: changing the result doesn't change the cache
+            data['check_1']['tag'] = 'changed'
+            assert audit._load_profile(self.profile, 'profile.yaml')['check_1']['tag'] == 'CIS-1'
+            assert load_yaml.call_count == 1
+
+            # persisted: a new process (empty memory cache) doesn't parse it
+            runner._PROFILE_CACHE.clear()
+            audit._load_profile(self.profile, 'profile.yaml')
+            assert load_yaml.call_count == 1
+            assert len(os.listdir(os.path.join(self.cachedir, 'profiles'))) == 1
+
+            with open(self.profile, 'ab') as outfile:
+                outfile.write(b'\ncheck_2: {}\n')
+            assert 'check_2' in audit._load_profile(self.profile, 'profile.yaml')
+            assert load_yaml.call_count == 2
+
+    def test_persisted_entries_capped(self):
+        audit = AuditRunner()
+        profiles = os.path.join(self.cachedir, 'profiles')
+        with mock.patch.object(runner, 'PROFILE_CACHE_MAX_ENTRIES', 2):
+            for idx in range(4):
+                with open(self.profile, 'ab') as outfile:
+                    outfile.write('\ncheck_edit_{0}: {{}}\n'.format(idx).encode())
+                audit._load_profile(self.profile, 'profile.yaml')
+                # date the entries of the edits in order, the oldest are removed first
+                newest = max(os.listdir(profiles), key=lambda name: os.stat(os.path.join(profiles, name)).st_mtime)
+                os.utime(os.path.join(profiles, newest), (idx + 1, idx + 1))
+            assert len(os.listdir(profiles)) == 2
+            runner._PROFILE_CACHE.clear()
+            # the last edit is still there
+            with mock.patch.object(AuditRunner, '_load_yaml') as load_yaml:
+                assert 'check_edit_3' in audit._load_profile(self.profile, 'profile.yaml')
+                load_yaml.assert_not_called()
+
+    def test_validated_per_caller(self):
+        AuditRunner()._load_profile(self.profile, 'profile.yaml')
+        # the cached audit profile isn't a valid fdg profile
+        with pytest.raises(CommandExecutionError):
+            FdgRunner()._load_profile(self.profile, 'profile.yaml')
+
+    def test_version_checks(self):
+        audit = AuditRunner()
+        impl = {'hubble_version': '>=4.0.0 AND <5.0.0'}
+        assert audit._is_hubble_version_compatible('check_1', impl)
+        runner.__grains__['hubble_version'] = '5.0.1'
+        assert not audit._is_hubble_version_compatible('check_1', impl)
+        assert audit._is_hubble_version_compatible('check_1', {'hubble_version': '<4.0 OR >5.0'})
@@ -0,0 +1,86 @@
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+import hubblestack.returners.common.delta as delta
+import hubblestack.returners.splunk_audit_return as sar
+import hubblestack.returners.splunk_nova_return as snr
+
+
+class _Hec(object):
+    def __init__(self):
+        self.events = []
+
+    def batchEvent(self, payload):
+        self.events.append(payload['event'])
+
+
+def _result(failures, successes):
+    return {'Failure': [{tag: 'check ' + tag} for tag in failures],
+            'Success': [{tag: 'check ' + tag} for tag in successes],
+            'Compliance': '50%'}
+
+
+class TestReturnerDelta():
+
+    def setup_method(self):
+        self.cachedir = tempfile.mkdtemp()
+        for returner in (sar, snr):
+            returner.__opts__ = {'cachedir': self.cachedir}
+            returner.__grains__ = {'system_uuid': 'uuid'}
+        self.opts = {'indexer': 'idx', 'index': 'hubble', 'sourcetype': 'hubble_audit_v2',
+                     'custom_fields': []}
+        self.ret = {'fun': 'audit.top', 'fun_args': []}
+
+    def teardown_method(self):
+        for returner in (sar, snr):
+            del returner.__opts__
+            del returner.__grains__
+        shutil.rmtree(self.cachedir)
+
+    def _publish(self, data, full_snapshot=delta.DEFAULT_FULL_SNAPSHOT, returner=sar):
+        hec = _Hec()
+        args = {'job_id': '1', 'minion_id': 'm', 'fqdn': 'host', 'fqdn_ip4': '10.0.0.1',
+                'local_fqdn': 'host', 'hec': hec}
+        tracker = delta.ResultDelta(self.cachedir, delta.state_key(returner.__name__, self.opts, self.ret),
+                                    full_snapshot)
+        delta.publish_delta(args=args, data=data, tracker=tracker, cloud_details={}, opts=self.opts,
+                            generate_event=returner._generate_event, publish_event=returner._publish_event)
+        tracker.save()
+        digest = hec.events.pop()
+        return sorted((event['check_id'], event['check_result'], event['delta_change'])
+                      for event in hec.events), digest
+
+    def test_only_changes_sent(self):
+        events, digest = self._publish(_result(['A'], ['B', 'C']))
+        assert events == [('A', 'Failure', 'snapshot'), ('B', 'Success', 'snapshot'),
+                          ('C', 'Success', 'snapshot')]
+        assert digest['delta_checks'] == 3 and digest['delta_full_snapshot']
+
+        events, again = self._publish(_result(['A'], ['B', 'C']))
+        assert events == []
+        assert again['delta_digest'] == digest['delta_digest']
+        assert again['delta_changes'] == 0 and not again['delta_full_snapshot']
+
+        events, changed = self._publish(_result(['B'], ['A', 'D']))
+        assert events == [('A', 'Success', 'fixed'), ('B', 'Failure', 'new_failure'),
+                          ('C', 'Success', 'removed'), ('D', 'Success', 'added')]
+        assert changed['delta_digest'] != digest['delta_digest']
+
+    def test_full_snapshot(self):
+        self._publish(_result(['A'], ['B']), full_snapshot=60)
+        with mock.patch('time.time', return_value=time.time() + 120):
+            events, digest = self._publish(_result(['A'], ['B']), full_snapshot=60)
+        assert [event[2] for event in events] == ['snapshot', 'snapshot']
+
+    def test_duplicate_tags(self):
+        rows = delta.compliance_rows(_result(['A'], ['A']))
+        assert [row[:2] for row in rows] == [('A', 'Failure'), ('A#1', 'Success')]
+
+    def test_nova_events(self):
+        for data in (_result(['A'], ['B', 'C']), _result(['B'], ['A', 'D'])):
+            audit_events, audit_digest = self._publish(data, returner=sar)
+            nova_events, nova_digest = self._publish(data, returner=snr)
+            assert nova_events == audit_events
+            assert nova_digest == audit_digest
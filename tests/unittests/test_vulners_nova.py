@@ -0,0 +1,80 @@
+import http.server
+import json
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import hubblestack.files.hubblestack_nova.vulners_scanner as vulners_scanner
+
+
+class _AuditHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Stand-in for the Vulners.com Linux audit API: openssl is vulnerable
+    """
+    queries = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.queries.append(body['package'])
+        packages = dict((pkg, {'RHSA-2020:0001': [{'package': pkg}]})
+                        for pkg in body['package'] if pkg.startswith('openssl'))
+        data = json.dumps({'result': 'OK', 'data': {'packages': packages}}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestVulnersScanner():
+
+    def setup_method(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.server = http.server.HTTPServer(('127.0.0.1', 0), _AuditHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        _AuditHandler.queries = []
+        self.pkgs = {'openssl': '1.0.1', 'bash': '4.1', 'zsh': '5.0'}
+        vulners_scanner.__opts__ = {'cachedir': self.cachedir}
+        vulners_scanner.__grains__ = {'os': 'CentOS', 'osmajorrelease': 7,
+                                      'os_family': 'RedHat', 'osarch': 'x86_64'}
+        vulners_scanner.__mods__ = {'pkg.list_pkgs': lambda: dict(self.pkgs)}
+        self.data_list = [('cve.vulners', {
+            'vulners_scanner': True, 'vulners_api_key': 'key',
+            'vulners_api_url': 'http://127.0.0.1:{0}'.format(self.server.server_port)})]
+
+    def teardown_method(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cachedir)
+
+    def test_incremental(self):
+        ret = vulners_scanner.audit(self.data_list, '*', [])
+        assert [fail['tag'] for fail in ret['Failure']] == ['Vulnerable package: openssl-1.0.1.x86_64']
+        assert ret['Success'][0]['description'] == '2 out of 3'
+        assert sorted(_AuditHandler.queries[-1]) == ['bash-4.1.x86_64', 'openssl-1.0.1.x86_64',
+                                                     'zsh-5.0.x86_64']
+
+        # nothing changed: no query, same results
+        assert vulners_scanner.audit(self.data_list, '*', []) == ret
+        assert len(_AuditHandler.queries) == 1
+
+        # only the changed package is queried
+        self.pkgs['openssl'] = '1.0.2'
+        del self.pkgs['zsh']
+        ret = vulners_scanner.audit(self.data_list, '*', [])
+        assert _AuditHandler.queries[-1] == ['openssl-1.0.2.x86_64']
+        assert [fail['tag'] for fail in ret['Failure']] == ['Vulnerable package: openssl-1.0.2.x86_64']
+        assert ret['Success'][0]['description'] == '1 out of 2'
+
+    def test_expired(self):
+        self.data_list[0][1]['vulners_cache_ttl'] = 60
+        vulners_scanner.audit(self.data_list, '*', [])
+        with mock.patch('time.time', return_value=time.time() + 120):
+            vulners_scanner.audit(self.data_list, '*', [])
+        assert len(_AuditHandler.queries) == 2
+        assert len(_AuditHandler.queries[-1]) == 3
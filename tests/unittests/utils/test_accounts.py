@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from tests.support.unit import TestCase
+
+import hubblestack.audit.misc
+import hubblestack.utils.accounts as accounts
+import hubblestack.utils.filecache as filecache
+
+PASSWD = '''root:x:0:0:root:/root:/bin/bash
+toor:x:0:0::/root:/bin/sh
+daemon:x:1:1:daemon:/usr/sbin:/usr/sbin/nologin
+
+short:x:1000
+'''
+
+GROUP = '''root:x:0:
+daemon:x:1:
+wheel:x:10:root,toor
+'''
+
+
+class AccountsTestCase(TestCase):
+    '''
+    Tests the functions in hubblestack.utils.accounts
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        filecache.clear()
+        patcher = mock.patch.multiple(accounts, PASSWD=self._write('passwd', PASSWD),
+                                      GROUP=self._write('group', GROUP),
+                                      SHADOW=os.path.join(self.tmpdir, 'shadow'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        filecache.clear()
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, data):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w') as fh:
+            fh.write(data)
+        then = time.time() - 60
+        os.utime(path, (then, then))
+        return path
+
+    def test_entries(self):
+        entries = accounts.passwd()
+        self.assertEqual([entry[0] for entry in entries], ['root', 'toor', 'daemon', 'short'])
+        self.assertEqual(entries[1], ('toor', 'x', '0', '0', '', '/root', '/bin/sh'))
+        self.assertEqual(accounts.field(entries[3], 5), '')
+        self.assertEqual(accounts.group()[2][3], 'root,toor')
+        self.assertRaises(OSError, accounts.shadow)
+
+    def test_parsed_once(self):
+        misses = filecache.STATS['misses']
+        for _ in range(3):
+            accounts.passwd()
+            self.assertEqual(accounts.uid_to_name(0), 'root')
+        self.assertEqual(filecache.STATS['misses'], misses + 2)
+
+    def test_id_to_name(self):
+        self.assertEqual(accounts.uid_to_name(1), 'daemon')
+        self.assertEqual(accounts.uid_to_name('1000'), 'short')
+        self.assertIsNone(accounts.uid_to_name(4242))
+        self.assertEqual(accounts.gid_to_name(10), 'wheel')
+        with mock.patch.object(accounts, 'GROUP', os.path.join(self.tmpdir, 'missing')):
+            self.assertIsNone(accounts.gid_to_name(10))
+
+    def test_misc_checks(self):
+        misc = hubblestack.audit.misc
+        self.assertEqual(misc._root_is_only_uid_0_account('id', {}, {}), 'root\ntoor')
+        self.assertEqual(misc._check_duplicate_uids('id', {}, {}), "['0']")
+        self.assertTrue(misc._check_duplicate_gids('id', {}, {}))
+
+    def test_misc_max_password_expiration(self):
+        # accounts without a password are checked too, locked ones aren't
+        self._write('shadow', 'root:$6$salt$hash:19000:0:99999:7:::\n'
+                              'nopass::19000:0:99999:7:::\n'
+                              'locked:!:19000:0:99999:7:::\n'
+                              'daemon:*:19000:0:99999:7:::\n'
+                              'ok:$6$salt$hash:19000:0:60:7:::\n')
+        misc = hubblestack.audit.misc
+        block = {'args': {'allow_max_days': 90, 'except_for_users': 'root'}}
+        with mock.patch.object(misc, '_grep', return_value={'stdout': 'PASS_MAX_DAYS 90'}):
+            self.assertEqual(misc._ensure_max_password_expiration('id', block),
+                             "['User nopass has max password expiry days 99999, which is more than 90']")
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from tests.support.unit import TestCase
+
+import hubblestack.audit.readfile
+import hubblestack.fdg.readfile
+import hubblestack.utils.filecache as filecache
+
+
+class FileCacheTestCase(TestCase):
+    '''
+    Tests the functions in hubblestack.utils.filecache
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        filecache.clear()
+        self.calls = []
+
+    def tearDown(self):
+        filecache.clear()
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, data, age=60):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w') as fh:
+            fh.write(data)
+        then = time.time() - age
+        os.utime(path, (then, then))
+        return path
+
+    def _parser(self, file_handle):
+        self.calls.append(1)
+        return json.load(file_handle)
+
+    def test_parsed_once_per_version(self):
+        path = self._write('daemon.json', '{"a": {"b": 1}}')
+        for _ in range(5):
+            self.assertEqual(filecache.parsed(path, 'json', self._parser), {'a': {'b': 1}})
+        self.assertEqual(len(self.calls), 1)
+
+        # a different mode or params is a different entry
+        filecache.parsed(path, 'json', self._parser, ('x',))
+        self.assertEqual(len(self.calls), 2)
+
+        self._write('daemon.json', '{"a": {"b": 2}}', age=30)
+        self.assertEqual(filecache.parsed(path, 'json', self._parser), {'a': {'b': 2}})
+        self.assertEqual(len(self.calls), 3)
+
+    def test_recently_modified_not_cached(self):
+        path = self._write('daemon.json', '{}', age=0)
+        filecache.parsed(path, 'json', self._parser)
+        filecache.parsed(path, 'json', self._parser)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_errors_not_cached(self):
+        path = self._write('bad.json', '{')
+        self.assertRaises(ValueError, filecache.parsed, path, 'json', self._parser)
+        self.assertRaises(ValueError, filecache.parsed, path, 'json', self._parser)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_lru_eviction_by_size(self):
+        orig = filecache.MAX_BYTES
+        filecache.MAX_BYTES = 100
+        try:
+            paths = [self._write('f{0}.json'.format(i), json.dumps('x' * 38)) for i in range(3)]
+            filecache.parsed(paths[0], 'json', self._parser)
+            filecache.parsed(paths[1], 'json', self._parser)
+            filecache.parsed(paths[0], 'json', self._parser)
+            # over the limit: evicts paths[1], the least recently used
+            filecache.parsed(paths[2], 'json', self._parser)
+            self.assertEqual(len(self.calls), 3)
+            filecache.parsed(paths[0], 'json', self._parser)
+            self.assertEqual(len(self.calls), 3)
+            filecache.parsed(paths[1], 'json', self._parser)
+            self.assertEqual(len(self.calls), 4)
+        finally:
+            filecache.MAX_BYTES = orig
+
+    def test_shared_by_readfile_modules(self):
+        path = self._write('daemon.json', '{"log-opts": {"max-size": "10m"}, "hosts": ["a", "b"]}')
+        misses = filecache.STATS['misses']
+        block = {'args': {'path': path, 'format': 'json', 'subkey': 'hosts'}}
+        status, ret = hubblestack.audit.readfile.execute('check', block)
+        self.assertTrue(status)
+        # results are copies, changing them doesn't change the cached data
+        ret['result'].append('c')
+        status, ret = hubblestack.fdg.readfile.json(path, subkey='hosts')
+        self.assertEqual(ret, ['a', 'b'])
+        status, ret = hubblestack.fdg.readfile.json(path, subkey='log-opts:max-size', sep=':')
+        self.assertEqual(ret, '10m')
+        self.assertEqual(filecache.STATS['misses'], misses + 1)
+
+        conf = self._write('sshd_config', 'Port 22\nCiphers a,b\n')
+        ret = hubblestack.audit.readfile._lines_as_dict(conf, None, None, ' ', ',', None)
+        self.assertEqual(ret, {'Port': ['22'], 'Ciphers': ['a', 'b']})
+        ret['Port'].append('2222')
+        ret = hubblestack.fdg.readfile._lines_as_dict(conf, None, None, ' ', ',', None)
+        self.assertEqual(ret, {'Port': ['22'], 'Ciphers': ['a', 'b']})
+        self.assertEqual(filecache.STATS['misses'], misses + 2)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from tests.support.unit import TestCase, skipIf
+
+import hubblestack.utils.grep as grep
+
+SAMPLE = '''# sshd_config
+Port 22
+#PermitRootLogin yes
+PermitRootLogin no
+  MaxAuthTries  4
+Protocol 2
+Banner /etc/issue.net
+ClientAliveInterval 300
+ciphers aes256-ctr
+'''
+
+
+class GrepTestCase(TestCase):
+    '''
+    Tests the functions in hubblestack.utils.grep
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'sshd_config')
+        with open(self.path, 'w') as fh:
+            fh.write(SAMPLE)
+        grep.clear_primed()
+
+    def tearDown(self):
+        grep.clear_primed()
+        shutil.rmtree(self.tmpdir)
+
+    def test_parse_args(self):
+        args = grep.parse_args(['-iE', '-A1', '--', '-x', 'file'])
+        self.assertTrue(args.icase)
+        self.assertEqual(args.syntax, 'E')
+        self.assertEqual(args.after, 1)
+        self.assertEqual(args.patterns, ['-x'])
+        self.assertEqual(args.files, ['file'])
+        self.assertRaises(grep.Unsupported, grep.parse_args, ['-r', 'x', 'file'])
+        self.assertRaises(grep.Unsupported, grep.parse_args, ['--color', 'x', 'file'])
+
+    def test_translate(self):
+        self.assertEqual(grep.translate(b'a\\{2\\}', 'G'), b'a{2}')
+        self.assertEqual(grep.translate(b'a+', 'G'), b'a\\+')
+        self.assertEqual(grep.translate(b'*a', 'G'), b'\\*a')
+        self.assertEqual(grep.translate(b'[[:digit:]]+', 'E'), b'[0-9]+')
+        for pattern in (b'(?i)a', b'\\d', b'[:space:]'):
+            self.assertRaises(grep.Unsupported, grep.translate, pattern, 'E')
+
+    def test_run(self):
+        ret = grep.run(['^PermitRootLogin', self.path])
+        self.assertEqual(ret, {'pid': None, 'retcode': 0, 'stdout': 'PermitRootLogin no', 'stderr': ''})
+
+        ret = grep.run(['-E', '-i', '-c', '^(port|protocol) [0-9]+$', self.path])
+        self.assertEqual(ret['stdout'], '2')
+
+        ret = grep.run(['-n', '-A', '1', 'Banner', self.path])
+        self.assertEqual(ret['stdout'], '7:Banner /etc/issue.net\n8-ClientAliveInterval 300')
+
+        ret = grep.run(['-w', 'MaxAuthTries[[:space:]]*4', self.path])
+        self.assertEqual(ret['stdout'], '  MaxAuthTries  4')
+
+        ret = grep.run(['-q', 'UsePAM', self.path])
+        self.assertEqual(ret, {'pid': None, 'retcode': 1, 'stdout': '', 'stderr': ''})
+
+        ret = grep.run(['-v', '^#', self.path])
+        self.assertEqual(len(ret['stdout'].splitlines()), 7)
+
+        ret = grep.run(['-F', 'x', os.path.join(self.tmpdir, 'missing')])
+        self.assertEqual(ret['retcode'], 2)
+        self.assertIn('No such file or directory', ret['stderr'])
+
+        ret = grep.run(['-E', 'b|c'], stdin='a\nb\nc\n')
+        self.assertEqual(ret['stdout'], 'b\nc')
+
+    def test_unsupported_falls_back(self):
+        self.assertIsNone(grep.run(['-r', 'Port', self.tmpdir]))
+        self.assertIsNone(grep.run(['Port', self.path, self.path]))
+        self.assertIsNone(grep.run(['-P', '\\d+', self.path]))
+        self.assertIsNone(grep.run(['Port', self.tmpdir]))
+        self.assertIsNone(grep.run(['Port']))
+
+    def test_prime(self):
+        argvs = [['^Port', self.path], ['-c', 'Permit', self.path], ['-r', 'x', self.path]]
+        self.assertEqual(grep.prime(self.path, argvs), 2)
+
+        # primed results are handed out without reading the file again
+        with open(self.path) as fh:
+            data = fh.read()
+        os.chmod(self.path, 0)
+        try:
+            self.assertEqual(grep.run(['-c', 'Permit', self.path])['stdout'], '2')
+        finally:
+            os.chmod(self.path, 0o644)
+
+        # until the file changes
+        time.sleep(0.01)
+        with open(self.path, 'w') as fh:
+            fh.write(data + 'Port 2222\n')
+        self.assertEqual(grep.run(['^Port', self.path])['stdout'], 'Port 22\nPort 2222')
+
+        grep.prime(self.path, [['^Port', self.path], ['Protocol', self.path]])
+        grep.clear_primed()
+        self.assertFalse(grep._PRIMED)
+
+    @skipIf(not shutil.which('grep'), 'grep is not installed')
+    def test_matches_grep(self):
+        cases = [
+            ['^Permit'], ['-E', '^ *Max[A-Za-z]+ +[0-9]$'], ['-i', 'PORT'],
+            ['-x', 'Port 22'], ['-w', 'yes'], ['-vc', '^#'], ['-B1', '-n', 'Protocol'],
+            ['-C', '1', 'Root'], ['-F', '.net'], ['\\(Port\\|Banner\\) '],
+            ['-E', 'ciphers.*(cbc|ctr)'], ['-e', 'Port', '-e', 'Banner'],
+            ['-iw', 'client[a-z]*'], ['-E', 'a{2,}|[[:upper:]]{3}'],
+        ]
+        env = dict(os.environ, LC_ALL='C')
+        for argv in cases:
+            proc = subprocess.run(['grep'] + argv + [self.path], env=env,
+                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            ret = grep.run(argv + [self.path])
+            self.assertEqual(ret['retcode'], proc.returncode, argv)
+            self.assertEqual(ret['stdout'], proc.stdout.decode().rstrip(), argv)
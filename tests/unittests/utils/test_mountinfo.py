@@ -0,0 +1,61 @@
+import os
+import tempfile
+
+import pytest
+
+import hubblestack.utils.mount
+
+MOUNTINFO = (
+    "22 1 253:0 / / rw,relatime shared:1 - ext4 /dev/mapper/vg-root rw,errors=remount-ro\n"
+    "23 22 0:21 / /proc rw,nosuid,nodev,noexec,relatime shared:12 - proc proc rw\n"
+    "41 22 0:35 /export /mnt/my\\040share rw,nosuid master:3 propagate_from:2 - nfs4 srv:/a\\040b "
+    "rw,vers=4.2\n"
+    "42 22 0:36 / /tmp rw,nosuid,nodev - tmpfs tmpfs rw,size=1024k\n"
+    "malformed\n"
+)
+
+
+class TestMountinfo():
+
+    def setup_method(self):
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as outfile:
+            outfile.write(MOUNTINFO)
+
+    def teardown_method(self):
+        os.unlink(self.path)
+
+    def test_parse(self):
+        table = hubblestack.utils.mount.parse_mountinfo(MOUNTINFO)
+        assert [entry['mountpoint'] for entry in table] == ['/', '/proc', '/mnt/my share', '/tmp']
+        assert table[2] == {
+            'mountid': '41', 'parentid': '22', 'major': '0', 'minor': '35', 'root': '/export',
+            'mountpoint': '/mnt/my share', 'opts': ['rw', 'nosuid'],
+            'propagation': ['master:3', 'propagate_from:2'], 'fstype': 'nfs4', 'device': 'srv:/a b',
+            'superopts': ['rw', 'vers=4.2']}
+        assert table[3]['propagation'] == []
+
+    def test_cached_until_changed(self):
+        mount_table = hubblestack.utils.mount.MountTable(self.path)
+        table = mount_table.get()
+        with open(self.path, 'a') as outfile:
+            outfile.write("43 22 0:37 / /var/tmp rw - tmpfs tmpfs rw\n")
+        # a regular file never signals a change, unlike mountinfo
+        assert mount_table.get() is table
+        assert mount_table.reads == 1
+
+        mount_table._poll = _Changed()
+        assert len(mount_table.get()) == 5
+        assert mount_table.reads == 2
+        mount_table.close()
+
+    @pytest.mark.skipif(not os.path.exists(hubblestack.utils.mount.MOUNTINFO), reason='no mountinfo')
+    def test_proc(self):
+        table = hubblestack.utils.mount.mounts()
+        assert '/' in [entry['mountpoint'] for entry in table]
+        assert hubblestack.utils.mount.mounts() is table
+
+
+class _Changed(object):
+    def poll(self, timeout):
+        return [(0, 0)]
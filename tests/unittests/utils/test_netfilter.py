@@ -0,0 +1,95 @@
+import os
+
+import hubblestack.utils.netfilter as netfilter
+
+RESOURCES = os.path.join(os.path.dirname(__file__), '..', 'resources', 'netfilter')
+
+
+def _fixture(name):
+    with open(os.path.join(RESOURCES, name), 'r') as infile:
+        return infile.read()
+
+
+class TestIptablesSave():
+
+    def setup_method(self):
+        self.ruleset = netfilter.parse_iptables_save(_fixture('iptables-save.txt'), 'ipv4')
+
+    def test_chains(self):
+        assert self.ruleset.policy('filter', 'INPUT') == 'DROP'
+        assert self.ruleset.policy('filter', 'LOGDROP') is None
+        assert self.ruleset.policy('filter', 'INPUT', family='ipv6') is None
+        assert self.ruleset.chains[('ipv4', 'raw', 'OUTPUT')] == {'policy': 'ACCEPT', 'packets': '1626',
+                                                                   'bytes': '262211'}
+
+    def test_rules(self):
+        rules = self.ruleset.select(table='filter', chain='INPUT')
+        assert [rule.position for rule in rules] == [1, 2, 3, 4, 5, 6]
+        assert [rule.target for rule in rules] == ['ACCEPT', 'ACCEPT', 'ACCEPT', 'ACCEPT', 'LOGDROP', 'LOGDROP']
+        assert rules[0].in_interface == 'lo'
+        assert rules[1].options['--state'] == ['RELATED,ESTABLISHED']
+        ssh = rules[2]
+        assert (ssh.protocol, ssh.dports, ssh.comment) == ('tcp', ['22'], 'ssh from "anywhere"')
+        assert ssh.options['--match'] == ['tcp', 'comment']
+        assert (rules[3].source, rules[3].dports) == ('10.0.0.0/8', ['80', '443', '8000:8100'])
+        assert (rules[4].source, rules[4].sports) == ('!192.168.0.0/16', ['53'])
+        assert rules[4].raw == '-A INPUT ! -s 192.168.0.0/16 -p udp -m udp --sport 53 -j LOGDROP'
+
+    def test_other_tables(self):
+        assert len(self.ruleset.select()) == 11
+        masquerade = self.ruleset.select(table='nat', chain='POSTROUTING')[0]
+        assert (masquerade.out_interface, masquerade.target) == ('!docker0', 'MASQUERADE')
+        log = self.ruleset.select(chain='LOGDROP')[0]
+        assert log.options['--log-prefix'] == ['iptables drop: ']
+        assert log.options['--limit'] == ['5/min']
+
+    def test_split_args(self):
+        assert netfilter.split_args('-A X -m comment --comment "a \\"b\\" c" -j ACCEPT') == \
+            ['-A', 'X', '-m', 'comment', '--comment', 'a "b" c', '-j', 'ACCEPT']
+
+
+class TestNftJson():
+
+    def setup_method(self):
+        self.ruleset = netfilter.parse_nft_json(_fixture('nft-ruleset.json'))
+
+    def test_rules(self):
+        rules = self.ruleset.select(family='inet', table='firewall', chain='input')
+        assert [rule.target for rule in rules] == ['ACCEPT', 'services', 'DROP']
+        assert all(rule.backend == netfilter.NFTABLES for rule in rules)
+        public = rules[1]
+        assert (public.position, public.protocol, public.source, public.comment) == \
+            (2, 'tcp', '!192.168.0.0/16', 'public services')
+        assert public.dports == ['22', '80', '8000:8100']
+        assert (rules[2].protocol, rules[2].sports) == ('udp', ['53'])
+        assert self.ruleset.policy('firewall', 'input', family='inet') == 'DROP'
+        assert self.ruleset.policy('firewall', 'services', family='inet') is None
+
+    def test_ip_family(self):
+        rule = self.ruleset.select(family='ipv4', table='filter', chain='INPUT')[0]
+        assert (rule.in_interface, rule.target) == ('lo', 'ACCEPT')
+        assert rule.raw['handle'] == 4
+
+    def test_empty(self):
+        assert netfilter.parse_nft_json('').rules == []
+
+
+class TestSnapshot():
+
+    def test_snapshot(self):
+        saves = {'ipv4': _fixture('iptables-save.txt'), 'ipv6': _fixture('ip6tables-save.txt')}
+        ruleset = netfilter.snapshot(saves, _fixture('nft-ruleset.json'))
+        assert len(ruleset.select(family='ipv6', table='filter', chain='INPUT')) == 4
+        assert ruleset.select(family='ipv6')[3].options['--reject-with'] == ['icmp6-port-unreachable']
+        # the ip filter table is the one iptables-nft manages, listed by iptables-save
+        assert ruleset.select(family='ipv4', backend=netfilter.NFTABLES) == []
+        assert len(ruleset.select(family='inet')) == 4
+
+    def test_snapshot_nft_only(self):
+        ruleset = netfilter.snapshot({}, _fixture('nft-ruleset.json'))
+        assert len(ruleset.select(family='ipv4')) == 1
+        assert ruleset.policy('filter', 'INPUT') == 'DROP'
+
+    def test_snapshot_bad_nft(self):
+        ruleset = netfilter.snapshot({'ipv6': _fixture('ip6tables-save.txt')}, '{"nftables": [')
+        assert len(ruleset.rules) == 4
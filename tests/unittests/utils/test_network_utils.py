@@ -3,6 +3,7 @@
 import logging
 import socket
 import textwrap
+import unittest.mock
 
 from tests.support.unit import skipIf
 from tests.support.unit import TestCase
@@ -22,6 +23,26 @@ from hubblestack.utils._compat import ipaddress
 
 log = logging.getLogger(__name__)
 
+PROC_NET = {
+    '/proc/net/tcp': textwrap.dedent('''\
+          sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode
+           0: 00000000:0016 00000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 1001 1 0000000000000000 100 0 0 10 0
+           1: 0100007F:0CEA 0100007F:9A42 01 00000010:00000002 02:000AF4E2 00000000  1000        0 1002 1 0000000000000000 20 4 30 10 -1
+        '''),
+    '/proc/net/tcp6': textwrap.dedent('''\
+          sl  local_address                         remote_address                        st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode
+           0: 00000000000000000000000000000000:0050 00000000000000000000000000000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 1003 1 0000000000000000 100 0 0 10 0
+           1: 0000000000000000FFFF00000100007F:0050 0000000000000000FFFF00000100007F:D431 01 00000000:00000000 00:00000000 00000000    33        0 1004 1 0000000000000000 20 4 30 10 -1
+        '''),
+    '/proc/net/udp': textwrap.dedent('''\
+           sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode ref pointer drops
+          100: 3500007F:0035 00000000:0000 07 00000000:00000000 00:00000000 00000000   101        0 1005 2 0000000000000000 0
+        '''),
+    '/proc/net/udp6': textwrap.dedent('''\
+           sl  local_address                         remote_address                        st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode ref pointer drops
+        '''),
+}
+
 LINUX = '''\
 eth0      Link encap:Ethernet  HWaddr e0:3f:49:85:6a:af
           inet addr:10.10.10.56  Bcast:10.10.10.255  Mask:255.255.252.0
@@ -272,3 +293,69 @@ class NetworkTestCase(TestCase):
                                                   'scope': 'vioif0'}],
                                       'up': True}}
         )
+
+
+class ProcNetTestCase(TestCase):
+    '''
+    Tests the /proc/net socket inventory
+    '''
+    def test_hex2ip(self):
+        self.assertEqual(network.hex2ip('0100007F', invert=True), '127.0.0.1')
+        self.assertEqual(network.hex2ip('7F000001'), '127.0.0.1')
+        self.assertEqual(network.hex2ip('00000000000000000000000001000000', invert=True), '::1')
+        self.assertEqual(network.hex2ip('0000000000000000FFFF00000100007F', invert=True),
+                         '::ffff:127.0.0.1')
+        self.assertEqual(network.hex2ip('XYZ'), 'XYZ')
+
+    def test_proc_netstat(self):
+        with unittest.mock.patch('builtins.open', _proc_net_open), \
+                unittest.mock.patch.object(network, 'socket_owners', lambda: {'1001': '612/sshd', '1005': '540/systemd-resolve'}):
+            sockets = network.proc_netstat()
+            active = network.active_tcp()
+        self.assertEqual(sockets, [
+            {'proto': 'tcp', 'recv-q': '0', 'send-q': '0', 'local-address': '0.0.0.0:22',
+             'remote-address': '0.0.0.0:*', 'state': 'LISTEN', 'user': '0', 'inode': '1001',
+             'program': '612/sshd'},
+            {'proto': 'tcp', 'recv-q': '2', 'send-q': '16', 'local-address': '127.0.0.1:3306',
+             'remote-address': '127.0.0.1:39490', 'state': 'ESTABLISHED', 'user': '1000',
+             'inode': '1002', 'program': '-'},
+            {'proto': 'tcp6', 'recv-q': '0', 'send-q': '0', 'local-address': ':::80',
+             'remote-address': ':::*', 'state': 'LISTEN', 'user': '0', 'inode': '1003',
+             'program': '-'},
+            {'proto': 'tcp6', 'recv-q': '0', 'send-q': '0', 'local-address': '::ffff:127.0.0.1:80',
+             'remote-address': '::ffff:127.0.0.1:54321', 'state': 'ESTABLISHED', 'user': '33',
+             'inode': '1004', 'program': '-'},
+            {'proto': 'udp', 'recv-q': '0', 'send-q': '0', 'local-address': '127.0.0.53:53',
+             'remote-address': '0.0.0.0:*', 'user': '101', 'inode': '1005',
+             'program': '540/systemd-resolve'},
+        ])
+        self.assertEqual(active, {
+            0: {'local_addr': '127.0.0.1', 'local_port': 3306,
+                'remote_addr': '127.0.0.1', 'remote_port': 39490},
+            1: {'local_addr': '::ffff:127.0.0.1', 'local_port': 80,
+                'remote_addr': '::ffff:127.0.0.1', 'remote_port': 54321},
+        })
+
+    def test_socket_owners_cached(self):
+        scans = []
+        real_scandir = network.os.scandir
+
+        def _scandir(path):
+            scans.append(path)
+            return real_scandir(path)
+
+        with unittest.mock.patch.object(network.os, 'scandir', _scandir):
+            network.socket_owners(refresh=True)
+            network.socket_owners()
+            self.assertEqual(len(scans), 1)
+            network.socket_owners(refresh=True)
+            self.assertEqual(len(scans), 2)
+
+
+_REAL_OPEN = open
+
+
+def _proc_net_open(path, *args, **kwargs):
+    if path in PROC_NET:
+        return unittest.mock.mock_open(read_data=PROC_NET[path])(path, *args, **kwargs)
+    return _REAL_OPEN(path, *args, **kwargs)
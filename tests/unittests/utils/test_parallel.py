@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+from tests.support.unit import TestCase
+
+import hubblestack.utils.parallel as parallel
+
+
+def _sleeper(value, seconds):
+    def _func():
+        time.sleep(seconds)
+        return value
+    return _func
+
+
+class ParallelTestCase(TestCase):
+    '''
+    Tests the functions in hubblestack.utils.parallel
+    '''
+    def test_results_keep_task_order(self):
+        tasks = [(i, _sleeper(i, 0.05 * (5 - i))) for i in range(5)]
+        results = parallel.run_tasks(tasks, workers=5)
+        self.assertEqual([res.key for res in results], list(range(5)))
+        self.assertEqual([res.value for res in results], list(range(5)))
+        self.assertTrue(all(res.ok for res in results))
+
+    def test_runs_concurrently_within_bound(self):
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def _task():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.1)
+            with lock:
+                running.pop()
+
+        start = time.time()
+        results = parallel.run_tasks([_task] * 8, workers=4)
+        elapsed = time.time() - start
+        self.assertTrue(all(res.ok for res in results))
+        self.assertEqual(max(peak), 4)
+        self.assertLess(elapsed, 0.6)
+
+    def test_exceptions_are_captured(self):
+        def _boom():
+            raise ValueError('boom')
+        results = parallel.run_tasks([('a', _boom), ('b', lambda: 2)], workers=2)
+        self.assertIsInstance(results[0].exc, ValueError)
+        self.assertFalse(results[0].ok)
+        self.assertEqual(results[1].value, 2)
+
+    def test_per_task_timeout_does_not_block_others(self):
+        tasks = [('slow', _sleeper('slow', 5), 0.2),
+                 ('fast1', _sleeper('fast1', 0.05)),
+                 ('fast2', _sleeper('fast2', 0.05))]
+        start = time.time()
+        results = parallel.run_tasks(tasks, workers=1, timeout=None)
+        elapsed = time.time() - start
+        self.assertLess(elapsed, 1)
+        self.assertTrue(results[0].timed_out)
+        self.assertIsNone(results[0].value)
+        self.assertEqual([res.value for res in results[1:]], ['fast1', 'fast2'])
+
+    def test_deadline(self):
+        tasks = [('a', _sleeper('a', 5)), ('b', _sleeper('b', 5))]
+        start = time.time()
+        results = parallel.run_tasks(tasks, workers=1, deadline=0.2)
+        self.assertLess(time.time() - start, 1)
+        self.assertTrue(results[0].timed_out)
+        self.assertTrue(results[1].timed_out)
+        self.assertIsNone(results[1].started)
+
+    def test_inline_when_sequential(self):
+        idents = []
+        parallel.run_tasks([lambda: idents.append(threading.get_ident())], workers=1)
+        self.assertEqual(idents, [threading.get_ident()])
@@ -0,0 +1,46 @@
+import os
+import shutil
+import tempfile
+
+import hubblestack.utils.pkg.inventory as inventory
+
+
+class TestPkgInventory():
+
+    def setup_method(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.status = os.path.join(self.tmpdir, 'status')
+        self.databases = (os.path.join(self.tmpdir, 'Packages'), self.status)
+        self._write('Package: bash\n')
+
+    def teardown_method(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, content):
+        # dpkg replaces its status file
+        with open(self.status + '-new', 'w') as outfile:
+            outfile.write(content)
+        os.rename(self.status + '-new', self.status)
+
+    def test_generation(self):
+        assert inventory.stamp((self.databases[0],)) is None
+        assert inventory.generation((self.databases[0],)) is None
+        generation = inventory.generation(self.databases)
+        assert inventory.generation(self.databases) == generation
+        self._write('Package: bash\nPackage: zsh\n')
+        assert inventory.generation(self.databases) == generation + 1
+
+    def test_refresh_context(self):
+        context = {'pkg.list_pkgs': {'bash': '5.0'}}
+        generation = inventory.refresh_context(context, self.databases)
+        assert context == {'pkg.list_pkgs': {'bash': '5.0'}, 'pkg.list_pkgs_generation': generation}
+        inventory.refresh_context(context, self.databases)
+        assert 'pkg.list_pkgs' in context
+
+        self._write('Package: bash\nPackage: zsh\n')
+        assert inventory.refresh_context(context, self.databases) == generation + 1
+        assert context == {'pkg.list_pkgs_generation': generation + 1}
+
+        context['pkg.list_pkgs'] = {'bash': '5.0', 'zsh': '5.8'}
+        assert inventory.refresh_context(context, (self.databases[0],)) is None
+        assert context['pkg.list_pkgs'] == {'bash': '5.0', 'zsh': '5.8'}
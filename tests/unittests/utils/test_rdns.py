@@ -0,0 +1,146 @@
+import socket
+import threading
+import time
+
+import pytest
+
+import hubblestack.modules.network as network
+import hubblestack.utils.network
+import hubblestack.utils.rdns as rdns
+
+
+class StandInResolver(object):
+    '''
+    Stands in for the resolver of the host: answers from a table, with a
+    delay per address, and counts the queries it got
+    '''
+
+    def __init__(self):
+        self.names = {}
+        self.delays = {}
+        self.errors = {}
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def __call__(self, address):
+        with self.lock:
+            self.queries.append(address)
+        time.sleep(self.delays.get(address, 0))
+        if address in self.errors:
+            raise self.errors[address]
+        if address not in self.names:
+            raise socket.herror(1, 'Unknown host')
+        return [self.names[address]]
+
+    def gethostbyaddr(self, address):
+        # socket.gethostbyaddr of the stand-in
+        return self(address)[0], [], [address]
+
+
+@pytest.fixture
+def resolver():
+    rdns.clear()
+    stand_in = StandInResolver()
+    stand_in.names.update({'10.0.0.1': 'one.example.com', '10.0.0.2': 'two.example.com',
+                           'fe80::1': 'six.example.com'})
+    yield stand_in
+    rdns.clear()
+
+
+def test_gethostbyaddr(resolver, monkeypatch):
+    monkeypatch.setattr(socket, 'gethostbyaddr', resolver.gethostbyaddr)
+    monkeypatch.setattr(socket, 'getfqdn', lambda name: name)
+    resolver.errors['10.0.0.4'] = socket.herror(2, 'Host name lookup failure')
+    assert rdns.gethostbyaddr('10.0.0.1') == ['one.example.com']
+    assert rdns.gethostbyaddr('10.0.0.3') == []
+    with pytest.raises(socket.herror):
+        rdns.gethostbyaddr('10.0.0.4')
+
+
+def test_concurrent_and_cached(resolver):
+    for address in ('10.0.0.1', '10.0.0.2', 'fe80::1', '10.0.0.3'):
+        resolver.delays[address] = 0.5
+    resolver.errors['10.0.0.4'] = socket.gaierror(-3, 'Temporary failure in name resolution')
+    addresses = ['10.0.0.1', '10.0.0.2', 'fe80::1', '10.0.0.3', '10.0.0.4', '10.0.0.1']
+    start = time.time()
+    ret = rdns.resolve(addresses, workers=8, timeout=5, deadline=10, resolver=resolver)
+    # one after the other, that would take 2 seconds
+    assert time.time() - start < 1.5
+    assert ret == {'10.0.0.1': ['one.example.com'], '10.0.0.2': ['two.example.com'],
+                   'fe80::1': ['six.example.com'], '10.0.0.3': [], '10.0.0.4': []}
+    assert sorted(resolver.queries) == sorted(set(addresses))
+    # names and the lack of them are both reused
+    assert rdns.resolve(addresses, resolver=resolver) == ret
+    assert len(resolver.queries) == 5
+
+
+def test_ttls(resolver):
+    rdns.resolve(['10.0.0.1', '10.0.0.3'], resolver=resolver, ttl=60, negative_ttl=0)
+    rdns.resolve(['10.0.0.1', '10.0.0.3'], resolver=resolver, ttl=60, negative_ttl=0)
+    assert sorted(resolver.queries) == ['10.0.0.1', '10.0.0.3', '10.0.0.3']
+
+
+def test_timeout_and_deadline(resolver):
+    resolver.delays['10.0.0.1'] = 0.8
+    resolver.delays['10.0.0.2'] = 0.8
+    start = time.time()
+    # one worker: 10.0.0.1 hits the timeout, 10.0.0.2 the deadline, fe80::1 never starts
+    ret = rdns.resolve(['10.0.0.1', '10.0.0.2', 'fe80::1'], workers=1, timeout=0.3, deadline=0.5,
+                       resolver=resolver)
+    assert time.time() - start < 0.8
+    assert ret == {'10.0.0.1': [], '10.0.0.2': [], 'fe80::1': []}
+    assert 'fe80::1' not in resolver.queries
+    # the abandoned lookups record their names once they finish
+    time.sleep(1.5)
+    ret = rdns.resolve(['10.0.0.1', '10.0.0.2'], resolver=resolver)
+    assert ret == {'10.0.0.1': ['one.example.com'], '10.0.0.2': ['two.example.com']}
+    assert resolver.queries.count('10.0.0.1') == 1
+
+
+def test_resolve_args():
+    assert rdns.resolve_args({}) == {'workers': 8, 'timeout': 5, 'deadline': 10, 'ttl': rdns.POSITIVE_TTL,
+                                     'negative_ttl': rdns.NEGATIVE_TTL}
+    opts = {'fqdns_workers': 2, 'fqdns_timeout': 1, 'fqdns_deadline': 3, 'fqdns_ttl': 60, 'fqdns_negative_ttl': 0}
+    assert rdns.resolve_args(opts) == {'workers': 2, 'timeout': 1, 'deadline': 3, 'ttl': 60, 'negative_ttl': 0}
+
+
+@pytest.fixture
+def host(resolver, monkeypatch):
+    '''
+    A host with the addresses of the stand-in resolver (and one without a name)
+    '''
+    monkeypatch.setattr(socket, 'gethostbyaddr', resolver.gethostbyaddr)
+    monkeypatch.setattr(socket, 'getfqdn', lambda name: name)
+    monkeypatch.setattr(hubblestack.utils.network, 'interfaces', lambda: {})
+    monkeypatch.setattr(hubblestack.utils.network, 'ip_addrs',
+                        lambda **kwargs: ['10.0.0.1', '10.0.0.2', '10.0.0.3'])
+    monkeypatch.setattr(hubblestack.utils.network, 'ip_addrs6', lambda **kwargs: ['fe80::1'])
+    resolver.names['10.0.0.2'] = 'one.example.com'
+    return resolver
+
+
+def _check_fqdns(fqdns, resolver):
+    assert fqdns() == {'fqdns': ['one.example.com', 'six.example.com']}
+    assert sorted(resolver.queries) == ['10.0.0.1', '10.0.0.2', '10.0.0.3', 'fe80::1']
+    # the next refresh reuses the names
+    assert fqdns() == {'fqdns': ['one.example.com', 'six.example.com']}
+    assert len(resolver.queries) == 4
+
+
+def test_fqdns_module(host):
+    network.__opts__ = {'fqdns_workers': 2}
+    try:
+        _check_fqdns(network.fqdns, host)
+    finally:
+        del network.__opts__
+
+
+def test_fqdns_grain(host, monkeypatch):
+    # hubble_core doesn't import on python 3.8+ (platform._supported_dists)
+    hubble_core = pytest.importorskip('hubblestack.grains.hubble_core', exc_type=ImportError)
+    monkeypatch.setattr(hubble_core, '_get_interfaces', lambda: {})
+    hubble_core.__opts__ = {'fqdns_workers': 2}
+    try:
+        _check_fqdns(hubble_core.fqdns, host)
+    finally:
+        del hubble_core.__opts__
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+
+import hubblestack.utils.sysctl as sysctl
+
+TREE = {
+    'kernel/randomize_va_space': '2\n',
+    'net/ipv4/ip_local_port_range': '32768\t60999\n',
+    'net/ipv4/conf/all/accept_redirects': '0\n',
+    'net/ipv4/conf/default/accept_redirects': '1\n',
+    'net/ipv4/conf/eth0.1/accept_redirects': '0\n',
+    'net/ipv4/conf/eth0.1/rp_filter': '1\n',
+    'vm/compact_memory': '',
+}
+
+
+class TestSysctl():
+
+    def setup_method(self):
+        self.root = tempfile.mkdtemp()
+        for path, value in TREE.items():
+            path = os.path.join(self.root, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as outfile:
+                outfile.write(value)
+        # write-only, like the real one
+        os.chmod(os.path.join(self.root, 'vm/compact_memory'), 0o200)
+
+    def teardown_method(self):
+        shutil.rmtree(self.root)
+
+    def test_key_to_path(self):
+        assert sysctl.key_to_path('kernel.randomize_va_space', '/proc/sys') == \
+            '/proc/sys/kernel/randomize_va_space'
+        assert sysctl.key_to_path('net.ipv4.conf.eth0/1.rp_filter', '/proc/sys') == \
+            '/proc/sys/net/ipv4/conf/eth0.1/rp_filter'
+        assert sysctl.key_to_path('net/ipv4/conf/eth0.1/rp_filter', '/proc/sys') == \
+            '/proc/sys/net/ipv4/conf/eth0.1/rp_filter'
+        assert sysctl.path_to_key('/proc/sys/net/ipv4/conf/eth0.1/rp_filter', '/proc/sys') == \
+            'net.ipv4.conf.eth0/1.rp_filter'
+
+    def test_read(self):
+        assert sysctl.available(self.root)
+        assert sysctl.read('kernel.randomize_va_space', self.root) == '2'
+        assert sysctl.read('net.ipv4.ip_local_port_range', self.root) == '32768\t60999'
+        assert sysctl.read('net.ipv4.conf.eth0/1.rp_filter', self.root) == '1'
+        assert sysctl.read('kernel.nope', self.root) is None
+        assert sysctl.read('net.ipv4', self.root) is None
+
+    def test_snapshot(self):
+        ret = sysctl.snapshot(['kernel.randomize_va_space', 'net.ipv4.conf.*.accept_redirects',
+                               'vm.*', 'kernel.nope'], self.root)
+        assert ret == {
+            'kernel.randomize_va_space': '2',
+            'net.ipv4.conf.*.accept_redirects': {'net.ipv4.conf.all.accept_redirects': '0',
+                                                 'net.ipv4.conf.default.accept_redirects': '1',
+                                                 'net.ipv4.conf.eth0/1.accept_redirects': '0'},
+            'vm.*': {},
+            'kernel.nope': None,
+        }
+        assert sorted(sysctl.read_glob('net.ipv4.*', self.root)) == [
+            'net.ipv4.conf.all.accept_redirects', 'net.ipv4.conf.default.accept_redirects',
+            'net.ipv4.conf.eth0/1.accept_redirects', 'net.ipv4.conf.eth0/1.rp_filter',
+            'net.ipv4.ip_local_port_range']
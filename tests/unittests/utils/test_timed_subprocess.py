@@ -1,6 +1,13 @@
 # -*- coding: utf-8 -*-
 
-from tests.support.unit import TestCase
+import subprocess
+import time
+from unittest.mock import patch
+
+from tests.support.unit import TestCase, skipIf
+import hubblestack.exceptions
+import hubblestack.utils.platform
+import hubblestack.utils.spawn_broker as spawn_broker
 import hubblestack.utils.timed_subprocess as timed_subprocess
 
 
@@ -14,3 +21,73 @@ class TestTimedSubprocess(TestCase):
         '''
         p = timed_subprocess.TimedProc(['echo', 'foo'], shell=True)
         del p  # Don't need this anymore
+
+
+@skipIf(hubblestack.utils.platform.is_windows(), 'The spawn broker is not used on Windows')
+class TestSpawnBroker(TestCase):
+    '''
+    TimedProc through hubblestack.utils.spawn_broker
+    '''
+    def setUp(self):
+        self.broker = spawn_broker.Broker()
+        self.broker.start()
+        self.patcher = patch.object(timed_subprocess, 'BROKER', self.broker)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.broker.stop()
+
+    def test_brokered(self):
+        proc = timed_subprocess.TimedProc(['sh', '-c', 'cat; echo err >&2; exit 3'], stdin='in',
+                                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertIsInstance(proc.process, spawn_broker.BrokeredProcess)
+        self.assertTrue(proc.process.pid)
+        self.assertEqual(proc.run(), 3)
+        self.assertEqual(proc.stdout, b'in')
+        self.assertEqual(proc.stderr, b'err\n')
+
+    def test_not_found(self):
+        self.assertRaises(OSError, timed_subprocess.TimedProc, ['/no/such/command'],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def test_timeout(self):
+        proc = timed_subprocess.TimedProc(['sleep', '30'], timeout=0.5,
+                                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertIsInstance(proc.process, spawn_broker.BrokeredProcess)
+        self.assertRaises(hubblestack.exceptions.TimedProcTimeoutError, proc.run)
+
+    def test_timeout_shell(self):
+        # the shell's children hold the pipes too, they are killed with it
+        start = time.time()
+        proc = timed_subprocess.TimedProc('sleep 8; echo hi', shell=True, timeout=1, with_communicate=True,
+                                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertIsInstance(proc.process, spawn_broker.BrokeredProcess)
+        self.assertRaises(hubblestack.exceptions.TimedProcTimeoutError, proc.run)
+        self.assertLess(time.time() - start, 3)
+
+    def test_timeout_left_group(self):
+        # a child that left the process group still holds the pipes: the
+        # timeout is reported without waiting for it
+        start = time.time()
+        proc = timed_subprocess.TimedProc(['sh', '-c', 'setsid sleep 8; echo hi'], timeout=1,
+                                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertRaises(hubblestack.exceptions.TimedProcTimeoutError, proc.run)
+        self.assertLess(time.time() - start, 3)
+        # and the broker keeps serving
+        proc = timed_subprocess.TimedProc(['echo', 'foo'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertEqual(proc.run(), 0)
+        self.assertEqual(proc.stdout, b'foo\n')
+
+    def test_spawned_directly(self):
+        # needs a preexec_fn, and then the broker stopped
+        proc = timed_subprocess.TimedProc(['true'], preexec_fn=lambda: None,
+                                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertIsInstance(proc.process, subprocess.Popen)
+        self.assertEqual(proc.run(), 0)
+        self.broker.stop()
+        proc = timed_subprocess.TimedProc(['echo', 'foo'],
+                                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertIsInstance(proc.process, subprocess.Popen)
+        proc.run()
+        self.assertEqual(proc.stdout, b'foo\n')
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+from tests.support.unit import TestCase
+
+import hubblestack.audit.misc
+import hubblestack.utils.treewalk as treewalk
+
+
+class TreeWalkTestCase(TestCase):
+    '''
+    Tests the functions in hubblestack.utils.treewalk
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.bad = []
+        for sub in ('', 'a', 'a/b', 'c', 'd'):
+            os.makedirs(os.path.join(self.tmpdir, sub), exist_ok=True)
+            for name, mode in (('ok', 0o600), ('ro', 0o444), ('bad', 0o666), ('exe', 0o4750)):
+                path = os.path.join(self.tmpdir, sub, name)
+                with open(path, 'w'):
+                    pass
+                os.chmod(path, mode)
+                if name in ('bad', 'exe'):
+                    self.bad.append(path)
+        # not followed or checked, like find -type f
+        os.symlink(os.path.join(self.tmpdir, 'a', 'bad'), os.path.join(self.tmpdir, 'link'))
+        os.symlink(os.path.join(self.tmpdir, 'a'), os.path.join(self.tmpdir, 'dirlink'))
+        self.mask = treewalk.permission_mask('644')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _check(self, path, stat_result):
+        return treewalk.file_mode(stat_result) if stat_result.st_mode & self.mask else None
+
+    def test_permission_mask(self):
+        self.assertEqual(treewalk.permission_mask('644'), 0o133)
+        self.assertEqual(treewalk.permission_mask(750), 0o027)
+
+    def test_sweep(self):
+        for workers in (1, 3):
+            found = dict(treewalk.sweep(self.tmpdir, self._check, workers=workers))
+            self.assertEqual(sorted(found), sorted(self.bad))
+            self.assertEqual(found[os.path.join(self.tmpdir, 'a', 'b', 'exe')], '4750')
+            self.assertEqual(found[os.path.join(self.tmpdir, 'bad')], '0666')
+
+    def test_single_file_and_missing(self):
+        path = os.path.join(self.tmpdir, 'c', 'bad')
+        self.assertEqual(treewalk.sweep(path, self._check), [(path, '0666')])
+        self.assertEqual(treewalk.sweep(os.path.join(self.tmpdir, 'nope'), self._check), [])
+
+    def test_limit(self):
+        for workers in (1, 3):
+            found = treewalk.sweep(self.tmpdir, self._check, workers=workers, limit=3)
+            self.assertEqual(len(found), 3)
+            self.assertTrue(set(path for path, _ in found) <= set(self.bad))
+
+    def test_check_directory_files_permission(self):
+        block = {'args': {'path': os.path.join(self.tmpdir, 'a', 'b'), 'permission': 644}}
+        ret = hubblestack.audit.misc._check_directory_files_permission('id', block)
+        self.assertIn(os.path.join(self.tmpdir, 'a', 'b', 'bad') + ': Bad Permission - 0666:', ret)
+        self.assertIn(os.path.join(self.tmpdir, 'a', 'b', 'exe') + ': Bad Permission - 4750:', ret)
+        block['args']['permission'] = 4777
+        self.assertTrue(hubblestack.audit.misc._check_directory_files_permission('id', block))